@@ -3,7 +3,7 @@
 import logging
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Body, Query
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime, timezone
@@ -18,7 +18,11 @@ from app.schemas.search import RankedHR  # Adjusted
 from app.schemas.admin import AssignHrRequest, UserActivationStatusUpdate # Adjusted (Added UserActivationStatusUpdate)
 
 from app.db.mongodb import mongodb # Adjusted
+from app.db.pool import LISTING, REPORTING, causal_tokens
+from app.db.repository import DocumentCodec, Repository
+from app.core.fast_json import FastJSONResponse
 from app.core.config import settings # Adjusted
+from app.core.principal_cache import principal_cache
 from app.services.invitation_service import InvitationService, InvitationError # Adjusted
 from app.services.search_service import SearchService  # Adjusted
 
@@ -34,6 +38,16 @@ def get_object_id(id_str: str) -> ObjectId:
         raise HTTPException(status_code=400, detail=f"Invalid ID format: {id_str}")
 
 
+def get_reporting_db():
+    """Database handle with the reporting read profile (dashboard counts may use a secondary)."""
+    return mongodb.get_db_for(REPORTING)
+
+
+def get_listing_db():
+    """Database handle with the listing read profile (secondaries within maxStalenessSeconds)."""
+    return mongodb.get_db_for(LISTING)
+
+
 # AssignHrRequest is now imported from app.schemas.admin
 
 
@@ -42,13 +56,17 @@ router = APIRouter(
     prefix="/admin", tags=["Admin"] # Removed global dependency
 )
 
+# The user listing decodes documents straight to response JSON instead of validating every row
+USER_CODEC = DocumentCodec(UserOut)
+
 
 # --- Admin User/Stats Routes --- (No change)
 @router.get("/users", response_model=List[UserOut], dependencies=[Depends(verify_admin_user)]) # Added specific dependency
 async def get_all_users(
     admin_user: User = Depends(verify_admin_user), # This inner Depends is for param injection, not auth for the route itself
-    db: AsyncIOMotorClient = Depends(mongodb.get_db),
-) -> List[UserOut]:
+    db: AsyncIOMotorClient = Depends(get_listing_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
+):
     logger.info(f"Admin {admin_user.username} requested list of all users (excluding other admins).")
     users_collection = db[settings.MONGODB_COLLECTION_USERS]
     # Filter out other admin users. The current admin might still see themselves if not explicitly excluded.
@@ -62,14 +80,15 @@ async def get_all_users(
             {"email": {"$not": {"$regex": "test", "$options": "i"}}} # Exclude emails containing "test" (case-insensitive)
         ]
     }
-    users_list = await users_collection.find(query).to_list(length=None)
-    return [UserOut.model_validate(u) for u in users_list]
+    causal_tokens.resume(admin_user.id, session) # Include this admin's own recent assignments
+    users_list = await Repository(users_collection).find_decoded(query, USER_CODEC, session=session)
+    return FastJSONResponse(users_list)
 
 
 @router.get("/stats", dependencies=[Depends(verify_admin_user)]) # Added specific dependency
 async def get_system_stats(
     admin_user: User = Depends(verify_admin_user), # Param injection
-    db: AsyncIOMotorClient = Depends(mongodb.get_db),
+    db: AsyncIOMotorClient = Depends(get_reporting_db),
 ):
     logger.info(f"Admin {admin_user.username} requested system stats.")
     # ... (fetch counts) ...
@@ -207,7 +226,7 @@ async def reject_hr_application(
 @router.get("/search-hr", response_model=List[RankedHR], dependencies=[Depends(verify_admin_user)]) # Added specific dependency
 async def search_hr_profiles(
     admin_user: User = Depends(verify_admin_user), # Param injection
-    db: AsyncIOMotorClient = Depends(mongodb.get_db),
+    db: AsyncIOMotorClient = Depends(get_listing_db),
     status_filter: Optional[HrStatus] = Query(None),
     keyword: Optional[str] = Query(None),
     yoe_min: Optional[int] = Query(None, ge=0),
@@ -302,6 +321,7 @@ async def assign_hr_to_candidate(
     assign_request: AssignHrRequest,
     admin_user: User = Depends(verify_admin_user), # Param injection
     db: AsyncIOMotorClient = Depends(mongodb.get_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (Implementation remains the same as previous version) ...
     candidate_oid = get_object_id(candidate_id)
@@ -347,13 +367,13 @@ async def assign_hr_to_candidate(
             "updated_at": datetime.now(timezone.utc),
         }
     }
-    update_result = await db[settings.MONGODB_COLLECTION_USERS].update_one(
-        {"_id": candidate_oid}, update_data
+    # The status condition makes the assignment atomic; the post-image is the response
+    updated_candidate_doc = await Repository.for_setting(db, "MONGODB_COLLECTION_USERS").update(
+        {"_id": candidate_oid, "mapping_status": "pending_assignment"}, update_data, session=session
     )
-    if update_result.modified_count == 1:
-        updated_candidate_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one(
-            {"_id": candidate_oid}
-        )
+    causal_tokens.remember(admin_user.id, session)
+    principal_cache.invalidate(user_id=candidate_oid)
+    if updated_candidate_doc is not None:
         return CandidateProfileOut.model_validate(updated_candidate_doc)
     else:
         logger.error(f"Failed assign HR for candidate {candidate_id}.")
@@ -0,0 +1,225 @@
+# admin_service/app/db/indexes.py
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import PyMongoError
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Case-insensitive collation of the login identifiers (matches USER_IDENTIFIER_COLLATION in security.py)
+IDENTIFIER_COLLATION = {"locale": "en", "strength": 2}
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    One index every deployment should have. `collection` is the settings attribute holding
+    the collection name (with `default_collection` for services that do not define it) and
+    `owner` is the service that creates it; the other services only report drift for it.
+    """
+    owner: str
+    collection: str
+    default_collection: str
+    keys: Tuple[Tuple[str, Any], ...]
+    name: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    serves: str = "" # The query shapes this index exists for
+
+    def collection_name(self) -> str:
+        return getattr(settings, self.collection, self.default_collection)
+
+
+def _spec(owner: str, collection: str, default_collection: str, keys: Sequence[Tuple[str, Any]], name: str, serves: str, **options: Any) -> IndexSpec:
+    return IndexSpec(owner, collection, default_collection, tuple(keys), name, options, serves)
+
+
+# --- Index Registry ---
+# Derived from the query shapes in the routes and services of every service; keep it in sync
+# when adding a query on a non-_id field.
+INDEX_SPECS: List[IndexSpec] = [
+    # users
+    _spec("auth", "MONGODB_COLLECTION_USERS", "users", [("email", ASCENDING)], "users_email_ci_unique",
+          "login, registration and every get_current_user lookup by email", unique=True, collation=IDENTIFIER_COLLATION),
+    _spec("auth", "MONGODB_COLLECTION_USERS", "users", [("username", ASCENDING)], "users_username_ci_unique",
+          "login and registration by username", unique=True, collation=IDENTIFIER_COLLATION),
+    _spec("auth", "MONGODB_COLLECTION_USERS", "users", [("updated_at", ASCENDING)], "users_updated_at",
+          "principal-cache invalidation polling {updated_at: {$gt}}"),
+    _spec("admin", "MONGODB_COLLECTION_USERS", "users", [("role", ASCENDING), ("mapping_status", ASCENDING), ("updated_at", DESCENDING)],
+          "users_role_mapping_status_updated_at",
+          "candidate search {role, mapping_status} sorted by updated_at; admin stats counts"),
+    _spec("admin", "MONGODB_COLLECTION_USERS", "users", [("role", ASCENDING), ("hr_status", ASCENDING)], "users_role_hr_status",
+          "HR search {role: hr, hr_status}; admin stats counts; admin list {role: admin}"),
+    _spec("admin", "MONGODB_COLLECTION_USERS", "users", [("assigned_hr_id", ASCENDING), ("role", ASCENDING)], "users_assigned_hr_role",
+          "HR assigned-candidates list {role: candidate, assigned_hr_id}"),
+    _spec("admin", "MONGODB_COLLECTION_USERS", "users",
+          [("username", TEXT), ("email", TEXT), ("company", TEXT), ("full_name", TEXT), ("extracted_skills_list", TEXT)],
+          "user_text_search_index", "admin and HR keyword search ($text)", default_language="english"),
+    # hr_mapping_requests
+    _spec("hr", "MONGODB_COLLECTION_HR_MAPPING_REQUESTS", "hr_mapping_requests",
+          [("target_id", ASCENDING), ("request_type", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING)],
+          "hr_mapping_requests_target_type_status_created_at",
+          "pending applications/invitations for a target sorted by created_at; accept/reject lookups"),
+    _spec("hr", "MONGODB_COLLECTION_HR_MAPPING_REQUESTS", "hr_mapping_requests",
+          [("requester_id", ASCENDING), ("request_type", ASCENDING), ("status", ASCENDING)],
+          "hr_mapping_requests_requester_type_status",
+          "an HR's own applications by status; admin sent invitations; supersede/active checks"),
+    # messages
+    _spec("hr", "MONGODB_COLLECTION_MESSAGES", "messages", [("recipient_id", ASCENDING), ("sent_at", DESCENDING)],
+          "messages_recipient_sent_at", "inbox {recipient_id} sorted by sent_at desc; mark read/unread"),
+    # interviews
+    _spec("interview", "MONGODB_COLLECTION_INTERVIEWS", "interviews", [("interview_id", ASCENDING)], "interviews_interview_id",
+          "every per-interview lookup {interview_id[, candidate_id, status]}"),
+    _spec("interview", "MONGODB_COLLECTION_INTERVIEWS", "interviews",
+          [("candidate_id", ASCENDING), ("status", ASCENDING), ("completed_at", DESCENDING)],
+          "interviews_candidate_status_completed_at", "candidate interview list and completed history"),
+    _spec("interview", "MONGODB_COLLECTION_INTERVIEWS", "interviews", [("status", ASCENDING)], "interviews_status",
+          "/interviews/all?status and admin stats counts"),
+    # responses
+    _spec("interview", "MONGODB_COLLECTION_RESPONSES", "responses",
+          [("interview_id", ASCENDING), ("candidate_id", ASCENDING), ("question_id", ASCENDING)],
+          "responses_interview_candidate_question",
+          "response upsert {interview_id, question_id, candidate_id}; per-interview lists and counts"),
+    # questions
+    _spec("interview", "MONGODB_COLLECTION_QUESTIONS", "questions", [("pool_key", ASCENDING), ("created_at", ASCENDING)],
+          "questions_pool_key_created_at", "question-pool claims (oldest first), counts and distinct texts per pool"),
+    _spec("interview", "MONGODB_COLLECTION_QUESTIONS", "questions", [("claimed_at", ASCENDING)], "questions_claimed_at",
+          "question-pool warmer releasing stale claims {claimed_at: {$lt}}", partialFilterExpression={"claimed_at": {"$exists": True}}),
+    # llm_metrics
+    _spec("interview", "MONGODB_COLLECTION_LLM_METRICS", "llm_metrics", [("created_at", ASCENDING)], "llm_metrics_created_at",
+          "LLM metrics aggregation {created_at: {$gte: since}}"),
+    # auth-owned token collections
+    _spec("auth", "MONGODB_COLLECTION_REFRESH_TOKENS", "refresh_tokens", [("expires_at", ASCENDING)], "refresh_token_expiry_ttl",
+          "TTL purge of expired refresh tokens", expireAfterSeconds=0),
+    _spec("auth", "MONGODB_COLLECTION_REFRESH_TOKENS", "refresh_tokens", [("user_id", ASCENDING)], "refresh_token_user_id",
+          "revoking a user's refresh tokens"),
+    _spec("auth", "MONGODB_COLLECTION_PASSWORD_RESET_TOKENS", "password_reset_tokens", [("token_hash", ASCENDING)],
+          "password_reset_token_hash_unique", "reset confirmation find_one_and_delete by digest", unique=True),
+    _spec("auth", "MONGODB_COLLECTION_PASSWORD_RESET_TOKENS", "password_reset_tokens", [("expires_at", ASCENDING)],
+          "password_reset_token_expiry_ttl", "TTL purge of unused reset tokens", expireAfterSeconds=0),
+    _spec("auth", "MONGODB_COLLECTION_PASSWORD_RESET_TOKENS", "password_reset_tokens", [("user_id", ASCENDING)],
+          "password_reset_token_user_id", "replacing a user's outstanding reset token"),
+    _spec("auth", "MONGODB_COLLECTION_LOGIN_THROTTLE", "login_throttle", [("expires_at", ASCENDING)], "login_throttle_expiry_ttl",
+          "TTL purge of shared login-throttle windows", expireAfterSeconds=0),
+]
+
+# Options that describe an index (as reported by index_information) and must match the spec
+_COMPARED_OPTIONS = ("unique", "expireAfterSeconds", "collation", "sparse", "partialFilterExpression")
+
+
+def _normalize_keys(keys: Sequence[Tuple[str, Any]]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple((name, int(direction) if isinstance(direction, (int, float)) else direction) for name, direction in keys)
+
+
+def _text_fields(info: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    weights = info.get("weights")
+    return tuple(sorted(weights)) if weights else None
+
+
+def diff_index(spec: IndexSpec, info: Dict[str, Any]) -> List[str]:
+    """Differences between a spec and an existing index of the same name (empty when they match)."""
+    differences = []
+    if any(direction == TEXT for _, direction in spec.keys):
+        expected_fields = tuple(sorted(name for name, direction in spec.keys if direction == TEXT))
+        if _text_fields(info) != expected_fields:
+            differences.append(f"text fields {_text_fields(info)} != {expected_fields}")
+    elif _normalize_keys(info.get("key", [])) != _normalize_keys(spec.keys):
+        differences.append(f"keys {list(info.get('key', []))} != {list(spec.keys)}")
+    for option in _COMPARED_OPTIONS:
+        expected = spec.options.get(option)
+        actual = info.get(option)
+        if option == "collation" and expected is not None and actual is not None:
+            actual = {k: actual.get(k) for k in expected}
+        if option == "unique":
+            expected, actual = bool(expected), bool(actual)
+        if expected != actual:
+            differences.append(f"{option} {actual!r} != {expected!r}")
+    return differences
+
+
+class IndexReconciler:
+    """
+    Brings the indexes of the registry into existence at startup without delaying it. Indexes
+    owned by this service that are missing are created; for every registered collection the
+    service touches, indexes that differ from their spec and indexes nobody declared are
+    reported (never dropped automatically).
+    """
+
+    def __init__(self, specs: Sequence[IndexSpec] = INDEX_SPECS):
+        self.specs = list(specs)
+        self.last_report: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def reconcile(self, db: AsyncIOMotorDatabase, owner: str, create: bool = True) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"created": [], "missing": [], "mismatched": [], "undeclared": [], "failed": []}
+        by_collection: Dict[str, List[IndexSpec]] = {}
+        for spec in self.specs:
+            by_collection.setdefault(spec.collection_name(), []).append(spec)
+
+        for collection_name, specs in by_collection.items():
+            collection = db[collection_name]
+            try:
+                existing = await collection.index_information()
+            except PyMongoError as e:
+                report["failed"].append({"collection": collection_name, "error": str(e)})
+                continue
+            declared = {spec.name for spec in specs}
+            for spec in specs:
+                label = f"{collection_name}.{spec.name}"
+                if spec.name in existing:
+                    differences = diff_index(spec, existing[spec.name])
+                    if differences:
+                        report["mismatched"].append({"index": label, "differences": differences})
+                    continue
+                if spec.owner != owner or not create:
+                    report["missing"].append(label)
+                    continue
+                try:
+                    await collection.create_index(list(spec.keys), name=spec.name, **spec.options)
+                    report["created"].append(label)
+                except PyMongoError as e:
+                    report["failed"].append({"index": label, "error": str(e)})
+            report["undeclared"].extend(
+                f"{collection_name}.{name}" for name in existing if name != "_id_" and name not in declared
+            )
+
+        for label in report["created"]:
+            logger.info(f"Created index {label}.")
+        for item in report["mismatched"]:
+            logger.warning(f"Index drift: {item['index']} differs from its spec ({'; '.join(item['differences'])}). Drop and let startup recreate it.")
+        for item in report["failed"]:
+            logger.error(f"Index reconciliation failed for {item.get('index') or item.get('collection')}: {item['error']}")
+        if report["undeclared"]:
+            logger.info(f"Indexes not in the registry (left untouched): {', '.join(report['undeclared'])}")
+        self.last_report = report
+        return report
+
+    def start(self, db: AsyncIOMotorDatabase, owner: str) -> None:
+        """Runs reconciliation in the background so index builds never block startup."""
+        if not settings.INDEX_RECONCILE_ENABLED or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(db, owner))
+
+    async def _run(self, db: AsyncIOMotorDatabase, owner: str) -> None:
+        try:
+            await self.reconcile(db, owner, create=settings.INDEX_RECONCILE_CREATE)
+        except Exception as e:
+            logger.error(f"Index reconciliation aborted: {e}", exc_info=True)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+index_reconciler = IndexReconciler()
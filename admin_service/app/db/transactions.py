@@ -0,0 +1,89 @@
+# admin_service/app/db/transactions.py
+
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from pymongo import ReadPreference
+from pymongo.errors import PyMongoError
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSIENT_TRANSACTION_ERROR = "TransientTransactionError"
+UNKNOWN_COMMIT_RESULT = "UnknownTransactionCommitResult"
+COMMIT_ATTEMPTS = 3
+
+# Whether each client's deployment supports transactions (replica set or sharded), keyed by id(client)
+_support: Dict[int, bool] = {}
+
+
+async def transactions_supported(client: AsyncIOMotorClient) -> bool:
+    """True when transactions are enabled and the deployment is a replica set or mongos."""
+    if not settings.MONGODB_TRANSACTIONS_ENABLED:
+        return False
+    key = id(client)
+    if key not in _support:
+        hello = await client.admin.command("hello")
+        _support[key] = "setName" in hello or hello.get("msg") == "isdbgrid"
+        if not _support[key]:
+            logger.warning("MongoDB is a standalone server: mapping flows run without transactions (guarded single-document writes only).")
+    return _support[key]
+
+
+async def _commit(session: AsyncIOMotorClientSession, label: str) -> None:
+    for attempt in range(1, COMMIT_ATTEMPTS + 1):
+        try:
+            await session.commit_transaction()
+            return
+        except PyMongoError as e:
+            # The commit may or may not have applied; committing again is safe and settles it
+            if e.has_error_label(UNKNOWN_COMMIT_RESULT) and attempt < COMMIT_ATTEMPTS:
+                logger.warning(f"Transaction '{label}': commit result unknown ({e}); retrying commit.")
+                continue
+            raise
+
+
+async def run_in_transaction(
+    client: AsyncIOMotorClient,
+    callback: Callable[[Optional[AsyncIOMotorClientSession]], Awaitable[T]],
+    label: str,
+) -> T:
+    """
+    Runs `callback(session)` in a snapshot transaction with majority writes on the primary.
+    The whole callback is retried (after a short jittered backoff) when the server labels the
+    failure TransientTransactionError, e.g. a write conflict with a concurrent transaction on
+    the same document, up to MONGODB_TRANSACTION_MAX_ATTEMPTS. Any other exception, including
+    the caller's own business errors, aborts the transaction and propagates. On a standalone
+    server the callback runs once with session=None.
+    """
+    if not await transactions_supported(client):
+        return await callback(None)
+
+    attempts = max(1, settings.MONGODB_TRANSACTION_MAX_ATTEMPTS)
+    async with await client.start_session() as session:
+        for attempt in range(1, attempts + 1):
+            session.start_transaction(
+                read_concern=ReadConcern("snapshot"),
+                write_concern=WriteConcern("majority"),
+                read_preference=ReadPreference.PRIMARY,
+            )
+            try:
+                result = await callback(session)
+                await _commit(session, label)
+                return result
+            except Exception as e:
+                if session.in_transaction:
+                    await session.abort_transaction()
+                transient = isinstance(e, PyMongoError) and e.has_error_label(TRANSIENT_TRANSACTION_ERROR)
+                if not transient or attempt == attempts:
+                    raise
+                logger.info(f"Transaction '{label}' hit a transient error (attempt {attempt}/{attempts}): {e}")
+                await asyncio.sleep(random.uniform(0, 0.005 * 2 ** attempt))
@@ -1,13 +1,21 @@
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import application components
 from .core.config import settings
+from .core.request_context import RequestContextMiddleware
 from .db.mongodb import mongodb
+from .db.indexes import index_reconciler
+from .db.pool import pool_metrics
+from .db.query_stats import query_stats
+from .core.principal_cache import user_change_feed
+from .db.change_events import change_event_bus
+from .core.token_verifier import token_verifier
+from .core.auth_client import auth_client
 from .api.routes import admin as admin_router
 
 # --- Logging Setup ---
@@ -27,33 +35,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         await mongodb.connect()
         db_connected = True
         logger.info("Admin Service: MongoDB connection successful.")
+        user_change_feed.start(mongodb.get_db())
+        change_event_bus.start(mongodb.get_db()) # After the subscribers above
 
-        # Ensure text index exists for user search
-        try:
-            db = mongodb.get_db()
-            users_collection = db[settings.MONGODB_COLLECTION_USERS]
-            index_name = "user_text_search_index"
-            existing_indexes = await users_collection.index_information()
-            if index_name not in existing_indexes:
-                logger.info(f"Creating text index '{index_name}' on users collection for fields: username, email, company.")
-                await users_collection.create_index(
-                    [
-                        ("username", "text"),
-                        ("email", "text"),
-                        ("company", "text"), # Primarily for HR profiles
-                        ("full_name", "text"), # For candidate/user profiles if applicable
-                        ("extracted_skills_list", "text") # For candidate/HR profiles
-                    ],
-                    name=index_name,
-                    default_language="english"
-                )
-                logger.info(f"Text index '{index_name}' created successfully.")
-            else:
-                logger.info(f"Text index '{index_name}' already exists on users collection.")
-        except Exception as index_e:
-            logger.error(f"Error ensuring text index on users collection: {index_e}", exc_info=True)
-            # Depending on policy, you might want to raise this error or allow startup
-            # For now, logging error and continuing startup.
+        # Search (text) and role/status indexes on users come from the registry in app/db/indexes.py
+        index_reconciler.start(mongodb.get_db(), owner="admin")
 
         # Add any admin-service specific seeding if needed
         logger.info("Admin Service: Application startup complete.")
@@ -63,6 +49,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     finally:
         logger.info("Admin Service: Application shutdown sequence initiated...")
         if db_connected:
+            await change_event_bus.stop()
+            await user_change_feed.stop()
+            await index_reconciler.stop()
+            await auth_client.aclose()
             await mongodb.close()
             logger.info("Admin Service: MongoDB connection closed.")
         else:
@@ -104,6 +94,8 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 logger.info(f"CORS middleware enabled for Admin Service. Allowed origins: {configured_origins}")
+# Exposes the matched route to code outside the route, e.g. for per-route query stats
+app.add_middleware(RequestContextMiddleware)
 
 # --- API Router Inclusion (Placeholder) ---
 app.include_router(admin_router.router, prefix="/api/v1", tags=["Admin"]) # Using /api/v1 as base
@@ -118,3 +110,28 @@ async def read_root() -> dict[str, str]:
 @app.get("/health", tags=["Health Check"])
 async def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+# Token verification cache effectiveness and latency of full signature checks
+@app.get("/health/token-verification", tags=["Health Check"])
+async def token_verification_stats() -> Dict[str, Any]:
+    return token_verifier.stats()
+
+
+# MongoDB connection pool checkouts, connections in use and checkout wait times
+@app.get("/health/db-pool", tags=["Health Check"])
+async def db_pool_stats() -> Dict[str, Any]:
+    return pool_metrics.snapshot()
+
+
+# Per-route query histograms and recent slow commands (filter values redacted), with pool and index state.
+# Exposes route and query shapes, so it is off unless DEBUG_ENDPOINTS_ENABLED is set.
+@app.get("/debug/db-stats", tags=["Health Check"], include_in_schema=settings.DEBUG_ENDPOINTS_ENABLED)
+async def db_stats(limit: int = Query(50, ge=1, le=500)) -> Dict[str, Any]:
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return {
+        "queries": query_stats.snapshot(limit=limit),
+        "pool": pool_metrics.snapshot(),
+        "indexes": index_reconciler.last_report,
+        "change_events": change_event_bus.snapshot(),
+    }
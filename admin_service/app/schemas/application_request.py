@@ -7,7 +7,21 @@ from datetime import datetime
 from .user import PyObjectIdStr, UserRole # This should work as user.py is in the same directory
 
 RequestMappingType = Literal["application", "request"]
-RequestMappingStatus = Literal["pending", "accepted", "rejected", "cancelled"]
+# Same status list as hr_service's models/application_request.py, which creates applications
+RequestMappingStatus = Literal[
+    "pending",
+    "accepted",
+    "rejected",
+    "cancelled",
+    "pending_admin_approval",
+    "admin_approved",
+    "admin_rejected",
+    "hr_confirmed_mapping",
+    "hr_rejected_invitation",
+    "hr_cancelled_application",
+    "request_pending_hr_approval",
+    "superceded"
+]
 
 class UserInfoBasic(BaseModel):
     id: PyObjectIdStr
@@ -1,13 +1,16 @@
 # LLM_interviewer/server/app/services/invitation_service.py
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal, Tuple
 from datetime import datetime, timezone 
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorClient 
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
 
 from app.db.mongodb import mongodb # Adjusted
+from app.db.repository import Repository
+from app.db.transactions import run_in_transaction
 from app.core.config import settings # Adjusted
+from app.core.principal_cache import principal_cache
 from app.models.user import User, HrStatus # Adjusted
 from app.schemas.application_request import HRMappingRequest, RequestMappingStatus, RequestMappingType # Adjusted
 
@@ -24,21 +27,40 @@ class InvitationService:
         self.user_collection = self.db[settings.MONGODB_COLLECTION_USERS]
         self.request_collection_name = "hr_mapping_requests" 
         self.request_collection = self.db[self.request_collection_name]
+        self.requests = Repository(self.request_collection)
 
-    async def _check_existing_pending(self, hr_user_id: ObjectId) -> bool:
+    async def _check_existing_pending(self, hr_user_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> bool:
         pending_item = await self.request_collection.find_one({
             "status": "pending",
             "$or": [
                 {"requester_id": hr_user_id, "request_type": "application"},
                 {"target_id": hr_user_id, "request_type": "request"}
             ]
-        })
+        }, session=session)
         if pending_item:
             logger.warning(f"HR User {hr_user_id} already has a pending application or request ({pending_item['_id']}).")
             return True
         return False
 
-    async def _cleanup_pending_for_user(self, hr_user_id: ObjectId, accepted_request_id: ObjectId):
+    async def _check_hr_has_active_requests(self, hr_user_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> bool:
+        """Checks if an HR user has any active (non-finalized) applications or invitations."""
+        active_statuses: List[RequestMappingStatus] = [
+            "pending_admin_approval",
+            "admin_approved",
+            "request_pending_hr_approval"
+        ]
+        active_request = await self.request_collection.find_one({
+            "$or": [
+                {"requester_id": hr_user_id, "request_type": "application", "status": {"$in": active_statuses}},
+                {"target_id": hr_user_id, "request_type": "request", "status": {"$in": active_statuses}}
+            ]
+        }, session=session)
+        if active_request:
+            logger.info(f"HR User {hr_user_id} has an active request/application: ID {active_request['_id']}, Status {active_request['status']}.")
+            return True
+        return False
+
+    async def _cleanup_pending_for_user(self, hr_user_id: ObjectId, accepted_request_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None):
         now = datetime.now(timezone.utc)
         logger.info(f"Cleaning up other pending requests/applications for HR {hr_user_id}, excluding accepted item {accepted_request_id}")
         await self.request_collection.update_many(
@@ -48,7 +70,8 @@ class InvitationService:
                  "status": "pending",
                  "request_type": "application"
              },
-             {"$set": {"status": "cancelled", "updated_at": now}}
+             {"$set": {"status": "cancelled", "updated_at": now}},
+             session=session,
         )
         await self.request_collection.update_many(
              {
@@ -57,7 +80,8 @@ class InvitationService:
                  "status": "pending",
                  "request_type": "request"
              },
-             {"$set": {"status": "rejected", "updated_at": now}}
+             {"$set": {"status": "rejected", "updated_at": now}},
+             session=session,
         )
         logger.info(f"Cleanup complete for HR {hr_user_id}.")
 
@@ -71,27 +95,32 @@ class InvitationService:
         if not target_admin: raise InvitationError(f"Target Admin {target_admin_id} not found or is not an Admin.")
 
         logger.info(f"Creating application from HR {hr_user.id} to Admin {target_admin_id}")
-        now = datetime.now(timezone.utc)
-        application_doc = {
-            "request_type": "application", "requester_id": hr_user.id, "requester_role": "hr",
-            "target_id": target_admin_id, "target_role": "admin", "status": "pending",
-            "created_at": now, "updated_at": now
-        }
-        insert_result = await self.request_collection.insert_one(application_doc)
-        if not insert_result.acknowledged:
-            raise InvitationError("Failed to create application record in database.")
-        created_doc = await self.request_collection.find_one({"_id": insert_result.inserted_id})
-        if not created_doc:
-             raise InvitationError("Failed to retrieve created application record.")
 
-        update_result = await self.user_collection.update_one(
-            {"_id": hr_user.id},
-            {"$set": {"hr_status": "application_pending", "updated_at": now}}
-        )
-        if update_result.modified_count == 0:
-             logger.error(f"Failed to update HR user {hr_user.id} status after creating application {insert_result.inserted_id}")
-             await self.request_collection.delete_one({"_id": insert_result.inserted_id})
-             raise InvitationError("Failed to update HR user status.")
+        async def apply(session: Optional[AsyncIOMotorClientSession]) -> Dict[str, Any]:
+            now = datetime.now(timezone.utc)
+            # The HR's own document is written first: two concurrent applications by the same HR
+            # conflict here, and the retried one no longer finds the HR 'profile_complete'.
+            update_result = await self.user_collection.update_one(
+                {"_id": hr_user.id, "hr_status": "profile_complete"},
+                {"$set": {"hr_status": "application_pending", "updated_at": now}},
+                session=session,
+            )
+            if update_result.matched_count == 0:
+                logger.error(f"Failed to update HR user {hr_user.id} from 'profile_complete' to 'application_pending'.")
+                raise InvitationError("Failed to update HR user status.")
+            if await self._check_existing_pending(hr_user.id, session=session):
+                raise InvitationError("HR user already has a pending application or request.")
+
+            application_doc = {
+                "request_type": "application", "requester_id": hr_user.id, "requester_role": "hr",
+                "target_id": target_admin_id, "target_role": "admin", "status": "pending",
+                "created_at": now, "updated_at": now
+            }
+            # The inserted document (with its new _id) is the record; no read-back
+            return await self.requests.insert(application_doc, session=session)
+
+        created_doc = await run_in_transaction(self.db.client, apply, "create_hr_application")
+        principal_cache.invalidate(user_id=hr_user.id)
         return HRMappingRequest.model_validate(created_doc)
 
 
@@ -114,117 +143,140 @@ class InvitationService:
         if await self._check_existing_pending(target_hr_id): raise InvitationError("Target HR user already has a pending application or request.")
 
         logger.info(f"Creating mapping request from Admin {admin_user.id} to HR {target_hr_id}")
-        now = datetime.now(timezone.utc)
-        request_doc = {
-            "request_type": "request", "requester_id": admin_user.id, "requester_role": "admin",
-            "target_id": target_hr_id, "target_role": "hr", "status": "pending",
-            "created_at": now, "updated_at": now
-        }
-        insert_result = await self.request_collection.insert_one(request_doc)
-        if not insert_result.acknowledged:
-            raise InvitationError("Failed to create request record in database.")
-        created_doc = await self.request_collection.find_one({"_id": insert_result.inserted_id})
-        if not created_doc:
-             raise InvitationError("Failed to retrieve created request record.")
-        
-        update_result = await self.user_collection.update_one(
-            {"_id": target_hr_id, "hr_status": "profile_complete"},
-            {"$set": {"hr_status": "admin_request_pending", "updated_at": now}}
-        )
-        if update_result.modified_count == 0: 
-            logger.error(f"Failed to update HR user {target_hr_id} from 'profile_complete' to 'admin_request_pending'.")
-            await self.request_collection.delete_one({"_id": insert_result.inserted_id}) 
-            raise InvitationError("Failed to update HR user status.")
+
+        async def invite(session: Optional[AsyncIOMotorClientSession]) -> Dict[str, Any]:
+            now = datetime.now(timezone.utc)
+            # Concurrent invitations to one HR conflict on the HR's document; only one moves it on
+            update_result = await self.user_collection.update_one(
+                {"_id": target_hr_id, "hr_status": "profile_complete"},
+                {"$set": {"hr_status": "admin_request_pending", "updated_at": now}},
+                session=session,
+            )
+            if update_result.matched_count == 0:
+                logger.error(f"Failed to update HR user {target_hr_id} from 'profile_complete' to 'admin_request_pending'.")
+                raise InvitationError("Failed to update HR user status.")
+            if await self._check_existing_pending(target_hr_id, session=session):
+                raise InvitationError("Target HR user already has a pending application or request.")
+
+            request_doc = {
+                "request_type": "request", "requester_id": admin_user.id, "requester_role": "admin",
+                "target_id": target_hr_id, "target_role": "hr", "status": "pending",
+                "created_at": now, "updated_at": now
+            }
+            # The inserted document (with its new _id) is the record; no read-back
+            return await self.requests.insert(request_doc, session=session)
+
+        created_doc = await run_in_transaction(self.db.client, invite, "create_admin_request")
+        principal_cache.invalidate(user_id=target_hr_id)
         return HRMappingRequest.model_validate(created_doc)
 
     async def accept_request_or_application(self, request_id: ObjectId, accepting_user: User) -> bool:
+        """
+        Accepts a pending request or application targeting `accepting_user`: the HR is mapped, the
+        item is marked 'accepted' and the HR's other pending items are closed in one transaction.
+        """
         logger.info(f"User {accepting_user.id} attempting to accept request/application {request_id}")
-        now = datetime.now(timezone.utc)
-        request_doc = await self.request_collection.find_one({
-            "_id": request_id, "target_id": ObjectId(str(accepting_user.id)), "status": "pending"
-        })
-        if not request_doc:
-            logger.error(f"Pending request/application {request_id} not found for target user {accepting_user.id}.")
-            raise InvitationError("Request/Application not found or already actioned.")
-        hr_map_request = HRMappingRequest.model_validate(request_doc)
+        accepting_oid = ObjectId(str(accepting_user.id))
 
-        if hr_map_request.request_type == "application":
-            if accepting_user.role != "admin": raise InvitationError("Only Admins can accept applications.")
-            admin_oid_for_db = ObjectId(str(accepting_user.id))
-            hr_oid_for_db = ObjectId(str(hr_map_request.requester_id))
-        elif hr_map_request.request_type == "request":
-            if accepting_user.role != "hr": raise InvitationError("Only HR can accept admin requests.")
-            hr_oid_for_db = ObjectId(str(accepting_user.id))
-            admin_oid_for_db = ObjectId(str(hr_map_request.requester_id))
-        else:
-            raise InvitationError("Invalid request type.")
+        async def accept(session: Optional[AsyncIOMotorClientSession]) -> ObjectId:
+            now = datetime.now(timezone.utc)
+            request_doc = await self.request_collection.find_one({
+                "_id": request_id, "target_id": accepting_oid, "status": "pending"
+            }, session=session)
+            if not request_doc:
+                logger.error(f"Pending request/application {request_id} not found for target user {accepting_user.id}.")
+                raise InvitationError("Request/Application not found or already actioned.")
+            hr_map_request = HRMappingRequest.model_validate(request_doc)
 
-        hr_user_to_update = await self.user_collection.find_one({"_id": hr_oid_for_db})
-        if not hr_user_to_update:
-            # This should ideally not happen if request_doc was valid and contained this hr_oid_for_db
-            logger.error(f"Consistency Error: HR user {hr_oid_for_db} referenced in request {request_id} not found in user collection.")
-            raise InvitationError(f"HR user {hr_oid_for_db} not found during acceptance process.")
-        
-        original_hr_status_before_mapping = hr_user_to_update.get("hr_status")
-        logger.info(f"HR user {hr_oid_for_db} current status before attempting to map: '{original_hr_status_before_mapping}'")
-
-        expected_pending_statuses = ["application_pending", "admin_request_pending"]
-        if original_hr_status_before_mapping not in expected_pending_statuses:
-            logger.error(f"HR user {hr_oid_for_db} status is '{original_hr_status_before_mapping}', which is not in the expected pending states {expected_pending_statuses} for mapping. Acceptance process cannot proceed with this status.")
-            # This is a critical state mismatch. The HR user should be in a pending state.
-            raise InvitationError(f"HR user status '{original_hr_status_before_mapping}' is not valid for mapping. Expected one of {expected_pending_statuses}.")
-
-        # Attempt to update the HR user's status to "mapped"
-        hr_update_result = await self.user_collection.update_one(
-            {"_id": hr_oid_for_db}, # We've already confirmed the user exists and their status is (supposedly) correct for update.
-            {"$set": {"hr_status": "mapped", "admin_manager_id": admin_oid_for_db, "updated_at": now}}
-        )
-        
-        # Explicitly check if the update to "mapped" was successful
-        if hr_update_result.modified_count == 0:
-            # This means the status was NOT changed to "mapped".
-            # This could happen if, despite the check above, the status wasn't actually one of the expected_pending_statuses at the moment of update,
-            # or if it was already "mapped" (which the previous check should prevent from raising error but this log would catch), or another DB issue.
-            updated_hr_doc_after_failed_modify = await self.user_collection.find_one({"_id": hr_oid_for_db})
-            current_db_status_after_attempt = updated_hr_doc_after_failed_modify.get('hr_status') if updated_hr_doc_after_failed_modify else 'NOT_FOUND'
-            logger.error(f"CRITICAL: Failed to modify HR user {hr_oid_for_db} status to 'mapped'. "
-                         f"Original status was '{original_hr_status_before_mapping}'. "
-                         f"Current DB status after attempt: '{current_db_status_after_attempt}'. "
-                         f"Update result: matched_count={hr_update_result.matched_count}, modified_count={hr_update_result.modified_count}. "
-                         f"This indicates a problem with the update operation itself or a race condition if matched_count was 1 but modified_count was 0.")
-            # Do NOT proceed to update the request status if HR status update failed.
-            raise InvitationError("Failed to update HR user status to 'mapped' in the database. Request acceptance aborted.")
-        
-        logger.info(f"HR user {hr_oid_for_db} status successfully updated to 'mapped'. Matched: {hr_update_result.matched_count}, Modified: {hr_update_result.modified_count}")
-        
-        # Fetch the user doc again to log its state immediately after successful update attempt
-        updated_hr_doc_for_log = await self.user_collection.find_one({"_id": hr_oid_for_db})
-        logger.info(f"HR user {hr_oid_for_db} state immediately after successful 'mapped' update: {updated_hr_doc_for_log}") # This should now show 'mapped'
+            if hr_map_request.request_type == "application":
+                if accepting_user.role != "admin": raise InvitationError("Only Admins can accept applications.")
+                admin_oid_for_db = accepting_oid
+                hr_oid_for_db = ObjectId(str(hr_map_request.requester_id))
+            elif hr_map_request.request_type == "request":
+                if accepting_user.role != "hr": raise InvitationError("Only HR can accept admin requests.")
+                hr_oid_for_db = accepting_oid
+                admin_oid_for_db = ObjectId(str(hr_map_request.requester_id))
+            else:
+                raise InvitationError("Invalid request type.")
 
-        # Now, update the request/application status to "accepted"
-        req_update_result = await self.request_collection.update_one(
-            {"_id": request_id, "status": "pending"}, # Ensure we only update if still pending
-            {"$set": {"status": "accepted", "updated_at": now}}
-        )
+            # Map the HR only from a pending state. Concurrent acceptances for the same HR conflict
+            # on this document, and the retried ones find the HR already mapped.
+            expected_pending_statuses = ["application_pending", "admin_request_pending"]
+            hr_update_result = await self.user_collection.update_one(
+                {"_id": hr_oid_for_db, "hr_status": {"$in": expected_pending_statuses}},
+                {"$set": {"hr_status": "mapped", "admin_manager_id": admin_oid_for_db, "updated_at": now}},
+                session=session,
+            )
+            if hr_update_result.matched_count == 0:
+                logger.error(f"HR user {hr_oid_for_db} not found or not in one of {expected_pending_statuses}; acceptance of {request_id} aborted.")
+                raise InvitationError(f"HR user status is not valid for mapping. Expected one of {expected_pending_statuses}.")
+
+            updated_request_doc = await self.requests.update(
+                {"_id": request_id, "status": "pending"},
+                {"$set": {"status": "accepted", "updated_at": now}},
+                session=session,
+            )
+            if updated_request_doc is None:
+                raise InvitationError(f"Request/Application {request_id} changed state while accepting it.")
+
+            await self._cleanup_pending_for_user(hr_oid_for_db, accepted_request_id=request_id, session=session)
+            return hr_oid_for_db
+
+        hr_oid = await run_in_transaction(self.db.client, accept, "accept_request_or_application")
+        principal_cache.invalidate(user_id=hr_oid)
+        logger.info(f"Request/Application {request_id} accepted; HR {hr_oid} is now mapped.")
+        return True
+
+    async def admin_process_hr_application(self, request_id: ObjectId, admin_user: User, action: Literal["approve", "reject"]) -> Dict[str, Any]:
+        """
+        Approves or rejects an HR application (created by hr_service as 'pending_admin_approval').
+        The decision and the HR status reset on rejection commit together in one transaction.
+        """
+        logger.info(f"Admin {admin_user.id} attempting to '{action}' HR application {request_id}")
 
-        if req_update_result.modified_count == 1:
-             logger.info(f"Request/Application {request_id} successfully marked as 'accepted'. Cleaning up other pending items for HR {hr_oid_for_db}.")
-             await self._cleanup_pending_for_user(hr_oid_for_db, accepted_request_id=request_id)
-             return True # Successfully mapped HR and accepted request
+        new_status: RequestMappingStatus
+        if action == "approve":
+            new_status = "admin_approved"
+            # HR user status is not changed here, HR needs to confirm.
+        elif action == "reject":
+            new_status = "admin_rejected"
         else:
-             # This is a problematic state: HR user was set to "mapped", but the request itself couldn't be marked "accepted".
-             # This could happen if the request was actioned by another process between HR update and request update.
-             logger.error(f"CRITICAL: HR user {hr_oid_for_db} was updated to 'mapped', but failed to update status for request/application {request_id} to 'accepted'. "
-                          f"Request update result: matched={req_update_result.matched_count}, modified={req_update_result.modified_count}. "
-                          f"Manual intervention may be required to correct request status. Attempting to revert HR status.")
-             # Attempt to revert HR status to what it was before this acceptance process
-             # This is a best-effort rollback.
-             revert_hr_status_result = await self.user_collection.update_one(
-                 {"_id": hr_oid_for_db, "admin_manager_id": admin_oid_for_db, "hr_status": "mapped"}, # Condition to ensure we only revert if it's still as we set it
-                 {"$set": {"hr_status": original_hr_status_before_mapping, "admin_manager_id": hr_user_to_update.get("admin_manager_id"), "updated_at": now}}
-             )
-             logger.info(f"Attempted to revert HR user {hr_oid_for_db} status to '{original_hr_status_before_mapping}'. Revert modified_count: {revert_hr_status_result.modified_count}")
-             raise InvitationError("Failed to finalize request acceptance status update after HR mapping. HR status change was attempted to be reverted.")
+            raise InvitationError("Invalid action for processing HR application.")
+        admin_oid = ObjectId(str(admin_user.id))
+
+        async def process(session: Optional[AsyncIOMotorClientSession]) -> Tuple[Dict[str, Any], bool]:
+            now = datetime.now(timezone.utc)
+            # Concurrent decisions on one application conflict on it; only the first finds it pending
+            updated_request_doc = await self.requests.update(
+                {
+                    "_id": request_id,
+                    "target_id": admin_oid, # Admin is the target of an HR's application
+                    "request_type": "application",
+                    "status": "pending_admin_approval"
+                },
+                {"$set": {"status": new_status, "updated_at": now}},
+                session=session,
+            )
+            if updated_request_doc is None:
+                raise InvitationError(f"Application {request_id} not found for Admin {admin_user.id} or not in 'pending_admin_approval' state.")
+
+            hr_applicant_id = updated_request_doc["requester_id"]
+            hr_status_reset = False
+            # If rejected, check if the HR has other active requests. If not, reset their status.
+            if new_status == "admin_rejected" and not await self._check_hr_has_active_requests(hr_applicant_id, session=session):
+                reset_result = await self.user_collection.update_one(
+                    {"_id": hr_applicant_id, "hr_status": "application_pending"},
+                    {"$set": {"hr_status": "profile_complete", "updated_at": now}},
+                    session=session,
+                )
+                hr_status_reset = reset_result.modified_count > 0
+            return updated_request_doc, hr_status_reset
+
+        updated_request_doc, hr_status_reset = await run_in_transaction(self.db.client, process, "admin_process_hr_application")
+        if hr_status_reset:
+            principal_cache.invalidate(user_id=updated_request_doc["requester_id"])
+            logger.info(f"HR {updated_request_doc['requester_id']} status reset to 'profile_complete' after application rejection.")
+        return updated_request_doc
 
     async def reject_request_or_application(self, request_id: ObjectId, rejecting_user: User) -> bool:
         logger.info(f"User {rejecting_user.id} attempting to reject request/application {request_id}")
@@ -254,6 +306,7 @@ class InvitationService:
                 {"_id": hr_oid_for_status_reset, "hr_status": {"$in": ["application_pending", "admin_request_pending"]}},
                 {"$set": {"hr_status": "profile_complete", "updated_at": now}}
             )
+            principal_cache.invalidate(user_id=hr_oid_for_status_reset)
             if hr_update_result.matched_count == 0:
                 logger.warning(f"HR user {hr_oid_for_status_reset} not found or status was not pending ('{original_status}') during rejection cleanup.")
             else:
@@ -267,7 +320,7 @@ class InvitationService:
          logger.debug(f"Fetching pending applications for Admin {admin_id_str}")
          admin_oid = ObjectId(admin_id_str)
          pipeline = [
-             {"$match": {"target_id": admin_oid, "request_type": "application", "status": "pending"}},
+             {"$match": {"target_id": admin_oid, "request_type": "application", "status": "pending_admin_approval"}},
              {"$sort": {"created_at": 1}},
              {"$lookup": { "from": settings.MONGODB_COLLECTION_USERS, "localField": "requester_id", "foreignField": "_id", "as": "requester_info_doc"}},
              {"$unwind": { "path": "$requester_info_doc", "preserveNullAndEmptyArrays": True }},
@@ -307,6 +360,7 @@ class InvitationService:
             {"_id": hr_user.id, "hr_status": "mapped"},
             {"$set": {"hr_status": "profile_complete", "admin_manager_id": None, "updated_at": now}}
         )
+        principal_cache.invalidate(user_id=hr_user.id)
         if update_result.modified_count == 1:
             logger.info(f"HR {hr_user.id} successfully unmapped.")
             return True
@@ -3,7 +3,8 @@ from httpx import AsyncClient
 from typing import Any, Dict
 from fastapi import status
 from app.main import app # The FastAPI app instance
-from app.core.security import get_current_active_user # Assuming this is the dependency
+from app.core.security import get_current_active_user, verify_admin_user # Assuming this is the dependency
+from app.core.config import settings
 from app.schemas.user import UserOut # Corrected import
 from bson import ObjectId
 from datetime import datetime
@@ -51,3 +52,52 @@ async def test_get_system_stats(client_admin: AsyncClient, test_db_client_admin:
     # Add more assertions based on the actual structure of AdminStats schema
 
     app.dependency_overrides = {} # Clear overrides
+
+# --- HR application decisions ---
+
+async def _seed_hr_application(db) -> Dict[str, ObjectId]:
+    now = datetime.utcnow()
+    hr_id = ObjectId()
+    await db["users"].insert_one({
+        "_id": hr_id, "username": f"hr_{hr_id}", "email": f"hr_{hr_id}@example.com", "role": "hr",
+        "hashed_password": "x", "hr_status": "application_pending", "created_at": now, "updated_at": now,
+    })
+    application = await db["hr_mapping_requests"].insert_one({
+        "request_type": "application", "requester_id": hr_id, "requester_role": "hr",
+        "target_id": ObjectId(MOCK_ADMIN_USER_ID), "target_role": "admin", "status": "pending_admin_approval",
+        "created_at": now, "updated_at": now,
+    })
+    return {"hr_id": hr_id, "application_id": application.inserted_id}
+
+@pytest.mark.asyncio
+async def test_approve_hr_application(client_admin: AsyncClient, test_db_client_admin: Any):
+    app.dependency_overrides[verify_admin_user] = override_get_current_active_user_admin
+    db = test_db_client_admin[settings.MONGODB_DB]
+    seeded = await _seed_hr_application(db)
+
+    response = await client_admin.post(f"/api/v1/admin/hr-applications/{seeded['application_id']}/approve")
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["status"] == "admin_approved"
+    # Approval leaves the HR pending until they confirm the mapping
+    hr_doc = await db["users"].find_one({"_id": seeded["hr_id"]})
+    assert hr_doc["hr_status"] == "application_pending"
+
+    # A decided application cannot be decided again
+    response = await client_admin.post(f"/api/v1/admin/hr-applications/{seeded['application_id']}/reject")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    app.dependency_overrides = {}
+
+@pytest.mark.asyncio
+async def test_reject_hr_application_resets_hr_status(client_admin: AsyncClient, test_db_client_admin: Any):
+    app.dependency_overrides[verify_admin_user] = override_get_current_active_user_admin
+    db = test_db_client_admin[settings.MONGODB_DB]
+    seeded = await _seed_hr_application(db)
+
+    response = await client_admin.post(f"/api/v1/admin/hr-applications/{seeded['application_id']}/reject")
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["status"] == "admin_rejected"
+    hr_doc = await db["users"].find_one({"_id": seeded["hr_id"]})
+    assert hr_doc["hr_status"] == "profile_complete"
+
+    app.dependency_overrides = {}
@@ -1,23 +1,45 @@
 # LLM_interviewer/server/app/api/routes/auth.py
 
 from datetime import timedelta, datetime, timezone # Added timezone
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    verify_and_update_password_async,
+    get_password_hash_async,
     create_access_token,
-    get_current_active_user
+    create_refresh_token,
+    build_access_claims,
+    introspect_token,
+    identifier_filter,
+    hash_reset_token,
+    USER_IDENTIFIER_COLLATION,
+    get_current_active_user,
+    verify_admin_user
 )
 # Ensure correct schemas are imported
 # Import specific status literals if needed for validation/logic, otherwise role check is sufficient
-from app.schemas.user import UserCreate, UserOut, Token, TokenData, UserRole, PasswordResetRequest, PasswordResetConfirm, UserChangePassword # Added UserChangePassword
+from app.schemas.user import UserCreate, UserOut, Token, TokenData, UserRole, PasswordResetRequest, PasswordResetConfirm, UserChangePassword, RefreshTokenRequest, TokenIntrospection, TokenIntrospectionRequest, TokenIntrospectionBatch, TokenIntrospectionBatchRequest # Added UserChangePassword
 from motor.motor_asyncio import AsyncIOMotorDatabase # Added import
 from app.db.mongodb import mongodb # Import the mongodb instance
+from app.db.repository import Repository
 from app.core.config import settings # Import settings instance directly
+from app.core.principal_cache import principal_cache
+from app.core.token_verifier import token_verifier
+from app.core.login_throttle import login_throttle, client_ip
+from app.services.user_import import UserImportService, build_new_user_document, iter_csv_rows, iter_ndjson_rows
+import asyncio
+import hmac
+import json
 import logging
 import secrets # For generating secure tokens
 from pydantic import EmailStr # For type hinting email
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError
+from jose import JWTError
 
 # Logger setup
 logger = logging.getLogger(__name__)
@@ -26,6 +48,44 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+# --- Token Issuing Helper ---
+async def _issue_tokens(db: AsyncIOMotorDatabase, user_doc: dict) -> dict:
+    """
+    Issues an access token carrying the user's authorization claims plus a refresh token.
+    The refresh token's id is stored so it can be used once (rotation) and revoked.
+    """
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(data=build_access_claims(user_doc), expires_delta=access_token_expires)
+
+    now = datetime.now(timezone.utc)
+    jti = secrets.token_urlsafe(32)
+    refresh_expires_at = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    await db[settings.MONGODB_COLLECTION_REFRESH_TOKENS].insert_one(
+        {"_id": jti, "user_id": user_doc["_id"], "expires_at": refresh_expires_at, "created_at": now}
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user_doc, jti, refresh_expires_at),
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+def _decode_refresh_token(refresh_token: str, verify_exp: bool = True) -> dict:
+    invalid_refresh_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = token_verifier.decode(refresh_token, verify_exp=verify_exp)
+        if payload.get("typ") != "refresh" or not payload.get("jti"):
+            raise invalid_refresh_exception
+        payload["uid"] = ObjectId(str(payload.get("uid")))
+    except (JWTError, InvalidId, TypeError):
+        raise invalid_refresh_exception
+    return payload
+
+
 # --- Register Endpoint ---
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate):
@@ -42,7 +102,7 @@ async def register(user: UserCreate):
         db = mongodb.get_db()
 
         # --- Username Check ---
-        existing_user_username = await db[settings.MONGODB_COLLECTION_USERS].find_one({"username": user.username})
+        existing_user_username = await db[settings.MONGODB_COLLECTION_USERS].find_one({"username": user.username}, {"_id": 1}, collation=USER_IDENTIFIER_COLLATION)
         if existing_user_username:
              logger.warning(f"Registration attempt failed: Username '{user.username}' already exists.")
              raise HTTPException(
@@ -52,7 +112,7 @@ async def register(user: UserCreate):
         # --- End Username Check ---
 
         # --- Email Check ---
-        existing_user_email = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": user.email})
+        existing_user_email = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": user.email}, {"_id": 1}, collation=USER_IDENTIFIER_COLLATION)
         if existing_user_email:
             logger.warning(f"Registration attempt failed: Email '{user.email}' already exists.")
             raise HTTPException(
@@ -61,34 +121,24 @@ async def register(user: UserCreate):
             )
         # --- End Email Check ---
 
-        # Create new user document
-        hashed_password = get_password_hash(user.password)
-        user_doc = user.model_dump(exclude={"password"}) # Excludes password, includes role, email, username
-        user_doc["hashed_password"] = hashed_password
-        user_doc["created_at"] = datetime.now(timezone.utc) # Use timezone-aware
-        user_doc["updated_at"] = user_doc["created_at"] # Initialize updated_at
-
-        # --- Set initial status based on role ---
-        if user.role == "candidate":
-            user_doc["mapping_status"] = "pending_resume"
-            # Other candidate fields like assigned_hr_id default to None via model
-        elif user.role == "hr":
-            user_doc["hr_status"] = "pending_profile"
-            # Other HR fields like admin_manager_id, years_of_experience default to None via model
-        # No specific status field needed for admin role based on current model
-        # --- End Set Initial Status ---
+        # Create new user document, with the initial status for its role
+        hashed_password = await get_password_hash_async(user.password)
+        user_doc = build_new_user_document(user, hashed_password)
 
         # Ensure other Optional fields default correctly (Pydantic model handles this)
         # user_doc.setdefault("resume_path", None) # Model default is None
         # user_doc.setdefault("resume_text", None) # Model default is None
 
         # Insert user into database
-        result = await db[settings.MONGODB_COLLECTION_USERS].insert_one(user_doc)
-        created_user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": result.inserted_id})
-
-        if not created_user_doc:
-            logger.error(f"Failed to retrieve created user after insert for email: {user.email}")
-            raise HTTPException(status_code=500, detail="Failed to create user account.")
+        try:
+            created_user_doc = await Repository.for_setting(db, "MONGODB_COLLECTION_USERS").insert(user_doc)
+        except DuplicateKeyError:
+            # A concurrent registration won the race past the checks above; the unique indexes decide
+            logger.warning(f"Registration attempt failed: username '{user.username}' or email '{user.email}' registered concurrently.")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username or email already registered."
+            )
 
         logger.info(f"User '{user.username}' ({user.email}) registered successfully as '{user.role}'. Initial status set.")
         # Use model_validate for Pydantic V2 validation
@@ -105,39 +155,124 @@ async def register(user: UserCreate):
         )
 
 
+# --- Bulk User Import Endpoint (Admin) ---
+_IMPORT_PARSERS = {
+    "csv": iter_csv_rows,
+    "ndjson": iter_ndjson_rows,
+}
+_IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    format: Optional[str] = None,
+    default_role: UserRole = "candidate",
+    admin_user: UserOut = Depends(verify_admin_user),
+):
+    """
+    Creates many accounts from a CSV (header row with email, username, password[, role]) or
+    NDJSON upload. Responds with an NDJSON stream: one result per input row in input order
+    (status created / duplicate / invalid / error), then a summary line.
+    """
+    import_format = format or _IMPORT_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+    if import_format not in _IMPORT_PARSERS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload CSV (text/csv) or NDJSON (application/x-ndjson), or pass format=csv|ndjson.",
+        )
+
+    # The upload is read before responding: once a StreamingResponse starts, Starlette listens on the
+    # same receive channel for disconnects, so the body cannot be consumed from inside the stream.
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.USER_IMPORT_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Import is larger than {settings.USER_IMPORT_MAX_BYTES} bytes; split it into several uploads.",
+            )
+
+    db = mongodb.get_db()
+    importer = UserImportService(db, default_role=default_role)
+    logger.info(f"Admin {admin_user.email} started a {import_format} user import ({len(body)} bytes).")
+
+    async def body_chunks():
+        for start in range(0, len(body), 64 * 1024):
+            yield bytes(body[start:start + 64 * 1024])
+
+    async def results():
+        try:
+            async for result in importer.import_rows(_IMPORT_PARSERS[import_format](body_chunks())):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the abort in-band after the rows processed so far
+            logger.error(f"User import by {admin_user.email} aborted: {e}", exc_info=True)
+            yield json.dumps({"status": "error", "detail": "Import aborted; rows without a result were not processed."}) + "\n"
+        logger.info(f"User import by {admin_user.email} finished: {importer.summary}")
+        yield json.dumps({"summary": importer.summary}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 # --- Login Endpoint ---
 # No changes needed based on current requirements
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     """Logs in a user using email OR username and returns an access token."""
     try:
         db = mongodb.get_db()
         identifier = form_data.username
+        ip = client_ip(request)
         logger.info(f"Login attempt with identifier: {identifier}")
 
-        user_from_db = await db[settings.MONGODB_COLLECTION_USERS].find_one({
-            "$or": [
-                {"email": identifier},
-                {"username": identifier}
-            ]
-        })
+        # Throttled attempts are rejected before the user lookup and before any bcrypt work
+        retry_after = await login_throttle.check(db, identifier, ip)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts. Please try again later.",
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
 
-        if user_from_db:
-             logger.info(f"User found in DB for identifier '{identifier}'. User ID: {user_from_db.get('_id')}")
-             password_correct = verify_password(form_data.password, user_from_db.get("hashed_password", ""))
-             logger.info(f"Password verification result for identifier '{identifier}': {password_correct}")
-             if not password_correct:
-                 logger.warning(f"Password verification failed for identifier: {identifier}")
-        else:
-             logger.warning(f"User NOT found in DB for identifier: {identifier}")
+        # check reserved this attempt; it is released, or recorded as a failure, exactly once below
+        try:
+            # Exactly one equality lookup on the case-insensitive unique email or username index
+            user_from_db = await db[settings.MONGODB_COLLECTION_USERS].find_one(
+                identifier_filter(identifier), collation=USER_IDENTIFIER_COLLATION
+            )
 
-        if not user_from_db or not verify_password(form_data.password, user_from_db.get("hashed_password", "")):
+            # Verify exactly once per attempt; bcrypt is the dominant cost of a login
+            password_correct = False
+            upgraded_hash = None
+            if user_from_db:
+                 logger.info(f"User found in DB for identifier '{identifier}'. User ID: {user_from_db.get('_id')}")
+                 password_correct, upgraded_hash = await verify_and_update_password_async(
+                     form_data.password, user_from_db.get("hashed_password", "")
+                 )
+                 logger.info(f"Password verification result for identifier '{identifier}': {password_correct}")
+                 if not password_correct:
+                     logger.warning(f"Password verification failed for identifier: {identifier}")
+            else:
+                 logger.warning(f"User NOT found in DB for identifier: {identifier}")
+        except BaseException:
+            login_throttle.release(identifier, ip) # The lookup or verification failed, not the credentials
+            raise
+
+        if not password_correct:
             logger.warning(f"Login attempt failed for identifier: {identifier} (Final Check: User not found or incorrect password)")
+            await login_throttle.record_failure(db, identifier, ip)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect login credentials. Please provide a valid username or email ID and password.",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        await login_throttle.record_success(db, identifier, ip)
 
         user_email_for_token = user_from_db.get("email")
         if not user_email_for_token:
@@ -147,17 +282,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
                  detail="User data integrity issue. Cannot complete login."
              )
 
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={
-                "sub": user_email_for_token,
-                "role": user_from_db.get("role"),
-                },
-            expires_delta=access_token_expires
-        )
-
+        if upgraded_hash:
+            # The stored hash predates the current KDF policy; swap it unless the password changed meanwhile.
+            # updated_at is left alone: the account itself did not change, so issued claims stay current.
+            await db[settings.MONGODB_COLLECTION_USERS].update_one(
+                {"_id": user_from_db["_id"], "hashed_password": user_from_db.get("hashed_password")},
+                {"$set": {"hashed_password": upgraded_hash}},
+            )
+            logger.info(f"Rehashed password for user ID {user_from_db['_id']} under the current KDF policy.")
+        tokens = await _issue_tokens(db, user_from_db)
         logger.info(f"Successful login for user identified by: {identifier} (Email: {user_email_for_token})")
-        return {"access_token": access_token, "token_type": "bearer"}
+        return tokens
 
     except HTTPException:
         raise
@@ -169,6 +304,78 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         )
 
 
+# --- Refresh Token Endpoint ---
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(payload: RefreshTokenRequest):
+    """
+    Exchanges a refresh token for a new access/refresh token pair with up-to-date claims.
+    Each refresh token can be used once; reuse or a bumped token version is rejected.
+    """
+    claims = _decode_refresh_token(payload.refresh_token)
+    try:
+        db = mongodb.get_db()
+        stored = await db[settings.MONGODB_COLLECTION_REFRESH_TOKENS].find_one_and_delete(
+            {"_id": claims["jti"], "user_id": claims["uid"]}
+        )
+        if not stored:
+            logger.warning(f"Refresh attempted with unknown, used or revoked refresh token for user {claims['uid']}.")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token.", headers={"WWW-Authenticate": "Bearer"})
+
+        user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": claims["uid"]})
+        if not user_doc or user_doc.get("token_version", 0) != claims.get("tv", 0):
+            logger.warning(f"Refresh rejected for user {claims['uid']}: user missing or tokens revoked.")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token.", headers={"WWW-Authenticate": "Bearer"})
+
+        return await _issue_tokens(db, user_doc)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error refreshing tokens for user {claims['uid']}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while refreshing the session."
+        )
+
+
+# --- Logout Endpoint ---
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(payload: RefreshTokenRequest):
+    """Revokes a refresh token. The access token simply expires."""
+    claims = _decode_refresh_token(payload.refresh_token, verify_exp=False)
+    db = mongodb.get_db()
+    await db[settings.MONGODB_COLLECTION_REFRESH_TOKENS].delete_one({"_id": claims["jti"], "user_id": claims["uid"]})
+    return {"message": "Logged out."}
+
+
+# --- Token Introspection Endpoints (service-to-service) ---
+async def require_internal_caller(x_internal_auth: Optional[str] = Header(default=None)) -> None:
+    """
+    Checks the shared secret other services send. Without INTROSPECTION_SHARED_SECRET every caller
+    is refused, except in TESTING_MODE.
+    """
+    secret = settings.INTROSPECTION_SHARED_SECRET
+    if not secret:
+        if settings.TESTING_MODE:
+            return
+        logger.warning("Introspection request refused: INTROSPECTION_SHARED_SECRET is not configured.")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Introspection is restricted to internal services.")
+    if not (x_internal_auth and hmac.compare_digest(x_internal_auth, secret)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Introspection is restricted to internal services.")
+
+@router.post("/introspect", response_model=TokenIntrospection, dependencies=[Depends(require_internal_caller)])
+async def introspect(payload: TokenIntrospectionRequest, db: AsyncIOMotorDatabase = Depends(mongodb.get_db)):
+    """Resolves an access token to its principal, or {"active": false}."""
+    return await introspect_token(payload.token, db)
+
+@router.post("/introspect/batch", response_model=TokenIntrospectionBatch, dependencies=[Depends(require_internal_caller)])
+async def introspect_batch(payload: TokenIntrospectionBatchRequest, db: AsyncIOMotorDatabase = Depends(mongodb.get_db)):
+    """Resolves several access tokens in one call (fan-out callers). Results keep the request order."""
+    unique_tokens = list(dict.fromkeys(payload.tokens))
+    resolved = await asyncio.gather(*(introspect_token(token, db) for token in unique_tokens))
+    by_token: Dict[str, dict] = dict(zip(unique_tokens, resolved))
+    return {"results": [by_token[token] for token in payload.tokens]}
+
+
 # --- Get Current User Endpoint ---
 # No changes needed
 @router.get("/me", response_model=UserOut)
@@ -191,8 +398,13 @@ async def change_current_user_password(
     """
     logger.info(f"User {current_user.email} attempting to change their password.")
 
+    # UserOut does not carry the password hash; read it from the user document
+    user_doc = await db_client[settings.MONGODB_COLLECTION_USERS].find_one({"_id": ObjectId(str(current_user.id))})
+    if not user_doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+
     # Verify current password
-    if not verify_password(payload.current_password, current_user.hashed_password):
+    if not await verify_password_async(payload.current_password, user_doc.get("hashed_password", "")):
         logger.warning(f"Password change attempt failed for {current_user.email}: Incorrect current password.")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -200,23 +412,30 @@ async def change_current_user_password(
         )
 
     # Hash the new password
-    new_hashed_password = get_password_hash(payload.new_password)
+    new_hashed_password = await get_password_hash_async(payload.new_password)
 
     # Update the password in the database
     try:
-        result = await db_client[settings.MONGODB_COLLECTION_USERS].update_one(
-            {"_id": current_user.id},
-            {"$set": {"hashed_password": new_hashed_password, "updated_at": datetime.now(timezone.utc)}}
+        # Bumping token_version revokes every token issued before the change
+        updated_user_doc = await Repository.for_setting(db_client, "MONGODB_COLLECTION_USERS").update(
+            {"_id": user_doc["_id"]},
+            {"$set": {"hashed_password": new_hashed_password, "updated_at": datetime.now(timezone.utc)},
+             "$inc": {"token_version": 1}}
         )
-        if result.modified_count == 0:
+        principal_cache.invalidate(user_id=user_doc["_id"])
+        if updated_user_doc is None:
             logger.error(f"Failed to update password for user {current_user.email} in DB, though current password was correct.")
             # This case is unlikely if the user was fetched correctly and password verified.
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Could not update password."
             )
+        await db_client[settings.MONGODB_COLLECTION_REFRESH_TOKENS].delete_many({"user_id": user_doc["_id"]})
         logger.info(f"Password successfully changed for user {current_user.email}.")
-        return {"message": "Password updated successfully."}
+        # Existing tokens are now revoked; hand this session a fresh pair
+        return {"message": "Password updated successfully.", **(await _issue_tokens(db_client, updated_user_doc))}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating password in DB for {current_user.email}: {e}", exc_info=True)
         raise HTTPException(
@@ -233,23 +452,26 @@ async def request_password_reset(payload: PasswordResetRequest):
     """
     try:
         db = mongodb.get_db()
-        user = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": payload.email})
+        user = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": payload.email}, collation=USER_IDENTIFIER_COLLATION)
 
         if not user:
             # Do not reveal if the email exists or not for security reasons
             logger.info(f"Password reset request for non-existent or unconfirmed email: {payload.email}")
             return {"message": "If an account with that email exists, a password reset link has been sent."}
 
-        # Generate a secure, URL-safe token
+        # Generate a secure, URL-safe token; only its SHA-256 digest is stored
         reset_token = secrets.token_urlsafe(32)
-        # Store the token and its expiry in the user's document or a separate collection
-        # For simplicity, adding to user document here. Consider a separate collection for robustness.
-        token_expiry = datetime.now(timezone.utc) + timedelta(hours=settings.PASSWORD_RESET_TOKEN_EXPIRE_HOURS) # Assuming PASSWORD_RESET_TOKEN_EXPIRE_HOURS is in settings
-
-        await db[settings.MONGODB_COLLECTION_USERS].update_one(
-            {"email": payload.email},
-            {"$set": {"password_reset_token": reset_token, "password_reset_token_expires_at": token_expiry}}
-        )
+        token_expiry = datetime.now(timezone.utc) + timedelta(hours=settings.PASSWORD_RESET_TOKEN_EXPIRE_HOURS)
+
+        reset_tokens = db[settings.MONGODB_COLLECTION_PASSWORD_RESET_TOKENS]
+        # A new request supersedes any outstanding token for this user
+        await reset_tokens.delete_many({"user_id": user["_id"]})
+        await reset_tokens.insert_one({
+            "token_hash": hash_reset_token(reset_token),
+            "user_id": user["_id"],
+            "expires_at": token_expiry, # TTL index purges unused tokens
+            "created_at": datetime.now(timezone.utc),
+        })
 
         # In a real application, you would email this token to the user
         # For this example, we'll log it (NEVER do this in production)
@@ -274,32 +496,43 @@ async def confirm_password_reset(payload: PasswordResetConfirm):
     """
     try:
         db = mongodb.get_db()
-        user = await db[settings.MONGODB_COLLECTION_USERS].find_one({
-            "password_reset_token": payload.token,
-            "password_reset_token_expires_at": {"$gt": datetime.now(timezone.utc)}
+        # Consume the token atomically: a token can be redeemed at most once, even under concurrent requests.
+        # Expired tokens may linger until the TTL monitor runs, so the expiry is checked here as well.
+        token_doc = await db[settings.MONGODB_COLLECTION_PASSWORD_RESET_TOKENS].find_one_and_delete({
+            "token_hash": hash_reset_token(payload.token),
+            "expires_at": {"$gt": datetime.now(timezone.utc)},
         })
 
-        if not user:
-            logger.warning(f"Invalid or expired password reset token used: {payload.token}")
+        if not token_doc:
+            logger.warning("Invalid or expired password reset token used.")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid or expired password reset token."
             )
 
-        hashed_password = get_password_hash(payload.new_password)
-        await db[settings.MONGODB_COLLECTION_USERS].update_one(
-            {"_id": user["_id"]},
+        user_id = token_doc["user_id"]
+        hashed_password = await get_password_hash_async(payload.new_password)
+        result = await db[settings.MONGODB_COLLECTION_USERS].update_one(
+            {"_id": user_id},
             {"$set": {"hashed_password": hashed_password, "updated_at": datetime.now(timezone.utc)},
-             "$unset": {"password_reset_token": "", "password_reset_token_expires_at": ""}} # Remove token fields
+             "$inc": {"token_version": 1}} # Revoke tokens issued before the reset
         )
+        if result.matched_count == 0:
+            logger.warning(f"Password reset token referenced missing user ID: {user_id}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid or expired password reset token."
+            )
+        principal_cache.invalidate(user_id=user_id)
+        await db[settings.MONGODB_COLLECTION_REFRESH_TOKENS].delete_many({"user_id": user_id})
 
-        logger.info(f"Password successfully reset for user ID: {user['_id']}")
+        logger.info(f"Password successfully reset for user ID: {user_id}")
         return {"message": "Password has been reset successfully."}
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error during password reset confirmation for token {payload.token}: {e}", exc_info=True)
+        logger.error(f"Error during password reset confirmation: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while resetting your password."
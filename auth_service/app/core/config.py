@@ -47,13 +47,94 @@ class Settings(BaseSettings):
     MONGODB_COLLECTION_RESPONSES: str = "responses"
     MONGODB_COLLECTION_HR_MAPPING_REQUESTS: str = "hr_mapping_requests"
     MONGODB_COLLECTION_MESSAGES: str = "messages"
+    MONGODB_COLLECTION_CHANGE_STREAM_TOKENS: str = "change_stream_tokens"
+    MONGODB_COLLECTION_REFRESH_TOKENS: str = "refresh_tokens"
+    MONGODB_COLLECTION_LOGIN_THROTTLE: str = "login_throttle"
+    MONGODB_COLLECTION_PASSWORD_RESET_TOKENS: str = "password_reset_tokens"
+    INDEX_RECONCILE_ENABLED: bool = True # Check the index registry (app/db/indexes.py) at startup
+    INDEX_RECONCILE_CREATE: bool = True # Create this service's missing indexes; False only reports drift
+    # Connection pool and client options (app/db/pool.py); pool limits apply per worker process
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None # None waits for the server indefinitely (driver default)
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0 # Connections kept warm even when idle
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None # Close pooled connections idle for longer than this
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = 10000 # Fail a checkout instead of queueing forever when the pool is exhausted
+    MONGODB_MAX_CONNECTING: int = 2 # Concurrent connection handshakes per pool
+    MONGODB_COMPRESSORS: str = "" # Wire compression in preference order, e.g. "zstd,snappy,zlib" (zstd/snappy need their packages)
+    MONGODB_ZLIB_COMPRESSION_LEVEL: int = -1
+    MONGODB_RETRY_READS: bool = True
+    MONGODB_RETRY_WRITES: bool = True
+    MONGODB_READ_PREFERENCE: str = "" # Client-wide default; empty defers to the connection string
+    MONGODB_READ_CONCERN: str = "" # Client-wide default level; empty defers to the connection string
+    MONGODB_LISTING_READ_PREFERENCE: str = "secondaryPreferred" # Read profile for paged lists and searches
+    MONGODB_LISTING_READ_CONCERN: str = "local"
+    MONGODB_LISTING_MAX_STALENESS_SECONDS: int = 90 # -1 disables; otherwise at least 90
+    MONGODB_REPORTING_READ_PREFERENCE: str = "secondaryPreferred" # Read profile for dashboard counts and aggregations
+    MONGODB_REPORTING_READ_CONCERN: str = "local"
+    MONGODB_REPORTING_MAX_STALENESS_SECONDS: int = 300
+    MONGODB_CAUSAL_TOKENS_MAX_PRINCIPALS: int = 10000 # Users whose last write time is kept for read-your-writes on secondaries
+    MONGODB_POOL_METRICS_ENABLED: bool = True # Record checkout counts and wait times (/health/db-pool)
+    DB_QUERY_STATS_ENABLED: bool = True # Per-command duration histograms and slow-query log (app/db/query_stats.py)
+    DB_SLOW_QUERY_MS: float = 100.0 # Commands at or above this duration are logged with their redacted filter shape
+    DB_SLOW_QUERY_LOG_SIZE: int = 100 # Recent slow commands kept for /debug/db-stats
+    DB_QUERY_STATS_MAX_SERIES: int = 2000 # Distinct (collection, operation, route) histograms before folding into "other"
+    DEBUG_ENDPOINTS_ENABLED: bool = False # Serve /debug/db-stats; keep off wherever the port is reachable from outside
+    # Change stream event bus (app/db/change_events.py); needs a replica set
+    CHANGE_EVENTS_ENABLED: bool = True
+    CHANGE_EVENTS_CONSUMER: str = "" # Resume token key; empty uses APP_NAME. Set per worker when workers run blocking subscribers
+    CHANGE_EVENTS_QUEUE_SIZE: int = 1000 # Events buffered per subscriber before backpressure (or a resync for lossy ones)
+    CHANGE_EVENTS_CHECKPOINT_SECONDS: float = 5.0 # How often the resume token is saved
+    CHANGE_EVENTS_RECONNECT_MIN_SECONDS: float = 0.5
+    CHANGE_EVENTS_RECONNECT_MAX_SECONDS: float = 30.0
+    CHANGE_EVENTS_DRAIN_SECONDS: float = 5.0 # Shutdown wait for blocking subscribers to finish queued events
 
     # --- Security Configuration ---
     JWT_SECRET_KEY: str = "your_super_secret_key_please_change"
-    JWT_ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+    JWT_ALGORITHM: str = "HS256" # HS256 uses JWT_SECRET_KEY; RS256/ES256/EdDSA use the PEM keys below
+    JWT_PUBLIC_KEY: Optional[str] = None # PEM; lets services verify asymmetric tokens without any signing secret
+    JWT_PRIVATE_KEY: Optional[str] = None # PEM; only auth_service signs tokens
+    TOKEN_VERIFY_CACHE_ENABLED: bool = True # Remember verified tokens (by digest) until they expire
+    TOKEN_VERIFY_CACHE_MAX_ENTRIES: int = 10000
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15 # Short-lived: services authorize from the claims; clients renew through /auth/refresh
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    INTROSPECTION_SHARED_SECRET: Optional[str] = None # Required in X-Internal-Auth by /auth/introspect; unset refuses callers outside TESTING_MODE
     PASSWORD_RESET_TOKEN_EXPIRE_HOURS: int = 1 # Added for password reset token expiry
 
+    # Cached principal resolution for authenticated requests
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0 # Upper bound on how long a cached principal is served
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_POLL_INTERVAL_SECONDS: float = 5.0 # Invalidation poll interval when change streams are unavailable
+
+    # Password hashing runs on a bounded thread pool, off the event loop
+    PASSWORD_HASH_MAX_WORKERS: int = 4 # bcrypt releases the GIL, so this is the hashing parallelism
+    PASSWORD_HASH_MAX_PENDING: int = 64 # Hash/verify operations allowed to be queued or running at once
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 5.0 # Wait for a free slot before answering 503
+
+    # KDF policy; run `python -m benchmarks.kdf_calibration` on the deployment host to pick costs
+    PASSWORD_HASH_SCHEME: str = "bcrypt" # "bcrypt" or "argon2" (argon2id, needs argon2-cffi)
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_MEMORY_COST_KIB: int = 65536
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_PARALLELISM: int = 1
+    PASSWORD_REHASH_ON_LOGIN: bool = True # Replace hashes made with an outdated scheme or cost after a successful login
+
+    # Login throttling: failed attempts per identifier and per client IP, checked before bcrypt
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_IDENTIFIER_MAX_FAILURES: int = 5
+    LOGIN_THROTTLE_IDENTIFIER_WINDOW_SECONDS: float = 300.0
+    LOGIN_THROTTLE_IP_MAX_FAILURES: int = 50
+    LOGIN_THROTTLE_IP_WINDOW_SECONDS: float = 300.0
+    LOGIN_THROTTLE_MAX_TRACKED_KEYS: int = 100000 # Per scope; least recently failing keys are evicted first
+    LOGIN_THROTTLE_SHARED: bool = False # Share windows across auth workers via the login_throttle collection
+    LOGIN_THROTTLE_TRUST_FORWARDED_FOR: bool = False # Only enable behind a proxy that sets X-Forwarded-For
+
+    # --- Bulk User Import ---
+    USER_IMPORT_BATCH_SIZE: int = 500 # Rows per $in dedup query and unordered insert_many
+    USER_IMPORT_MAX_BYTES: int = 10 * 1024 * 1024
+
     # --- CORS Configuration ---
     CORS_ALLOWED_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
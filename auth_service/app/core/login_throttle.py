@@ -0,0 +1,258 @@
+# auth_service/app/core/login_throttle.py
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindowCounter:
+    """
+    Approximate sliding-window counter with bounded memory.
+
+    Each key keeps three numbers: the index of the current fixed window and the counts of the
+    current and previous windows. The sliding count is the current count plus the previous count
+    weighted by how much of the previous window still overlaps the sliding window. Keys are kept
+    in LRU order and the least recently touched ones are evicted beyond `max_keys`.
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [window_index, previous, current]
+
+    def _window(self, now: float) -> Tuple[int, float]:
+        index = int(now // self.window_seconds)
+        elapsed_fraction = (now - index * self.window_seconds) / self.window_seconds
+        return index, elapsed_fraction
+
+    def window_index(self, now: float) -> int:
+        return self._window(now)[0]
+
+    def counts(self, key: str, now: Optional[float] = None) -> Tuple[float, float]:
+        """(previous, current) window counts for `key`, rolled forward to `now`."""
+        now = time.time() if now is None else now
+        index = self.window_index(now)
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0, 0
+        if entry[0] != index:
+            # The old current window only survives as "previous" when it is the adjacent one
+            entry[1] = entry[2] if entry[0] == index - 1 else 0
+            entry[2] = 0
+            entry[0] = index
+        return entry[1], entry[2]
+
+    def weighted(self, previous: float, current: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return previous * (1 - self._window(now)[1]) + current
+
+    def count(self, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return self.weighted(*self.counts(key, now), now)
+
+    def add(self, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        previous, current = self.counts(key, now)
+        self._entries[key] = [self.window_index(now), previous, current + 1]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        return self.weighted(previous, current + 1, now)
+
+    def reset(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def retry_after(self, previous: float, current: float, now: Optional[float] = None) -> float:
+        """Seconds until the weighted count drops back under the limit if nothing else is added."""
+        now = time.time() if now is None else now
+        index, elapsed_fraction = self._window(now)
+        if current >= self.limit:
+            # Wait for this window to become "previous" and decay enough: current * (1 - f) < limit
+            until_next = (index + 1) * self.window_seconds - now
+            return until_next + (1 - self.limit / current) * self.window_seconds
+        if previous <= 0:
+            return 0.0
+        # previous * (1 - f) + current < limit
+        needed_fraction = 1 - (self.limit - current) / previous
+        return max(0.0, (needed_fraction - elapsed_fraction) * self.window_seconds)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _SharedWindowStore:
+    """
+    Window counts shared by all auth workers through MongoDB. One small document per
+    (scope, key, window) holds a count; a TTL index (login_throttle_expiry_ttl in the index
+    registry) drops it once the window can no longer affect a sliding count.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    async def add(self, db: AsyncIOMotorDatabase, scope: str, key: str, counter: SlidingWindowCounter, now: float) -> None:
+        index = counter.window_index(now)
+        expires_at = datetime.fromtimestamp((index + 2) * counter.window_seconds, tz=timezone.utc)
+        await db[self.collection_name].update_one(
+            {"_id": f"{scope}:{key}:{index}"},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+            upsert=True,
+        )
+
+    async def counts(self, db: AsyncIOMotorDatabase, scope: str, key: str, counter: SlidingWindowCounter, now: float) -> Tuple[float, float]:
+        index = counter.window_index(now)
+        ids = [f"{scope}:{key}:{index - 1}", f"{scope}:{key}:{index}"]
+        found: Dict[str, int] = {}
+        async for doc in db[self.collection_name].find({"_id": {"$in": ids}}, {"count": 1}):
+            found[doc["_id"]] = doc["count"]
+        return found.get(ids[0], 0), found.get(ids[1], 0)
+
+    async def reset(self, db: AsyncIOMotorDatabase, scope: str, key: str, counter: SlidingWindowCounter, now: float) -> None:
+        index = counter.window_index(now)
+        await db[self.collection_name].delete_many({"_id": {"$in": [f"{scope}:{key}:{index - 1}", f"{scope}:{key}:{index}"]}})
+
+
+class LoginThrottle:
+    """
+    Limits failed logins per identifier (targeted guessing) and per client IP (credential
+    stuffing across many identifiers). `check` runs before any password hashing, so rejected
+    attempts cost a dictionary lookup instead of a bcrypt verification. With
+    LOGIN_THROTTLE_SHARED the windows are also kept in MongoDB so every auth worker sees the
+    same counts; the in-memory counters still reject known offenders without a round trip.
+    """
+
+    IDENTIFIER = "id"
+    IP = "ip"
+
+    def __init__(self):
+        self.counters = {
+            self.IDENTIFIER: SlidingWindowCounter(
+                settings.LOGIN_THROTTLE_IDENTIFIER_MAX_FAILURES, settings.LOGIN_THROTTLE_IDENTIFIER_WINDOW_SECONDS,
+                settings.LOGIN_THROTTLE_MAX_TRACKED_KEYS,
+            ),
+            self.IP: SlidingWindowCounter(
+                settings.LOGIN_THROTTLE_IP_MAX_FAILURES, settings.LOGIN_THROTTLE_IP_WINDOW_SECONDS,
+                settings.LOGIN_THROTTLE_MAX_TRACKED_KEYS,
+            ),
+        }
+        self.shared = _SharedWindowStore(settings.MONGODB_COLLECTION_LOGIN_THROTTLE) if settings.LOGIN_THROTTLE_SHARED else None
+        self._pending: Dict[Tuple[str, str], int] = {} # (scope, key) -> attempts past `check` still verifying
+
+    @staticmethod
+    def identifier_key(identifier: str) -> str:
+        return identifier.strip().lower()
+
+    def _keys(self, identifier: str, ip: Optional[str]) -> List[Tuple[str, str]]:
+        keys = [(self.IDENTIFIER, self.identifier_key(identifier))]
+        if ip:
+            keys.append((self.IP, ip))
+        return keys
+
+    def _rejection(self, scope: str, key: str, previous: float, current: float, now: float, own_reservation: int = 0) -> Optional[float]:
+        """Seconds to wait when recorded failures plus other pending attempts reach the limit, else None."""
+        counter = self.counters[scope]
+        pending = self._pending.get((scope, key), 0) - own_reservation
+        count = counter.weighted(previous, current, now) + pending
+        if count < counter.limit:
+            return None
+        retry_after = max(1.0, counter.retry_after(previous, current, now))
+        logger.warning(f"Login throttled for {scope} '{key}' ({count:.1f} failures and pending attempts in window); retry after {retry_after:.0f}s.")
+        return retry_after
+
+    async def check(self, db: AsyncIOMotorDatabase, identifier: str, ip: Optional[str]) -> Optional[float]:
+        """
+        Returns the seconds to wait when the attempt must be rejected. Otherwise the attempt is
+        reserved: it counts towards the limits as pending until record_failure, record_success or
+        release resolves it, so a concurrent burst cannot all pass before the first failure lands.
+        """
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return None
+        now = time.time()
+        keys = self._keys(identifier, ip)
+        # Local counts are read and the attempt reserved without an await in between
+        for scope, key in keys:
+            retry_after = self._rejection(scope, key, *self.counters[scope].counts(key, now), now)
+            if retry_after is not None:
+                return retry_after
+        for scope_key in keys:
+            self._pending[scope_key] = self._pending.get(scope_key, 0) + 1
+        if self.shared is None:
+            return None
+        try:
+            for scope, key in keys:
+                try:
+                    previous, current = await self.shared.counts(db, scope, key, self.counters[scope], now)
+                except PyMongoError as e:
+                    logger.warning(f"Shared login throttle unavailable, using local counts: {e}")
+                    continue
+                retry_after = self._rejection(scope, key, previous, current, now, own_reservation=1)
+                if retry_after is not None:
+                    self.release(identifier, ip)
+                    return retry_after
+        except BaseException:
+            self.release(identifier, ip)
+            raise
+        return None
+
+    def release(self, identifier: str, ip: Optional[str]) -> None:
+        """Drops the attempt reserved by `check` without counting it (e.g. the lookup itself failed)."""
+        for scope_key in self._keys(identifier, ip):
+            pending = self._pending.get(scope_key, 0) - 1
+            if pending > 0:
+                self._pending[scope_key] = pending
+            else:
+                self._pending.pop(scope_key, None)
+
+    async def record_failure(self, db: AsyncIOMotorDatabase, identifier: str, ip: Optional[str]) -> None:
+        """Turns the attempt reserved by `check` into a recorded failure."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        now = time.time()
+        self.release(identifier, ip)
+        for scope, key in self._keys(identifier, ip):
+            self.counters[scope].add(key, now)
+        if self.shared is not None:
+            for scope, key in self._keys(identifier, ip):
+                try:
+                    await self.shared.add(db, scope, key, self.counters[scope], now)
+                except PyMongoError as e:
+                    logger.warning(f"Could not record shared login failure for {scope} '{key}': {e}")
+
+    async def record_success(self, db: AsyncIOMotorDatabase, identifier: str, ip: Optional[str] = None) -> None:
+        """
+        Releases the attempt reserved by `check`. A successful login clears the identifier's
+        failures (the IP window is left alone).
+        """
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        self.release(identifier, ip)
+        key = self.identifier_key(identifier)
+        counter = self.counters[self.IDENTIFIER]
+        counter.reset(key)
+        if self.shared is not None:
+            try:
+                await self.shared.reset(db, self.IDENTIFIER, key, counter, time.time())
+            except PyMongoError as e:
+                logger.warning(f"Could not reset shared login failures for '{key}': {e}")
+
+
+def client_ip(request) -> Optional[str]:
+    """The client address, honouring X-Forwarded-For only when the deployment trusts its proxy."""
+    if settings.LOGIN_THROTTLE_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+login_throttle = LoginThrottle()
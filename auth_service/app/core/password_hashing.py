@@ -0,0 +1,69 @@
+# auth_service/app/core/password_hashing.py
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PasswordHashingBusyError(Exception):
+    """Raised when the password-hashing queue stays full for longer than the configured timeout."""
+    pass
+
+
+class PasswordHashingExecutor:
+    """
+    Runs CPU-bound password hashing (bcrypt) on a small dedicated thread pool so it never blocks
+    the event loop. At most `max_pending` operations may be queued or running at once; further
+    callers wait up to `queue_timeout` seconds for a slot and then get PasswordHashingBusyError,
+    which keeps a login burst from building an unbounded backlog of expensive work.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, queue_timeout: float):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Password hashing queue full ({self.max_pending} pending) for {self.queue_timeout}s; rejecting request.")
+            raise PasswordHashingBusyError("Password hashing capacity exhausted.")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            slots.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
+
+
+password_hashing_executor = PasswordHashingExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,107 @@
+# auth_service/app/core/password_policy.py
+
+import time
+from typing import Dict, List, Optional
+
+from passlib.context import CryptContext
+
+from .config import settings
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+
+
+def build_crypt_context(
+    scheme: str,
+    bcrypt_rounds: int,
+    argon2_memory_cost_kib: int,
+    argon2_time_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    """
+    CryptContext for the given KDF policy. New hashes use `scheme` with the given cost; hashes
+    made with the other scheme or with different cost parameters still verify but report
+    `needs_update`, so they are replaced on the next successful login (lowering the cost after
+    calibration takes effect the same way as raising it). argon2 is always argon2id and needs
+    the argon2-cffi backend only when it is actually used.
+    """
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme '{scheme}'. Expected one of {SUPPORTED_SCHEMES}.")
+    return CryptContext(
+        schemes=[scheme] + [other for other in SUPPORTED_SCHEMES if other != scheme],
+        default=scheme,
+        deprecated="auto", # Everything but the default scheme is rehashed
+        bcrypt__rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memory_cost_kib,
+        argon2__time_cost=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+def context_from_settings() -> CryptContext:
+    return build_crypt_context(
+        scheme=settings.PASSWORD_HASH_SCHEME,
+        bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+        argon2_memory_cost_kib=settings.PASSWORD_ARGON2_MEMORY_COST_KIB,
+        argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+        argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+    )
+
+
+# --- Calibration ---
+def time_hash(context: CryptContext, samples: int = 3, password: str = "calibration-password") -> float:
+    """Median wall time, in seconds, of one hash under `context` on this host."""
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(password)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def calibrate_bcrypt(target_seconds: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> Dict:
+    """Highest bcrypt cost whose hash time stays within `target_seconds` (never below `min_rounds`)."""
+    measurements: List[Dict] = []
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        seconds = time_hash(CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds), samples)
+        measurements.append({"rounds": rounds, "seconds": seconds})
+        if seconds > target_seconds:
+            break
+        chosen = rounds
+    return {"scheme": "bcrypt", "PASSWORD_BCRYPT_ROUNDS": chosen, "measurements": measurements}
+
+
+def calibrate_argon2(
+    target_seconds: float, memory_cost_kib: int, parallelism: int, max_time_cost: int = 10, samples: int = 3,
+) -> Dict:
+    """
+    Highest argon2id time cost within `target_seconds` at a fixed memory cost. Memory is the
+    cost that hurts GPU attackers, so it is chosen by the operator and only time is searched;
+    if even one pass is too slow the memory cost is halved until it fits.
+    """
+    measurements: List[Dict] = []
+    memory = memory_cost_kib
+    while True:
+        chosen: Optional[int] = None
+        for time_cost in range(1, max_time_cost + 1):
+            context = build_crypt_context("argon2", 4, memory, time_cost, parallelism)
+            seconds = time_hash(context, samples)
+            measurements.append({"memory_cost_kib": memory, "time_cost": time_cost, "seconds": seconds})
+            if seconds > target_seconds:
+                break
+            chosen = time_cost
+        if chosen is not None or memory <= 8 * parallelism:
+            break
+        memory //= 2
+    return {
+        "scheme": "argon2",
+        "PASSWORD_ARGON2_MEMORY_COST_KIB": memory,
+        "PASSWORD_ARGON2_TIME_COST": chosen or 1,
+        "PASSWORD_ARGON2_PARALLELISM": parallelism,
+        "measurements": measurements,
+    }
+
+
+pwd_context = context_from_settings()
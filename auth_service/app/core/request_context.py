@@ -0,0 +1,36 @@
+# auth_service/app/core/request_context.py
+
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+_current_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_request_scope", default=None)
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware that exposes the current request scope to code outside the route (e.g. services)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+
+def current_endpoint() -> str:
+    """
+    Returns 'METHOD /route/template' for the request being served (path parameters are not
+    expanded, so it is safe as an aggregation key), or 'background' outside a request.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "unknown")
+    return f"{scope.get('method', '')} {path}".strip()
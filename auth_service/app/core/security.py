@@ -1,24 +1,28 @@
 # LLM_interviewer/server/app/core/security.py
 
+import hashlib
 import logging
 from datetime import datetime, timedelta, timezone # Use timezone-aware UTC
-from typing import Optional, Annotated # Use Annotated for Depends clarity
+from typing import Any, Optional, Annotated, Tuple # Use Annotated for Depends clarity
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClient # Added AsyncIOMotorClient
 from pydantic import ValidationError # For catching Pydantic validation errors
 from bson import ObjectId # Import ObjectId for checking _id
+from bson.errors import InvalidId
 
 # Import schemas and configuration
 from ..schemas.user import UserOut, TokenData # Relative import
 from .config import settings # Relative import for same directory
 from ..db.mongodb import mongodb # Relative import
+from .principal_cache import principal_cache, token_state_cache
+from .token_verifier import token_verifier
+from .password_hashing import password_hashing_executor, PasswordHashingBusyError
+from .password_policy import pwd_context # KDF scheme and cost come from settings
 
 # --- Configuration ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 logger = logging.getLogger(__name__)
 
 # Define the OAuth2 scheme instance
@@ -85,6 +89,43 @@ def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, when the stored hash no longer matches the KDF policy, returns a
+    replacement hash made with the current scheme and cost (otherwise None).
+    """
+    if not settings.PASSWORD_REHASH_ON_LOGIN:
+        return pwd_context.verify(plain_password, hashed_password), None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _password_hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The server is busy processing other sign-ins. Please retry shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a password on the bounded hashing executor. Use this in request handlers."""
+    try:
+        return await password_hashing_executor.run(verify_password, plain_password, hashed_password)
+    except PasswordHashingBusyError:
+        raise _password_hashing_unavailable()
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password on the bounded hashing executor."""
+    try:
+        return await password_hashing_executor.run(verify_and_update_password, plain_password, hashed_password)
+    except PasswordHashingBusyError:
+        raise _password_hashing_unavailable()
+
+async def get_password_hash_async(password: str) -> str:
+    """Hashes a password on the bounded hashing executor. Use this in request handlers."""
+    try:
+        return await password_hashing_executor.run(get_password_hash, password)
+    except PasswordHashingBusyError:
+        raise _password_hashing_unavailable()
+
 # --- JWT Token Utilities ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Creates a JWT access token."""
@@ -96,9 +137,141 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = token_verifier.encode(to_encode)
     return encoded_jwt
 
+# --- Claims Tokens ---
+CLAIMS_VERSION = 2 # Layout of the access-token claims issued by auth_service
+# Case-insensitive collation of the unique users email/username indexes (created by auth_service).
+# Lookups must pass the same collation for MongoDB to use those indexes.
+USER_IDENTIFIER_COLLATION = {"locale": "en", "strength": 2}
+
+def identifier_filter(identifier: str) -> dict:
+    """
+    Picks the one field a login identifier can match: emails always contain '@' and usernames
+    may not, so a single indexed equality lookup replaces the email/username $or.
+    """
+    field = "email" if "@" in identifier else "username"
+    return {field: identifier.strip()}
+
+def _optional_str(value: Any) -> Optional[str]:
+    return str(value) if value is not None else None
+
+def _epoch_seconds(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+def build_access_claims(user_doc: dict) -> dict:
+    """
+    Builds the versioned claims carried by access tokens. Besides 'sub' and 'role' they include
+    the authorization fields downstream services need ('uid', 'hr_status', 'mapping_status',
+    'admin_manager_id', 'assigned_hr_id'), the user's 'token_version' ('tv') for revocation and
+    its 'updated_at' ('uat') so services can tell when the claims have gone stale.
+    """
+    return {
+        "sub": user_doc["email"],
+        "role": user_doc.get("role"),
+        "uid": str(user_doc["_id"]),
+        "username": user_doc.get("username"),
+        "hr_status": user_doc.get("hr_status"),
+        "mapping_status": user_doc.get("mapping_status"),
+        "admin_manager_id": _optional_str(user_doc.get("admin_manager_id")),
+        "assigned_hr_id": _optional_str(user_doc.get("assigned_hr_id")),
+        "tv": user_doc.get("token_version", 0),
+        "uat": _epoch_seconds(user_doc.get("updated_at")),
+        "cv": CLAIMS_VERSION,
+        "typ": "access",
+    }
+
+def create_refresh_token(user_doc: dict, jti: str, expires_at: datetime) -> str:
+    """Creates a refresh token. Its 'jti' must be stored; refreshing consumes it (rotation)."""
+    to_encode = {
+        "sub": user_doc["email"],
+        "uid": str(user_doc["_id"]),
+        "tv": user_doc.get("token_version", 0),
+        "jti": jti,
+        "typ": "refresh",
+        "exp": expires_at,
+    }
+    return token_verifier.encode(to_encode)
+
+def hash_reset_token(token: str) -> str:
+    """Password-reset tokens are stored and looked up only by their SHA-256 digest."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+async def _token_claims_status(payload: dict, db: AsyncIOMotorDatabase) -> str:
+    """
+    Checks a token's 'tv' (token version) and 'uat' (user updated_at at issue) claims against the
+    user's cached token state. Returns 'revoked' when the token version was bumped or the user is
+    gone, 'stale' when the user changed after the token was issued, and 'current' otherwise.
+    """
+    try:
+        user_id = ObjectId(str(payload["uid"]))
+    except (KeyError, InvalidId, TypeError):
+        return "revoked"
+    state = await token_state_cache.get(db, user_id)
+    if state is None or payload.get("tv", 0) != state.token_version:
+        return "revoked"
+    issued_version = payload.get("uat")
+    if state.updated_at is not None and (issued_version is None or state.updated_at > issued_version + 0.001):
+        return "stale"
+    return "current"
+
+_INTROSPECTION_PROJECTION = {
+    "email": 1, "username": 1, "role": 1, "hr_status": 1, "mapping_status": 1,
+    "admin_manager_id": 1, "assigned_hr_id": 1, "token_version": 1,
+}
+
+async def introspect_token(token: str, db: AsyncIOMotorDatabase) -> dict:
+    """
+    Resolves an access token to its principal for other services. Returns {"active": False}
+    for invalid, expired, refresh or revoked tokens. Current claims tokens are answered from the
+    claims and the cached token state; older or stale tokens need one projected user lookup.
+    """
+    inactive = {"active": False}
+    try:
+        payload = token_verifier.decode(token)
+    except JWTError:
+        return inactive
+    email = payload.get("sub")
+    if not email or payload.get("typ") == "refresh":
+        return inactive
+
+    if payload.get("uid"):
+        claims_status = await _token_claims_status(payload, db)
+        if claims_status == "revoked":
+            return inactive
+        if claims_status == "current" and payload.get("cv") == CLAIMS_VERSION:
+            return {
+                "active": True,
+                "sub": email,
+                "uid": payload["uid"],
+                "username": payload.get("username"),
+                "role": payload.get("role"),
+                "hr_status": payload.get("hr_status"),
+                "mapping_status": payload.get("mapping_status"),
+                "admin_manager_id": payload.get("admin_manager_id"),
+                "assigned_hr_id": payload.get("assigned_hr_id"),
+                "exp": payload.get("exp"),
+            }
+
+    user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": email}, _INTROSPECTION_PROJECTION, collation=USER_IDENTIFIER_COLLATION)
+    if not user_doc:
+        return inactive
+    return {
+        "active": True,
+        "sub": email,
+        "uid": str(user_doc["_id"]),
+        "username": user_doc.get("username"),
+        "role": user_doc.get("role"),
+        "hr_status": user_doc.get("hr_status"),
+        "mapping_status": user_doc.get("mapping_status"),
+        "admin_manager_id": _optional_str(user_doc.get("admin_manager_id")),
+        "assigned_hr_id": _optional_str(user_doc.get("assigned_hr_id")),
+        "exp": payload.get("exp"),
+    }
+
 # --- Core User Fetching Dependency ---
 async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
     """
@@ -118,7 +291,7 @@ async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
     # 1. Decode Token
     email: Optional[str] = None # Initialize email
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = token_verifier.decode(token)
         email = payload.get("sub") # Assign email here
         logger.debug(f"[AUTH_DEBUG] Decoded token for email: {email}") # Log decoded email
         if email is None:
@@ -131,11 +304,26 @@ async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
         logger.error(f"Unexpected error processing token payload: {e}", exc_info=True)
         raise credentials_exception # Treat unexpected token processing errors as auth failure
 
+    # Claims tokens carry a token version and the user's updated_at; both are checked against a
+    # cached per-user state instead of loading the user document on every request.
+    if payload.get("typ") == "refresh":
+        raise credentials_exception
+    if payload.get("uid"):
+        try:
+            claims_status = await _token_claims_status(payload, db)
+        except Exception:
+            raise internal_server_exception
+        if claims_status == "revoked":
+            raise credentials_exception
+
     # 2. Fetch and Validate User from DB
     if email: # Only proceed if email was decoded
         try:
+            cached_user = principal_cache.get(email, UserOut)
+            if cached_user is not None:
+                return cached_user
             logger.debug(f"[AUTH_DEBUG] Attempting DB lookup for email: {email}")
-            user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": email})
+            user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": email}, collation=USER_IDENTIFIER_COLLATION)
 
             if user_doc is None:
                 logger.warning(f"[AUTH_DEBUG] User NOT FOUND in DB for email: {email}")
@@ -157,6 +345,7 @@ async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
                 # This ensures the data structure is correct before returning
                 try:
                     user = UserOut.model_validate(user_doc)
+                    principal_cache.put(email, user_doc, user)
                     logger.debug(f"[AUTH_DEBUG] Successfully validated user doc into UserOut model: {user.email} (Validated ID: {user.id}, Validated Username: {user.username})") # Log validated data
                     return user
                 except ValidationError as e:
@@ -0,0 +1,435 @@
+# auth_service/app/db/change_events.py
+
+import asyncio
+import inspect
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, ClassVar, Deque, Dict, List, Optional, Tuple, Type, Union
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Returned by MongoDB when change streams are unavailable (standalone server, not a replica set)
+_UNSUPPORTED_CODES = {40573, 40324}
+# The resume token is invalid or already rolled off the oplog (InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost)
+_RESUME_LOST_CODES = {260, 280, 286}
+
+# --- Gap Reasons ---
+# Passed to a subscriber's `on_gap` when it may have missed events and should resync its state
+GAP_OVERFLOW = "overflow" # The subscriber's queue was full (lossy subscribers only)
+GAP_RESET = "reset" # The stream restarted from "now" because the resume point was lost
+GAP_UNAVAILABLE = "unavailable" # Change streams are not supported by the deployment; no events will arrive
+
+
+# --- Events ---
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    One insert, update, replace or delete on a watched collection. Only the document key and the
+    names of the changed fields are carried (never the values), so events stay small and
+    subscribers re-read whatever they need.
+    """
+
+    collection_setting: ClassVar[str] = ""
+
+    collection: str
+    operation: str
+    document_id: Any
+    updated_fields: Tuple[str, ...] = ()
+    removed_fields: Tuple[str, ...] = ()
+    cluster_time: Any = None
+    resume_token: Any = field(default=None, repr=False, compare=False)
+
+    def touches(self, *fields: str) -> bool:
+        """Whether the change may affect any of `fields` (inserts, replaces and deletes affect all)."""
+        if self.operation != "update":
+            return True
+        for changed in self.updated_fields + self.removed_fields:
+            for name in fields:
+                if changed == name or changed.startswith(name + ".") or name.startswith(changed + "."):
+                    return True
+        return False
+
+
+class UserChanged(ChangeEvent):
+    collection_setting = "MONGODB_COLLECTION_USERS"
+
+
+class InterviewChanged(ChangeEvent):
+    collection_setting = "MONGODB_COLLECTION_INTERVIEWS"
+
+
+class MappingRequestChanged(ChangeEvent):
+    collection_setting = "MONGODB_COLLECTION_HR_MAPPING_REQUESTS"
+
+
+EVENT_TYPES: Tuple[Type[ChangeEvent], ...] = (UserChanged, InterviewChanged, MappingRequestChanged)
+
+Handler = Callable[[ChangeEvent], Union[None, Awaitable[None]]]
+GapHandler = Callable[[str], Union[None, Awaitable[None]]]
+
+
+async def _call(callback: Callable[[Any], Any], argument: Any) -> None:
+    result = callback(argument)
+    if inspect.isawaitable(result):
+        await result
+
+
+# --- Subscriptions ---
+class Subscription:
+    """
+    One in-process consumer with its own bounded queue and task, so a slow handler never delays
+    the others. A blocking subscription applies backpressure: when its queue is full the stream
+    is not read until it catches up, and resume tokens are only checkpointed past events it has
+    handled. A lossy subscription (caches) never holds the stream back: on overflow its queue is
+    emptied and it gets `on_gap(GAP_OVERFLOW)` to resync instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        event_types: Tuple[Type[ChangeEvent], ...],
+        handler: Handler,
+        on_gap: Optional[GapHandler],
+        max_queue: int,
+        lossy: bool,
+    ):
+        self.name = name
+        self.event_types = event_types
+        self.handler = handler
+        self.on_gap = on_gap
+        self.lossy = lossy
+        self.queue: "asyncio.Queue[Tuple[int, Union[ChangeEvent, str]]]" = asyncio.Queue(maxsize=max_queue)
+        self.in_flight: Deque[int] = deque() # Sequence numbers queued or being handled, oldest first
+        self.delivered = 0
+        self.handled = 0
+        self.failed = 0
+        self.dropped = 0
+        self.gaps = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def wants(self, event: ChangeEvent) -> bool:
+        return isinstance(event, self.event_types)
+
+    async def deliver(self, seq: int, item: Union[ChangeEvent, str]) -> None:
+        if isinstance(item, ChangeEvent):
+            self.delivered += 1
+        if not self.lossy:
+            self.in_flight.append(seq)
+            await self.queue.put((seq, item))
+            return
+        if self.queue.full():
+            # Everything still queued is superseded by the resync the gap triggers
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+            if isinstance(item, ChangeEvent):
+                self.dropped += 1
+            item = GAP_OVERFLOW
+            logger.warning(f"Change events: subscriber '{self.name}' overflowed ({self.queue.maxsize} queued); resyncing.")
+        self.queue.put_nowait((seq, item))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _consume(self) -> None:
+        while True:
+            seq, item = await self.queue.get()
+            try:
+                if isinstance(item, str):
+                    self.gaps += 1
+                    if self.on_gap is not None:
+                        await _call(self.on_gap, item)
+                else:
+                    await _call(self.handler, item)
+                    self.handled += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A failing handler skips the event; it must not stop the subscription
+                self.failed += 1
+                logger.error(f"Change events: subscriber '{self.name}' failed on {item!r}: {e}", exc_info=True)
+            finally:
+                if self.in_flight and self.in_flight[0] == seq:
+                    self.in_flight.popleft()
+                self.queue.task_done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "events": [event_type.__name__ for event_type in self.event_types],
+            "lossy": self.lossy,
+            "queued": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "delivered": self.delivered,
+            "handled": self.handled,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "gaps": self.gaps,
+        }
+
+
+# --- Bus ---
+class ChangeEventBus:
+    """
+    One change stream per process over the collections that have subscribers (users, interviews,
+    hr_mapping_requests), fanned out as typed events to in-process subscriptions. The resume token
+    is checkpointed to MONGODB_COLLECTION_CHANGE_STREAM_TOKENS every CHANGE_EVENTS_CHECKPOINT_SECONDS,
+    only past events every blocking subscriber has handled, so a restart resumes where processing
+    stopped. Interrupted streams reconnect with jittered exponential backoff from the last event
+    read; when the resume point is gone (token rolled off the oplog) the stream restarts from now
+    and subscribers get `on_gap(GAP_RESET)`. On a standalone server they get GAP_UNAVAILABLE.
+    """
+
+    def __init__(self, consumer: str):
+        self.consumer = consumer # _id of the checkpoint document
+        self._subscriptions: List[Subscription] = []
+        self._task: Optional[asyncio.Task] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._delay = settings.CHANGE_EVENTS_RECONNECT_MIN_SECONDS
+        self._seq = 0
+        self._pending: Deque[Tuple[int, Any]] = deque() # (last event seq covered, resume token) not yet checkpointed
+        self._token: Any = None # Latest token read; reconnects resume from here
+        self._saved_token: Any = None
+        self._next_checkpoint = 0.0
+        self.state = "stopped"
+        self.watching: List[str] = []
+        self.received: Dict[str, Dict[str, int]] = {}
+        self.reconnects = 0
+        self.resets = 0
+        self.last_error: Optional[str] = None
+        self.last_checkpoint_at: Optional[datetime] = None
+
+    def subscribe(
+        self,
+        name: str,
+        event_types: Tuple[Type[ChangeEvent], ...],
+        handler: Handler,
+        *,
+        on_gap: Optional[GapHandler] = None,
+        max_queue: Optional[int] = None,
+        lossy: bool = False,
+    ) -> Subscription:
+        """
+        Registers a handler (sync or async) for events of `event_types`. Subscribe before `start`:
+        the set of watched collections is fixed when the stream opens.
+        """
+        subscription = Subscription(
+            name, tuple(event_types), handler, on_gap,
+            max_queue or settings.CHANGE_EVENTS_QUEUE_SIZE, lossy,
+        )
+        self._subscriptions.append(subscription)
+        if self._task is not None:
+            subscription.start()
+            if self.watching and any(_collection(event_type) not in self.watching for event_type in subscription.event_types):
+                logger.warning(f"Change events: '{name}' subscribed after start; only {self.watching} are watched.")
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        await subscription.stop()
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        if not settings.CHANGE_EVENTS_ENABLED or not self._subscriptions:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        for subscription in self._subscriptions:
+            subscription.start()
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        blocking = [s.queue.join() for s in self._subscriptions if not s.lossy]
+        if blocking:
+            # Let blocking subscribers finish what was already read so the final checkpoint covers it
+            try:
+                await asyncio.wait_for(asyncio.gather(*blocking), settings.CHANGE_EVENTS_DRAIN_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning("Change events: subscribers did not drain before shutdown; unhandled events will be redelivered.")
+        if self._db is not None:
+            await self._checkpoint(self._db[settings.MONGODB_COLLECTION_CHANGE_STREAM_TOKENS])
+        for subscription in self._subscriptions:
+            await subscription.stop()
+        self.state = "stopped"
+
+    # Stream loop
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        self._db = db
+        tokens = db[settings.MONGODB_COLLECTION_CHANGE_STREAM_TOKENS]
+        self._token = self._saved_token = await self._load_token(tokens)
+        while True:
+            try:
+                await self._watch(db, tokens)
+                continue # Invalidated: reopen from now
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES:
+                    logger.info("Change events: change streams unavailable (standalone server); no events will be published.")
+                    self.state = "unavailable"
+                    await self._broadcast(GAP_UNAVAILABLE)
+                    return
+                if self._token is not None and (e.code in _RESUME_LOST_CODES or e.has_error_label("NonResumableChangeStreamError")):
+                    logger.warning(f"Change events: cannot resume ({e}); restarting from now.")
+                    await self._reset()
+                    continue
+                self.last_error = str(e)
+                logger.warning(f"Change events: stream failed ({e}); reconnecting in {self._delay:.1f}s.")
+            except PyMongoError as e:
+                self.last_error = str(e)
+                logger.warning(f"Change events: stream interrupted ({e}); reconnecting in {self._delay:.1f}s.")
+            self.state = "reconnecting"
+            self.reconnects += 1
+            await asyncio.sleep(self._delay * random.uniform(0.5, 1.0))
+            self._delay = min(self._delay * 2, settings.CHANGE_EVENTS_RECONNECT_MAX_SECONDS)
+
+    async def _watch(self, db: AsyncIOMotorDatabase, tokens: AsyncIOMotorCollection) -> None:
+        """Reads the stream until it fails or is invalidated."""
+        types_by_collection = {
+            _collection(event_type): event_type
+            for event_type in EVENT_TYPES
+            if any(issubclass(event_type, s.event_types) for s in self._subscriptions)
+        }
+        self.watching = sorted(types_by_collection)
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": self.watching}, "operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+            # Field names only: updated values (resume text, transcripts) never cross the wire
+            {"$project": {
+                "ns": 1, "operationType": 1, "documentKey": 1, "clusterTime": 1,
+                "updatedFields": {"$map": {
+                    "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+                    "as": "field", "in": "$$field.k",
+                }},
+                "removedFields": "$updateDescription.removedFields",
+            }},
+        ]
+        max_await_ms = max(100, int(min(settings.CHANGE_EVENTS_CHECKPOINT_SECONDS, 1.0) * 1000))
+        async with db.watch(pipeline, resume_after=self._token, max_await_time_ms=max_await_ms) as stream:
+            logger.info(f"Change events: watching {self.watching} ({'resuming' if self._token else 'from now'}).")
+            self.state = "running"
+            self._delay = settings.CHANGE_EVENTS_RECONNECT_MIN_SECONDS # Connected; reset the backoff
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    if change.get("operationType") == "invalidate":
+                        await self._reset()
+                        return
+                    self._token = stream.resume_token
+                    await self._dispatch(types_by_collection, change)
+                elif stream.resume_token is not None and stream.resume_token != self._token:
+                    # Idle: the post-batch token still advances, which keeps a quiet stream resumable
+                    self._token = stream.resume_token
+                    self._track(self._token)
+                if time.monotonic() >= self._next_checkpoint:
+                    await self._checkpoint(tokens)
+
+    async def _dispatch(self, types_by_collection: Dict[str, Type[ChangeEvent]], change: Dict[str, Any]) -> None:
+        collection = change["ns"]["coll"]
+        event_type = types_by_collection.get(collection, ChangeEvent)
+        event = event_type(
+            collection=collection,
+            operation=change["operationType"],
+            document_id=(change.get("documentKey") or {}).get("_id"),
+            updated_fields=tuple(change.get("updatedFields") or ()),
+            removed_fields=tuple(change.get("removedFields") or ()),
+            cluster_time=change.get("clusterTime"),
+            resume_token=self._token,
+        )
+        counts = self.received.setdefault(collection, {})
+        counts[event.operation] = counts.get(event.operation, 0) + 1
+        self._seq += 1
+        self._track(self._token)
+        for subscription in list(self._subscriptions):
+            if subscription.wants(event):
+                await subscription.deliver(self._seq, event)
+
+    async def _broadcast(self, reason: str) -> None:
+        self._seq += 1
+        for subscription in list(self._subscriptions):
+            await subscription.deliver(self._seq, reason)
+
+    async def _reset(self) -> None:
+        self.resets += 1
+        self._token = None
+        self._pending.clear()
+        await self._broadcast(GAP_RESET)
+
+    # Checkpoints
+    def _track(self, token: Any) -> None:
+        if self._pending and self._pending[-1][0] == self._seq:
+            self._pending[-1] = (self._seq, token)
+        else:
+            self._pending.append((self._seq, token))
+
+    def _handled_through(self) -> int:
+        """Highest sequence number every blocking subscriber has handled."""
+        oldest = [s.in_flight[0] for s in self._subscriptions if not s.lossy and s.in_flight]
+        return min(oldest) - 1 if oldest else self._seq
+
+    async def _load_token(self, tokens: AsyncIOMotorCollection) -> Any:
+        try:
+            doc = await tokens.find_one({"_id": self.consumer}, {"token": 1})
+        except PyMongoError as e:
+            logger.warning(f"Change events: could not load the resume token ({e}); starting from now.")
+            return None
+        return doc.get("token") if doc else None
+
+    async def _checkpoint(self, tokens: AsyncIOMotorCollection) -> None:
+        self._next_checkpoint = time.monotonic() + settings.CHANGE_EVENTS_CHECKPOINT_SECONDS
+        handled_through = self._handled_through()
+        token = None
+        while self._pending and self._pending[0][0] <= handled_through:
+            token = self._pending.popleft()[1]
+        if token is None or token == self._saved_token:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            await tokens.update_one({"_id": self.consumer}, {"$set": {"token": token, "saved_at": now}}, upsert=True)
+        except PyMongoError as e:
+            self._pending.appendleft((handled_through, token)) # Retried at the next checkpoint
+            logger.warning(f"Change events: could not save the resume token ({e}).")
+            return
+        self._saved_token = token
+        self.last_checkpoint_at = now
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consumer": self.consumer,
+            "watching": self.watching,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "resets": self.resets,
+            "last_error": self.last_error,
+            "unsaved_tokens": len(self._pending),
+            "last_checkpoint_at": self.last_checkpoint_at.isoformat() if self.last_checkpoint_at else None,
+            "subscriptions": {s.name: s.snapshot() for s in self._subscriptions},
+        }
+
+
+def _collection(event_type: Type[ChangeEvent]) -> str:
+    return getattr(settings, event_type.collection_setting)
+
+
+change_event_bus = ChangeEventBus(settings.CHANGE_EVENTS_CONSUMER or settings.APP_NAME)
@@ -1,12 +1,13 @@
 # LLM_interviewer/server/app/db/mongodb.py
 
 import logging
-from typing import Optional # Import Optional for type hinting
+from typing import AsyncGenerator, Dict, Optional # Import Optional for type hinting
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession, AsyncIOMotorDatabase
 
 # Import settings for configuration
 from ..core.config import settings # This will be changed to relative import
+from .pool import DEFAULT, client_options, read_options
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,7 @@ class MongoDB:
         """Initializes the MongoDB manager with None client/db."""
         self.client = None
         self.db = None
+        self._profiles: Dict[str, AsyncIOMotorDatabase] = {}
         # Use settings directly for configuration
         self.mongodb_url = settings.MONGODB_URL
         self.mongodb_db_name = settings.MONGODB_DB
@@ -44,16 +46,8 @@ class MongoDB:
 
         try:
             logger.info(f"Attempting to connect to MongoDB at {self.mongodb_url}...")
-            # Configure timeouts from settings if available, otherwise use defaults
-            connect_timeout = getattr(settings, 'MONGODB_CONNECT_TIMEOUT_MS', 5000)
-            server_select_timeout = getattr(settings, 'MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)
-
-            self.client = AsyncIOMotorClient(
-                self.mongodb_url,
-                serverSelectionTimeoutMS=server_select_timeout,
-                connectTimeoutMS=connect_timeout,
-                # socketTimeoutMS is often less critical here, but can be added
-            )
+            # Pool sizing, compression, retries and read defaults live in pool.py; one client per process
+            self.client = AsyncIOMotorClient(self.mongodb_url, **client_options())
             # The 'ping' command is cheap and verifies connectivity + authentication
             await self.client.admin.command('ping')
             # Assign database instance *after* successful ping
@@ -74,6 +68,7 @@ class MongoDB:
             self.client.close()
             self.client = None
             self.db = None
+            self._profiles = {}
             logger.info("MongoDB connection closed.")
         else:
             logger.info("No active MongoDB connection to close.")
@@ -92,5 +87,28 @@ class MongoDB:
             raise RuntimeError("Database not connected. Ensure connect() was called and succeeded during application startup.")
         return self.db
 
+    def get_db_for(self, profile: str = DEFAULT) -> AsyncIOMotorDatabase:
+        """
+        The database handle for a read profile (see pool.READ_PROFILES). Handles share the
+        client's connection pool and only differ in read preference/concern.
+        """
+        db = self.get_db()
+        if profile == DEFAULT:
+            return db
+        handle = self._profiles.get(profile)
+        if handle is None:
+            handle = self._profiles[profile] = db.with_options(**read_options(profile))
+        return handle
+
+    async def causal_session(self) -> AsyncGenerator[AsyncIOMotorClientSession, None]:
+        """
+        FastAPI dependency yielding a causally consistent session for one request. Reads made
+        with it observe the request's earlier writes even on a secondary; pool.causal_tokens
+        carries a principal's last write into later requests.
+        """
+        self.get_db() # Fails the same way as get_db when not connected
+        async with await self.client.start_session(causal_consistency=True) as session:
+            yield session
+
 # Create a single, globally available instance of the MongoDB manager
 mongodb = MongoDB()
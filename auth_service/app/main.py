@@ -1,14 +1,22 @@
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 from datetime import datetime, timezone
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import application components
 from .core.config import settings
+from .core.request_context import RequestContextMiddleware
 from .db.mongodb import mongodb # Import the singleton instance
+from .db.indexes import index_reconciler
+from .db.pool import pool_metrics
+from .db.query_stats import query_stats
+from .core.principal_cache import user_change_feed
+from .db.change_events import change_event_bus
+from .core.token_verifier import token_verifier
+from .core.password_hashing import password_hashing_executor
 from .api.routes import auth as auth_router # Import the auth router
 
 # --- Logging Setup ---
@@ -18,6 +26,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# --- Data Cleanup ---
+async def remove_legacy_password_reset_fields(db) -> None:
+    """Reset tokens used to live on the user documents; drop any that are still lying around."""
+    result = await db[settings.MONGODB_COLLECTION_USERS].update_many(
+        {"password_reset_token": {"$exists": True}},
+        {"$unset": {"password_reset_token": "", "password_reset_token_expires_at": ""}},
+    )
+    if result.modified_count:
+        logger.info(f"Removed legacy password reset fields from {result.modified_count} user documents.")
+
+
 # --- Application Lifespan (Simplified for now) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
@@ -28,17 +47,22 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         await mongodb.connect()
         db_connected = True
         logger.info("Auth Service: MongoDB connection successful.")
+        user_change_feed.start(mongodb.get_db())
+        change_event_bus.start(mongodb.get_db()) # After the subscribers above
+        # Identifier, token and TTL indexes come from the registry in app/db/indexes.py
+        index_reconciler.start(mongodb.get_db(), owner="auth")
+        await remove_legacy_password_reset_fields(mongodb.get_db())
         # Seeding specific to auth service, if any, would go here
         # For example, creating a default admin user if not in testing mode
         if not settings.TESTING_MODE and settings.DEFAULT_ADMIN_EMAIL and settings.DEFAULT_ADMIN_PASSWORD and settings.DEFAULT_ADMIN_USERNAME:
-            from .core.security import get_password_hash # Local import for lifespan
+            from .core.security import get_password_hash_async # Local import for lifespan
             db_instance = mongodb.get_db()
-            existing_admin = await db_instance[settings.MONGODB_COLLECTION_USERS].find_one({"email": settings.DEFAULT_ADMIN_EMAIL})
+            existing_admin = await db_instance[settings.MONGODB_COLLECTION_USERS].find_one({"email": settings.DEFAULT_ADMIN_EMAIL}, {"_id": 1})
             if not existing_admin:
                 admin_user_doc = {
                     "username": settings.DEFAULT_ADMIN_USERNAME,
                     "email": settings.DEFAULT_ADMIN_EMAIL,
-                    "hashed_password": get_password_hash(settings.DEFAULT_ADMIN_PASSWORD),
+                    "hashed_password": await get_password_hash_async(settings.DEFAULT_ADMIN_PASSWORD),
                     "role": "admin",
                     "created_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc)
@@ -56,10 +80,14 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     finally:
         logger.info("Auth Service: Application shutdown sequence initiated...")
         if db_connected:
+            await change_event_bus.stop()
+            await user_change_feed.stop()
+            await index_reconciler.stop()
             await mongodb.close()
             logger.info("Auth Service: MongoDB connection closed.")
         else:
             logger.warning("Auth Service: Skipping MongoDB close sequence as connection was not established.")
+        password_hashing_executor.shutdown()
         logger.info("Auth Service: Application shutdown complete.")
 
 
@@ -99,6 +127,8 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 logger.info(f"CORS middleware enabled. Allowed origins: {configured_origins}")
+# Exposes the matched route to code outside the route, e.g. for per-route query stats
+app.add_middleware(RequestContextMiddleware)
 
 # --- API Router Inclusion (Placeholder) ---
 app.include_router(auth_router.router, prefix="/api/v1", tags=["Authentication"]) # Using /api/v1 as base for all services
@@ -114,3 +144,28 @@ async def read_root() -> dict[str, str]:
 @app.get("/health", tags=["Health Check"])
 async def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+# Token verification cache effectiveness and latency of full signature checks
+@app.get("/health/token-verification", tags=["Health Check"])
+async def token_verification_stats() -> Dict[str, Any]:
+    return token_verifier.stats()
+
+
+# MongoDB connection pool checkouts, connections in use and checkout wait times
+@app.get("/health/db-pool", tags=["Health Check"])
+async def db_pool_stats() -> Dict[str, Any]:
+    return pool_metrics.snapshot()
+
+
+# Per-route query histograms and recent slow commands (filter values redacted), with pool and index state.
+# Exposes route and query shapes, so it is off unless DEBUG_ENDPOINTS_ENABLED is set.
+@app.get("/debug/db-stats", tags=["Health Check"], include_in_schema=settings.DEBUG_ENDPOINTS_ENABLED)
+async def db_stats(limit: int = Query(50, ge=1, le=500)) -> Dict[str, Any]:
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return {
+        "queries": query_stats.snapshot(limit=limit),
+        "pool": pool_metrics.snapshot(),
+        "indexes": index_reconciler.last_report,
+        "change_events": change_event_bus.snapshot(),
+    }
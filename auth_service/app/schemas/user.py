@@ -62,6 +62,14 @@ class BaseUser(BaseModel):
 class UserCreate(BaseUser):
     password: str = Field(..., min_length=8)
 
+    @field_validator('username')
+    @classmethod
+    def check_username_not_email_like(cls, value: str) -> str:
+        # Login treats identifiers containing '@' as emails, so usernames may not contain it
+        if "@" in value:
+            raise ValueError("Username may not contain '@'.")
+        return value
+
 # Schema for user update (optional fields)
 class UserUpdate(BaseModel):
     username: Optional[str] = Field(None, min_length=3, max_length=50)
@@ -86,6 +94,33 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None # Access token lifetime in seconds
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+# --- Token Introspection Schemas (service-to-service) ---
+class TokenIntrospectionRequest(BaseModel):
+    token: str
+
+class TokenIntrospectionBatchRequest(BaseModel):
+    tokens: List[str] = Field(..., max_length=100)
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: Optional[EmailStr] = None
+    uid: Optional[str] = None
+    username: Optional[str] = None
+    role: Optional[UserRole] = None
+    hr_status: Optional[str] = None
+    mapping_status: Optional[str] = None
+    admin_manager_id: Optional[str] = None
+    assigned_hr_id: Optional[str] = None
+    exp: Optional[int] = None
+
+class TokenIntrospectionBatch(BaseModel):
+    results: List[TokenIntrospection] # Same order as the request's tokens
 
 class TokenData(BaseModel):
     # Store email (subject) and potentially role from token payload
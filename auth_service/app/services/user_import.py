@@ -0,0 +1,216 @@
+# auth_service/app/services/user_import.py
+
+import asyncio
+import codecs
+import csv
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.core.password_hashing import password_hashing_executor, PasswordHashingBusyError
+from app.core.security import get_password_hash, USER_IDENTIFIER_COLLATION
+from app.schemas.user import UserCreate
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def import_hash_slots() -> int:
+    """Hashing workers one import may occupy at a time (at least one)."""
+    return max(1, settings.PASSWORD_HASH_MAX_WORKERS // 2)
+
+
+def build_new_user_document(user: UserCreate, hashed_password: str) -> Dict[str, Any]:
+    """User document for a new account, with the role's initial status (shared with /register)."""
+    now = datetime.now(timezone.utc)
+    user_doc = user.model_dump(exclude={"password"})
+    user_doc["hashed_password"] = hashed_password
+    user_doc["created_at"] = now
+    user_doc["updated_at"] = now
+    if user.role == "candidate":
+        user_doc["mapping_status"] = "pending_resume"
+    elif user.role == "hr":
+        user_doc["hr_status"] = "pending_profile"
+    return user_doc
+
+
+# --- Row Parsing ---
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decodes a byte stream incrementally and yields complete lines (without the newline)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, dict) per CSV record; the first record is the header. Quoted newlines are kept."""
+    header: Optional[List[str]] = None
+    record = ""
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2: # Inside a quoted field that spans lines
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_number += 1
+        yield row_number, dict(zip(header, values))
+    if record:
+        row_number += 1
+        yield row_number, ValueError("Unterminated quoted field.")
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, dict) per non-blank NDJSON line; unparsable lines yield the error instead."""
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+# --- Import ---
+class UserImportService:
+    """
+    Bulk account creation for admin imports. Rows are processed in batches: each batch is
+    validated, deduplicated against itself, earlier batches and the database (one `$in` query
+    per batch on the collated unique indexes), hashed in parallel on the password-hashing
+    executor and written with one unordered `insert_many`. One result is yielded per input row.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, batch_size: Optional[int] = None, default_role: str = "candidate"):
+        self.db = db
+        self.users = db[settings.MONGODB_COLLECTION_USERS]
+        self.batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+        self.default_role = default_role
+        self._seen_emails: Set[str] = set()
+        self._seen_usernames: Set[str] = set()
+        # An import holds at most half of the hashing workers; the rest stay free for interactive logins
+        self._hash_slots = asyncio.Semaphore(import_hash_slots())
+        self.summary: Dict[str, int] = {"created": 0, "duplicate": 0, "invalid": 0, "error": 0}
+
+    async def import_rows(self, rows: AsyncIterator[Tuple[int, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        batch: List[Tuple[int, Any]] = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                for result in await self._import_batch(batch):
+                    yield result
+                batch = []
+        if batch:
+            for result in await self._import_batch(batch):
+                yield result
+
+    def _result(self, row: int, status: str, **fields: Any) -> Dict[str, Any]:
+        self.summary[status] += 1
+        return {"row": row, "status": status, **{k: v for k, v in fields.items() if v is not None}}
+
+    async def _hash(self, password: str) -> Optional[str]:
+        async with self._hash_slots:
+            try:
+                return await password_hashing_executor.run(get_password_hash, password)
+            except PasswordHashingBusyError:
+                return None
+
+    async def _import_batch(self, batch: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+        results: Dict[int, Dict[str, Any]] = {}
+        candidates: List[Tuple[int, UserCreate]] = []
+
+        for row_number, data in batch:
+            if isinstance(data, Exception):
+                results[row_number] = self._result(row_number, "invalid", detail=str(data))
+                continue
+            if not isinstance(data, dict):
+                results[row_number] = self._result(row_number, "invalid", detail="Row must be an object.")
+                continue
+            data = {k: v for k, v in data.items() if v not in (None, "")}
+            data.setdefault("role", self.default_role)
+            try:
+                user = UserCreate.model_validate(data)
+            except ValidationError as e:
+                detail = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+                results[row_number] = self._result(row_number, "invalid", email=data.get("email"), detail=detail)
+                continue
+            email_key, username_key = user.email.lower(), user.username.lower()
+            if email_key in self._seen_emails or username_key in self._seen_usernames:
+                results[row_number] = self._result(row_number, "duplicate", email=user.email, detail="Repeated earlier in this import.")
+                continue
+            self._seen_emails.add(email_key)
+            self._seen_usernames.add(username_key)
+            candidates.append((row_number, user))
+
+        if candidates:
+            # One round trip for the whole batch; the collation matches the unique indexes
+            existing_emails: Set[str] = set()
+            existing_usernames: Set[str] = set()
+            cursor = self.users.find(
+                {"$or": [
+                    {"email": {"$in": [user.email for _, user in candidates]}},
+                    {"username": {"$in": [user.username for _, user in candidates]}},
+                ]},
+                {"_id": 0, "email": 1, "username": 1},
+                collation=USER_IDENTIFIER_COLLATION,
+            )
+            async for doc in cursor:
+                existing_emails.add(str(doc.get("email", "")).lower())
+                existing_usernames.add(str(doc.get("username", "")).lower())
+
+            fresh: List[Tuple[int, UserCreate]] = []
+            for row_number, user in candidates:
+                if user.email.lower() in existing_emails:
+                    results[row_number] = self._result(row_number, "duplicate", email=user.email, detail="Email already registered.")
+                elif user.username.lower() in existing_usernames:
+                    results[row_number] = self._result(row_number, "duplicate", email=user.email, detail="Username already registered.")
+                else:
+                    fresh.append((row_number, user))
+
+            hashes = await asyncio.gather(*(self._hash(user.password) for _, user in fresh))
+            to_insert: List[Tuple[int, UserCreate, Dict[str, Any]]] = []
+            for (row_number, user), hashed in zip(fresh, hashes):
+                if hashed is None:
+                    results[row_number] = self._result(row_number, "error", email=user.email, detail="Password hashing capacity exhausted; retry this row.")
+                else:
+                    to_insert.append((row_number, user, build_new_user_document(user, hashed)))
+
+            if to_insert:
+                failed: Dict[int, Dict[str, Any]] = {}
+                try:
+                    await self.users.insert_many([doc for _, _, doc in to_insert], ordered=False)
+                except BulkWriteError as e:
+                    failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+                for index, (row_number, user, doc) in enumerate(to_insert):
+                    err = failed.get(index)
+                    if err is None:
+                        results[row_number] = self._result(row_number, "created", email=user.email, id=str(doc["_id"]))
+                    elif err.get("code") == DUPLICATE_KEY_ERROR:
+                        # Registered concurrently between the $in check and the insert
+                        results[row_number] = self._result(row_number, "duplicate", email=user.email, detail="Username or email already registered.")
+                    else:
+                        logger.error(f"Bulk import insert failed for row {row_number} ({user.email}): {err.get('errmsg')}")
+                        results[row_number] = self._result(row_number, "error", email=user.email, detail="Could not create this account.")
+
+        logger.info(f"User import batch of {len(batch)} rows processed; running totals: {self.summary}")
+        return [results[row_number] for row_number, _ in batch]
@@ -0,0 +1,56 @@
+# auth_service/benchmarks/kdf_calibration.py
+"""
+KDF cost calibration.
+
+Measures password-hash time on this host and recommends the highest cost that stays within a
+target latency per hash. Run it on (or on hardware identical to) the deployment host and copy
+the printed settings into the auth service environment; existing hashes are upgraded as users
+log in (PASSWORD_REHASH_ON_LOGIN).
+
+    cd auth_service && python -m benchmarks.kdf_calibration --target-ms 250
+    cd auth_service && python -m benchmarks.kdf_calibration --scheme argon2 --target-ms 250 --memory-kib 65536
+
+Keep PASSWORD_HASH_MAX_WORKERS in mind: with N workers the service sustains roughly
+N / target logins per second before requests start queueing.
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.core.password_policy import calibrate_argon2, calibrate_bcrypt, context_from_settings, time_hash
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target time for one hash")
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--min-rounds", type=int, default=10, help="bcrypt: never recommend fewer rounds")
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--memory-kib", type=int, default=settings.PASSWORD_ARGON2_MEMORY_COST_KIB)
+    parser.add_argument("--parallelism", type=int, default=settings.PASSWORD_ARGON2_PARALLELISM)
+    args = parser.parse_args()
+    target = args.target_ms / 1000
+
+    current = time_hash(context_from_settings(), args.samples)
+    print(f"current policy ({settings.PASSWORD_HASH_SCHEME}): {current * 1000:.1f} ms per hash")
+
+    if args.scheme == "bcrypt":
+        result = calibrate_bcrypt(target, args.min_rounds, args.max_rounds, args.samples)
+        for m in result["measurements"]:
+            print(f"  rounds {m['rounds']:>2}: {m['seconds'] * 1000:8.1f} ms")
+    else:
+        result = calibrate_argon2(target, args.memory_kib, args.parallelism, samples=args.samples)
+        for m in result["measurements"]:
+            print(f"  memory {m['memory_cost_kib']:>7} KiB  time {m['time_cost']:>2}: {m['seconds'] * 1000:8.1f} ms")
+
+    print(f"\nrecommended for <= {args.target_ms:.0f} ms:")
+    print(f"PASSWORD_HASH_SCHEME={result['scheme']}")
+    for key, value in result.items():
+        if key.startswith("PASSWORD_"):
+            print(f"{key}={value}")
+    print(f"# ~{settings.PASSWORD_HASH_MAX_WORKERS / target:.0f} logins/s with PASSWORD_HASH_MAX_WORKERS={settings.PASSWORD_HASH_MAX_WORKERS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# auth_service/benchmarks/login_lookup.py
+"""
+Login lookup latency vs. users-collection size.
+
+Seeds a scratch database with N synthetic users per step and times the login user lookup:
+
+- "$or scan": the previous {"$or": [{"email": id}, {"username": id}]} query with no indexes
+- "indexed":  identifier_filter() + USER_IDENTIFIER_COLLATION on the unique collated indexes
+
+Needs a reachable MongoDB (MONGODB_URL). The scratch database is dropped afterwards.
+
+    cd auth_service && python -m benchmarks.login_lookup --sizes 1000 10000 100000 --lookups 200
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.core.security import USER_IDENTIFIER_COLLATION, identifier_filter
+
+
+async def _time_lookups(lookup: Callable[[str], Awaitable[object]], identifiers: List[str]) -> List[float]:
+    latencies = []
+    for identifier in identifiers:
+        started = time.perf_counter()
+        found = await lookup(identifier)
+        latencies.append(time.perf_counter() - started)
+        assert found is not None, identifier
+    return latencies
+
+
+def _report(name: str, size: int, latencies: List[float]) -> None:
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"{size:>9} users  {name:<9} p50 {statistics.median(latencies) * 1000:8.2f} ms  p95 {p95 * 1000:8.2f} ms")
+
+
+async def run(sizes: List[int], lookups: int, database: str) -> None:
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    users = client[database]["users"]
+    try:
+        await client.drop_database(database)
+        seeded = 0
+        for size in sorted(sizes):
+            batch = [
+                {"email": f"user{i}@bench.example.com", "username": f"user{i}", "role": "candidate", "hashed_password": "x"}
+                for i in range(seeded, size)
+            ]
+            for start in range(0, len(batch), 10000):
+                await users.insert_many(batch[start:start + 10000], ordered=False)
+            seeded = size
+
+            sample = [random.randrange(size) for _ in range(lookups)]
+            # Mix of email and username logins, with case differences the collation has to absorb
+            identifiers = [f"User{i}@Bench.example.com" if n % 2 else f"USER{i}" for n, i in enumerate(sample)]
+            exact = [f"user{i}@bench.example.com" if n % 2 else f"user{i}" for n, i in enumerate(sample)]
+
+            await users.drop_indexes()
+            _report("$or scan", size, await _time_lookups(
+                lambda ident: users.find_one({"$or": [{"email": ident}, {"username": ident}]}), exact
+            ))
+
+            for field in ("email", "username"):
+                await users.create_index(field, unique=True, collation=USER_IDENTIFIER_COLLATION, name=f"users_{field}_ci_unique")
+            _report("indexed", size, await _time_lookups(
+                lambda ident: users.find_one(identifier_filter(ident), collation=USER_IDENTIFIER_COLLATION), identifiers
+            ))
+    finally:
+        await client.drop_database(database)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--database", default=f"{settings.MONGODB_DB}_login_bench")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.lookups, args.database))
+
+
+if __name__ == "__main__":
+    main()
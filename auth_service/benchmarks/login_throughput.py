@@ -0,0 +1,116 @@
+# auth_service/benchmarks/login_throughput.py
+"""
+Login throughput benchmark.
+
+Local mode (default) compares the password-verification step of a login, which dominates its
+cost, run inline on the event loop versus on the bounded hashing executor. For each it reports
+logins/s, latency percentiles and the worst event-loop stall seen by a concurrent ticker task
+(inline bcrypt freezes every other request on the worker).
+
+    cd auth_service && python -m benchmarks.login_throughput --logins 64 --concurrency 16
+
+HTTP mode drives a running auth service instead:
+
+    python -m benchmarks.login_throughput --url http://localhost:8001/api/v1/auth/login \\
+        --username adminuser --password adminpassword --logins 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from app.core.password_hashing import PasswordHashingExecutor
+from app.core.security import get_password_hash, verify_password
+from app.core.config import settings
+
+
+async def _measure_loop_stall(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def _run(name: str, attempt: Callable[[], Awaitable[bool]], logins: int, concurrency: int) -> None:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with gate:
+            started = time.perf_counter()
+            ok = await attempt()
+            latencies.append(time.perf_counter() - started)
+            failures += 0 if ok else 1
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_loop_stall(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_stall = await ticker
+
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{name:<10} {logins / elapsed:8.1f} logins/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  max loop stall {worst_stall * 1000:7.1f} ms  failures {failures}"
+    )
+
+
+async def run_local(logins: int, concurrency: int, workers: int) -> None:
+    password = "benchmark-password"
+    hashed = get_password_hash(password)
+    print(f"bcrypt hash: {hashed[:7]}...  logins={logins} concurrency={concurrency} workers={workers}")
+
+    async def inline() -> bool:
+        return verify_password(password, hashed)
+
+    executor = PasswordHashingExecutor(max_workers=workers, max_pending=max(concurrency, 1), queue_timeout=60.0)
+
+    async def offloaded() -> bool:
+        return await executor.run(verify_password, password, hashed)
+
+    try:
+        await _run("inline", inline, logins, concurrency)
+        await _run("executor", offloaded, logins, concurrency)
+    finally:
+        executor.shutdown()
+
+
+async def run_http(url: str, username: str, password: str, logins: int, concurrency: int) -> None:
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        async def attempt() -> bool:
+            response = await client.post(url, data={"username": username, "password": password})
+            return response.status_code == 200
+
+        await _run("http", attempt, logins, concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_MAX_WORKERS)
+    parser.add_argument("--url", help="Login endpoint of a running auth service (HTTP mode)")
+    parser.add_argument("--username", default=settings.DEFAULT_ADMIN_USERNAME)
+    parser.add_argument("--password", default=settings.DEFAULT_ADMIN_PASSWORD)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_http(args.url, args.username, args.password, args.logins, args.concurrency))
+    else:
+        asyncio.run(run_local(args.logins, args.concurrency, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# auth_service/benchmarks/write_paths.py
+"""
+Write endpoint round trips: write-then-read vs. single-round-trip repository writes.
+
+Times the persistence half of three write endpoints against a scratch database and counts the
+commands each one sends (via a CommandListener on the benchmark client):
+
+- "insert+find":  insert_one followed by find_one on the inserted _id (previous register/schedule)
+- "insert":       Repository.insert, which returns the document it wrote
+- "update+find":  update_one followed by find_one (previous profile/status updates)
+- "find_and_mod": Repository.update, a single findAndModify returning the post-image
+
+Needs a reachable MongoDB (MONGODB_URL). The scratch database is dropped afterwards. Run it
+against a remote server as well as localhost: the saving is one network round trip per write.
+
+    cd auth_service && python -m benchmarks.write_paths --writes 2000 --concurrency 1 16
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.db.repository import Repository
+
+
+class _CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name not in ("hello", "isMaster", "ismaster", "ping", "endSessions"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _user_doc(n: int) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "username": f"bench{n}", "email": f"bench{n}@bench.example.com", "role": "candidate",
+        "hashed_password": "x", "is_active": True, "created_at": now, "updated_at": now,
+    }
+
+
+async def _run_concurrently(op: Callable[[int], Awaitable[object]], writes: int, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    queue = iter(range(writes))
+
+    async def worker():
+        for n in queue:
+            started = time.perf_counter()
+            result = await op(n)
+            latencies.append(time.perf_counter() - started)
+            assert result is not None, n
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def _report(name: str, concurrency: int, latencies: List[float], elapsed: float, commands: int) -> None:
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"c={concurrency:<3} {name:<13} p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+        f"p95 {p95 * 1000:7.2f} ms  {len(latencies) / elapsed:8.0f} writes/s  "
+        f"{commands / len(latencies):.1f} commands/write"
+    )
+
+
+async def run(writes: int, concurrencies: List[int], database: str) -> None:
+    counter = _CommandCounter()
+    client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[counter])
+    users = client[database]["users"]
+    repository = Repository(users)
+    try:
+        await client.drop_database(database)
+
+        async def insert_then_find(n: int):
+            result = await users.insert_one(_user_doc(n))
+            return await users.find_one({"_id": result.inserted_id})
+
+        async def update_then_find(n: int):
+            await users.update_one({"username": f"bench{n}"}, {"$set": {"updated_at": datetime.now(timezone.utc)}})
+            return await users.find_one({"username": f"bench{n}"})
+
+        async def find_and_modify(n: int):
+            return await repository.update({"username": f"bench{n}"}, {"$set": {"updated_at": datetime.now(timezone.utc)}})
+
+        await users.create_index("username", unique=True)
+        for concurrency in concurrencies:
+            cases = [
+                ("insert+find", insert_then_find),
+                ("insert", lambda n: repository.insert(_user_doc(writes + n))),
+                ("update+find", update_then_find),
+                ("find_and_mod", find_and_modify),
+            ]
+            for name, op in cases:
+                counter.count = 0
+                started = time.perf_counter()
+                latencies = await _run_concurrently(op, writes, concurrency)
+                _report(name, concurrency, latencies, time.perf_counter() - started, counter.count)
+            await users.delete_many({})
+    finally:
+        await client.drop_database(database)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--database", default=f"{settings.MONGODB_DB}_write_bench")
+    args = parser.parse_args()
+    asyncio.run(run(args.writes, args.concurrency, args.database))
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,7 @@ def test_user_create_valid():
     ({"username": "testuser", "email": "invalidemail", "password": "password123", "role": "candidate"}, "email"), # Invalid email
     ({"username": "testuser", "email": "test@example.com", "password": "short", "role": "candidate"}, "password"), # Too short password
     ({"username": "testuser", "email": "test@example.com", "password": "password123", "role": "invalidrole"}, "role"), # Invalid role
+    ({"username": "test@user", "email": "test@example.com", "password": "password123", "role": "candidate"}, "username"), # '@' reserved for email logins
 ])
 def test_user_create_invalid_data(invalid_data: dict, expected_error_field: str):
     with pytest.raises(ValidationError) as excinfo:
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.login_throttle import LoginThrottle, SlidingWindowCounter
+
+def test_sliding_window_weights_previous_window():
+    counter = SlidingWindowCounter(limit=5, window_seconds=100, max_keys=10)
+    for _ in range(4):
+        counter.add("k", now=1050.0)
+    assert counter.count("k", now=1050.0) == 4
+    # Halfway through the next window only half of the previous window still counts
+    assert counter.count("k", now=1150.0) == pytest.approx(2.0)
+    # Two windows later the old failures no longer count
+    assert counter.count("k", now=1350.0) == 0
+
+def test_sliding_window_evicts_least_recent_keys():
+    counter = SlidingWindowCounter(limit=5, window_seconds=100, max_keys=3)
+    for key in ("a", "b", "c"):
+        counter.add(key, now=10.0)
+    counter.add("a", now=11.0)
+    counter.add("d", now=12.0)
+    assert len(counter) == 3
+    assert counter.count("b", now=12.0) == 0 and counter.count("a", now=12.0) == 2
+
+def test_retry_after_reaches_below_limit():
+    counter = SlidingWindowCounter(limit=5, window_seconds=100, max_keys=10)
+    for _ in range(5):
+        counter.add("k", now=1010.0)
+    previous, current = counter.counts("k", now=1010.0)
+    wait = counter.retry_after(previous, current, now=1010.0)
+    assert counter.count("k", now=1010.0 + wait - 0.5) >= 5
+    assert counter.count("k", now=1010.0 + wait + 0.5) < 5
+
+async def test_throttle_blocks_identifier_then_success_resets(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    throttle = LoginThrottle()
+    limit = throttle.counters[LoginThrottle.IDENTIFIER].limit
+    for _ in range(limit):
+        assert await throttle.check(None, "User@Example.com", "10.0.0.1") is None
+        await throttle.record_failure(None, "User@Example.com", "10.0.0.1")
+    # Identifier keys are case-insensitive, matching the collated login lookup
+    assert await throttle.check(None, "user@example.com", "10.0.0.2") >= 1
+    await throttle.record_success(None, "user@example.com")
+    assert await throttle.check(None, "user@example.com", "10.0.0.2") is None
+
+async def test_throttle_blocks_ip_across_identifiers(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    throttle = LoginThrottle()
+    for n in range(throttle.counters[LoginThrottle.IP].limit):
+        await throttle.record_failure(None, f"victim{n}", "203.0.113.9")
+    assert await throttle.check(None, "someone-new", "203.0.113.9") is not None
+    assert await throttle.check(None, "someone-new", "198.51.100.1") is None
+
+async def _burst(throttle, attempts, identifier="victim@example.com", ip="203.0.113.7"):
+    """Concurrent wrong-password logins; returns how many got past the check (i.e. ran bcrypt)."""
+    verified = 0
+
+    async def attempt():
+        nonlocal verified
+        if await throttle.check(None, identifier, ip) is not None:
+            return
+        verified += 1
+        await asyncio.sleep(0.01) # bcrypt runs while the other attempts arrive
+        await throttle.record_failure(None, identifier, ip)
+
+    await asyncio.gather(*(attempt() for _ in range(attempts)))
+    return verified
+
+async def test_concurrent_burst_is_capped_before_bcrypt(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_SHARED", False)
+    throttle = LoginThrottle()
+    limit = throttle.counters[LoginThrottle.IDENTIFIER].limit
+
+    assert await _burst(throttle, limit * 4) == limit
+    assert not throttle._pending # Every reservation became a recorded failure
+    assert await throttle.check(None, "victim@example.com", "198.51.100.1") is not None
+
+async def test_reservations_are_held_across_the_shared_lookup(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_SHARED", True)
+    throttle = LoginThrottle()
+
+    class SlowSharedStore:
+        async def counts(self, db, scope, key, counter, now):
+            await asyncio.sleep(0.01)
+            return 0, 0
+
+        async def add(self, db, scope, key, counter, now):
+            pass
+
+        async def reset(self, db, scope, key, counter, now):
+            pass
+
+    throttle.shared = SlowSharedStore()
+    limit = throttle.counters[LoginThrottle.IDENTIFIER].limit
+    assert await _burst(throttle, limit * 4) == limit
+
+    # Released and successful attempts stop counting as pending
+    assert await throttle.check(None, "other@example.com", "10.0.0.3") is None
+    throttle.release("other@example.com", "10.0.0.3")
+    assert await throttle.check(None, "other@example.com", "10.0.0.3") is None
+    await throttle.record_success(None, "other@example.com", "10.0.0.3")
+    assert not throttle._pending
@@ -1,9 +1,23 @@
+import asyncio
+import threading
+
 import pytest
+from fastapi import HTTPException
 from jose import jwt
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
 
 # Adjust import paths based on your project structure
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import (
+    create_access_token, verify_password, get_password_hash,
+    verify_password_async, get_password_hash_async,
+    build_access_claims, create_refresh_token, CLAIMS_VERSION, introspect_token,
+    identifier_filter, hash_reset_token, verify_and_update_password,
+)
+from app.core import security as security_module
+from app.core.password_policy import build_crypt_context
+from app.core.password_hashing import PasswordHashingExecutor, PasswordHashingBusyError
 from app.core.config import settings
 
 def test_password_hashing_and_verification():
@@ -52,3 +66,149 @@ def test_get_password_hash_consistency():
     assert hash1 != hash2 
     assert verify_password(password, hash1)
     assert verify_password(password, hash2)
+
+async def test_async_password_hashing_and_verification():
+    hashed_password = await get_password_hash_async("asyncpassword")
+    assert await verify_password_async("asyncpassword", hashed_password) is True
+    assert await verify_password_async("wrongpassword", hashed_password) is False
+
+async def test_password_hashing_runs_off_the_event_loop():
+    loop_thread = threading.get_ident()
+    executor = PasswordHashingExecutor(max_workers=2, max_pending=4, queue_timeout=1.0)
+    try:
+        worker_thread = await executor.run(threading.get_ident)
+    finally:
+        executor.shutdown()
+    assert worker_thread != loop_thread
+
+async def test_password_hashing_rejects_when_queue_stays_full():
+    release = threading.Event()
+    executor = PasswordHashingExecutor(max_workers=1, max_pending=1, queue_timeout=0.05)
+    try:
+        blocked = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PasswordHashingBusyError):
+            await executor.run(lambda: True)
+        release.set()
+        assert await blocked is True
+    finally:
+        release.set()
+        executor.shutdown()
+
+async def test_async_hashing_busy_maps_to_503(monkeypatch):
+    async def busy(*args):
+        raise PasswordHashingBusyError("busy")
+    monkeypatch.setattr("app.core.security.password_hashing_executor.run", busy)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_password_hash_async("whatever")
+    assert exc_info.value.status_code == 503
+
+def test_access_claims_carry_authorization_fields():
+    user_id, admin_id = ObjectId(), ObjectId()
+    updated_at = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    user_doc = {
+        "_id": user_id, "email": "hr@example.com", "username": "hruser", "role": "hr",
+        "hr_status": "mapped", "admin_manager_id": admin_id, "token_version": 3, "updated_at": updated_at,
+    }
+    token = create_access_token(build_access_claims(user_doc))
+    payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    assert payload["sub"] == "hr@example.com"
+    assert payload["uid"] == str(user_id)
+    assert payload["admin_manager_id"] == str(admin_id)
+    assert payload["assigned_hr_id"] is None
+    assert payload["tv"] == 3
+    assert payload["uat"] == updated_at.timestamp()
+    assert payload["cv"] == CLAIMS_VERSION and payload["typ"] == "access"
+
+def test_refresh_token_is_typed():
+    user_doc = {"_id": ObjectId(), "email": "c@example.com"}
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    payload = jwt.decode(create_refresh_token(user_doc, "jti-1", expires_at), settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    assert payload["typ"] == "refresh" and payload["jti"] == "jti-1" and payload["tv"] == 0
+
+class _FakeUsers:
+    def __init__(self, doc):
+        self.doc = doc
+
+    async def find_one(self, query, projection=None, **kwargs):
+        return dict(self.doc) if self.doc and query.get("_id", self.doc["_id"]) == self.doc["_id"] else None
+
+class _FakeDB:
+    def __init__(self, doc):
+        self.users = _FakeUsers(doc)
+
+    def __getitem__(self, name):
+        return self.users
+
+async def test_introspect_token():
+    from app.core.principal_cache import principal_cache
+    principal_cache.clear()
+    user_doc = {
+        "_id": ObjectId(), "email": "intro@example.com", "username": "introuser", "role": "hr",
+        "hr_status": "mapped", "token_version": 0, "updated_at": datetime(2024, 5, 1, tzinfo=timezone.utc),
+    }
+    db = _FakeDB(user_doc)
+    access = create_access_token(build_access_claims(user_doc))
+    result = await introspect_token(access, db)
+    assert result["active"] is True and result["uid"] == str(user_doc["_id"]) and result["hr_status"] == "mapped"
+
+    refresh = create_refresh_token(user_doc, "jti", datetime.now(timezone.utc) + timedelta(days=1))
+    assert await introspect_token(refresh, db) == {"active": False}
+    assert await introspect_token("not-a-jwt", db) == {"active": False}
+
+    principal_cache.clear()
+    db.users.doc = {**user_doc, "token_version": 1}
+    assert await introspect_token(access, db) == {"active": False}
+
+async def test_introspection_requires_the_shared_secret(monkeypatch):
+    from app.api.routes.auth import require_internal_caller
+    monkeypatch.setattr(settings, "INTROSPECTION_SHARED_SECRET", None)
+    monkeypatch.setattr(settings, "TESTING_MODE", False)
+    with pytest.raises(HTTPException) as exc:
+        await require_internal_caller(x_internal_auth=None)
+    assert exc.value.status_code == 403
+    monkeypatch.setattr(settings, "TESTING_MODE", True)
+    await require_internal_caller(x_internal_auth=None)
+
+    monkeypatch.setattr(settings, "INTROSPECTION_SHARED_SECRET", "s3cret")
+    for header in (None, "wrong"):
+        with pytest.raises(HTTPException):
+            await require_internal_caller(x_internal_auth=header)
+    await require_internal_caller(x_internal_auth="s3cret")
+
+@pytest.mark.parametrize("identifier, expected", [
+    ("someone@example.com", {"email": "someone@example.com"}),
+    ("  someone  ", {"username": "someone"}),
+])
+def test_identifier_filter_picks_single_field(identifier, expected):
+    assert identifier_filter(identifier) == expected
+
+def test_reset_token_digest_is_stable_and_not_the_token():
+    token = "reset-token-value"
+    digest = hash_reset_token(token)
+    assert digest == hash_reset_token(token) and len(digest) == 64
+    assert token not in digest and digest != hash_reset_token(token + "x")
+
+def test_kdf_policy_flags_outdated_bcrypt_cost():
+    old = build_crypt_context("bcrypt", 4, 1024, 1, 1).hash("s3cret-pass")
+    context = build_crypt_context("bcrypt", 5, 1024, 1, 1)
+    assert context.needs_update(old) is True
+    ok, new_hash = context.verify_and_update("s3cret-pass", old)
+    assert ok and new_hash.startswith("$2b$05$")
+    assert context.needs_update(new_hash) is False
+    # Any cost other than the policy's is migrated, so lowering the cost also takes effect
+    assert context.needs_update(build_crypt_context("bcrypt", 6, 1024, 1, 1).hash("x")) is True
+
+def test_kdf_policy_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        build_crypt_context("md5_crypt", 12, 1024, 1, 1)
+
+def test_verify_and_update_password_respects_rehash_setting(monkeypatch):
+    old = build_crypt_context("bcrypt", 4, 1024, 1, 1).hash("s3cret-pass")
+    monkeypatch.setattr(security_module, "pwd_context", build_crypt_context("bcrypt", 5, 1024, 1, 1))
+    monkeypatch.setattr(settings, "PASSWORD_REHASH_ON_LOGIN", False)
+    assert verify_and_update_password("s3cret-pass", old) == (True, None)
+    monkeypatch.setattr(settings, "PASSWORD_REHASH_ON_LOGIN", True)
+    ok, new_hash = verify_and_update_password("s3cret-pass", old)
+    assert ok and new_hash is not None
+    assert verify_and_update_password("wrong-pass", old) == (False, None)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+from pymongo.errors import BulkWriteError
+
+from app.api.routes import auth as auth_routes
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.main import app
+from app.schemas.user import UserOut
+from app.services import user_import
+from app.services.user_import import UserImportService, iter_csv_rows, iter_ndjson_rows
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeUsers:
+    def __init__(self, existing=(), conflict_emails=()):
+        self.existing = list(existing)
+        self.conflict_emails = set(conflict_emails)
+        self.find_calls = 0
+        self.inserted = []
+
+    def find(self, query, projection=None, **kwargs):
+        self.find_calls += 1
+        emails = {e.lower() for e in query["$or"][0]["email"]["$in"]}
+        usernames = {u.lower() for u in query["$or"][1]["username"]["$in"]}
+        return FakeCursor([d for d in self.existing if d["email"].lower() in emails or d["username"].lower() in usernames])
+
+    async def insert_many(self, docs, ordered=True):
+        assert ordered is False
+        errors = []
+        for index, doc in enumerate(docs):
+            doc["_id"] = ObjectId()
+            if doc["email"] in self.conflict_emails:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            else:
+                self.inserted.append(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = users
+
+    def __getitem__(self, name):
+        return self.users
+
+async def _chunks(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def _collect(aiter):
+    return [item async for item in aiter]
+
+def _fast_hash(monkeypatch):
+    monkeypatch.setattr(user_import, "get_password_hash", lambda password: f"hashed:{password}")
+
+async def test_csv_rows_handle_chunk_boundaries_and_quoted_newlines():
+    data = 'email,username,password\r\na@example.com,alice,"multi\nline pw"\r\n\r\nb@example.com,bob,password2\n'.encode()
+    rows = await _collect(iter_csv_rows(_chunks(data)))
+    assert rows == [
+        (1, {"email": "a@example.com", "username": "alice", "password": "multi\nline pw"}),
+        (2, {"email": "b@example.com", "username": "bob", "password": "password2"}),
+    ]
+
+async def test_ndjson_rows_report_bad_lines():
+    data = b'{"email": "a@example.com"}\nnot json\n\n{"email": "b@example.com"}'
+    rows = await _collect(iter_ndjson_rows(_chunks(data)))
+    assert [n for n, _ in rows] == [1, 2, 3]
+    assert isinstance(rows[1][1], ValueError) and rows[2][1] == {"email": "b@example.com"}
+
+async def test_import_dedupes_per_batch_and_reports_every_row(monkeypatch):
+    _fast_hash(monkeypatch)
+    users = FakeUsers(existing=[{"email": "Taken@Example.com", "username": "someone"}], conflict_emails={"race@example.com"})
+    rows = [
+        {"email": "new1@example.com", "username": "new1", "password": "password1"},
+        {"email": "taken@example.com", "username": "other", "password": "password1"},
+        {"email": "NEW1@example.com", "username": "new1b", "password": "password1"},
+        {"email": "bad", "username": "x", "password": "short"},
+        {"email": "race@example.com", "username": "racer", "password": "password1"},
+        {"email": "hr@example.com", "username": "hr1", "password": "password1", "role": "hr"},
+    ]
+    importer = UserImportService(FakeDB(users), batch_size=4)
+
+    async def source():
+        for n, row in enumerate(rows, 1):
+            yield n, row
+
+    results = await _collect(importer.import_rows(source()))
+    assert [r["row"] for r in results] == [1, 2, 3, 4, 5, 6]
+    assert [r["status"] for r in results] == ["created", "duplicate", "duplicate", "invalid", "duplicate", "created"]
+    assert users.find_calls == 2 # one $in query per batch
+    assert importer.summary == {"created": 2, "duplicate": 3, "invalid": 1, "error": 0}
+    created = {doc["email"]: doc for doc in users.inserted}
+    assert created["new1@example.com"]["mapping_status"] == "pending_resume"
+    assert created["hr@example.com"]["hr_status"] == "pending_profile"
+    assert created["hr@example.com"]["hashed_password"] == "hashed:password1"
+    assert results[0]["id"] == str(created["new1@example.com"]["_id"])
+    json.dumps(results) # results are directly serialisable for the NDJSON stream
+
+async def test_import_leaves_hashing_workers_for_logins(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_WORKERS", 4)
+    running, peak = 0, 0
+
+    async def run(func, *args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return func(*args)
+
+    monkeypatch.setattr(user_import.password_hashing_executor, "run", run)
+    _fast_hash(monkeypatch)
+    importer = UserImportService(FakeDB(FakeUsers()), batch_size=20)
+
+    async def source():
+        for n in range(1, 21):
+            yield n, {"email": f"user{n}@example.com", "username": f"user{n}", "password": "password1"}
+
+    results = await _collect(importer.import_rows(source()))
+    assert importer.summary["created"] == 20 and len(results) == 20
+    assert peak == 2 # Half of PASSWORD_HASH_MAX_WORKERS; logins keep the other two
+
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_WORKERS", 1)
+    assert user_import.import_hash_slots() == 1
+
+
+# --- POST /auth/users/import ---
+
+def _principal(role):
+    return lambda: UserOut(id=str(ObjectId()), username=f"{role}user", email=f"{role}@example.com", role=role)
+
+async def _upload(monkeypatch, body: bytes, content_type: str, role: str = "admin", users=None, **params):
+    monkeypatch.setattr(auth_routes.mongodb, "get_db", lambda: FakeDB(users or FakeUsers()))
+    app.dependency_overrides[get_current_user] = _principal(role)
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver-auth") as client:
+            return await client.post("/api/v1/auth/users/import", content=body, headers={"content-type": content_type}, params=params)
+    finally:
+        app.dependency_overrides = {}
+
+async def test_import_endpoint_streams_results_and_summary(monkeypatch):
+    _fast_hash(monkeypatch)
+    users = FakeUsers(existing=[{"email": "taken@example.com", "username": "taken"}])
+    body = b'{"email": "a@example.com", "username": "alice", "password": "password1"}\n{"email": "taken@example.com", "username": "taken2", "password": "password1"}\nnope\n'
+
+    response = await _upload(monkeypatch, body, "application/x-ndjson", users=users)
+
+    assert response.status_code == 200 and response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line.get("status") for line in lines[:3]] == ["created", "duplicate", "invalid"]
+    assert lines[-1] == {"summary": {"created": 1, "duplicate": 1, "invalid": 1, "error": 0}}
+    assert [doc["email"] for doc in users.inserted] == ["a@example.com"]
+
+async def test_import_endpoint_rejects_bad_uploads(monkeypatch):
+    assert (await _upload(monkeypatch, b"<users/>", "application/xml")).status_code == 415
+    monkeypatch.setattr(settings, "USER_IMPORT_MAX_BYTES", 16)
+    assert (await _upload(monkeypatch, b"email,username,password\n" * 4, "text/csv")).status_code == 413
+    # format= overrides the content type, but only admins may import
+    assert (await _upload(monkeypatch, b"", "application/octet-stream", role="hr", format="csv")).status_code == 403
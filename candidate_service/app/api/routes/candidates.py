@@ -24,9 +24,12 @@ import aiofiles.os
 
 # Core, models, schemas, db
 from app.core.security import get_current_active_user # Adjusted
-from app.models.user import User, CandidateMappingStatus # Adjusted
+from app.models.user import Principal, User, CandidateMappingStatus # Adjusted
 from app.db.mongodb import mongodb # Adjusted
+from app.db.repository import Repository
+from app.db.resume_documents import LEGACY_USER_UNSET, ResumeDocuments
 from app.core.config import settings # Adjusted
+from app.core.principal_cache import principal_cache
 from app.services.resume_parser import parse_resume, ResumeParserError # Adjusted
 # Import analyzer service (called during resume upload)
 from app.services.resume_analyzer_service import resume_analyzer_service # Adjusted
@@ -62,18 +65,28 @@ def get_object_id(id_str: str) -> ObjectId:
     try: return ObjectId(str(id_str))
     except Exception: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid ID format: {id_str}")
 
-async def require_candidate(current_user: User = Depends(get_current_active_user)):
+async def require_candidate(current_user: Principal = Depends(get_current_active_user)) -> Principal:
     # --- Added logging for debugging role issues ---
     logger.info(f"require_candidate: Checking user. Email: {current_user.email}, Role: {current_user.role}, ID: {current_user.id}")
     # --- End added logging ---
     if current_user.role != "candidate": 
         logger.warning(f"require_candidate: Role check failed for user {current_user.email}. Expected 'candidate', got '{current_user.role}'. Raising 403.")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation not permitted.")
-    db = mongodb.get_db(); user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": get_object_id(current_user.id)})
+    # The principal carries mapping_status from the token claims; no user document needed
+    return current_user
+
+async def require_candidate_document(current_user: Principal = Depends(require_candidate)) -> User:
+    """The candidate's full User, for routes that return profile fields the token claims do not carry."""
+    cached_user = principal_cache.get(current_user.email, User)
+    if cached_user is not None:
+        return cached_user
+    db = mongodb.get_db(); user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": current_user.id})
     if not user_doc: 
-        logger.error(f"require_candidate: User {current_user.email} (ID: {current_user.id}) passed role check but was not found in DB by ID for re-fetch. This should not happen.")
+        logger.error(f"require_candidate_document: User {current_user.email} (ID: {current_user.id}) passed role check but was not found in DB by ID for re-fetch. This should not happen.")
         raise HTTPException(status_code=404, detail="Candidate user not found.")
-    return User.model_validate(user_doc)
+    validated_user = User.model_validate(user_doc)
+    principal_cache.put(current_user.email, user_doc, validated_user)
+    return validated_user
 # --- End Configuration & Helpers ---
 
 
@@ -81,7 +94,7 @@ async def require_candidate(current_user: User = Depends(get_current_active_user
 @router.post("/resume", response_model=CandidateProfileOut)
 async def upload_resume(
     resume: UploadFile = File(...),
-    current_candidate_user: User = Depends(require_candidate), # Renamed for clarity
+    current_candidate_user: Principal = Depends(require_candidate), # Renamed for clarity
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     """
@@ -134,9 +147,10 @@ async def upload_resume(
         await resume.close()
 
     # --- Database Update ---
+    # The text and full analysis go to resume_documents; the user document keeps the search keys
     update_data = {
         "resume_path": str(file_location.resolve()),
-        "resume_text": parsed_content, 
+        "has_resume": parsed_content is not None,
         "extracted_skills_list": analysis_result.get("extracted_skills_list"),
         "estimated_yoe": analysis_result.get("estimated_yoe"),
         "updated_at": datetime.now(timezone.utc)
@@ -152,8 +166,6 @@ async def upload_resume(
         # No change to mapping_status in update_data if parsing fails
     
     final_update_data = {k: v for k, v in update_data.items() if v is not None}
-    if "resume_text" not in final_update_data and parsed_content is None: 
-        final_update_data["resume_text"] = None
     # Ensure mapping_status is explicitly included if it was determined, even if it's the same as before
     # This handles cases where it might be None and then gets set.
     if "mapping_status" in update_data:
@@ -163,22 +175,20 @@ async def upload_resume(
 
 
     try:
-        users_collection = db[settings.MONGODB_COLLECTION_USERS]
-        update_result = await users_collection.update_one(
-            {"_id": current_candidate_user.id}, 
-            {"$set": final_update_data}
+        await ResumeDocuments(db).save(current_candidate_user.id, parsed_content, analysis_result, update_data["resume_path"])
+        updated_user_doc = await Repository.for_setting(db, "MONGODB_COLLECTION_USERS").update(
+            {"_id": current_candidate_user.id},
+            {"$set": final_update_data, "$unset": LEGACY_USER_UNSET}
         )
-        if update_result.matched_count == 0:
+        principal_cache.invalidate(user_id=current_candidate_user.id)
+        if updated_user_doc is None:
             if file_saved and await aiofiles.os.path.exists(file_location):
                  try: await aiofiles.os.remove(file_location)
                  except Exception as e: logger.error(f"Cleanup failed for {file_location} (user not found during update): {e}")
             raise HTTPException(status_code=404, detail="Candidate not found during update.")
         
         logger.info(f"Updated candidate {current_candidate_user.username}. Parse status: {parsing_status}")
-        updated_user_doc = await users_collection.find_one({"_id": current_candidate_user.id})
-        if not updated_user_doc: 
-            raise HTTPException(status_code=500, detail="Failed to retrieve updated candidate profile.")
-        return CandidateProfileOut.model_validate(updated_user_doc)
+        return CandidateProfileOut.model_validate({**updated_user_doc, "resume_text": parsed_content})
     except Exception as db_e:
         logger.error(f"DB error updating resume info for {current_candidate_user.username}: {db_e}", exc_info=True)
         if file_saved and await aiofiles.os.path.exists(file_location):
@@ -189,12 +199,15 @@ async def upload_resume(
 
 # --- Profile Endpoints ---
 @router.get("/profile", response_model=CandidateProfileOut)
-async def get_candidate_profile(current_candidate: User = Depends(require_candidate)):
+async def get_candidate_profile(current_candidate: User = Depends(require_candidate_document), db: AsyncIOMotorClient = Depends(mongodb.get_db)):
     logger.info(f"Fetching profile for candidate: {current_candidate.username}")
-    return CandidateProfileOut.model_validate(current_candidate)
+    profile = CandidateProfileOut.model_validate(current_candidate)
+    # Resume text is no longer on the (cached) user document
+    profile.resume_text = await ResumeDocuments(db).get_text(current_candidate.id, {"resume_text": current_candidate.resume_text})
+    return profile
 
 @router.put("/profile", response_model=CandidateProfileOut)
-async def update_candidate_profile(profile_update: CandidateProfileUpdate, current_candidate: User = Depends(require_candidate), db: AsyncIOMotorClient = Depends(mongodb.get_db)):
+async def update_candidate_profile(profile_update: CandidateProfileUpdate, current_candidate: Principal = Depends(require_candidate), db: AsyncIOMotorClient = Depends(mongodb.get_db)):
     logger.info(f"Attempting update profile for candidate: {current_candidate.username}")
     update_data = profile_update.model_dump(exclude_unset=True)
     if not update_data: raise HTTPException(status_code=400, detail="No update data.")
@@ -203,11 +216,12 @@ async def update_candidate_profile(profile_update: CandidateProfileUpdate, curre
              raise HTTPException(status_code=400, detail="Username already taken.")
     update_data["updated_at"] = datetime.now(timezone.utc)
     try:
-        users_collection = db[settings.MONGODB_COLLECTION_USERS]
-        res = await users_collection.update_one({"_id": current_candidate.id}, {"$set": update_data})
-        if res.matched_count == 0: raise HTTPException(status_code=404, detail="Candidate not found.")
-        updated_user_doc = await users_collection.find_one({"_id": current_candidate.id})
-        return CandidateProfileOut.model_validate(updated_user_doc)
+        updated_user_doc = await Repository.for_setting(db, "MONGODB_COLLECTION_USERS").update({"_id": current_candidate.id}, {"$set": update_data})
+        principal_cache.invalidate(user_id=current_candidate.id)
+        if updated_user_doc is None: raise HTTPException(status_code=404, detail="Candidate not found.")
+        profile = CandidateProfileOut.model_validate(updated_user_doc)
+        profile.resume_text = await ResumeDocuments(db).get_text(current_candidate.id, updated_user_doc)
+        return profile
     except Exception as e: logger.error(f"Error updating profile: {e}", exc_info=True); raise HTTPException(status_code=500)
 
 
@@ -215,7 +229,7 @@ async def update_candidate_profile(profile_update: CandidateProfileUpdate, curre
 
 @router.get("/messages", response_model=List[MessageOut])
 async def get_candidate_messages(
-    current_candidate: User = Depends(require_candidate),
+    current_candidate: Principal = Depends(require_candidate),
     db: AsyncIOMotorClient = Depends(mongodb.get_db),
     limit: int = Query(20, ge=1, le=100), 
     skip: int = Query(0, ge=0)
@@ -258,7 +272,7 @@ async def get_candidate_messages(
 @router.post("/messages/mark-read", status_code=status.HTTP_200_OK, response_model=Dict[str, int])
 async def mark_messages_as_read(
     read_request: MarkReadRequest,
-    current_candidate: User = Depends(require_candidate),
+    current_candidate: Principal = Depends(require_candidate),
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     logger.info(f"Candidate {current_candidate.username} marking messages as read: {read_request.message_ids}")
@@ -285,7 +299,7 @@ async def mark_messages_as_read(
 @router.post("/messages/mark-unread", status_code=status.HTTP_200_OK, response_model=Dict[str, int])
 async def mark_messages_as_unread(
     unread_request: MarkUnreadRequest,
-    current_candidate: User = Depends(require_candidate),
+    current_candidate: Principal = Depends(require_candidate),
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     logger.info(f"Candidate {current_candidate.username} marking messages as unread: {unread_request.message_ids}")
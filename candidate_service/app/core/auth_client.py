@@ -0,0 +1,153 @@
+# candidate_service/app/core/auth_client.py
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+Principal = Dict[str, Any]
+
+
+class AuthServiceUnavailableError(Exception):
+    """Raised when auth_service cannot answer an introspection request (never cached)."""
+    pass
+
+
+class AuthIntrospectionClient:
+    """
+    Resolves access tokens through auth_service's /auth/introspect endpoints.
+
+    A single pooled httpx client keeps connections to auth_service alive. Active principals are
+    cached for AUTH_INTROSPECTION_CACHE_TTL_SECONDS (never past the token's own expiry), inactive
+    tokens are negatively cached for AUTH_INTROSPECTION_NEGATIVE_TTL_SECONDS, and concurrent
+    lookups of the same token share one request. Tokens are cached under their SHA-256 digest.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[str, Tuple[Optional[Principal], float]]" = OrderedDict()
+        self._in_flight: Dict[str, "asyncio.Task[Optional[Principal]]"] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {}
+            if settings.AUTH_INTROSPECTION_SHARED_SECRET:
+                headers["X-Internal-Auth"] = settings.AUTH_INTROSPECTION_SHARED_SECRET
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=settings.AUTH_INTROSPECTION_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.AUTH_INTROSPECTION_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AUTH_INTROSPECTION_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Tuple[bool, Optional[Principal]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        principal, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, principal
+
+    def _store(self, key: str, result: Dict[str, Any]) -> Optional[Principal]:
+        now = time.monotonic()
+        if result.get("active"):
+            principal: Optional[Principal] = result
+            ttl = settings.AUTH_INTROSPECTION_CACHE_TTL_SECONDS
+            if result.get("exp"):
+                ttl = min(ttl, result["exp"] - time.time())
+        else:
+            principal = None
+            ttl = settings.AUTH_INTROSPECTION_NEGATIVE_TTL_SECONDS
+        if ttl > 0:
+            self._cache[key] = (principal, now + ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > settings.AUTH_INTROSPECTION_CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return principal
+
+    async def _post(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await self._get_client().post(path, json=body)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Token introspection call {path} failed: {e}")
+            raise AuthServiceUnavailableError(str(e))
+
+    async def _fetch(self, key: str, token: str) -> Optional[Principal]:
+        try:
+            result = await self._post("/api/v1/auth/introspect", {"token": token})
+            return self._store(key, result)
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def introspect(self, token: str) -> Optional[Principal]:
+        """Returns the active principal for `token`, or None when the token is not valid."""
+        key = self._key(token)
+        hit, principal = self._cached(key)
+        if hit:
+            return principal
+        task = self._in_flight.get(key)
+        if task is None:
+            # The call runs in its own task, shared by every concurrent lookup of the token. A caller
+            # that is cancelled (e.g. its client disconnected) only stops waiting; the others still
+            # get the result.
+            task = asyncio.create_task(self._fetch(key, token))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception()) # Retrieved even if every waiter left
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def introspect_many(self, tokens: List[str]) -> List[Optional[Principal]]:
+        """Resolves several tokens with at most one batch request for the cache misses."""
+        results: Dict[str, Optional[Principal]] = {}
+        misses: List[str] = []
+        for token in dict.fromkeys(tokens):
+            hit, principal = self._cached(self._key(token))
+            if hit:
+                results[token] = principal
+            else:
+                misses.append(token)
+        if misses:
+            batch_size = 100 # Matches the endpoint's per-request limit
+            for start in range(0, len(misses), batch_size):
+                chunk = misses[start:start + batch_size]
+                response = await self._post("/api/v1/auth/introspect/batch", {"tokens": chunk})
+                for token, result in zip(chunk, response.get("results", [])):
+                    results[token] = self._store(self._key(token), result)
+        return [results.get(token) for token in tokens]
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def aclose(self) -> None:
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._cache.clear()
+
+
+auth_client = AuthIntrospectionClient(settings.AUTH_SERVICE_URL)
@@ -0,0 +1,243 @@
+# candidate_service/app/core/principal_cache.py
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Type, TypeVar
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, ValidationError
+
+from .config import settings
+from ..db.change_events import GAP_UNAVAILABLE, ChangeEventBus, Subscription, UserChanged, change_event_bus
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class _PrincipalEntry:
+    __slots__ = ("user_doc", "user_id", "version", "expires_at", "models")
+
+    def __init__(self, user_doc: Dict[str, Any], expires_at: float):
+        self.user_doc = user_doc
+        self.user_id = user_doc.get("_id")
+        self.version = user_doc.get("updated_at")
+        self.expires_at = expires_at
+        self.models: Dict[type, BaseModel] = {}
+
+
+class PrincipalCache:
+    """
+    Per-process cache of authenticated principals, keyed by the token 'sub' (email) and
+    versioned by the user's 'updated_at'. Entries expire after a short TTL, the cache is
+    bounded (least recently used entries are evicted) and entries are invalidated by the
+    users change feed, so most authenticated requests skip the users-collection round trip.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _PrincipalEntry]" = OrderedDict()
+        self._sub_by_id: Dict[ObjectId, str] = {}
+
+    def get(self, sub: str, model_cls: Type[ModelT]) -> Optional[ModelT]:
+        """Returns a copy of the cached principal as `model_cls`, or None on a miss."""
+        if not settings.PRINCIPAL_CACHE_ENABLED:
+            return None
+        entry = self._entries.get(sub)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._drop(sub)
+            return None
+        self._entries.move_to_end(sub)
+        model = entry.models.get(model_cls)
+        if model is None:
+            try:
+                # Validated once per entry and model class, not once per request
+                model = model_cls.model_validate(entry.user_doc)
+            except ValidationError:
+                return None
+            entry.models[model_cls] = model
+        return model.model_copy()
+
+    def put(self, sub: str, user_doc: Dict[str, Any], model: Optional[BaseModel] = None) -> None:
+        if not settings.PRINCIPAL_CACHE_ENABLED:
+            return
+        entry = self._entries.get(sub)
+        if entry is None or entry.version != user_doc.get("updated_at") or entry.user_id != user_doc.get("_id"):
+            self._drop(sub)
+            entry = _PrincipalEntry(user_doc, time.monotonic() + self.ttl_seconds)
+            self._entries[sub] = entry
+            if entry.user_id is not None:
+                self._sub_by_id[entry.user_id] = sub
+        self._entries.move_to_end(sub)
+        if model is not None:
+            entry.models[type(model)] = model
+        while len(self._entries) > self.max_entries:
+            oldest_sub = next(iter(self._entries))
+            self._drop(oldest_sub)
+
+    def invalidate(self, sub: Optional[str] = None, user_id: Optional[Any] = None, version: Optional[datetime] = None) -> None:
+        """
+        Drops the entry for `sub` or `user_id`. When `version` is given, the entry is only
+        dropped if it is older than that version (a no-op for entries that are already current).
+        """
+        if user_id is not None:
+            token_state_cache.invalidate(user_id)
+        if sub is None and user_id is not None:
+            try:
+                sub = self._sub_by_id.get(ObjectId(str(user_id)))
+            except (InvalidId, TypeError):
+                return
+        if sub is None or sub not in self._entries:
+            return
+        entry = self._entries[sub]
+        if version is not None and entry.version is not None and _as_utc(entry.version) >= _as_utc(version):
+            return
+        self._drop(sub)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._sub_by_id.clear()
+        token_state_cache.clear()
+
+    def _drop(self, sub: str) -> None:
+        entry = self._entries.pop(sub, None)
+        if entry is not None and entry.user_id is not None and self._sub_by_id.get(entry.user_id) == sub:
+            del self._sub_by_id[entry.user_id]
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class TokenState(NamedTuple):
+    token_version: int
+    updated_at: Optional[float] # Epoch seconds, comparable with the 'uat' claim
+
+
+class TokenStateCache:
+    """
+    Short-lived cache of the per-user fields that decide whether a claims token may be trusted:
+    'token_version' (bumped to revoke every outstanding token) and 'updated_at' (claims issued
+    before the last change are stale). Loaded with a small projection and invalidated together
+    with the principal cache, so the check costs at most one lookup per user per TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ObjectId, Tuple[Optional[TokenState], float]]" = OrderedDict()
+
+    async def get(self, db: AsyncIOMotorDatabase, user_id: ObjectId) -> Optional[TokenState]:
+        """Returns the user's current token state, or None if the user no longer exists."""
+        cached = self._entries.get(user_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            return cached[0]
+        doc = await db[settings.MONGODB_COLLECTION_USERS].find_one(
+            {"_id": user_id}, {"token_version": 1, "updated_at": 1}
+        )
+        state = None
+        if doc:
+            updated_at = doc.get("updated_at")
+            state = TokenState(doc.get("token_version", 0), _as_utc(updated_at).timestamp() if updated_at else None)
+        self._entries[user_id] = (state, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return state
+
+    def invalidate(self, user_id: Any) -> None:
+        try:
+            self._entries.pop(ObjectId(str(user_id)), None)
+        except (InvalidId, TypeError):
+            pass
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class UserChangeFeed:
+    """
+    Invalidates principal cache (and token state) entries when user documents change. Subscribes
+    to the change event bus (app/db/change_events.py) as a lossy subscriber: an overflowing queue or
+    a stream restarted from "now" clears the cache instead of holding the stream back. Falls back
+    to polling users by 'updated_at' when change streams are unavailable (standalone server) or
+    the bus is disabled.
+    """
+
+    def __init__(self, cache: PrincipalCache, bus: ChangeEventBus):
+        self.cache = cache
+        self.bus = bus
+        self._subscription: Optional[Subscription] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Call before `change_event_bus.start`, which only watches collections that have subscribers."""
+        if not settings.PRINCIPAL_CACHE_ENABLED or self._subscription is not None or self._task is not None:
+            return
+        self._db = db
+        if settings.CHANGE_EVENTS_ENABLED:
+            self._subscription = self.bus.subscribe(
+                "principal_cache", (UserChanged,), self._on_change, on_gap=self._on_gap, lossy=True,
+            )
+        else:
+            self._start_polling()
+
+    async def stop(self) -> None:
+        if self._subscription is not None:
+            await self.bus.unsubscribe(self._subscription)
+            self._subscription = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.cache.clear()
+
+    def _on_change(self, event: UserChanged) -> None:
+        self.cache.invalidate(user_id=event.document_id)
+
+    def _on_gap(self, reason: str) -> None:
+        # Anything may have changed while events were missed
+        self.cache.clear()
+        if reason == GAP_UNAVAILABLE:
+            logger.info("Principal cache: change streams unavailable, polling users by updated_at instead.")
+            self._start_polling()
+
+    def _start_polling(self) -> None:
+        if self._db is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._poll(self._db[settings.MONGODB_COLLECTION_USERS]))
+
+    async def _poll(self, collection) -> None:
+        last_seen = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(settings.PRINCIPAL_CACHE_POLL_INTERVAL_SECONDS)
+            try:
+                cursor = collection.find({"updated_at": {"$gt": last_seen}}, {"_id": 1, "updated_at": 1})
+                async for doc in cursor:
+                    self.cache.invalidate(user_id=doc["_id"], version=doc["updated_at"])
+                    last_seen = max(last_seen, _as_utc(doc["updated_at"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Principal cache: users poll failed ({e}); clearing cache.")
+                self.cache.clear()
+
+
+token_state_cache = TokenStateCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+user_change_feed = UserChangeFeed(principal_cache, change_event_bus)
@@ -6,16 +6,21 @@ from typing import Optional, Annotated # Use Annotated for Depends clarity
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from passlib.context import CryptContext
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClient # Added AsyncIOMotorClient
 from pydantic import ValidationError # For catching Pydantic validation errors
 from bson import ObjectId # Import ObjectId for checking _id
+from bson.errors import InvalidId
 
 # Import schemas and configuration
-from ..schemas.user import UserOut, TokenData # Relative import
+from ..schemas.user import TokenData # Relative import
 from .config import settings # Relative import for same directory
 from ..db.mongodb import mongodb # Relative import
+from .principal_cache import principal_cache, token_state_cache
+from .token_verifier import token_verifier
+from .auth_client import auth_client, AuthServiceUnavailableError
+from ..models.user import Principal
 
 # --- Configuration ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -79,11 +84,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = token_verifier.encode(to_encode)
     return encoded_jwt
 
+# --- Claims Tokens ---
+CLAIMS_VERSION = 2 # Layout of the access-token claims issued by auth_service
+# Case-insensitive collation of the unique users email/username indexes (created by auth_service).
+# Lookups must pass the same collation for MongoDB to use those indexes.
+USER_IDENTIFIER_COLLATION = {"locale": "en", "strength": 2}
+
+async def _token_claims_status(payload: dict, db: AsyncIOMotorDatabase) -> str:
+    """
+    Checks a token's 'tv' (token version) and 'uat' (user updated_at at issue) claims against the
+    user's cached token state. Returns 'revoked' when the token version was bumped or the user is
+    gone, 'stale' when the user changed after the token was issued, and 'current' otherwise.
+    """
+    try:
+        user_id = ObjectId(str(payload["uid"]))
+    except (KeyError, InvalidId, TypeError):
+        return "revoked"
+    state = await token_state_cache.get(db, user_id)
+    if state is None or payload.get("tv", 0) != state.token_version:
+        return "revoked"
+    issued_version = payload.get("uat")
+    if state.updated_at is not None and (issued_version is None or state.updated_at > issued_version + 0.001):
+        return "stale"
+    return "current"
+
 # --- Core User Fetching Dependency ---
-async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
+async def get_current_user(token: Token, db: CurrentDB) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -96,7 +125,7 @@ async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
 
     email: Optional[str] = None
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = token_verifier.decode(token)
         email = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -105,15 +134,49 @@ async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
     except Exception:
         raise credentials_exception
 
+    # Claims tokens carry a token version and the user's updated_at; both are checked against a
+    # cached per-user state instead of loading the user document on every request.
+    if payload.get("typ") == "refresh":
+        raise credentials_exception
+    if payload.get("uid"):
+        try:
+            claims_status = await _token_claims_status(payload, db)
+        except Exception:
+            raise internal_server_exception
+        if claims_status == "revoked":
+            raise credentials_exception
+        if claims_status == "current" and settings.CLAIMS_AUTH_ENABLED and payload.get("cv") == CLAIMS_VERSION:
+            try:
+                return Principal.from_claims(payload) # Identity, role and statuses straight from the claims
+            except (KeyError, ValidationError):
+                logger.warning(f"Malformed claims in token for {email}; falling back to user lookup.")
+
+    # Stale or legacy tokens are resolved by auth_service (pooled, cached) when introspection is on
+    if settings.AUTH_INTROSPECTION_ENABLED:
+        try:
+            principal = await auth_client.introspect(token)
+        except AuthServiceUnavailableError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Authentication service unavailable.")
+        if principal is None:
+            raise credentials_exception
+        try:
+            return Principal.from_claims(principal)
+        except (KeyError, ValidationError):
+            raise internal_server_exception
+
     if email:
         try:
-            user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": email})
+            cached_user = principal_cache.get(email, Principal)
+            if cached_user is not None:
+                return cached_user
+            user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"email": email}, collation=USER_IDENTIFIER_COLLATION)
             if user_doc is None:
                 raise credentials_exception
             if "_id" not in user_doc or not isinstance(user_doc.get('_id'), ObjectId):
                 raise internal_server_exception
             try:
-                user = UserOut.model_validate(user_doc)
+                user = Principal.model_validate(user_doc)
+                principal_cache.put(email, user_doc, user)
                 return user
             except ValidationError:
                 raise internal_server_exception
@@ -124,12 +187,12 @@ async def get_current_user(token: Token, db: CurrentDB) -> UserOut:
     else:
         raise credentials_exception
 
-CurrentUser = Annotated[UserOut, Depends(get_current_user)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
 
-async def get_current_active_user(current_user: CurrentUser) -> UserOut:
+async def get_current_active_user(current_user: CurrentUser) -> Principal:
     return current_user
 
-async def verify_admin_user(current_user: CurrentUser) -> UserOut:
+async def verify_admin_user(current_user: CurrentUser) -> Principal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -137,7 +200,7 @@ async def verify_admin_user(current_user: CurrentUser) -> UserOut:
         )
     return current_user
 
-async def verify_hr_or_admin_user(current_user: CurrentUser) -> UserOut:
+async def verify_hr_or_admin_user(current_user: CurrentUser) -> Principal:
     if current_user.role not in ["hr", "admin"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -145,7 +208,7 @@ async def verify_hr_or_admin_user(current_user: CurrentUser) -> UserOut:
         )
     return current_user
 
-async def require_candidate(current_user: CurrentUser) -> UserOut: # Renamed to avoid conflict if used directly
+async def require_candidate(current_user: CurrentUser) -> Principal: # Renamed to avoid conflict if used directly
     if current_user.role != "candidate":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
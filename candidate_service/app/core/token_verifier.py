@@ -0,0 +1,212 @@
+# candidate_service/app/core/token_verifier.py
+
+import base64
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from jose import jwk, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_PREFIXES = ("RS", "ES", "PS")
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _epoch(value: Any) -> Any:
+    return int(value.timestamp()) if isinstance(value, datetime) else value
+
+
+class _EdDSAKeys:
+    """
+    EdDSA (Ed25519/Ed448) signing and verification through `cryptography`, which python-jose
+    does not offer. Only the compact JWS form with exp/nbf checks is needed for access tokens.
+    """
+
+    def __init__(self, public_key_pem: Optional[str], private_key_pem: Optional[str]):
+        from cryptography.hazmat.primitives import serialization
+        self.private_key = serialization.load_pem_private_key(private_key_pem.encode(), password=None) if private_key_pem else None
+        if public_key_pem:
+            self.public_key = serialization.load_pem_public_key(public_key_pem.encode())
+        else:
+            self.public_key = self.private_key.public_key() if self.private_key else None
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        if self.private_key is None:
+            raise JWTError("JWT_PRIVATE_KEY is required to sign EdDSA tokens.")
+        header = _b64url_encode(json.dumps({"alg": "EdDSA", "typ": "JWT"}, separators=(",", ":")).encode())
+        payload = _b64url_encode(json.dumps({k: _epoch(v) for k, v in claims.items()}, separators=(",", ":")).encode())
+        signing_input = f"{header}.{payload}".encode("ascii")
+        return f"{header}.{payload}.{_b64url_encode(self.private_key.sign(signing_input))}"
+
+    def decode(self, token: str, verify_exp: bool = True) -> Dict[str, Any]:
+        from cryptography.exceptions import InvalidSignature
+        if self.public_key is None:
+            raise JWTError("JWT_PUBLIC_KEY is required to verify EdDSA tokens.")
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64url_decode(header_b64))
+            if header.get("alg") != "EdDSA":
+                raise JWTError("The specified alg value is not allowed")
+            self.public_key.verify(_b64url_decode(signature_b64), f"{header_b64}.{payload_b64}".encode("ascii"))
+            claims = json.loads(_b64url_decode(payload_b64))
+        except InvalidSignature:
+            raise JWTError("Signature verification failed.")
+        except (ValueError, TypeError, UnicodeError):
+            raise JWTError("Error decoding token.")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload.")
+        now = time.time()
+        if verify_exp and "exp" in claims and now >= float(claims["exp"]):
+            raise ExpiredSignatureError("Signature has expired.")
+        if "nbf" in claims and now < float(claims["nbf"]):
+            raise JWTClaimsError("The token is not yet valid (nbf)")
+        return claims
+
+
+class TokenVerifier:
+    """
+    Verifies (and, in auth_service, signs) access tokens with keys prepared once at start-up.
+
+    HS* algorithms use JWT_SECRET_KEY. RS*/ES*/PS* and EdDSA verify with JWT_PUBLIC_KEY (PEM),
+    so services other than auth_service do not need the signing secret; only auth_service
+    needs JWT_PRIVATE_KEY. Successfully verified tokens are remembered by SHA-256 digest in a
+    bounded LRU until their `exp`, so repeated requests from a session skip signature checks
+    and JSON decoding. Revocation is unaffected: token-version checks run after verification.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret_key: Optional[str],
+        public_key: Optional[str] = None,
+        private_key: Optional[str] = None,
+        cache_enabled: bool = True,
+        max_entries: int = 10000,
+        latency_samples: int = 1024,
+    ):
+        self.algorithm = algorithm
+        self.cache_enabled = cache_enabled
+        self.max_entries = max_entries
+        self._eddsa: Optional[_EdDSAKeys] = None
+        self._verify_key: Any = None
+        self._sign_key: Any = None
+        if algorithm == "EdDSA":
+            self._eddsa = _EdDSAKeys(public_key, private_key)
+        elif algorithm.startswith(ASYMMETRIC_PREFIXES):
+            if public_key:
+                self._verify_key = jwk.construct(public_key, algorithm)
+            if private_key:
+                self._sign_key = jwk.construct(private_key, algorithm)
+                if self._verify_key is None:
+                    self._verify_key = self._sign_key.public_key()
+        else:
+            self._verify_key = self._sign_key = jwk.construct(secret_key, algorithm)
+        self._cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict() # digest -> (exp, claims)
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        logger.info(f"Token verifier ready: {algorithm}, verified-token cache {'on' if cache_enabled else 'off'} ({max_entries} entries).")
+
+    # --- Signing ---
+    def encode(self, claims: Dict[str, Any]) -> str:
+        if self._eddsa is not None:
+            return self._eddsa.encode(claims)
+        if self._sign_key is None:
+            raise JWTError(f"No signing key configured for {self.algorithm}; set JWT_PRIVATE_KEY.")
+        return jwt.encode(claims, self._sign_key, algorithm=self.algorithm)
+
+    # --- Verification ---
+    def _verify(self, token: str, verify_exp: bool) -> Dict[str, Any]:
+        if self._eddsa is not None:
+            return self._eddsa.decode(token, verify_exp=verify_exp)
+        if self._verify_key is None:
+            raise JWTError(f"No verification key configured for {self.algorithm}; set JWT_PUBLIC_KEY.")
+        return jwt.decode(token, self._verify_key, algorithms=[self.algorithm], options={"verify_exp": verify_exp})
+
+    def decode(self, token: str, verify_exp: bool = True) -> Dict[str, Any]:
+        """
+        Returns the token's claims or raises JWTError, like `jose.jwt.decode`. The returned dict
+        is the caller's own copy.
+        """
+        if not verify_exp or not self.cache_enabled:
+            return self._timed_verify(token, verify_exp)
+
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        entry = self._cache.get(digest)
+        if entry is not None:
+            if time.time() < entry[0]:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return dict(entry[1])
+            self._cache.pop(digest, None)
+
+        self.misses += 1
+        claims = self._timed_verify(token, verify_exp)
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            self._cache[digest] = (float(exp), dict(claims))
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return claims
+
+    def _timed_verify(self, token: str, verify_exp: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return self._verify(token, verify_exp)
+        except JWTError:
+            self.failures += 1
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache effectiveness and latency of full (uncached) verifications, in microseconds."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6, 1)
+
+        lookups = self.hits + self.misses
+        return {
+            "algorithm": self.algorithm,
+            "cached_tokens": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "verify_us_p50": percentile(0.50),
+            "verify_us_p95": percentile(0.95),
+            "verify_us_p99": percentile(0.99),
+        }
+
+
+token_verifier = TokenVerifier(
+    algorithm=settings.JWT_ALGORITHM,
+    secret_key=settings.JWT_SECRET_KEY,
+    public_key=settings.JWT_PUBLIC_KEY,
+    private_key=settings.JWT_PRIVATE_KEY,
+    cache_enabled=settings.TOKEN_VERIFY_CACHE_ENABLED,
+    max_entries=settings.TOKEN_VERIFY_CACHE_MAX_ENTRIES,
+)
@@ -1,11 +1,12 @@
 # LLM_interviewer/server/app/db/mongodb.py
 
 import logging
-from typing import Optional 
+from typing import AsyncGenerator, Dict, Optional 
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession, AsyncIOMotorDatabase
 
 from ..core.config import settings # Relative import
+from .pool import DEFAULT, client_options, read_options
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,7 @@ class MongoDB:
     def __init__(self):
         self.client = None
         self.db = None
+        self._profiles: Dict[str, AsyncIOMotorDatabase] = {}
         self.mongodb_url = settings.MONGODB_URL
         self.mongodb_db_name = settings.MONGODB_DB
         logger.info("MongoDB manager initialized for Candidate Service.")
@@ -31,14 +33,8 @@ class MongoDB:
 
         try:
             logger.info(f"Candidate Service: Attempting to connect to MongoDB at {self.mongodb_url}...")
-            connect_timeout = getattr(settings, 'MONGODB_CONNECT_TIMEOUT_MS', 5000)
-            server_select_timeout = getattr(settings, 'MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)
-
-            self.client = AsyncIOMotorClient(
-                self.mongodb_url,
-                serverSelectionTimeoutMS=server_select_timeout,
-                connectTimeoutMS=connect_timeout,
-            )
+            # Pool sizing, compression, retries and read defaults live in pool.py; one client per process
+            self.client = AsyncIOMotorClient(self.mongodb_url, **client_options())
             await self.client.admin.command('ping')
             self.db = self.client[self.mongodb_db_name]
             logger.info(f"Candidate Service: MongoDB connection successful. Database '{self.mongodb_db_name}' is ready.")
@@ -54,6 +50,7 @@ class MongoDB:
             self.client.close()
             self.client = None
             self.db = None
+            self._profiles = {}
             logger.info("Candidate Service: MongoDB connection closed.")
         else:
             logger.info("Candidate Service: No active MongoDB connection to close.")
@@ -64,4 +61,27 @@ class MongoDB:
             raise RuntimeError("Database not connected. Ensure connect() was called and succeeded during application startup.")
         return self.db
 
+    def get_db_for(self, profile: str = DEFAULT) -> AsyncIOMotorDatabase:
+        """
+        The database handle for a read profile (see pool.READ_PROFILES). Handles share the
+        client's connection pool and only differ in read preference/concern.
+        """
+        db = self.get_db()
+        if profile == DEFAULT:
+            return db
+        handle = self._profiles.get(profile)
+        if handle is None:
+            handle = self._profiles[profile] = db.with_options(**read_options(profile))
+        return handle
+
+    async def causal_session(self) -> AsyncGenerator[AsyncIOMotorClientSession, None]:
+        """
+        FastAPI dependency yielding a causally consistent session for one request. Reads made
+        with it observe the request's earlier writes even on a secondary; pool.causal_tokens
+        carries a principal's last write into later requests.
+        """
+        self.get_db() # Fails the same way as get_db when not connected
+        async with await self.client.start_session(causal_consistency=True) as session:
+            yield session
+
 mongodb = MongoDB()
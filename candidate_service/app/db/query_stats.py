@@ -0,0 +1,204 @@
+# candidate_service/app/db/query_stats.py
+
+import json
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from ..core.config import settings
+from ..core.request_context import current_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the duration histogram buckets; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Handshake, auth and session housekeeping are not application queries
+IGNORED_COMMANDS = frozenset({
+    "hello", "ismaster", "isMaster", "ping", "buildinfo", "buildInfo", "saslStart", "saslContinue",
+    "authenticate", "getnonce", "endSessions", "killCursors", "abortTransaction", "commitTransaction",
+})
+
+
+# --- Filter Shapes ---
+def redact(value: Any, depth: int = 0) -> Any:
+    """
+    The shape of a filter or pipeline with every value replaced by "?": field names and operators
+    are kept, so `{"email": "a@b.c", "age": {"$gt": 3}}` becomes `{"email": "?", "age": {"$gt": "?"}}`.
+    """
+    if depth > 8:
+        return "..."
+    if isinstance(value, dict):
+        return {key: redact(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Lists of scalars ($in, $all, ...) collapse to one placeholder; lists of documents keep their shapes
+        shapes = []
+        for item in value:
+            shape = redact(item, depth + 1)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes if any(isinstance(shape, (dict, list)) for shape in shapes) else ["?"]
+    return "?"
+
+
+def describe_command(command_name: str, command: Dict[str, Any]) -> Tuple[str, Optional[Any]]:
+    """(collection, redacted filter shape) for a command document."""
+    collection = command.get(command_name)
+    if command_name == "getMore":
+        collection = command.get("collection")
+    if not isinstance(collection, str):
+        collection = "-"
+
+    shape: Optional[Any] = None
+    if command_name == "find":
+        shape = {"filter": redact(command.get("filter", {}))}
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"]) # Field names and directions only
+    elif command_name in ("delete", "update"):
+        statements = command.get("deletes" if command_name == "delete" else "updates") or [{}]
+        shape = {"filter": redact(statements[0].get("q", {}))}
+    elif command_name in ("count", "distinct", "findAndModify"):
+        shape = {"filter": redact(command.get("query", {}))}
+    elif command_name == "aggregate":
+        shape = {"pipeline": redact(command.get("pipeline", []))}
+    return collection, shape
+
+
+# --- Histograms ---
+class _Series:
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def observe(self, duration_ms: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += int(failed)
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, duration_ms)] += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile (None for the open-ended bucket)."""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(BUCKET_BOUNDS_MS[index]) if index < len(BUCKET_BOUNDS_MS) else None
+        return None
+
+
+class QueryStats(monitoring.CommandListener):
+    """
+    Command listener that keeps a duration histogram per (collection, operation, route) and logs
+    commands slower than DB_SLOW_QUERY_MS with their redacted filter shape. The route comes from
+    the request context, which Motor carries into the executor thread running the command.
+    Series beyond DB_QUERY_STATS_MAX_SERIES are folded into one overflow series.
+    """
+
+    OVERFLOW = ("-", "-", "other")
+
+    def __init__(self, slow_ms: float, max_series: int, slow_log_size: int):
+        self.slow_ms = slow_ms
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str, str, Optional[Any]]] = {}
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection, shape = describe_command(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name, current_endpoint(), shape)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+            if pending is None:
+                return
+            collection, operation, route, shape = pending
+            duration_ms = event.duration_micros / 1000
+            key = (collection, operation, route)
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = self.OVERFLOW
+                series = self._series.setdefault(key, _Series())
+            series.observe(duration_ms, failed)
+        if duration_ms >= self.slow_ms:
+            entry = {
+                "at": datetime.now(timezone.utc).isoformat(),
+                "collection": collection,
+                "operation": operation,
+                "route": route,
+                "duration_ms": round(duration_ms, 2),
+                "shape": shape,
+                "failed": failed,
+            }
+            self.slow_queries.append(entry)
+            logger.warning(
+                f"Slow MongoDB {operation} on {collection} from {route}: {duration_ms:.1f}ms "
+                f"shape={json.dumps(shape, default=str, sort_keys=True)}"
+            )
+
+    def snapshot(self, limit: int = 50) -> Dict[str, Any]:
+        """The `limit` series with the most total time, plus the recent slow commands."""
+        with self._lock:
+            items = sorted(self._series.items(), key=lambda item: item[1].total_ms, reverse=True)[:limit]
+            series: List[Dict[str, Any]] = [
+                {
+                    "collection": collection,
+                    "operation": operation,
+                    "route": route,
+                    "count": s.count,
+                    "errors": s.errors,
+                    "total_ms": round(s.total_ms, 2),
+                    "mean_ms": round(s.total_ms / s.count, 3) if s.count else None,
+                    "max_ms": round(s.max_ms, 2),
+                    "p50_ms_le": s.percentile(0.50),
+                    "p95_ms_le": s.percentile(0.95),
+                    "p99_ms_le": s.percentile(0.99),
+                    "buckets": dict(zip([f"le_{b}" for b in BUCKET_BOUNDS_MS] + ["inf"], s.buckets)),
+                }
+                for (collection, operation, route), s in items
+            ]
+            tracked = len(self._series)
+        return {
+            "slow_query_ms": self.slow_ms,
+            "tracked_series": tracked,
+            "series": series,
+            "slow_queries": list(self.slow_queries),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._pending.clear()
+            self.slow_queries.clear()
+
+
+query_stats = QueryStats(
+    slow_ms=settings.DB_SLOW_QUERY_MS,
+    max_series=settings.DB_QUERY_STATS_MAX_SERIES,
+    slow_log_size=settings.DB_SLOW_QUERY_LOG_SIZE,
+)
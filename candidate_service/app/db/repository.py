@@ -0,0 +1,151 @@
+# candidate_service/app/db/repository.py
+
+import logging
+import types
+import typing
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClientSession, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pydantic import BaseModel
+from pymongo import ReturnDocument
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# --- Trusted Decoding ---
+def _plain(value: Any) -> Any:
+    """BSON values to what the JSON encoder takes: ObjectIds become strings, containers are walked."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _to_float(value: Any) -> Any:
+    # Pydantic serializes a float field holding an int as 4.0, not 4
+    return float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+def _converter(annotation: Any, encoders: Mapping[Any, Callable[[Any], Any]]) -> Callable[[Any], Any]:
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        options = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(options) == 1:
+            inner = _converter(options[0], encoders)
+            return lambda value: None if value is None else inner(value)
+        return _plain
+    if origin in (list, List):
+        args = typing.get_args(annotation)
+        inner = _converter(args[0], encoders) if args else _plain
+        return lambda value: [inner(item) for item in value] if isinstance(value, list) else _plain(value)
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            nested = DocumentCodec(annotation)
+            return lambda value: nested.decode(value) if isinstance(value, dict) else _plain(value)
+        if annotation in encoders: # The schema's own json_encoders (e.g. datetime.isoformat) win
+            encode = encoders[annotation]
+            return lambda value: encode(value) if isinstance(value, annotation) else _plain(value)
+        if annotation is float:
+            return _to_float
+        if annotation is datetime or annotation in (str, int, bool):
+            return lambda value: value
+    return _plain
+
+
+class DocumentCodec:
+    """
+    Turns documents read from our own collections straight into the JSON-ready dicts a response
+    schema would serialize to, without running Pydantic validation per document. The plan (output
+    key, source key, default and value conversion per field) is derived once from the schema, so
+    aliases, defaults and the dropping of unknown keys match `Schema.model_validate(doc)` dumped
+    by alias. Only for trusted reads: values are not checked, and a missing required field comes
+    out as None instead of failing.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        encoders = schema.model_config.get("json_encoders") or {}
+        self.fields: List[Tuple[str, Tuple[str, ...], Any, Callable[[Any], Any]]] = []
+        for name, field in schema.model_fields.items():
+            sources = tuple(dict.fromkeys(key for key in (field.alias, name) if key)) # Alias first, then the field name
+            output = field.serialization_alias or field.alias or name
+            default = None if field.is_required() else field.get_default(call_default_factory=True)
+            self.fields.append((output, sources, default, _converter(field.annotation, encoders)))
+
+    @property
+    def projection(self) -> Dict[str, int]:
+        """Projection fetching only the fields the schema reads."""
+        return {source: 1 for _, sources, _, _ in self.fields for source in sources}
+
+    def decode(self, document: Mapping[str, Any]) -> Dict[str, Any]:
+        decoded: Dict[str, Any] = {}
+        for output, sources, default, convert in self.fields:
+            for source in sources:
+                if source in document:
+                    value = document[source]
+                    decoded[output] = None if value is None else convert(value)
+                    break
+            else:
+                decoded[output] = _plain(default)
+        return decoded
+
+    def decode_many(self, documents: List[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        decode = self.decode
+        return [decode(document) for document in documents]
+
+
+class Repository:
+    """
+    Single-round-trip writes for one collection. Inserts return the document that was written
+    (with the `_id` the driver assigned) and updates return the post-image from
+    `find_one_and_update`, so write endpoints build their response without reading back.
+    Listings go through `find_decoded`, which fetches only the schema's fields and decodes them
+    with a DocumentCodec.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    @classmethod
+    def for_setting(cls, db: AsyncIOMotorDatabase, collection_setting: str) -> "Repository":
+        """Repository for the collection named by a MONGODB_COLLECTION_* setting."""
+        return cls(db[getattr(settings, collection_setting)])
+
+    async def insert(self, document: Dict[str, Any], session: Optional[AsyncIOMotorClientSession] = None) -> Dict[str, Any]:
+        """Inserts `document` and returns it; `insert_one` sets its `_id` in place."""
+        await self.collection.insert_one(document, session=session)
+        return document
+
+    async def update(
+        self,
+        filter: Mapping[str, Any],
+        update: Any,
+        *,
+        projection: Optional[Mapping[str, Any]] = None,
+        upsert: bool = False,
+        session: Optional[AsyncIOMotorClientSession] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Applies `update` to the first match and returns it as updated (None when nothing matched)."""
+        return await self.collection.find_one_and_update(
+            filter, update, projection=projection, upsert=upsert,
+            return_document=ReturnDocument.AFTER, session=session,
+        )
+
+    async def find_decoded(
+        self,
+        filter: Mapping[str, Any],
+        codec: DocumentCodec,
+        *,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        session: Optional[AsyncIOMotorClientSession] = None,
+    ) -> List[Dict[str, Any]]:
+        """Every match, decoded by `codec` into JSON-ready dicts (see DocumentCodec)."""
+        cursor = self.collection.find(filter, codec.projection, sort=sort, session=session)
+        return codec.decode_many(await cursor.to_list(length=None))
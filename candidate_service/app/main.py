@@ -1,13 +1,21 @@
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import application components
 from .core.config import settings
+from .core.request_context import RequestContextMiddleware
 from .db.mongodb import mongodb 
+from .db.indexes import index_reconciler
+from .db.pool import pool_metrics
+from .db.query_stats import query_stats
+from .core.principal_cache import user_change_feed
+from .db.change_events import change_event_bus
+from .core.token_verifier import token_verifier
+from .core.auth_client import auth_client
 from .api.routes import candidates as candidate_router 
 
 # --- Logging Setup ---
@@ -27,6 +35,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         await mongodb.connect()
         db_connected = True
         logger.info("Candidate Service: MongoDB connection successful.")
+        user_change_feed.start(mongodb.get_db())
+        change_event_bus.start(mongodb.get_db()) # After the subscribers above
+        index_reconciler.start(mongodb.get_db(), owner="candidate")
         # Add any candidate-service specific seeding if needed
         logger.info("Candidate Service: Application startup complete.")
         yield 
@@ -35,6 +46,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     finally:
         logger.info("Candidate Service: Application shutdown sequence initiated...")
         if db_connected:
+            await change_event_bus.stop()
+            await user_change_feed.stop()
+            await index_reconciler.stop()
+            await auth_client.aclose()
             await mongodb.close()
             logger.info("Candidate Service: MongoDB connection closed.")
         else:
@@ -76,6 +91,8 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 logger.info(f"CORS middleware enabled for Candidate Service. Allowed origins: {configured_origins}")
+# Exposes the matched route to code outside the route, e.g. for per-route query stats
+app.add_middleware(RequestContextMiddleware)
 
 # --- API Router Inclusion (Placeholder) ---
 app.include_router(candidate_router.router, prefix="/api/v1", tags=["Candidates"]) # Using /api/v1 as base
@@ -90,3 +107,28 @@ async def read_root() -> dict[str, str]:
 @app.get("/health", tags=["Health Check"])
 async def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+# Token verification cache effectiveness and latency of full signature checks
+@app.get("/health/token-verification", tags=["Health Check"])
+async def token_verification_stats() -> Dict[str, Any]:
+    return token_verifier.stats()
+
+
+# MongoDB connection pool checkouts, connections in use and checkout wait times
+@app.get("/health/db-pool", tags=["Health Check"])
+async def db_pool_stats() -> Dict[str, Any]:
+    return pool_metrics.snapshot()
+
+
+# Per-route query histograms and recent slow commands (filter values redacted), with pool and index state.
+# Exposes route and query shapes, so it is off unless DEBUG_ENDPOINTS_ENABLED is set.
+@app.get("/debug/db-stats", tags=["Health Check"], include_in_schema=settings.DEBUG_ENDPOINTS_ENABLED)
+async def db_stats(limit: int = Query(50, ge=1, le=500)) -> Dict[str, Any]:
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return {
+        "queries": query_stats.snapshot(limit=limit),
+        "pool": pool_metrics.snapshot(),
+        "indexes": index_reconciler.last_report,
+        "change_events": change_event_bus.snapshot(),
+    }
@@ -0,0 +1,47 @@
+# candidate_service/migrations/resume_documents.py
+"""
+Online migration: move resume text and analysis off user documents into resume_documents.
+
+Walks users that still carry `resume_text` in `_id` order, in batches, while the services keep
+serving (see ResumeDocuments.migrate in app/db/resume_documents.py for the concurrency rules).
+Safe to interrupt and rerun. Deploy the services first: their writes already go to
+resume_documents, and reads fall back to users.resume_text while RESUME_DOCUMENTS_LEGACY_READS
+is on. Once a run reports `remaining 0`, set RESUME_DOCUMENTS_LEGACY_READS=false everywhere.
+Set RESUME_DOCUMENTS_COMPRESSION=zstd here too if the services compress.
+
+    cd candidate_service && python -m migrations.resume_documents --batch-size 500 --pause 0.05
+    cd candidate_service && python -m migrations.resume_documents --dry-run
+"""
+
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.db.pool import client_options
+from app.db.resume_documents import ResumeDocuments
+
+
+async def run(batch_size: int, pause_seconds: float, dry_run: bool) -> None:
+    client = AsyncIOMotorClient(settings.MONGODB_URL, **client_options())
+    try:
+        db = client[settings.MONGODB_DB]
+        stats = await ResumeDocuments(db).migrate(batch_size=batch_size, pause_seconds=pause_seconds, dry_run=dry_run)
+        remaining = await db[settings.MONGODB_COLLECTION_USERS].count_documents({"resume_text": {"$exists": True}})
+        print(" ".join(f"{name} {count}" for name, count in stats.items()), f"remaining {remaining}")
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches to limit load")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the user documents left to migrate")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size, args.pause, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,7 @@ import aiofiles
 import aiofiles.os
 
 from app.core.security import get_current_active_user
-from app.models.user import User, HrStatus
+from app.models.user import Principal, User, HrStatus
 from app.schemas.user import (
     HrProfileOut, 
     HrProfileUpdate, 
@@ -34,7 +34,11 @@ from app.schemas.search import RankedCandidate
 from app.schemas.message import MessageContentCreate, MessageOut, MarkReadRequest, BaseUserInfo
 
 from app.db.mongodb import mongodb
+from app.db.pool import LISTING
+from app.db.repository import Repository
+from app.db.resume_documents import LEGACY_USER_UNSET, ResumeDocuments
 from app.core.config import settings
+from app.core.principal_cache import principal_cache
 
 from app.services.invitation_service import InvitationService, InvitationError
 from app.services.search_service import SearchService
@@ -65,10 +69,21 @@ def get_object_id(id_str: str) -> ObjectId:
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid ID format: {id_str}")
 
+def get_listing_db():
+    """Database handle with the listing read profile (secondaries within maxStalenessSeconds)."""
+    return mongodb.get_db_for(LISTING)
+
 async def require_hr(current_user_from_token: User = Depends(get_current_active_user), db: AsyncIOMotorClient = Depends(mongodb.get_db)) -> User:
     if current_user_from_token.role != "hr":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation requires HR privileges.")
     
+    # A principal built from current claims already carries hr_status and admin_manager_id (claims
+    # go stale on any user update). Otherwise get_current_user resolved the full User through the
+    # principal cache, which is invalidated on local status writes and by the users change feed.
+    # Re-fetch only if the cache is disabled.
+    if isinstance(current_user_from_token, Principal) or settings.PRINCIPAL_CACHE_ENABLED:
+        return current_user_from_token
+
     # Re-fetch the user from the database to ensure the most current state, especially for status fields.
     user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": ObjectId(str(current_user_from_token.id))})
     if not user_doc:
@@ -108,16 +123,12 @@ async def update_hr_profile_details(
     logger.info(f"HR profile update_doc: {update_doc}")
     update_doc["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db[settings.MONGODB_COLLECTION_USERS].update_one(
-        {"_id": current_hr_user.id}, {"$set": update_doc}
-    )
-    if result.matched_count == 0:
+    users = Repository.for_setting(db, "MONGODB_COLLECTION_USERS")
+    updated_user_doc = await users.update({"_id": current_hr_user.id}, {"$set": update_doc})
+    principal_cache.invalidate(user_id=current_hr_user.id)
+    if updated_user_doc is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="HR User not found during update.")
 
-    updated_user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": current_hr_user.id})
-    if not updated_user_doc:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve user after update.")
-    
     updated_user_obj = User.model_validate(updated_user_doc)
     # Temporarily reverting to simpler condition based on user feedback for "Update HR Profile" test expectations.
     # This implies that for the purpose of this test/flow, setting YoE is sufficient.
@@ -152,33 +163,23 @@ async def update_hr_profile_details(
     
     if updated_user_obj.hr_status in can_change_status_from and updated_user_obj.hr_status != target_status:
         logger.info(f"HR {updated_user_obj.username} status changing from '{updated_user_obj.hr_status}' to '{target_status}'. YoE: {has_yoe}, Resume: {has_resume}")
-        status_update_result = await db[settings.MONGODB_COLLECTION_USERS].update_one(
+        status_updated_doc = await users.update(
             {"_id": updated_user_obj.id},
             {"$set": {"hr_status": target_status, "updated_at": datetime.now(timezone.utc)}}
         )
-        if status_update_result.modified_count > 0:
+        principal_cache.invalidate(user_id=updated_user_obj.id)
+        if status_updated_doc is not None:
             logger.info(f"HR profile for {updated_user_obj.username} status successfully updated to '{target_status}'.")
-            refetched_user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": updated_user_obj.id})
-            if refetched_user_doc:
-                final_return_user = User.model_validate(refetched_user_doc)
+            final_return_user = User.model_validate(status_updated_doc)
         else:
-            logger.warning(f"HR profile status update to '{target_status}' reported 0 modifications. Current DB status might be stale or already '{target_status}'.")
-            # Re-fetch to ensure the returned user object has the most current status from DB
-            current_db_user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": updated_user_obj.id})
-            if current_db_user_doc:
-                 final_return_user = User.model_validate(current_db_user_doc)
+            logger.warning(f"HR profile status update to '{target_status}' matched no user; returning the profile as last updated.")
 
     elif updated_user_obj.hr_status == target_status:
         logger.info(f"HR {updated_user_obj.username} status '{target_status}' is already correct. No change needed. YoE: {has_yoe}, Resume: {has_resume}")
     else: # Current status is an advanced one (e.g. mapped) that this logic shouldn't override to pending_profile/profile_complete
         logger.info(f"HR {updated_user_obj.username} status '{updated_user_obj.hr_status}' not changed by profile update. Target based on completion: '{target_status}'. YoE: {has_yoe}, Resume: {has_resume}")
-        
-    final_user_doc_for_log = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": current_hr_user.id}) # Re-fetch for logging
-    if final_user_doc_for_log:
-        logger.info(f"HR {current_hr_user.username} final status before returning from update_hr_profile_details: {final_user_doc_for_log.get('hr_status')}")
-    else:
-        logger.error(f"Could not re-fetch HR user {current_hr_user.username} for final status log.")
 
+    logger.info(f"HR {current_hr_user.username} final status before returning from update_hr_profile_details: {final_return_user.hr_status}")
 
     return HrProfileOut.model_validate(final_return_user)
 
@@ -231,9 +232,10 @@ async def upload_hr_resume(
     finally:
         await resume.close()
 
+    # The text and full analysis go to resume_documents; the user document keeps the search keys
     update_fields = {
         "resume_path": str(file_location.resolve()),
-        "resume_text": parsed_content,
+        "has_resume": parsed_content is not None,
         "updated_at": datetime.now(timezone.utc),
     }
     if analysis_result.get("extracted_skills_list") is not None:
@@ -242,20 +244,17 @@ async def upload_hr_resume(
         update_fields["years_of_experience"] = analysis_result["estimated_yoe"]
     
     try:
-        result = await db[settings.MONGODB_COLLECTION_USERS].update_one(
-            {"_id": current_hr_user.id}, {"$set": update_fields}
-        )
-        if result.matched_count == 0:
+        await ResumeDocuments(db).save(current_hr_user.id, parsed_content, analysis_result, update_fields["resume_path"])
+        users = Repository.for_setting(db, "MONGODB_COLLECTION_USERS")
+        updated_user_doc = await users.update({"_id": current_hr_user.id}, {"$set": update_fields, "$unset": LEGACY_USER_UNSET})
+        principal_cache.invalidate(user_id=current_hr_user.id)
+        if updated_user_doc is None:
             if file_saved: # File was saved, but DB update failed for user
                  try: await aiofiles.os.remove(file_location)
                  except Exception as e_clean: logger.error(f"Cleanup failed for {file_location} (user not found for update): {e_clean}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="HR User not found during resume data update.")
         
         logger.info(f"Updated HR {current_hr_user.username} with resume details.")
-        
-        updated_user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": current_hr_user.id})
-        if not updated_user_doc:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve user after resume data update.")
 
         updated_user_obj = User.model_validate(updated_user_doc) # This is the user after resume fields are set
         
@@ -280,20 +279,16 @@ async def upload_hr_resume(
 
         if updated_user_obj.hr_status in can_change_status_from and updated_user_obj.hr_status != target_status:
             logger.info(f"HR {updated_user_obj.username} status changing from '{updated_user_obj.hr_status}' to '{target_status}' after resume upload. YoE: {has_yoe}, Resume: {has_resume}")
-            status_update_result = await db[settings.MONGODB_COLLECTION_USERS].update_one(
+            status_updated_doc = await users.update(
                 {"_id": updated_user_obj.id},
                 {"$set": {"hr_status": target_status, "updated_at": datetime.now(timezone.utc)}}
             )
-            if status_update_result.modified_count > 0:
+            principal_cache.invalidate(user_id=updated_user_obj.id)
+            if status_updated_doc is not None:
                 logger.info(f"HR profile for {updated_user_obj.username} status successfully updated to '{target_status}'.")
-                refetched_user_doc_after_status = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": updated_user_obj.id})
-                if refetched_user_doc_after_status:
-                    final_user_to_return = User.model_validate(refetched_user_doc_after_status)
+                final_user_to_return = User.model_validate(status_updated_doc)
             else:
-                logger.warning(f"HR profile status update to '{target_status}' after resume upload reported 0 modifications.")
-                current_db_user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": updated_user_obj.id})
-                if current_db_user_doc:
-                    final_user_to_return = User.model_validate(current_db_user_doc)
+                logger.warning(f"HR profile status update to '{target_status}' after resume upload matched no user.")
         elif updated_user_obj.hr_status == target_status:
              logger.info(f"HR {updated_user_obj.username} status '{target_status}' is already correct after resume upload. No change needed. YoE: {has_yoe}, Resume: {has_resume}")
         else:
@@ -623,7 +618,7 @@ async def get_my_assigned_candidates(
 @router.get("/search-candidates", response_model=List[RankedCandidate])
 async def search_candidates(
     current_hr_user: User = Depends(require_hr),
-    db: AsyncIOMotorClient = Depends(mongodb.get_db),
+    db: AsyncIOMotorClient = Depends(get_listing_db),
     keyword: Optional[str] = Query(None),
     required_skills: Optional[List[str]] = Query(None),
     yoe_min: Optional[int] = Query(None, ge=0),
@@ -749,17 +744,8 @@ async def send_message_to_user(
 
     messages_collection = db[settings.MONGODB_COLLECTION_MESSAGES]
     try:
-        result = await messages_collection.insert_one(message_doc_data)
-        if not result.inserted_id:
-            logger.error(f"Message insertion failed for HR {current_hr_user.id} to {recipient_user_id}, no inserted_id returned.")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Message insertion failed, no ID returned.")
-
-        created_message_doc = await messages_collection.find_one({"_id": result.inserted_id})
-        if not created_message_doc:
-            logger.error(f"Failed to retrieve message {result.inserted_id} after insertion for HR {current_hr_user.id} to {recipient_user_id}.")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve message after sending.")
-        
-        logger.info(f"Message {result.inserted_id} sent by HR {current_hr_user.username} to User {recipient_user_id}.")
+        created_message_doc = await Repository(messages_collection).insert(message_doc_data)
+        logger.info(f"Message {created_message_doc['_id']} sent by HR {current_hr_user.username} to User {recipient_user_id}.")
         return MessageOut.model_validate(created_message_doc)
 
     except Exception as e:
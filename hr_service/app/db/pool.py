@@ -0,0 +1,285 @@
+# hr_service/app/db/pool.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Read Profiles ---
+# Use cases with their own read preference/concern. "default" is whatever the client (and the
+# connection string) says; the others override it per database handle.
+DEFAULT = "default"
+LISTING = "listing" # Paged lists and searches that tolerate slightly stale data
+REPORTING = "reporting" # Counts and aggregations for dashboards
+CONSISTENT = "consistent" # Read-after-write flows that must observe majority-committed data
+READ_PROFILES = (DEFAULT, LISTING, REPORTING, CONSISTENT)
+
+
+def _read_preference(name: str, max_staleness_seconds: int = -1):
+    mode = read_pref_mode_from_name(name)
+    # The primary is never stale; maxStalenessSeconds (>= 90 when set) only applies to secondary reads
+    return make_read_preference(mode, None, max_staleness_seconds if name != "primary" else -1)
+
+
+def read_options(profile: str) -> Dict[str, Any]:
+    """`with_options` keyword arguments for a read profile ({} for the client defaults)."""
+    if profile == DEFAULT:
+        return {}
+    staleness = -1
+    if profile == LISTING:
+        preference, concern = settings.MONGODB_LISTING_READ_PREFERENCE, settings.MONGODB_LISTING_READ_CONCERN
+        staleness = settings.MONGODB_LISTING_MAX_STALENESS_SECONDS
+    elif profile == REPORTING:
+        preference, concern = settings.MONGODB_REPORTING_READ_PREFERENCE, settings.MONGODB_REPORTING_READ_CONCERN
+        staleness = settings.MONGODB_REPORTING_MAX_STALENESS_SECONDS
+    elif profile == CONSISTENT:
+        preference, concern = "primary", "majority"
+    else:
+        raise ValueError(f"Unknown read profile '{profile}'. Expected one of {READ_PROFILES}.")
+    options: Dict[str, Any] = {"read_preference": _read_preference(preference, staleness)}
+    if concern:
+        options["read_concern"] = ReadConcern(concern)
+    return options
+
+
+# --- Causal Reads ---
+class CausalTokens:
+    """
+    The latest cluster/operation time of each principal's writes through this worker. A read
+    made in a causally consistent session advanced to these times is served by a secondary
+    only once it has applied those writes (afterClusterTime), so a user who just wrote sees
+    the write on the next listing even when it is routed away from the primary. Writes made
+    by other services or workers are only bounded by maxStalenessSeconds.
+    """
+
+    def __init__(self, max_principals: int):
+        self.max_principals = max_principals
+        self._tokens: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict() # principal -> (cluster_time, operation_time)
+
+    def remember(self, principal_id: Any, session) -> None:
+        """Records the session's times after `principal_id` wrote through it."""
+        if session is None or session.operation_time is None:
+            return # Standalone servers report no operation time; every read is already consistent
+        key = str(principal_id)
+        self._tokens[key] = (session.cluster_time, session.operation_time)
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_principals:
+            self._tokens.popitem(last=False)
+
+    def resume(self, principal_id: Any, session) -> None:
+        """Advances a fresh session to the principal's last write before reading with it."""
+        tokens = self._tokens.get(str(principal_id))
+        if session is None or tokens is None:
+            return
+        cluster_time, operation_time = tokens
+        if cluster_time is not None:
+            session.advance_cluster_time(cluster_time)
+        session.advance_operation_time(operation_time)
+
+
+causal_tokens = CausalTokens(settings.MONGODB_CAUSAL_TOKENS_MAX_PRINCIPALS)
+
+
+# --- Client Options ---
+def client_options() -> Dict[str, Any]:
+    """
+    Keyword arguments for the service's single AsyncIOMotorClient. Pool limits are per process,
+    so the server sees up to MONGODB_MAX_POOL_SIZE connections per worker and per replica set
+    member; size it against the worker count and the server's connection limit.
+    """
+    options: Dict[str, Any] = {
+        "appname": settings.APP_NAME,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxConnecting": settings.MONGODB_MAX_CONNECTING,
+        "retryReads": settings.MONGODB_RETRY_READS,
+        "retryWrites": settings.MONGODB_RETRY_WRITES,
+    }
+    if settings.MONGODB_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGODB_MAX_IDLE_TIME_MS
+    if settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGODB_SOCKET_TIMEOUT_MS is not None:
+        options["socketTimeoutMS"] = settings.MONGODB_SOCKET_TIMEOUT_MS
+    if settings.MONGODB_COMPRESSORS:
+        # Unavailable compressors (zstandard / python-snappy not installed) are skipped by pymongo with a warning
+        options["compressors"] = settings.MONGODB_COMPRESSORS
+        if "zlib" in settings.MONGODB_COMPRESSORS:
+            options["zlibCompressionLevel"] = settings.MONGODB_ZLIB_COMPRESSION_LEVEL
+    # Read preference/concern left empty defer to the connection string (and then the driver defaults)
+    if settings.MONGODB_READ_PREFERENCE:
+        options["readPreference"] = settings.MONGODB_READ_PREFERENCE
+    if settings.MONGODB_READ_CONCERN:
+        options["readConcernLevel"] = settings.MONGODB_READ_CONCERN
+    listeners: List[Any] = []
+    if settings.MONGODB_POOL_METRICS_ENABLED:
+        listeners.append(pool_metrics)
+    if settings.DB_QUERY_STATS_ENABLED:
+        from .query_stats import query_stats
+        listeners.append(query_stats)
+    if listeners:
+        options["event_listeners"] = listeners
+    return options
+
+
+# --- Pool Metrics ---
+class _AddressStats:
+    def __init__(self, samples: int):
+        self.checkouts = 0
+        self.failures: Dict[str, int] = {}
+        self.in_use = 0
+        self.max_in_use = 0
+        self.open = 0
+        self.created = 0
+        self.closed = 0
+        self.cleared = 0
+        self.waits: Deque[float] = deque(maxlen=samples)
+        self.max_wait = 0.0
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that keeps checkout counts, connections in use and checkout wait
+    times per server. A growing wait time or `timeout` failures with `in_use` at the pool size
+    means the pool is saturated: raise MONGODB_MAX_POOL_SIZE or shorten the operations holding
+    connections. Events arrive on driver threads, so updates are guarded by a lock.
+    """
+
+    def __init__(self, samples: int = 2048):
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._servers: Dict[str, _AddressStats] = {}
+        self._checkout_started = threading.local()
+
+    def _stats(self, address) -> _AddressStats:
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        stats = self._servers.get(key)
+        if stats is None:
+            stats = self._servers[key] = _AddressStats(self.samples)
+        return stats
+
+    def _started_at(self) -> Dict[Any, float]:
+        started = getattr(self._checkout_started, "by_address", None)
+        if started is None:
+            started = self._checkout_started.by_address = {}
+        return started
+
+    def _wait(self, event) -> Optional[float]:
+        started = self._started_at().pop(event.address, None)
+        duration = getattr(event, "duration", None) # Reported by the driver on pymongo >= 4.9
+        if duration is None and started is not None:
+            duration = time.perf_counter() - started
+        return duration
+
+    # Pool lifecycle
+    def pool_created(self, event):
+        with self._lock:
+            self._stats(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._stats(event.address).cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Connection lifecycle
+    def connection_created(self, event):
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.created += 1
+            stats.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.closed += 1
+            stats.open = max(0, stats.open - 1)
+
+    # Checkout lifecycle
+    def connection_check_out_started(self, event):
+        self._started_at()[event.address] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._wait(event)
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.checkouts += 1
+            stats.in_use += 1
+            stats.max_in_use = max(stats.max_in_use, stats.in_use)
+            if wait is not None:
+                stats.waits.append(wait)
+                stats.max_wait = max(stats.max_wait, wait)
+
+    def connection_check_out_failed(self, event):
+        wait = self._wait(event)
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.failures[event.reason] = stats.failures.get(event.reason, 0) + 1
+            if wait is not None:
+                stats.max_wait = max(stats.max_wait, wait)
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            logger.warning(f"MongoDB pool for {event.address} exhausted: checkout timed out (maxPoolSize={settings.MONGODB_MAX_POOL_SIZE}).")
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.in_use = max(0, stats.in_use - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-server pool counters and checkout wait percentiles in milliseconds."""
+        with self._lock:
+            servers = {}
+            for address, stats in self._servers.items():
+                waits = sorted(stats.waits)
+
+                def percentile(p: float) -> Optional[float]:
+                    if not waits:
+                        return None
+                    return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1e3, 3)
+
+                servers[address] = {
+                    "checkouts": stats.checkouts,
+                    "checkout_failures": dict(stats.failures),
+                    "in_use": stats.in_use,
+                    "max_in_use": stats.max_in_use,
+                    "open_connections": stats.open,
+                    "connections_created": stats.created,
+                    "connections_closed": stats.closed,
+                    "pool_cleared": stats.cleared,
+                    "wait_ms_p50": percentile(0.50),
+                    "wait_ms_p95": percentile(0.95),
+                    "wait_ms_p99": percentile(0.99),
+                    "wait_ms_max": round(stats.max_wait * 1e3, 3),
+                }
+        return {
+            "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+            "wait_queue_timeout_ms": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "compressors": settings.MONGODB_COMPRESSORS or None,
+            "servers": servers,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._servers.clear()
+
+
+pool_metrics = PoolMetrics()
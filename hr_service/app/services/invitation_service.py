@@ -1,13 +1,16 @@
 # LLM_interviewer/server/app/services/invitation_service.py
 
 import logging
-from typing import List, Optional, Dict, Any, Literal # Import Literal
+from typing import List, Optional, Dict, Any, Literal, Tuple # Import Literal
 from datetime import datetime, timezone 
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorClient 
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
 
 from ..db.mongodb import mongodb # Adjusted
+from ..db.repository import Repository
+from ..db.transactions import run_in_transaction
 from ..core.config import settings # Adjusted
+from ..core.principal_cache import principal_cache
 from ..models.user import User, HrStatus # Adjusted
 from ..models.application_request import HRMappingRequest, RequestMappingStatus, RequestMappingType # Adjusted
 
@@ -24,8 +27,9 @@ class InvitationService:
         self.user_collection = self.db[settings.MONGODB_COLLECTION_USERS]
         self.request_collection_name = "hr_mapping_requests" 
         self.request_collection = self.db[self.request_collection_name]
+        self.requests = Repository(self.request_collection)
 
-    async def _check_hr_has_active_requests(self, hr_user_id: ObjectId) -> bool:
+    async def _check_hr_has_active_requests(self, hr_user_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> bool:
         """Checks if an HR user has any active (non-finalized) applications or invitations."""
         active_statuses: List[RequestMappingStatus] = [
             "pending_admin_approval",
@@ -37,13 +41,13 @@ class InvitationService:
                 {"requester_id": hr_user_id, "request_type": "application", "status": {"$in": active_statuses}},
                 {"target_id": hr_user_id, "request_type": "request", "status": {"$in": active_statuses}}
             ]
-        })
+        }, session=session)
         if active_request:
             logger.info(f"HR User {hr_user_id} has an active request/application: ID {active_request['_id']}, Status {active_request['status']}.")
             return True
         return False
 
-    async def _supersede_other_requests_for_hr(self, hr_user_id: ObjectId, confirmed_request_id: ObjectId):
+    async def _supersede_other_requests_for_hr(self, hr_user_id: ObjectId, confirmed_request_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None):
         """Sets other active requests for an HR to 'superceded' once one is confirmed."""
         now = datetime.now(timezone.utc)
         active_statuses_to_supersede: List[RequestMappingStatus] = [
@@ -61,7 +65,8 @@ class InvitationService:
                  "request_type": "application",
                  "status": {"$in": active_statuses_to_supersede}
              },
-             {"$set": {"status": "superceded", "updated_at": now}}
+             {"$set": {"status": "superceded", "updated_at": now}},
+             session=session,
         )
         # Supersede Admin's incoming invitations to this HR
         await self.request_collection.update_many(
@@ -71,7 +76,8 @@ class InvitationService:
                  "request_type": "request",
                  "status": {"$in": active_statuses_to_supersede}
              },
-             {"$set": {"status": "superceded", "updated_at": now}}
+             {"$set": {"status": "superceded", "updated_at": now}},
+             session=session,
         )
         logger.info(f"Superseding complete for HR {hr_user_id}.")
 
@@ -94,43 +100,40 @@ class InvitationService:
         target_admin = await self.user_collection.find_one({"_id": target_admin_id, "role": "admin"})
         if not target_admin: raise InvitationError(f"Target Admin {target_admin_id} not found or is not an Admin.")
 
-        # Check for existing pending application to the SAME admin
-        existing_pending_application_to_same_admin = await self.request_collection.find_one({
-            "requester_id": hr_user.id,
-            "target_id": target_admin_id,
-            "request_type": "application",
-            "status": "pending_admin_approval"
-        })
-        if existing_pending_application_to_same_admin:
-            logger.warning(f"HR user {hr_user.id} attempted to send a duplicate application to Admin {target_admin_id}.")
-            raise InvitationError(f"You already have a pending application to this Admin.")
-
         logger.info(f"Creating application from HR {hr_user.id} to Admin {target_admin_id}")
-        now = datetime.now(timezone.utc)
-        application_doc = {
-            "request_type": "application", "requester_id": hr_user.id, "requester_role": "hr",
-            "target_id": target_admin_id, "target_role": "admin", "status": "pending_admin_approval", # Updated status
-            "created_at": now, "updated_at": now
-        }
-        insert_result = await self.request_collection.insert_one(application_doc)
-        if not insert_result.acknowledged:
-            raise InvitationError("Failed to create application record in database.")
-        created_doc = await self.request_collection.find_one({"_id": insert_result.inserted_id})
-        if not created_doc:
-             raise InvitationError("Failed to retrieve created application record.")
-
-        # Ensure HR status is set to "application_pending"
-        # This is safe even if it's already "application_pending" or "admin_request_pending"
-        # as "application_pending" signifies they have at least one outgoing application.
-        update_result = await self.user_collection.update_one(
-            {"_id": hr_user.id}, # Update regardless of current pending status, as long as not mapped.
-            {"$set": {"hr_status": "application_pending", "updated_at": now}}
-        )
-        if update_result.modified_count == 0 and hr_user.hr_status != "application_pending":
-             # If status wasn't already application_pending and update failed, it's an issue.
-             logger.error(f"Failed to update HR user {hr_user.id} status to 'application_pending' after creating application {insert_result.inserted_id}. Current status: {hr_user.hr_status}")
-             await self.request_collection.delete_one({"_id": insert_result.inserted_id})
-             raise InvitationError("Failed to update HR user status.")
+
+        async def apply(session: Optional[AsyncIOMotorClientSession]) -> Dict[str, Any]:
+            # Check for existing pending application to the SAME admin
+            existing_pending_application_to_same_admin = await self.request_collection.find_one({
+                "requester_id": hr_user.id,
+                "target_id": target_admin_id,
+                "request_type": "application",
+                "status": "pending_admin_approval"
+            }, session=session)
+            if existing_pending_application_to_same_admin:
+                logger.warning(f"HR user {hr_user.id} attempted to send a duplicate application to Admin {target_admin_id}.")
+                raise InvitationError(f"You already have a pending application to this Admin.")
+
+            now = datetime.now(timezone.utc)
+            # The HR's own document is written first: two concurrent applications by the same HR
+            # conflict here, and the retried one then sees the other's application above.
+            update_result = await self.user_collection.update_one(
+                {"_id": hr_user.id, "hr_status": {"$ne": "mapped"}},
+                {"$set": {"hr_status": "application_pending", "updated_at": now}},
+                session=session,
+            )
+            if update_result.matched_count == 0:
+                raise InvitationError("HR user is already mapped to an Admin and cannot send new applications.")
+
+            application_doc = {
+                "request_type": "application", "requester_id": hr_user.id, "requester_role": "hr",
+                "target_id": target_admin_id, "target_role": "admin", "status": "pending_admin_approval", # Updated status
+                "created_at": now, "updated_at": now
+            }
+            return await self.requests.insert(application_doc, session=session)
+
+        created_doc = await run_in_transaction(self.db.client, apply, "create_hr_application")
+        principal_cache.invalidate(user_id=hr_user.id)
         return HRMappingRequest.model_validate(created_doc)
 
 
@@ -161,20 +164,17 @@ class InvitationService:
             "target_id": target_hr_id, "target_role": "hr", "status": "request_pending_hr_approval", # Updated status
             "created_at": now, "updated_at": now
         }
-        insert_result = await self.request_collection.insert_one(request_doc)
-        if not insert_result.acknowledged:
-            raise InvitationError("Failed to create request record in database.")
-        created_doc = await self.request_collection.find_one({"_id": insert_result.inserted_id})
-        if not created_doc:
-             raise InvitationError("Failed to retrieve created request record.")
+        # The inserted document (with its new _id) is the record; no read-back
+        created_doc = await self.requests.insert(request_doc)
         
         update_result = await self.user_collection.update_one(
             {"_id": target_hr_id, "hr_status": "profile_complete"},
             {"$set": {"hr_status": "admin_request_pending", "updated_at": now}}
         )
+        principal_cache.invalidate(user_id=target_hr_id)
         if update_result.modified_count == 0: 
             logger.error(f"Failed to update HR user {target_hr_id} from 'profile_complete' to 'admin_request_pending'.")
-            await self.request_collection.delete_one({"_id": insert_result.inserted_id}) 
+            await self.request_collection.delete_one({"_id": created_doc["_id"]}) 
             raise InvitationError("Failed to update HR user status.")
         return HRMappingRequest.model_validate(created_doc)
 
@@ -203,21 +203,8 @@ class InvitationService:
 
     async def admin_process_hr_application(self, request_id: ObjectId, admin_user: User, action: Literal["approve", "reject"]) -> HRMappingRequest:
         logger.info(f"Admin {admin_user.id} attempting to '{action}' HR application {request_id}")
-        now = datetime.now(timezone.utc)
-
-        request_doc = await self.request_collection.find_one({
-            "_id": request_id,
-            "target_id": admin_user.id, # Admin is the target of an HR's application
-            "request_type": "application",
-            "status": "pending_admin_approval"
-        })
 
-        if not request_doc:
-            raise InvitationError(f"Application {request_id} not found for Admin {admin_user.id} or not in 'pending_admin_approval' state.")
-        
-        hr_applicant_id = request_doc["requester_id"]
         new_status: RequestMappingStatus
-
         if action == "approve":
             new_status = "admin_approved"
             # HR user status is not changed here, HR needs to confirm.
@@ -227,30 +214,38 @@ class InvitationService:
         else:
             raise InvitationError("Invalid action for processing HR application.")
 
-        update_result = await self.request_collection.update_one(
-            {"_id": request_id},
-            {"$set": {"status": new_status, "updated_at": now}}
-        )
-
-        if update_result.modified_count == 0:
-            raise InvitationError(f"Failed to update application {request_id} status to {new_status}.")
+        async def process(session: Optional[AsyncIOMotorClientSession]) -> Tuple[Dict[str, Any], bool]:
+            now = datetime.now(timezone.utc)
+            # Concurrent decisions on one application conflict on it; only the first finds it pending
+            updated_request_doc = await self.requests.update(
+                {
+                    "_id": request_id,
+                    "target_id": admin_user.id, # Admin is the target of an HR's application
+                    "request_type": "application",
+                    "status": "pending_admin_approval"
+                },
+                {"$set": {"status": new_status, "updated_at": now}},
+                session=session,
+            )
+            if updated_request_doc is None:
+                raise InvitationError(f"Application {request_id} not found for Admin {admin_user.id} or not in 'pending_admin_approval' state.")
 
-        if new_status == "admin_rejected":
+            hr_applicant_id = updated_request_doc["requester_id"]
+            hr_status_reset = False
             # If rejected, check if the HR has other active requests. If not, reset their status.
-            if not await self._check_hr_has_active_requests(hr_applicant_id):
-                hr_user_doc = await self.user_collection.find_one({"_id": hr_applicant_id})
-                if hr_user_doc and hr_user_doc.get("hr_status") == "application_pending":
-                    await self.user_collection.update_one(
-                        {"_id": hr_applicant_id},
-                        {"$set": {"hr_status": "profile_complete", "updated_at": now}}
-                    )
-                    logger.info(f"HR {hr_applicant_id} status reset to 'profile_complete' after application rejection.")
-        
-        updated_request_doc = await self.request_collection.find_one({"_id": request_id})
-        if not updated_request_doc:
-            # This should not happen if update was successful
-            logger.error(f"CRITICAL: Failed to re-fetch request {request_id} after admin action.")
-            raise InvitationError("Failed to retrieve request after update.")
+            if new_status == "admin_rejected" and not await self._check_hr_has_active_requests(hr_applicant_id, session=session):
+                reset_result = await self.user_collection.update_one(
+                    {"_id": hr_applicant_id, "hr_status": "application_pending"},
+                    {"$set": {"hr_status": "profile_complete", "updated_at": now}},
+                    session=session,
+                )
+                hr_status_reset = reset_result.modified_count > 0
+            return updated_request_doc, hr_status_reset
+
+        updated_request_doc, hr_status_reset = await run_in_transaction(self.db.client, process, "admin_process_hr_application")
+        if hr_status_reset:
+            principal_cache.invalidate(user_id=updated_request_doc["requester_id"])
+            logger.info(f"HR {updated_request_doc['requester_id']} status reset to 'profile_complete' after application rejection.")
         return HRMappingRequest.model_validate(updated_request_doc)
 
     async def hr_respond_to_admin_invitation(self, request_id: ObjectId, hr_user: User, action: Literal["accept", "reject"]) -> HRMappingRequest:
@@ -278,9 +273,10 @@ class InvitationService:
             
             # Map the HR
             hr_update_result = await self.user_collection.update_one(
-                {"_id": hr_user.id, "hr_status": {"ne": "mapped"}}, # Ensure not already mapped by some race condition
+                {"_id": hr_user.id, "hr_status": {"$ne": "mapped"}}, # Ensure not already mapped by some race condition
                 {"$set": {"hr_status": "mapped", "admin_manager_id": admin_inviter_id, "updated_at": now}}
             )
+            principal_cache.invalidate(user_id=hr_user.id)
             if hr_update_result.matched_count == 0:
                 # This could happen if HR status changed to mapped between check and update
                 logger.error(f"HR {hr_user.id} could not be mapped. Status might have changed or user not found.")
@@ -294,11 +290,11 @@ class InvitationService:
         else:
             raise InvitationError("Invalid action for responding to Admin invitation.")
 
-        update_result = await self.request_collection.update_one(
+        updated_request_doc = await self.requests.update(
             {"_id": request_id},
             {"$set": {"status": new_request_status, "updated_at": now}}
         )
-        if update_result.modified_count == 0:
+        if updated_request_doc is None:
             # If mapping happened but request status update failed, this is problematic.
             # For now, we'll rely on the HR status update being the critical part for "accept".
             raise InvitationError(f"Failed to update invitation {request_id} status to {new_request_status}.")
@@ -311,61 +307,54 @@ class InvitationService:
                         {"_id": hr_user.id},
                         {"$set": {"hr_status": "profile_complete", "updated_at": now}}
                     )
+                    principal_cache.invalidate(user_id=hr_user.id)
                     logger.info(f"HR {hr_user.id} status reset to 'profile_complete' after rejecting admin invitation.")
-        
-        updated_request_doc = await self.request_collection.find_one({"_id": request_id})
-        if not updated_request_doc:
-            logger.error(f"CRITICAL: Failed to re-fetch request {request_id} after HR response.")
-            raise InvitationError("Failed to retrieve request after update.")
+
         return HRMappingRequest.model_validate(updated_request_doc)
 
     async def hr_confirm_mapping_choice(self, request_id: ObjectId, hr_user: User) -> HRMappingRequest:
         logger.info(f"HR {hr_user.id} attempting to confirm mapping with Admin via application {request_id}")
-        now = datetime.now(timezone.utc)
 
         if hr_user.hr_status == "mapped":
             raise InvitationError(f"HR {hr_user.id} is already mapped and cannot confirm a new mapping without unmapping first.")
 
-        request_doc = await self.request_collection.find_one({
-            "_id": request_id,
-            "requester_id": hr_user.id, # HR is the requester of this application
-            "request_type": "application",
-            "status": "admin_approved" # Admin must have approved this application
-        })
+        async def confirm(session: Optional[AsyncIOMotorClientSession]) -> Dict[str, Any]:
+            now = datetime.now(timezone.utc)
+            request_doc = await self.request_collection.find_one({
+                "_id": request_id,
+                "requester_id": hr_user.id, # HR is the requester of this application
+                "request_type": "application",
+                "status": "admin_approved" # Admin must have approved this application
+            }, session=session)
+            if not request_doc:
+                raise InvitationError(f"Application {request_id} by HR {hr_user.id} not found or not in 'admin_approved' state.")
+
+            # Map the HR. Concurrent confirmations by the same HR conflict on this document, and
+            # the retried ones find the HR already mapped.
+            hr_update_result = await self.user_collection.update_one(
+                {"_id": hr_user.id, "hr_status": {"$ne": "mapped"}},
+                {"$set": {"hr_status": "mapped", "admin_manager_id": request_doc["target_id"], "updated_at": now}},
+                session=session,
+            )
+            if hr_update_result.matched_count == 0:
+                logger.warning(f"HR {hr_user.id} could not be mapped via {request_id}: already mapped or user not found.")
+                raise InvitationError("Failed to map HR user. User may already be mapped or state is inconsistent.")
 
-        if not request_doc:
-            raise InvitationError(f"Application {request_id} by HR {hr_user.id} not found or not in 'admin_approved' state.")
+            updated_request_doc = await self.requests.update(
+                {"_id": request_id, "status": "admin_approved"},
+                {"$set": {"status": "hr_confirmed_mapping", "updated_at": now}},
+                session=session,
+            )
+            if updated_request_doc is None:
+                raise InvitationError(f"Application {request_id} changed state while confirming the mapping.")
 
-        admin_to_map_with_id = request_doc["target_id"]
-        
-        # Map the HR
-        hr_update_result = await self.user_collection.update_one(
-            {"_id": hr_user.id, "hr_status": {"ne": "mapped"}}, # Ensure not already mapped
-            {"$set": {"hr_status": "mapped", "admin_manager_id": admin_to_map_with_id, "updated_at": now}}
-        )
-        if hr_update_result.matched_count == 0:
-            logger.error(f"HR {hr_user.id} could not be mapped. Status might have changed or user not found.")
-            raise InvitationError("Failed to map HR user. User may already be mapped or state is inconsistent.")
-        
-        logger.info(f"HR {hr_user.id} successfully mapped to Admin {admin_to_map_with_id} by confirming application {request_id}.")
-        
-        # Update the chosen request status
-        update_chosen_request = await self.request_collection.update_one(
-            {"_id": request_id},
-            {"$set": {"status": "hr_confirmed_mapping", "updated_at": now}}
-        )
-        if update_chosen_request.modified_count == 0:
-            # This is a critical inconsistency if mapping succeeded but request status didn't update.
-            # Potentially try to revert HR mapping or log for manual intervention.
-            logger.error(f"CRITICAL: Failed to update chosen request {request_id} to 'hr_confirmed_mapping' after HR was mapped.")
-            # For now, we proceed assuming HR mapping is the primary success indicator.
-            # A more robust solution might involve transactions if the DB supports them.
-
-        await self._supersede_other_requests_for_hr(hr_user.id, request_id)
-        
-        updated_request_doc = await self.request_collection.find_one({"_id": request_id})
-        if not updated_request_doc: # Should ideally not happen
-            raise InvitationError("Failed to retrieve the confirmed request after update.")
+            await self._supersede_other_requests_for_hr(hr_user.id, request_id, session=session)
+            return updated_request_doc
+
+        # One transaction: the mapping, the confirmed request and the superseded ones commit together
+        updated_request_doc = await run_in_transaction(self.db.client, confirm, "hr_confirm_mapping_choice")
+        principal_cache.invalidate(user_id=hr_user.id)
+        logger.info(f"HR {hr_user.id} successfully mapped to Admin {updated_request_doc['target_id']} by confirming application {request_id}.")
         return HRMappingRequest.model_validate(updated_request_doc)
 
     async def hr_cancel_application(self, request_id: ObjectId, hr_user: User) -> HRMappingRequest:
@@ -382,12 +371,12 @@ class InvitationService:
         if not request_doc:
             raise InvitationError(f"Application {request_id} by HR {hr_user.id} not found or not in 'pending_admin_approval' state to be cancelled.")
 
-        update_result = await self.request_collection.update_one(
-            {"_id": request_id},
+        updated_request_doc = await self.requests.update(
+            {"_id": request_id, "status": "pending_admin_approval"},
             {"$set": {"status": "hr_cancelled_application", "updated_at": now}}
         )
 
-        if update_result.modified_count == 0:
+        if updated_request_doc is None:
             raise InvitationError(f"Failed to update application {request_id} status to 'hr_cancelled_application'.")
 
         # Check if HR has other active requests. If not, reset their overall status.
@@ -399,14 +388,11 @@ class InvitationService:
                     {"_id": hr_user.id},
                     {"$set": {"hr_status": "profile_complete", "updated_at": now}}
                 )
+                 principal_cache.invalidate(user_id=hr_user.id)
                  logger.info(f"HR {hr_user.id} status reset to 'profile_complete' after cancelling application and no other active requests.")
             else:
                 logger.info(f"HR {hr_user.id} cancelled application, but status '{hr_user.hr_status}' not reset as it's not a pending one or no other active requests found.")
 
-
-        updated_request_doc = await self.request_collection.find_one({"_id": request_id})
-        if not updated_request_doc:
-             raise InvitationError("Failed to retrieve the cancelled application after update.")
         return HRMappingRequest.model_validate(updated_request_doc)
 
     async def reject_request_or_application(self, request_id: ObjectId, rejecting_user: User) -> bool:
@@ -474,6 +460,7 @@ class InvitationService:
             {"_id": hr_user.id, "hr_status": "mapped"},
             {"$set": {"hr_status": "profile_complete", "admin_manager_id": None, "updated_at": now}}
         )
+        principal_cache.invalidate(user_id=hr_user.id)
         if update_result.modified_count == 1:
             logger.info(f"HR {hr_user.id} successfully unmapped.")
             return True
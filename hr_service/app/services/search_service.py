@@ -8,6 +8,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from fastapi import HTTPException, status
 
 from ..db.mongodb import mongodb # Adjusted
+from ..db.resume_documents import LEGACY_USER_UNSET, resume_filter
 from ..core.config import settings # Adjusted
 from ..models.user import User, CandidateMappingStatus, HrStatus # Adjusted
 
@@ -72,14 +73,15 @@ class SearchService:
         query: Dict[str, Any] = {
             "role": "candidate", "mapping_status": "pending_assignment",
             "estimated_yoe": {"$exists": True}, "extracted_skills_list": {"$exists": True},
-            "resume_text": {"$ne": None},
+            **resume_filter(),
         }
-        projection: Optional[Dict[str, Any]] = None
+        # Not-yet-migrated user documents still carry the resume text; ranking never needs it
+        projection: Dict[str, Any] = {field: 0 for field in LEGACY_USER_UNSET}
         sort_criteria: List[Tuple[str, Any]] = [("updated_at", -1)]
 
         if keyword:
             query["$text"] = {"$search": keyword}
-            projection = {"mongo_score": {"$meta": "textScore"}}
+            projection["mongo_score"] = {"$meta": "textScore"}
             sort_criteria = [("mongo_score", {"$meta": "textScore"})]
 
         if yoe_min is not None:
@@ -94,7 +96,7 @@ class SearchService:
             else: query.update(skill_filter)
 
         try:
-            find_query = self.user_collection.find(query, projection=projection if projection else None)
+            find_query = self.user_collection.find(query, projection=projection)
             cursor = find_query.sort(sort_criteria).limit(limit * 3)
             candidates_to_rank = await cursor.to_list(length=None)
         except Exception as e:
@@ -141,16 +143,16 @@ class SearchService:
         if status_filter: query["hr_status"] = status_filter
         if yoe_min is not None: query["years_of_experience"] = {"$gte": yoe_min}
         
-        projection = None
+        projection: Dict[str, Any] = {field: 0 for field in LEGACY_USER_UNSET}
         sort_criteria: List[Tuple[str, Any]] = [("updated_at", -1)]
         if keyword:
-            query["resume_text"] = {"$ne": None}
+            query.update(resume_filter())
             query["$text"] = {"$search": keyword}
-            projection = {"mongo_score": {"$meta": "textScore"}}
+            projection["mongo_score"] = {"$meta": "textScore"}
             sort_criteria = [("mongo_score", {"$meta": "textScore"})]
 
         try:
-            find_query = self.user_collection.find(query, projection=projection if projection else None)
+            find_query = self.user_collection.find(query, projection=projection)
             cursor = find_query.sort(sort_criteria).limit(limit)
             hr_list_docs = await cursor.to_list(length=None)
         except Exception as e:
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.api.routes.hr import require_hr
+from app.core.principal_cache import principal_cache
+from app.core.security import CLAIMS_VERSION, create_access_token, get_current_user
+from app.models.user import Principal, User
+
+class FakeUsers:
+    def __init__(self, doc):
+        self.doc = doc
+        self.calls = []
+
+    async def find_one(self, query, projection=None, **kwargs):
+        self.calls.append((query, projection))
+        return dict(self.doc)
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = users
+
+    def __getitem__(self, name):
+        return self.users
+
+def _hr_doc(**overrides):
+    doc = {
+        "_id": ObjectId(), "email": "hr@example.com", "username": "hr1", "role": "hr", "hashed_password": "x" * 60,
+        "hr_status": "mapped", "admin_manager_id": ObjectId(), "token_version": 0,
+        "updated_at": datetime(2024, 5, 1, tzinfo=timezone.utc),
+    }
+    doc.update(overrides)
+    return doc
+
+def _claims_token(doc, **overrides):
+    claims = {
+        "sub": doc["email"], "role": doc["role"], "uid": str(doc["_id"]), "username": doc["username"],
+        "hr_status": doc["hr_status"], "admin_manager_id": str(doc["admin_manager_id"]),
+        "tv": doc["token_version"], "uat": doc["updated_at"].timestamp(), "cv": CLAIMS_VERSION, "typ": "access",
+    }
+    claims.update(overrides)
+    return create_access_token(claims)
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+async def test_current_claims_authorize_without_loading_the_user():
+    doc = _hr_doc()
+    users = FakeUsers(doc)
+
+    principal = await require_hr(await get_current_user(_claims_token(doc), FakeDB(users)), db=FakeDB(users))
+
+    assert isinstance(principal, Principal)
+    assert (principal.id, principal.hr_status, principal.admin_manager_id) == (doc["_id"], "mapped", doc["admin_manager_id"])
+    assert [projection for _, projection in users.calls] == [{"token_version": 1, "updated_at": 1}]
+
+async def test_stale_claims_load_the_user():
+    doc = _hr_doc(hr_status="profile_complete", admin_manager_id=None)
+    token = _claims_token({**doc, "admin_manager_id": ObjectId()}, hr_status="mapped", uat=(doc["updated_at"] - timedelta(minutes=5)).timestamp())
+
+    user = await get_current_user(token, FakeDB(FakeUsers(doc)))
+
+    assert isinstance(user, User) and user.hr_status == "profile_complete" and user.admin_manager_id is None
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.db import transactions
+from app.db.transactions import run_in_transaction
+
+class FakeSession:
+    def __init__(self, commit_errors=()):
+        self.in_transaction = False
+        self.started = 0
+        self.commits = 0
+        self.aborts = 0
+        self.commit_errors = list(commit_errors)
+
+    def start_transaction(self, **kwargs):
+        self.in_transaction = True
+        self.started += 1
+
+    async def commit_transaction(self):
+        if self.commit_errors:
+            raise self.commit_errors.pop(0)
+        self.in_transaction = False
+        self.commits += 1
+
+    async def abort_transaction(self):
+        self.in_transaction = False
+        self.aborts += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakeClient:
+    def __init__(self, session, hello):
+        self.session = session
+
+        async def command(name):
+            return hello
+        self.admin = SimpleNamespace(command=command)
+
+    async def start_session(self):
+        return self.session
+
+REPLICA_SET = {"setName": "rs0", "isWritablePrimary": True}
+
+def _transient():
+    return PyMongoError("WriteConflict", error_labels=["TransientTransactionError"])
+
+@pytest.fixture(autouse=True)
+def _reset_support_cache():
+    transactions._support.clear()
+    yield
+    transactions._support.clear()
+
+async def test_transient_errors_retry_the_whole_callback():
+    session = FakeSession()
+    calls = []
+
+    async def callback(s):
+        calls.append(s)
+        if len(calls) == 1:
+            raise _transient()
+        return "done"
+
+    assert await run_in_transaction(FakeClient(session, REPLICA_SET), callback, "test") == "done"
+    assert calls == [session, session]
+    assert (session.started, session.aborts, session.commits) == (2, 1, 1)
+
+async def test_business_errors_abort_without_retry():
+    session = FakeSession()
+
+    async def callback(s):
+        raise ValueError("not allowed")
+
+    with pytest.raises(ValueError):
+        await run_in_transaction(FakeClient(session, REPLICA_SET), callback, "test")
+    assert (session.started, session.aborts, session.commits) == (1, 1, 0)
+
+async def test_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "MONGODB_TRANSACTION_MAX_ATTEMPTS", 3)
+    session = FakeSession()
+
+    async def callback(s):
+        raise _transient()
+
+    with pytest.raises(PyMongoError):
+        await run_in_transaction(FakeClient(session, REPLICA_SET), callback, "test")
+    assert session.started == 3 and session.aborts == 3
+
+async def test_unknown_commit_result_retries_the_commit_only():
+    session = FakeSession(commit_errors=[PyMongoError("timeout", error_labels=["UnknownTransactionCommitResult"])])
+    calls = []
+
+    async def callback(s):
+        calls.append(s)
+        return 1
+
+    assert await run_in_transaction(FakeClient(session, REPLICA_SET), callback, "test") == 1
+    assert len(calls) == 1 and session.commits == 1
+
+async def test_standalone_runs_without_a_session():
+    session = FakeSession()
+
+    async def callback(s):
+        return s
+
+    assert await run_in_transaction(FakeClient(session, {"isWritablePrimary": True}), callback, "test") is None
+    assert session.started == 0
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.db.transactions import transactions_supported
+from app.models.user import User
+from app.services.invitation_service import InvitationError, InvitationService
+
+logger = logging.getLogger(__name__)
+
+HRS = 40
+ADMINS = 8
+APPLICATIONS_PER_HR = 4
+DUPLICATES = 2 # Concurrent copies of every call, racing on the same HR/request
+
+def _user(role: str, n: int, **extra) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(), "username": f"stress_{role}_{n}", "email": f"stress_{role}_{n}@example.com",
+        "hashed_password": "x", "role": role, "created_at": now, "updated_at": now, **extra,
+    }
+
+async def _race(calls):
+    """Runs the coroutines concurrently; returns (successes, InvitationErrors, elapsed seconds)."""
+    started = time.perf_counter()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    unexpected = [r for r in results if isinstance(r, BaseException) and not isinstance(r, InvitationError)]
+    assert not unexpected, unexpected[:3]
+    successes = [r for r in results if not isinstance(r, BaseException)]
+    return successes, len(results) - len(successes), elapsed
+
+@pytest.mark.asyncio
+async def test_mapping_flows_keep_invariants_under_contention(test_db_client_hr):
+    if not await transactions_supported(test_db_client_hr):
+        pytest.skip("Transactions need a replica set (docker-compose.replica-set.yml).")
+    db = test_db_client_hr[settings.MONGODB_DB]
+    users = db[settings.MONGODB_COLLECTION_USERS]
+    requests = db[settings.MONGODB_COLLECTION_HR_MAPPING_REQUESTS]
+    service = InvitationService(db=db)
+
+    admin_docs = [_user("admin", n) for n in range(ADMINS)]
+    hr_docs = [_user("hr", n, hr_status="profile_complete", years_of_experience=3.0) for n in range(HRS)]
+    await users.insert_many(admin_docs + hr_docs)
+    admins = [User.model_validate(doc) for doc in admin_docs]
+    hrs = [User.model_validate(doc) for doc in hr_docs]
+    admins_by_id = {admin.id: admin for admin in admins}
+    try:
+        # 1. Every HR applies to several admins, each application sent concurrently more than once
+        calls = [
+            service.create_hr_application(hr, admins[(i + k) % ADMINS].id)
+            for i, hr in enumerate(hrs) for k in range(APPLICATIONS_PER_HR) for _ in range(DUPLICATES)
+        ]
+        created, rejected, elapsed = await _race(calls)
+        logger.info(f"create_hr_application: {len(calls) / elapsed:.0f} calls/s ({len(created)} created, {rejected} duplicates rejected)")
+        assert len(created) == HRS * APPLICATIONS_PER_HR
+        pairs = Counter((doc["requester_id"], doc["target_id"]) async for doc in requests.find({"request_type": "application"}))
+        assert len(pairs) == HRS * APPLICATIONS_PER_HR and set(pairs.values()) == {1}
+        assert await users.count_documents({"role": "hr", "hr_status": "application_pending"}) == HRS
+
+        # 2. Admins approve and reject the same application at the same time; exactly one decision wins.
+        # The HR's first application is always approved so every HR has something to confirm.
+        applications = [doc async for doc in requests.find({"request_type": "application"})]
+        first_per_hr = {}
+        for doc in sorted(applications, key=lambda d: d["_id"]):
+            first_per_hr.setdefault(doc["requester_id"], doc["_id"])
+        calls = []
+        for doc in applications:
+            admin = admins_by_id[doc["target_id"]]
+            actions = ["approve"] * DUPLICATES if first_per_hr[doc["requester_id"]] == doc["_id"] else ["approve", "reject"] * DUPLICATES
+            calls += [service.admin_process_hr_application(doc["_id"], admin, action) for action in actions]
+        decided, lost, elapsed = await _race(calls)
+        logger.info(f"admin_process_hr_application: {len(calls) / elapsed:.0f} calls/s ({len(decided)} decisions, {lost} lost races)")
+        assert len(decided) == len(applications)
+        assert await requests.count_documents({"status": "pending_admin_approval"}) == 0
+
+        # 3. Each HR confirms all of its approved applications at once; exactly one mapping wins
+        approved = defaultdict(list)
+        async for doc in requests.find({"status": "admin_approved"}):
+            approved[doc["requester_id"]].append(doc["_id"])
+        hrs_by_id = {hr.id: hr for hr in hrs}
+        calls = [
+            service.hr_confirm_mapping_choice(request_id, hrs_by_id[hr_id].model_copy(update={"hr_status": "application_pending"}))
+            for hr_id, request_ids in approved.items() for request_id in request_ids for _ in range(DUPLICATES)
+        ]
+        confirmed, lost, elapsed = await _race(calls)
+        logger.info(f"hr_confirm_mapping_choice: {len(calls) / elapsed:.0f} calls/s ({len(confirmed)} mappings, {lost} lost races)")
+        assert len(confirmed) == HRS
+
+        # Invariants: every HR is mapped to exactly the admin of its one confirmed application,
+        # and none of its other applications is still active
+        confirmed_by_hr = defaultdict(list)
+        async for doc in requests.find({"status": "hr_confirmed_mapping"}):
+            confirmed_by_hr[doc["requester_id"]].append(doc)
+        async for hr_doc in users.find({"role": "hr", "username": {"$regex": "^stress_"}}):
+            assert hr_doc["hr_status"] == "mapped"
+            assert len(confirmed_by_hr[hr_doc["_id"]]) == 1
+            assert hr_doc["admin_manager_id"] == confirmed_by_hr[hr_doc["_id"]][0]["target_id"]
+        assert await requests.count_documents({"status": {"$in": ["pending_admin_approval", "admin_approved"]}}) == 0
+    finally:
+        await users.delete_many({"username": {"$regex": "^stress_"}})
+        await requests.delete_many({"requester_id": {"$in": [hr["_id"] for hr in hr_docs]}})
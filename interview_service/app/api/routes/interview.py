@@ -1,8 +1,11 @@
 # LLM_interviewer/server/app/api/routes/interview.py
 
 import logging
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional, Dict, Any
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, Set, Tuple
 from app.schemas.interview import ( # Adjusted
     QuestionOut, InterviewCreate, InterviewOut,
     SingleResponseSubmit,
@@ -10,19 +13,26 @@ from app.schemas.interview import ( # Adjusted
     InterviewResultOut, SubmitAnswersRequest, AnswerItem,
     InterviewResultSubmit, ResponseFeedbackItem
 )
-from app.core.security import get_current_active_user # Adjusted
-# Import User model to check roles, statuses, and assigned IDs
-from app.models.user import User, CandidateMappingStatus, HrStatus # Adjusted
+from app.core.security import get_current_active_user, verify_admin_user # Adjusted
+# Import the principal model to check roles, statuses, and assigned IDs
+from app.models.user import Principal, CandidateMappingStatus, HrStatus # Adjusted
 # Import UserOut for dependency type hint where appropriate
 from app.schemas.user import UserOut, PyObjectIdStr # Adjusted
 from app.db.mongodb import mongodb # Adjusted
+from app.db.pool import LISTING, causal_tokens
+from app.db.repository import DocumentCodec, Repository
+from app.db.resume_documents import ResumeDocuments
+from app.core.fast_json import FastJSONResponse
 from app.core.config import settings # Adjusted
 from app.services.gemini_service import gemini_service, GeminiServiceError # Adjusted
+from app.services.question_pool_service import question_pool_service
+from app.services.llm_metrics import llm_metrics
 from uuid import uuid4
 from datetime import datetime, timezone
 from bson import ObjectId
 from bson.errors import InvalidId
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from pymongo import UpdateOne
 import asyncio # Import asyncio for placeholder sleeps
 
 # Configure logging
@@ -31,6 +41,19 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/interview", tags=["Interview"])
 
+# Shorter answers are not sent to the LLM for evaluation
+MIN_AI_EVALUATION_ANSWER_CHARS = 10
+# Streamed evaluations are written in bulk every this many arrivals (and once at the end)
+STREAMED_EVALUATION_FLUSH_SIZE = 5
+
+# Writes that must outlive the request that started them, e.g. after a client disconnect
+_detached_writes: Set[asyncio.Task] = set()
+
+# Listings decode documents straight to response JSON instead of validating every row
+QUESTION_CODEC = DocumentCodec(QuestionOut)
+INTERVIEW_CODEC = DocumentCodec(InterviewOut)
+RESPONSE_CODEC = DocumentCodec(InterviewResponseOut)
+
 # --- Helper function to Get ObjectId ---
 def get_object_id(id_str: str) -> ObjectId:
     try:
@@ -40,49 +63,28 @@ def get_object_id(id_str: str) -> ObjectId:
         logger.error(f"Invalid ObjectId format: '{id_str}'. Error: {e}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid ID format: {id_str}")
 
+def get_listing_db():
+    """Database handle with the listing read profile (secondaries within maxStalenessSeconds)."""
+    return mongodb.get_db_for(LISTING)
+
 # --- Helper Dependencies for Role Checks ---
+# Admin-only routes
+require_admin = verify_admin_user
+
 # Combined HR/Admin check for routes accessible by both
-async def require_hr_or_admin(current_user_dep: User = Depends(get_current_active_user)):
-    """Dependency ensuring user is HR or Admin. Fetches full User doc."""
+async def require_hr_or_admin(current_user_dep: Principal = Depends(get_current_active_user)) -> Principal:
+    """Dependency ensuring user is HR or Admin. The principal carries hr_status from the token claims."""
     if current_user_dep.role not in ["hr", "admin"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation not permitted. HR or Admin privileges required.")
-    # Fetch full doc for potential checks within routes
-    db = mongodb.get_db()
-    user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": get_object_id(current_user_dep.id)})
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="Authenticated user not found in database.")
-    
-    logger.debug(f"require_hr_or_admin: Fetched user_doc for {current_user_dep.id}: {user_doc}")
-
-    # Convert string OIDs to ObjectId before Pydantic validation
-    if "admin_manager_id" in user_doc and isinstance(user_doc["admin_manager_id"], str):
-        try:
-            user_doc["admin_manager_id"] = ObjectId(user_doc["admin_manager_id"])
-        except Exception:
-            logger.error(f"Invalid ObjectId string for admin_manager_id in require_hr_or_admin: {user_doc['admin_manager_id']}")
-            pass # Let Pydantic validation fail it if it's truly invalid.
-            
-    if "assigned_hr_id" in user_doc and isinstance(user_doc["assigned_hr_id"], str): # For completeness
-        try:
-            user_doc["assigned_hr_id"] = ObjectId(user_doc["assigned_hr_id"])
-        except Exception:
-            pass
-    
-    validated_user = User.model_validate(user_doc)
-    logger.debug(f"require_hr_or_admin: Validated user {validated_user.id} has role {validated_user.role} and hr_status {validated_user.hr_status if validated_user.role == 'hr' else 'N/A'}")
-    return validated_user
-
-
-# Candidate check (fetches full doc - reused from candidates.py logic conceptually)
-async def require_candidate(current_user_dep: User = Depends(get_current_active_user)):
-    """Dependency ensuring user is Candidate. Fetches full User doc."""
+    return current_user_dep
+
+
+# Candidate check
+async def require_candidate(current_user_dep: Principal = Depends(get_current_active_user)) -> Principal:
+    """Dependency ensuring user is Candidate. The principal carries mapping_status and assigned_hr_id from the token claims."""
     if current_user_dep.role != "candidate":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation not permitted. Candidate role required.")
-    db = mongodb.get_db()
-    user_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one({"_id": get_object_id(current_user_dep.id)})
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="Candidate user not found in database.")
-    return User.model_validate(user_doc)
+    return current_user_dep
 # --- End Helper Dependencies ---
 
 
@@ -91,46 +93,57 @@ async def get_default_questions_endpoint(db: AsyncIOMotorClient = Depends(mongod
     # No changes needed here
     logger.info("Request received for default questions.")
     try:
-        questions_cursor = db[settings.MONGODB_COLLECTION_QUESTIONS].find()
-        questions = await questions_cursor.to_list(length=None)
+        # Pooled (pre-generated) questions share the collection but are not default questions
+        questions = await Repository.for_setting(db, "MONGODB_COLLECTION_QUESTIONS").find_decoded(
+            {"pool_key": {"$exists": False}}, QUESTION_CODEC
+        )
         if not questions:
             logger.info("No default questions found in the database.")
             return []
         logger.info(f"Found {len(questions)} default questions.")
-        return [ QuestionOut.model_validate(q) for q in questions ]
+        return FastJSONResponse(questions)
     except Exception as e:
         logger.error(f"Error fetching default questions: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not fetch default questions.")
 
 
-@router.post("/schedule", response_model=InterviewOut, status_code=status.HTTP_201_CREATED, tags=["Scheduling"])
-async def schedule_interview(
-    interview_data: InterviewCreate,
-    # Use dependency that returns the full User model
-    requesting_user: User = Depends(require_hr_or_admin),
+@router.get("/metrics/llm", response_model=List[Dict[str, Any]], tags=["Admin & HR View"])
+async def get_llm_metrics(
+    since: Optional[datetime] = None,
+    current_user: UserOut = Depends(require_admin),
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
+    """LLM call counts, token usage and latency aggregated per endpoint and operation (Admin only)."""
+    try:
+        return await llm_metrics.aggregate_by_endpoint(db, since=since)
+    except Exception as e:
+        logger.error(f"Error aggregating LLM metrics: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not aggregate LLM metrics.")
+
+
+async def _validate_candidate_for_scheduling(
+    db: AsyncIOMotorClient,
+    candidate_id: str,
+    requesting_user: Principal
+) -> Tuple[ObjectId, Optional[str]]:
     """
-    Schedules an interview (HR/Admin only).
-    Checks if the candidate is in the 'assigned' state and if the requesting HR
+    Checks that the candidate is in the 'assigned' state and that the requesting HR
     is the assigned HR (Admins bypass this specific HR check).
+    Returns the candidate ObjectId and the candidate's resume text (if any).
     """
-    logger.info(f"User {requesting_user.username} attempting to schedule interview for candidate {interview_data.candidate_id}")
-    candidate_resume_text: Optional[str] = None
-
-    # --- Validate Candidate ID and Status ---
     try:
-        candidate_object_id = get_object_id(str(interview_data.candidate_id))
+        candidate_object_id = get_object_id(str(candidate_id))
         candidate_doc = await db[settings.MONGODB_COLLECTION_USERS].find_one(
-            {"_id": candidate_object_id, "role": "candidate"}
+            {"_id": candidate_object_id, "role": "candidate"},
+            {"mapping_status": 1, "assigned_hr_id": 1, "resume_text": 1}, # resume_text only until the resume migration is done
         )
         if not candidate_doc:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Candidate user with ID {interview_data.candidate_id} not found.")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Candidate user with ID {candidate_id} not found.")
 
         # Validate candidate status
         candidate_status = candidate_doc.get("mapping_status")
         if candidate_status != "assigned":
-            logger.warning(f"Scheduling denied: Candidate {interview_data.candidate_id} status is '{candidate_status}', required 'assigned'.")
+            logger.warning(f"Scheduling denied: Candidate {candidate_id} status is '{candidate_status}', required 'assigned'.")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Cannot schedule interview: Candidate is not in the required 'assigned' state (Current: {candidate_status})."
@@ -157,63 +170,53 @@ async def schedule_interview(
                  )
         # Admins can schedule for any assigned candidate
 
-        candidate_resume_text = candidate_doc.get("resume_text")
+        candidate_resume_text = await ResumeDocuments(db).get_text(candidate_object_id, candidate_doc)
         logger.info(f"Candidate {candidate_object_id} validated (status: 'assigned'). Resume text found: {bool(candidate_resume_text)}")
+        return candidate_object_id, candidate_resume_text
 
     except HTTPException:
         raise # Re-raise validation errors
     except Exception as e:
         logger.error(f"Error validating candidate during scheduling: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error processing candidate details.")
-    # --- End Validation ---
 
-    # --- Question Generation (remains largely the same) ---
-    logger.info(f"Generating questions for role '{interview_data.role}' and tech stack {interview_data.tech_stack}")
-    generated_questions_data = []
+
+def _to_interview_question(q_data: Any) -> Optional[Dict[str, Any]]:
+    """
+    Shapes a pooled or generated question into the form embedded in interview documents.
+    Returns None for anything that is not a JSON object (e.g. stray strings in LLM output).
+    """
+    if not isinstance(q_data, dict):
+        logger.warning(f"Skipping malformed question of type {type(q_data).__name__}: {str(q_data)[:200]}")
+        return None
+    return {"question_id": str(uuid4()), "text": q_data.get("text", "Generated question - text missing"), "category": q_data.get("category", "Generated"), "difficulty": q_data.get("difficulty", "Medium")}
+
+
+async def _fetch_default_questions(db: AsyncIOMotorClient) -> List[Dict[str, Any]]:
+    logger.info("Fetching default questions from database.")
     try:
-        generated_questions_data = await gemini_service.generate_questions(
-                job_title=interview_data.job_title,
-                job_description=interview_data.job_description,
-                num_questions=5,
-                resume_text=candidate_resume_text
-            )
-        if generated_questions_data:
-            logger.info(f"Generated {len(generated_questions_data)} questions (resume context: {bool(candidate_resume_text)}).")
-        else:
-            logger.warning("Gemini service returned no questions. Falling back to defaults.")
-    except GeminiServiceError as e: # Catch specific Gemini error
-        logger.error(f"Gemini question generation failed: {e}. Falling back to defaults.", exc_info=True)
-        generated_questions_data = []
-    except Exception as e: # Catch other unexpected errors
-        logger.error(f"Unexpected error during Gemini question generation: {e}. Falling back to defaults.", exc_info=True)
-        generated_questions_data = []
-
-
-    questions = []
-    if not generated_questions_data:
-        logger.info("Fetching default questions from database.")
-        try:
-            default_questions_cursor = db[settings.MONGODB_COLLECTION_QUESTIONS].find().limit(5)
-            default_questions = await default_questions_cursor.to_list(length=5)
-            if default_questions:
-                questions = [
-                    {"question_id": str(q['_id']), "text": q.get("text", "N/A"), "category": q.get("category", "Default"), "difficulty": q.get("difficulty", "Medium")}
-                    for q in default_questions
-                ]
-                logger.info(f"Using {len(questions)} default questions.")
-            else:
-                logger.error("No questions generated by LLM and no default questions found in DB.")
-                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No questions available for interview.")
-        except Exception as e:
-            logger.error(f"Error accessing default questions: {e}", exc_info=True)
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error accessing default questions.")
-    else:
-        questions = [
-            {"question_id": str(uuid4()), "text": q_data.get("text", "Generated question - text missing"), "category": q_data.get("category", "Generated"), "difficulty": q_data.get("difficulty", "Medium")}
-            for q_data in generated_questions_data
-        ]
-
-    # --- Prepare and Insert Interview Document (remains largely the same) ---
+        default_questions_cursor = db[settings.MONGODB_COLLECTION_QUESTIONS].find({"pool_key": {"$exists": False}}).limit(5)
+        default_questions = await default_questions_cursor.to_list(length=5)
+    except Exception as e:
+        logger.error(f"Error accessing default questions: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error accessing default questions.")
+    if not default_questions:
+        logger.error("No questions generated by LLM and no default questions found in DB.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No questions available for interview.")
+    logger.info(f"Using {len(default_questions)} default questions.")
+    return [
+        {"question_id": str(q['_id']), "text": q.get("text", "N/A"), "category": q.get("category", "Default"), "difficulty": q.get("difficulty", "Medium")}
+        for q in default_questions
+    ]
+
+
+async def _insert_scheduled_interview(
+    db: AsyncIOMotorClient,
+    interview_data: InterviewCreate,
+    requesting_user: Principal,
+    candidate_object_id: ObjectId,
+    questions: List[Dict[str, Any]]
+) -> InterviewOut:
     interview_doc = interview_data.model_dump(exclude={"candidate_id"}) # Exclude candidate_id from model dump as we use the validated ObjectId
     interview_doc["interview_id"] = str(uuid4())
     interview_doc["hr_id"] = requesting_user.id # Use requesting user's ObjectId
@@ -230,19 +233,171 @@ async def schedule_interview(
     interview_doc["evaluated_at"] = None
 
     try:
-        result = await db[settings.MONGODB_COLLECTION_INTERVIEWS].insert_one(interview_doc)
-        created_interview = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one({"_id": result.inserted_id})
-
-        if created_interview:
-            logger.info(f"Interview {created_interview['interview_id']} scheduled successfully for candidate {candidate_object_id} by user {requesting_user.username}.")
-            return InterviewOut.model_validate(created_interview)
-        else:
-            logger.error(f"Failed to retrieve created interview with DB ID {result.inserted_id} immediately after insert.")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve created interview.")
+        created_interview = await Repository.for_setting(db, "MONGODB_COLLECTION_INTERVIEWS").insert(interview_doc)
+        logger.info(f"Interview {created_interview['interview_id']} scheduled successfully for candidate {candidate_object_id} by user {requesting_user.username}.")
+        return InterviewOut.model_validate(created_interview)
     except Exception as e:
         logger.error(f"Error inserting scheduled interview into DB: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error occurred while scheduling interview.")
 
+
+async def _draw_pooled_questions(db: AsyncIOMotorClient, job_title: str, num_questions: int, has_resume: bool) -> List[Dict[str, Any]]:
+    """
+    Draws generic questions from the pre-generated pool, leaving room for resume-tailored ones.
+    Pools are keyed by job title only (default category and difficulty) and generated without a
+    job description, so a pooled question may have been generated for another interview with
+    the same title but a different description.
+    """
+    if not settings.QUESTION_POOL_ENABLED:
+        return []
+    tailored_count = min(settings.QUESTION_POOL_TAILORED_QUESTIONS, num_questions) if has_resume else 0
+    try:
+        return await question_pool_service.draw(db, job_title=job_title, count=num_questions - tailored_count)
+    except Exception as e:
+        logger.error(f"Failed to draw questions from pool: {e}. Generating live instead.", exc_info=True)
+        return []
+
+
+def _run_detached(coro) -> None:
+    """Runs `coro` as a task that a cancelled request does not take down with it."""
+    task = asyncio.create_task(coro)
+    _detached_writes.add(task)
+    task.add_done_callback(_detached_writes.discard)
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """Formats one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/schedule", response_model=InterviewOut, status_code=status.HTTP_201_CREATED, tags=["Scheduling"])
+async def schedule_interview(
+    interview_data: InterviewCreate,
+    # Principal with hr_status from the token claims
+    requesting_user: Principal = Depends(require_hr_or_admin),
+    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+):
+    """
+    Schedules an interview (HR/Admin only).
+    Checks if the candidate is in the 'assigned' state and if the requesting HR
+    is the assigned HR (Admins bypass this specific HR check).
+    """
+    logger.info(f"User {requesting_user.username} attempting to schedule interview for candidate {interview_data.candidate_id}")
+    candidate_object_id, candidate_resume_text = await _validate_candidate_for_scheduling(db, interview_data.candidate_id, requesting_user)
+
+    # --- Question Generation ---
+    # Generic questions are drawn from the pre-generated pool; only resume-tailored ones
+    # (and any shortfall when the pool runs dry) are generated live by the LLM.
+    logger.info(f"Generating questions for role '{interview_data.role}' and tech stack {interview_data.tech_stack}")
+    num_questions = 5
+    pooled_questions_data = await _draw_pooled_questions(db, interview_data.job_title, num_questions, bool(candidate_resume_text))
+
+    generated_questions_data = []
+    live_count = num_questions - len(pooled_questions_data)
+    if live_count > 0:
+        try:
+            generated_questions_data = await gemini_service.generate_questions(
+                    job_title=interview_data.job_title,
+                    job_description=interview_data.job_description,
+                    num_questions=live_count,
+                    resume_text=candidate_resume_text
+                )
+            if generated_questions_data:
+                logger.info(f"Generated {len(generated_questions_data)} questions live (resume context: {bool(candidate_resume_text)}).")
+            else:
+                logger.warning("Gemini service returned no questions.")
+        except GeminiServiceError as e: # Catch specific Gemini error
+            logger.error(f"Gemini question generation failed: {e}.", exc_info=True)
+            generated_questions_data = []
+        except Exception as e: # Catch other unexpected errors
+            logger.error(f"Unexpected error during Gemini question generation: {e}.", exc_info=True)
+            generated_questions_data = []
+    generated_questions_data = pooled_questions_data + (generated_questions_data or [])
+
+    questions = [question for question in map(_to_interview_question, generated_questions_data) if question is not None]
+    if not questions:
+        logger.warning("No pooled or generated questions available. Falling back to defaults.")
+        questions = await _fetch_default_questions(db)
+
+    try:
+        return await _insert_scheduled_interview(db, interview_data, requesting_user, candidate_object_id, questions)
+    except BaseException:
+        # Drawn questions have left the pool; put them back if no interview got them
+        question_pool_service.release(db, interview_data.job_title, pooled_questions_data)
+        raise
+
+
+@router.post("/schedule/stream", tags=["Scheduling"])
+async def schedule_interview_stream(
+    interview_data: InterviewCreate,
+    requesting_user: Principal = Depends(require_hr_or_admin),
+    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+):
+    """
+    Streaming variant of /schedule using server-sent events (HR/Admin only).
+    Emits a 'question' event for every question as soon as it is available (pooled questions
+    first, then each live-generated question as its JSON object closes), then persists the
+    interview and emits a final 'interview' event. Failures after streaming starts are
+    reported as an 'error' event; pooled questions are returned to the pool whenever the
+    interview was not inserted (including a client disconnect).
+    """
+    logger.info(f"User {requesting_user.username} attempting to schedule (streamed) interview for candidate {interview_data.candidate_id}")
+    # Validation runs before the stream opens so that errors keep their HTTP status codes
+    candidate_object_id, candidate_resume_text = await _validate_candidate_for_scheduling(db, interview_data.candidate_id, requesting_user)
+
+    async def event_stream():
+        num_questions = 5
+        questions: List[Dict[str, Any]] = []
+        pooled_questions_data: List[Dict[str, Any]] = []
+        created_interview: Optional[InterviewOut] = None
+        try:
+            pooled_questions_data = await _draw_pooled_questions(db, interview_data.job_title, num_questions, bool(candidate_resume_text))
+            for q_data in pooled_questions_data:
+                question = _to_interview_question(q_data)
+                if question is None:
+                    continue
+                questions.append(question)
+                yield _sse_event("question", question)
+
+            live_count = num_questions - len(questions)
+            if live_count > 0:
+                try:
+                    async for q_data in gemini_service.stream_questions(
+                        job_title=interview_data.job_title,
+                        job_description=interview_data.job_description,
+                        num_questions=live_count,
+                        resume_text=candidate_resume_text
+                    ):
+                        if len(questions) >= num_questions:
+                            break
+                        question = _to_interview_question(q_data)
+                        if question is None:
+                            continue
+                        questions.append(question)
+                        yield _sse_event("question", question)
+                except GeminiServiceError as e:
+                    logger.error(f"Streamed Gemini question generation failed: {e}.", exc_info=True)
+
+            if not questions:
+                logger.warning("No pooled or streamed questions available. Falling back to defaults.")
+                questions = await _fetch_default_questions(db)
+                for question in questions:
+                    yield _sse_event("question", question)
+
+            created_interview = await _insert_scheduled_interview(db, interview_data, requesting_user, candidate_object_id, questions)
+            yield _sse_event("interview", created_interview)
+        except HTTPException as e:
+            yield _sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Unexpected error during streamed scheduling: {e}", exc_info=True)
+            yield _sse_event("error", {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": "Unexpected error while scheduling interview."})
+        finally:
+            if created_interview is None:
+                # Failed or the client went away before the insert: drawn questions go back to the pool
+                question_pool_service.release(db, interview_data.job_title, pooled_questions_data)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # --- Other Endpoints ---
 # (Reviewing other endpoints for necessary changes based on new status fields/logic)
 # - /all, /results/all: No change needed, filtering by status is fine. Access is HR/Admin.
@@ -258,10 +413,10 @@ async def schedule_interview(
 # --- GET /all (No changes needed) ---
 @router.get("/all", response_model=List[InterviewOut], tags=["Admin & HR View"])
 async def get_all_interviews(
-    # Dependency returns User model instance
-    current_user: User = Depends(require_hr_or_admin),
+    current_user: Principal = Depends(require_hr_or_admin),
     status_filter: Optional[str] = None,
-    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+    db: AsyncIOMotorClient = Depends(get_listing_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (implementation remains the same) ...
     logger.info(f"User {current_user.username} requesting all interviews. Status filter: {status_filter}")
@@ -269,11 +424,10 @@ async def get_all_interviews(
     if status_filter:
         query["status"] = status_filter
     try:
-        interviews_cursor = db[settings.MONGODB_COLLECTION_INTERVIEWS].find(query)
-        interviews = await interviews_cursor.to_list(length=None)
+        causal_tokens.resume(current_user.id, session) # Reflect this user's own recent writes
+        interviews = await Repository.for_setting(db, "MONGODB_COLLECTION_INTERVIEWS").find_decoded(query, INTERVIEW_CODEC, session=session)
         logger.info(f"Found {len(interviews)} interviews matching filter.")
-        response_list = [InterviewOut.model_validate(interview) for interview in interviews]
-        return response_list
+        return FastJSONResponse(interviews)
     except Exception as e:
         logger.error(f"Error fetching all interviews: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not retrieve interviews.")
@@ -282,17 +436,17 @@ async def get_all_interviews(
 # --- GET /results/all (No changes needed) ---
 @router.get("/results/all", response_model=List[InterviewOut], tags=["Admin & HR View"])
 async def get_all_completed_interviews(
-    current_user: User = Depends(require_hr_or_admin),
-    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+    current_user: Principal = Depends(require_hr_or_admin),
+    db: AsyncIOMotorClient = Depends(get_listing_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (implementation remains the same) ...
     logger.info(f"User {current_user.username} requesting all completed interview results.")
     try:
-        interviews_cursor = db[settings.MONGODB_COLLECTION_INTERVIEWS].find({"status": "completed"})
-        interviews = await interviews_cursor.to_list(length=None)
+        causal_tokens.resume(current_user.id, session)
+        interviews = await Repository.for_setting(db, "MONGODB_COLLECTION_INTERVIEWS").find_decoded({"status": "completed"}, INTERVIEW_CODEC, session=session)
         logger.info(f"Found {len(interviews)} completed interviews.")
-        response_list = [InterviewOut.model_validate(interview) for interview in interviews]
-        return response_list
+        return FastJSONResponse(interviews)
     except Exception as e:
         logger.error(f"Error fetching all completed interviews: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not retrieve completed interviews.")
@@ -301,13 +455,13 @@ async def get_all_completed_interviews(
 @router.post("/submit-response", response_model=InterviewResponseOut, status_code=status.HTTP_201_CREATED, tags=["Candidate Actions"])
 async def submit_response(
     response_data: SingleResponseSubmit,
-    candidate_user: User = Depends(require_candidate), # Fetches full User model
+    candidate_user: Principal = Depends(require_candidate),
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     # ... (implementation remains the same - candidate submits answer to scheduled interview) ...
     logger.info(f"Candidate {candidate_user.username} submitting single response for interview {response_data.interview_id}, question {response_data.question_id}")
     try:
-        candidate_oid = candidate_user.id # Get ObjectId from User model
+        candidate_oid = candidate_user.id # ObjectId from the principal
         logger.debug(f"submit_response: Attempting to find interview with interview_id: {response_data.interview_id}, candidate_id: {candidate_oid}")
         interview = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one({"interview_id": response_data.interview_id, "candidate_id": candidate_oid, "status": {"$ne": "completed"}})
         
@@ -341,14 +495,11 @@ async def submit_response(
             "evaluated_at": None,
         }
 
-        await db[settings.MONGODB_COLLECTION_RESPONSES].update_one(
+        saved_response = await Repository.for_setting(db, "MONGODB_COLLECTION_RESPONSES").update(
             {"interview_id": response_data.interview_id, "question_id": response_data.question_id, "candidate_id": candidate_oid},
             {"$set": response_doc},
             upsert=True
         )
-        saved_response = await db[settings.MONGODB_COLLECTION_RESPONSES].find_one(
-            {"interview_id": response_data.interview_id, "question_id": response_data.question_id, "candidate_id": candidate_oid}
-        )
         if not saved_response:
             logger.error(f"Failed to save/retrieve response for interview {response_data.interview_id}, question {response_data.question_id}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save/retrieve response.")
@@ -378,8 +529,9 @@ async def submit_response(
 @router.post("/submit-all", status_code=status.HTTP_200_OK, tags=["Candidate Actions"])
 async def submit_all_responses(
     submission: SubmitAnswersRequest,
-    candidate_user: User = Depends(require_candidate), # Fetches full User model
-    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+    candidate_user: Principal = Depends(require_candidate),
+    db: AsyncIOMotorClient = Depends(mongodb.get_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (implementation remains the same - candidate submits all answers to scheduled interview) ...
     interview_id = submission.interview_id
@@ -400,7 +552,7 @@ async def submit_all_responses(
                     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Interview found but cannot be submitted (Status: {any_interview.get('status')}).")
 
         delete_filter = {"interview_id": interview_id, "candidate_id": candidate_oid}
-        delete_result = await db[settings.MONGODB_COLLECTION_RESPONSES].delete_many(delete_filter)
+        delete_result = await db[settings.MONGODB_COLLECTION_RESPONSES].delete_many(delete_filter, session=session)
         logger.info(f"Deleted {delete_result.deleted_count} existing responses for interview {interview_id} before inserting new ones.")
 
         responses_to_insert = []
@@ -429,7 +581,7 @@ async def submit_all_responses(
             responses_to_insert.append(response_doc)
 
         if responses_to_insert:
-            insert_result = await db[settings.MONGODB_COLLECTION_RESPONSES].insert_many(responses_to_insert)
+            insert_result = await db[settings.MONGODB_COLLECTION_RESPONSES].insert_many(responses_to_insert, session=session)
             logger.info(f"Inserted {len(insert_result.inserted_ids)} new responses for interview {interview_id}.")
         else:
             logger.warning(f"No valid responses provided or matched questions in the submission payload for interview {interview_id}.")
@@ -437,8 +589,10 @@ async def submit_all_responses(
         completion_time = datetime.now(timezone.utc)
         update_result = await db[settings.MONGODB_COLLECTION_INTERVIEWS].update_one(
             {"_id": interview["_id"]},
-            {"$set": {"status": "completed", "completed_at": completion_time, "updated_at": completion_time}}
+            {"$set": {"status": "completed", "completed_at": completion_time, "updated_at": completion_time}},
+            session=session,
         )
+        causal_tokens.remember(candidate_oid, session)
         if update_result.modified_count == 1:
             logger.info(f"Interview {interview_id} marked as completed at {completion_time}.")
         else:
@@ -456,14 +610,16 @@ async def submit_all_responses(
 # --- GET /candidate/me (No changes needed) ---
 @router.get("/candidate/me", response_model=List[InterviewOut], tags=["Candidate Actions"])
 async def get_my_interviews(
-    candidate_user: User = Depends(require_candidate), # Fetches full User model
-    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+    candidate_user: Principal = Depends(require_candidate),
+    db: AsyncIOMotorClient = Depends(get_listing_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (implementation remains the same) ...
     logger.info(f"Candidate {candidate_user.username} requesting their interviews.")
     try:
         candidate_oid = candidate_user.id
-        interviews_cursor = db[settings.MONGODB_COLLECTION_INTERVIEWS].find({"candidate_id": candidate_oid})
+        causal_tokens.resume(candidate_oid, session)
+        interviews_cursor = db[settings.MONGODB_COLLECTION_INTERVIEWS].find({"candidate_id": candidate_oid}, session=session)
         interviews = await interviews_cursor.to_list(length=None)
         logger.info(f"Found {len(interviews)} interviews for candidate {candidate_user.username}.")
         response_list = [InterviewOut.model_validate(interview) for interview in interviews]
@@ -476,16 +632,19 @@ async def get_my_interviews(
 # --- GET /candidate/history (No changes needed) ---
 @router.get("/candidate/history", response_model=List[Dict[str, Any]], tags=["Candidate Actions"])
 async def get_candidate_interview_history(
-    candidate_user: User = Depends(require_candidate), # Fetches full User model
-    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+    candidate_user: Principal = Depends(require_candidate),
+    db: AsyncIOMotorClient = Depends(get_listing_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (implementation remains the same) ...
     logger.info(f"Fetching interview history for candidate {candidate_user.username}")
     candidate_oid = candidate_user.id
     try:
+        causal_tokens.resume(candidate_oid, session) # A just-submitted interview shows up even on a lagging secondary
         completed_interviews_cursor = db[settings.MONGODB_COLLECTION_INTERVIEWS].find(
             {"candidate_id": candidate_oid, "status": "completed"},
-            sort=[("completed_at", -1)]
+            sort=[("completed_at", -1)],
+            session=session,
         )
         completed_interviews = await completed_interviews_cursor.to_list(length=None)
         if not completed_interviews:
@@ -496,7 +655,8 @@ async def get_candidate_interview_history(
         interview_ids = [str(interview['interview_id']) for interview in completed_interviews]
 
         responses_cursor = db[settings.MONGODB_COLLECTION_RESPONSES].find(
-            {"interview_id": {"$in": interview_ids}, "candidate_id": candidate_oid}
+            {"interview_id": {"$in": interview_ids}, "candidate_id": candidate_oid},
+            session=session,
         )
         all_responses = await responses_cursor.to_list(length=None)
 
@@ -546,7 +706,7 @@ async def get_candidate_interview_history(
 async def get_single_interview_result(
     interview_id: str,
     # Use generic get_current_active_user, then check role inside
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     # ... (implementation remains the same - fetches completed interview, checks role) ...
@@ -618,13 +778,18 @@ async def get_single_interview_result(
 async def submit_interview_results(
     interview_id: str,
     result_data: InterviewResultSubmit,
-    hr_or_admin_user: User = Depends(require_hr_or_admin), # Fetches full User model
-    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+    hr_or_admin_user: Principal = Depends(require_hr_or_admin),
+    db: AsyncIOMotorClient = Depends(mongodb.get_db),
+    session: AsyncIOMotorClientSession = Depends(mongodb.causal_session),
 ):
     # ... (implementation remains the same - HR/Admin submits feedback/scores) ...
     logger.info(f"User {hr_or_admin_user.username} submitting results (incl. per-response) for interview {interview_id}")
+    # Round trips are independent of the number of responses: one read, one bulk write, at most
+    # one aggregation and the final find_one_and_update
     try:
-        interview = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one({"interview_id": interview_id})
+        interview = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one(
+            {"interview_id": interview_id}, {"_id": 1, "candidate_id": 1, "status": 1}, session=session,
+        )
         if not interview:
              raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Interview {interview_id} not found.")
         if interview.get("status") != "completed":
@@ -632,50 +797,53 @@ async def submit_interview_results(
 
         interview_oid = interview["_id"]
         candidate_oid = interview["candidate_id"] # Should be ObjectId
+        responses_collection = db[settings.MONGODB_COLLECTION_RESPONSES]
 
         if result_data.responses_feedback:
             logger.info(f"Processing {len(result_data.responses_feedback)} individual response feedbacks for interview {interview_id}.")
-            updated_response_count = 0
+            evaluated_at = datetime.now(timezone.utc)
+            updates_by_question: Dict[str, Dict[str, Any]] = {} # Entries for the same question merge field by field, as sequential updates would
             for resp_feedback in result_data.responses_feedback:
                 response_update_data = {}
                 if resp_feedback.score is not None: response_update_data["score"] = resp_feedback.score
                 if resp_feedback.feedback is not None: response_update_data["feedback"] = resp_feedback.feedback
-
                 if response_update_data:
                     response_update_data["evaluated_by"] = hr_or_admin_user.username
-                    response_update_data["evaluated_at"] = datetime.now(timezone.utc)
-
-                    resp_update_result = await db[settings.MONGODB_COLLECTION_RESPONSES].update_one(
-                        {"interview_id": interview_id, "candidate_id": candidate_oid, "question_id": resp_feedback.question_id},
-                        {"$set": response_update_data}
-                    )
-                    if resp_update_result.matched_count == 0:
-                        logger.warning(f"No matching response found for question_id '{resp_feedback.question_id}' in interview {interview_id} to apply feedback.")
-                    elif resp_update_result.modified_count > 0:
-                        updated_response_count += 1
-            logger.info(f"Updated score/feedback for {updated_response_count} individual responses in interview {interview_id}.")
-
+                    response_update_data["evaluated_at"] = evaluated_at
+                    updates_by_question.setdefault(resp_feedback.question_id, {}).update(response_update_data)
+
+            if updates_by_question:
+                bulk_result = await responses_collection.bulk_write(
+                    [
+                        UpdateOne(
+                            {"interview_id": interview_id, "candidate_id": candidate_oid, "question_id": question_id},
+                            {"$set": response_update_data},
+                        )
+                        for question_id, response_update_data in updates_by_question.items()
+                    ],
+                    ordered=False,
+                    session=session,
+                )
+                unmatched = len(updates_by_question) - bulk_result.matched_count
+                if unmatched:
+                    logger.warning(f"{unmatched} of {len(updates_by_question)} response feedbacks for interview {interview_id} matched no response.")
+                logger.info(f"Updated score/feedback for {bulk_result.modified_count} individual responses in interview {interview_id}.")
+
+        # A manually submitted overall score wins; only average the response scores when it is missing
         calculated_overall_score: Optional[float] = None
-        all_responses = await db[settings.MONGODB_COLLECTION_RESPONSES].find(
-            {"interview_id": interview_id, "candidate_id": candidate_oid, "score": {"$ne": None}}
-        ).to_list(length=None)
-
-        if all_responses:
-             total_score_sum = 0.0
-             scored_responses_count = 0
-             for r in all_responses:
-                 score = r.get("score")
-                 try:
-                     total_score_sum += float(score)
-                     scored_responses_count += 1
-                 except (ValueError, TypeError):
-                     logger.warning(f"Invalid score format '{score}' found for scored response {r['_id']} during overall calculation.")
-
-             if scored_responses_count > 0:
-                 calculated_overall_score = total_score_sum / scored_responses_count
-             logger.info(f"Recalculated overall score for interview {interview_id}: {calculated_overall_score}")
-        else:
-             logger.info(f"No scored responses found after update for interview {interview_id}.")
+        if result_data.overall_score is None:
+            averages = await responses_collection.aggregate(
+                [
+                    {"$match": {"interview_id": interview_id, "candidate_id": candidate_oid, "score": {"$ne": None}}},
+                    {"$group": {"_id": None, "average": {"$avg": "$score"}}}, # Non-numeric scores are ignored
+                ],
+                session=session,
+            ).to_list(length=1)
+            calculated_overall_score = averages[0]["average"] if averages else None
+            if calculated_overall_score is not None:
+                logger.info(f"Recalculated overall score for interview {interview_id}: {calculated_overall_score}")
+            else:
+                logger.info(f"No scored responses found after update for interview {interview_id}.")
 
         current_time = datetime.now(timezone.utc)
         interview_update_data = {
@@ -697,21 +865,15 @@ async def submit_interview_results(
             interview_update_data["overall_feedback"] = result_data.overall_feedback
             logger.info(f"Applying submitted overall feedback for interview {interview_id}.")
 
-        update_result = await db[settings.MONGODB_COLLECTION_INTERVIEWS].update_one(
+        updated_interview = await Repository.for_setting(db, "MONGODB_COLLECTION_INTERVIEWS").update(
             {"_id": interview_oid},
-            {"$set": interview_update_data}
+            {"$set": interview_update_data},
+            session=session,
         )
-        if update_result.matched_count == 0:
+        causal_tokens.remember(hr_or_admin_user.id, session) # Their next /results/all listing includes this
+        if updated_interview is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Interview not found during final update.")
-        if update_result.modified_count == 0:
-            logger.warning(f"Interview {interview_id} overall results were not modified (perhaps submitted data was identical?).")
-        else:
-            logger.info(f"Successfully submitted/updated overall results info for interview {interview_id} by user {hr_or_admin_user.username}.")
-
-        updated_interview = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one({"_id": interview_oid})
-        if not updated_interview:
-            logger.error(f"Failed to retrieve interview {interview_id} after submitting results.")
-            raise HTTPException(status_code=500, detail="Failed to retrieve updated interview after submitting results.")
+        logger.info(f"Successfully submitted/updated overall results info for interview {interview_id} by user {hr_or_admin_user.username}.")
 
         return InterviewOut.model_validate(updated_interview)
 
@@ -726,7 +888,7 @@ async def submit_interview_results(
 @router.post("/responses/{response_id}/evaluate", response_model=Dict) # Return dict as before
 async def evaluate_single_response_ai(
     response_id: str,
-    hr_or_admin_user: User = Depends(require_hr_or_admin), # Fetches full User model
+    hr_or_admin_user: Principal = Depends(require_hr_or_admin),
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     # ... (implementation remains the same - HR/Admin triggers AI eval) ...
@@ -746,7 +908,7 @@ async def evaluate_single_response_ai(
         question_id = response_doc["question_id"]
         interview_id = response_doc["interview_id"]
 
-        if not answer_text or len(answer_text.strip()) < 10: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Answer must be at least 10 characters long for AI evaluation.")
+        if not answer_text or len(answer_text.strip()) < MIN_AI_EVALUATION_ANSWER_CHARS: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Answer must be at least {MIN_AI_EVALUATION_ANSWER_CHARS} characters long for AI evaluation.")
 
         interview_doc = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one({"interview_id": interview_id})
         if not interview_doc: raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Associated interview not found.")
@@ -790,15 +952,11 @@ async def evaluate_single_response_ai(
             "evaluated_by": f"AI ({hr_or_admin_user.username})", "evaluated_at": current_time
         }
         try:
-            update_result = await db[settings.MONGODB_COLLECTION_RESPONSES].update_one({"_id": response_oid}, {"$set": update_data})
+            updated_response_doc = await Repository.for_setting(db, "MONGODB_COLLECTION_RESPONSES").update({"_id": response_oid}, {"$set": update_data})
         except Exception as e: raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update response with evaluation results.")
 
-        if update_result.matched_count == 0: raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Response not found during update.")
-        if update_result.modified_count == 0: logger.warning(f"Response {response_id} score/feedback was not modified by AI evaluation.")
+        if updated_response_doc is None: raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Response not found during update.")
 
-        updated_response_doc = await db[settings.MONGODB_COLLECTION_RESPONSES].find_one({"_id": response_oid})
-        if not updated_response_doc: raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve updated response after AI evaluation.")
-        
         response_out = InterviewResponseOut.model_validate(updated_response_doc)
         response_dict = response_out.model_dump() 
 
@@ -815,11 +973,108 @@ async def evaluate_single_response_ai(
     except Exception as e: logger.error(f"Unexpected error evaluating response {response_id}: {str(e)}", exc_info=True); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred during AI evaluation.")
 
 
+async def _persist_streamed_evaluations(responses_collection, ops: List[UpdateOne], interview_id: str) -> None:
+    try:
+        await responses_collection.bulk_write(ops, ordered=False)
+        logger.info(f"Persisted {len(ops)} streamed AI evaluations for interview {interview_id} after the stream ended early.")
+    except Exception as e:
+        logger.error(f"Failed to persist {len(ops)} streamed AI evaluations for interview {interview_id}: {e}", exc_info=True)
+
+
+# --- POST /{interview_id}/evaluate/stream ---
+@router.post("/{interview_id}/evaluate/stream", tags=["Results", "Admin & HR Actions"])
+async def evaluate_interview_responses_stream(
+    interview_id: str,
+    hr_or_admin_user: Principal = Depends(require_hr_or_admin),
+    db: AsyncIOMotorClient = Depends(mongodb.get_db)
+):
+    """
+    AI-evaluates every answered question of a completed interview in one streamed LLM call,
+    using server-sent events (HR/Admin only). Answers shorter than MIN_AI_EVALUATION_ANSWER_CHARS
+    are skipped, as in /responses/{id}/evaluate. Emits an 'evaluation' event per response as soon
+    as its JSON object closes and emits a 'complete' event at the end. Evaluations are persisted
+    with bulk writes as they arrive; any still unwritten when the stream fails or the client
+    disconnects are written in the background.
+    """
+    logger.info(f"User {hr_or_admin_user.username} triggering streamed AI evaluation for interview {interview_id}")
+    interview_doc = await db[settings.MONGODB_COLLECTION_INTERVIEWS].find_one({"interview_id": interview_id})
+    if not interview_doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Interview {interview_id} not found.")
+    if interview_doc.get("status") != "completed":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot evaluate responses: interview not completed.")
+
+    candidate_oid = interview_doc.get("candidate_id")
+    question_texts = {str(q.get("question_id")): q.get("text") for q in interview_doc.get("questions", [])}
+    responses = await db[settings.MONGODB_COLLECTION_RESPONSES].find(
+        {"interview_id": interview_id, "candidate_id": candidate_oid}
+    ).to_list(length=None)
+    answers = [
+        {"question_id": str(r["question_id"]), "question_text": question_texts[str(r["question_id"])], "answer_text": r["answer"]}
+        for r in responses
+        if r.get("answer") and len(r["answer"].strip()) >= MIN_AI_EVALUATION_ANSWER_CHARS and question_texts.get(str(r.get("question_id")))
+    ]
+    if not answers:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No answered questions found to evaluate.")
+    answered_ids = {answer["question_id"] for answer in answers}
+
+    async def event_stream():
+        evaluations: Dict[str, Dict[str, Any]] = {}
+        pending: List[UpdateOne] = []
+        responses_collection = db[settings.MONGODB_COLLECTION_RESPONSES]
+        try:
+            async for evaluation in gemini_service.stream_evaluations(
+                answers,
+                job_title=interview_doc.get("job_title"),
+                job_description=interview_doc.get("job_description")
+            ):
+                question_id = str(evaluation["question_id"])
+                try:
+                    ai_score = float(evaluation["score"]); assert 0 <= ai_score <= 5
+                except (ValueError, TypeError, AssertionError):
+                    logger.warning(f"Skipping evaluation with invalid score '{evaluation.get('score')}' for question {question_id} in interview {interview_id}.")
+                    continue
+                if question_id not in answered_ids or question_id in evaluations:
+                    logger.warning(f"Skipping evaluation for unknown, unanswered or duplicate question_id '{question_id}' in interview {interview_id}.")
+                    continue
+                evaluations[question_id] = {"score": ai_score, "feedback": str(evaluation["feedback"])}
+                pending.append(UpdateOne(
+                    {"interview_id": interview_id, "candidate_id": candidate_oid, "question_id": question_id},
+                    {"$set": {
+                        "score": ai_score, "feedback": f"[AI]: {evaluations[question_id]['feedback']}",
+                        "evaluated_by": f"AI ({hr_or_admin_user.username})", "evaluated_at": datetime.now(timezone.utc)
+                    }}
+                ))
+                yield _sse_event("evaluation", {"question_id": question_id, **evaluations[question_id]})
+                if len(pending) >= STREAMED_EVALUATION_FLUSH_SIZE:
+                    # Cleared only once written; the updates are idempotent if the finally block resends them
+                    await responses_collection.bulk_write(pending, ordered=False)
+                    pending = []
+
+            if pending:
+                await responses_collection.bulk_write(pending, ordered=False)
+                pending = []
+            logger.info(f"Persisted {len(evaluations)} streamed AI evaluations for interview {interview_id}.")
+            yield _sse_event("complete", {"interview_id": interview_id, "evaluated_count": len(evaluations)})
+        except GeminiServiceError as e:
+            logger.error(f"Streamed AI evaluation failed for interview {interview_id}: {e}", exc_info=True)
+            yield _sse_event("error", {"status_code": status.HTTP_503_SERVICE_UNAVAILABLE, "detail": f"AI evaluation service failed: {e}"})
+        except Exception as e:
+            logger.error(f"Unexpected error during streamed AI evaluation for interview {interview_id}: {e}", exc_info=True)
+            yield _sse_event("error", {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": "An unexpected error occurred during AI evaluation."})
+        finally:
+            if pending:
+                # The stream failed or the client went away: keep the evaluations already paid for.
+                # Detached, since awaiting inside a cancelled request would be cancelled too.
+                _run_detached(_persist_streamed_evaluations(responses_collection, pending, interview_id))
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # --- GET /{interview_id} (No changes needed) ---
 @router.get("/{interview_id}", response_model=InterviewOut, tags=["Details"])
 async def get_interview_details(
     interview_id: str,
-    current_user: User = Depends(get_current_active_user), # Use generic dependency
+    current_user: Principal = Depends(get_current_active_user), # Use generic dependency
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     # ... (implementation remains the same - checks role inside) ...
@@ -843,7 +1098,7 @@ async def get_interview_details(
 @router.get("/{interview_id}/responses", response_model=List[InterviewResponseOut], tags=["Details"])
 async def get_interview_responses_list(
     interview_id: str,
-    current_user: User = Depends(get_current_active_user), # Use generic dependency
+    current_user: Principal = Depends(get_current_active_user), # Use generic dependency
     db: AsyncIOMotorClient = Depends(mongodb.get_db)
 ):
     # ... (implementation remains the same - checks role inside) ...
@@ -859,11 +1114,8 @@ async def get_interview_responses_list(
             logger.warning(f"Candidate {current_user.username} denied access to interview {interview_id} responses (belongs to {candidate_id_obj}).")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied.")
 
-        responses_cursor = db[settings.MONGODB_COLLECTION_RESPONSES].find({"interview_id": interview_id})
-        responses = await responses_cursor.to_list(length=None)
+        responses = await Repository.for_setting(db, "MONGODB_COLLECTION_RESPONSES").find_decoded({"interview_id": interview_id}, RESPONSE_CODEC)
         logger.info(f"Found {len(responses)} responses for interview {interview_id}")
-
-        response_list = [InterviewResponseOut.model_validate(response) for response in responses]
-        return response_list
+        return FastJSONResponse(responses)
     except HTTPException: raise
     except Exception as e: logger.error(f"Error fetching responses for {interview_id}: {e}", exc_info=True); raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not retrieve responses.")
@@ -34,11 +34,78 @@ class Settings(BaseSettings):
     MONGODB_COLLECTION_RESPONSES: str = "responses"
     MONGODB_COLLECTION_HR_MAPPING_REQUESTS: str = "hr_mapping_requests"
     MONGODB_COLLECTION_MESSAGES: str = "messages"
+    MONGODB_COLLECTION_CHANGE_STREAM_TOKENS: str = "change_stream_tokens"
+    MONGODB_COLLECTION_RESUME_DOCUMENTS: str = "resume_documents"
+    MONGODB_COLLECTION_LLM_METRICS: str = "llm_metrics"
+    INDEX_RECONCILE_ENABLED: bool = True # Check the index registry (app/db/indexes.py) at startup
+    INDEX_RECONCILE_CREATE: bool = True # Create this service's missing indexes; False only reports drift
+    # Connection pool and client options (app/db/pool.py); pool limits apply per worker process
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None # None waits for the server indefinitely (driver default)
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0 # Connections kept warm even when idle
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None # Close pooled connections idle for longer than this
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = 10000 # Fail a checkout instead of queueing forever when the pool is exhausted
+    MONGODB_MAX_CONNECTING: int = 2 # Concurrent connection handshakes per pool
+    MONGODB_COMPRESSORS: str = "" # Wire compression in preference order, e.g. "zstd,snappy,zlib" (zstd/snappy need their packages)
+    MONGODB_ZLIB_COMPRESSION_LEVEL: int = -1
+    MONGODB_RETRY_READS: bool = True
+    MONGODB_RETRY_WRITES: bool = True
+    MONGODB_READ_PREFERENCE: str = "" # Client-wide default; empty defers to the connection string
+    MONGODB_READ_CONCERN: str = "" # Client-wide default level; empty defers to the connection string
+    MONGODB_LISTING_READ_PREFERENCE: str = "secondaryPreferred" # Read profile for paged lists and searches
+    MONGODB_LISTING_READ_CONCERN: str = "local"
+    MONGODB_LISTING_MAX_STALENESS_SECONDS: int = 90 # -1 disables; otherwise at least 90
+    MONGODB_REPORTING_READ_PREFERENCE: str = "secondaryPreferred" # Read profile for dashboard counts and aggregations
+    MONGODB_REPORTING_READ_CONCERN: str = "local"
+    MONGODB_REPORTING_MAX_STALENESS_SECONDS: int = 300
+    MONGODB_CAUSAL_TOKENS_MAX_PRINCIPALS: int = 10000 # Users whose last write time is kept for read-your-writes on secondaries
+    MONGODB_POOL_METRICS_ENABLED: bool = True # Record checkout counts and wait times (/health/db-pool)
+    DB_QUERY_STATS_ENABLED: bool = True # Per-command duration histograms and slow-query log (app/db/query_stats.py)
+    DB_SLOW_QUERY_MS: float = 100.0 # Commands at or above this duration are logged with their redacted filter shape
+    DB_SLOW_QUERY_LOG_SIZE: int = 100 # Recent slow commands kept for /debug/db-stats
+    DB_QUERY_STATS_MAX_SERIES: int = 2000 # Distinct (collection, operation, route) histograms before folding into "other"
+    DEBUG_ENDPOINTS_ENABLED: bool = False # Serve /debug/db-stats; keep off wherever the port is reachable from outside
+    # Change stream event bus (app/db/change_events.py); needs a replica set
+    CHANGE_EVENTS_ENABLED: bool = True
+    CHANGE_EVENTS_CONSUMER: str = "" # Resume token key; empty uses APP_NAME. Set per worker when workers run blocking subscribers
+    CHANGE_EVENTS_QUEUE_SIZE: int = 1000 # Events buffered per subscriber before backpressure (or a resync for lossy ones)
+    CHANGE_EVENTS_CHECKPOINT_SECONDS: float = 5.0 # How often the resume token is saved
+    CHANGE_EVENTS_RECONNECT_MIN_SECONDS: float = 0.5
+    CHANGE_EVENTS_RECONNECT_MAX_SECONDS: float = 30.0
+    CHANGE_EVENTS_DRAIN_SECONDS: float = 5.0 # Shutdown wait for blocking subscribers to finish queued events
+    # Resume text and analysis live in resume_documents, not on user documents (app/db/resume_documents.py)
+    RESUME_DOCUMENTS_COMPRESSION: str = "" # "zstd" compresses stored resume text (needs the zstandard package); empty stores it as-is
+    RESUME_DOCUMENTS_ZSTD_LEVEL: int = 3
+    RESUME_DOCUMENTS_COMPRESS_MIN_BYTES: int = 1024 # Shorter texts are stored uncompressed
+    RESUME_DOCUMENTS_LEGACY_READS: bool = True # Fall back to users.resume_text; turn off once the migration reports none left
 
     JWT_SECRET_KEY: str = "your_super_secret_key_please_change"
-    JWT_ALGORITHM: str = "HS256"
+    JWT_ALGORITHM: str = "HS256" # HS256 uses JWT_SECRET_KEY; RS256/ES256/EdDSA use the PEM keys below
+    JWT_PUBLIC_KEY: Optional[str] = None # PEM; lets services verify asymmetric tokens without any signing secret
+    JWT_PRIVATE_KEY: Optional[str] = None # PEM; only auth_service signs tokens
+    TOKEN_VERIFY_CACHE_ENABLED: bool = True # Remember verified tokens (by digest) until they expire
+    TOKEN_VERIFY_CACHE_MAX_ENTRIES: int = 10000
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
 
+    # Cached principal resolution for authenticated requests
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0 # Upper bound on how long a cached principal is served
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_POLL_INTERVAL_SECONDS: float = 5.0 # Invalidation poll interval when change streams are unavailable
+    CLAIMS_AUTH_ENABLED: bool = True # Build the principal from current claims tokens without a user lookup
+
+    # Token introspection through auth_service instead of direct user lookups
+    AUTH_SERVICE_URL: str = "http://auth_service:8000"
+    AUTH_INTROSPECTION_ENABLED: bool = False
+    AUTH_INTROSPECTION_SHARED_SECRET: Optional[str] = None # Sent as X-Internal-Auth
+    AUTH_INTROSPECTION_CACHE_TTL_SECONDS: float = 30.0 # Active principals (capped at token expiry)
+    AUTH_INTROSPECTION_NEGATIVE_TTL_SECONDS: float = 60.0 # Invalid/revoked tokens
+    AUTH_INTROSPECTION_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_INTROSPECTION_MAX_CONNECTIONS: int = 20 # Keep-alive pool size towards auth_service
+    AUTH_INTROSPECTION_TIMEOUT_SECONDS: float = 2.0
+
     CORS_ALLOWED_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
     DEFAULT_ADMIN_EMAIL: Optional[EmailStr] = "admin@example.com"
@@ -62,6 +129,22 @@ class Settings(BaseSettings):
          {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
     ]
 
+    # Prompt budgeting and LLM call metrics
+    GEMINI_PROMPT_TOKEN_BUDGET: int = 3000 # Upper bound on estimated input tokens per prompt
+    GEMINI_PROMPT_MIN_SECTION_TOKENS: int = 200 # Tokens reserved for each lower-priority section when trimming
+    GEMINI_CHARS_PER_TOKEN: float = 4.0 # Local token estimate (no tokenizer round trip)
+    LLM_METRICS_ENABLED: bool = True
+    GEMINI_SINGLE_FLIGHT_ENABLED: bool = True # Coalesce identical concurrent prompts into one provider call
+
+    # Question pool (pre-generated questions per job title/category/difficulty)
+    QUESTION_POOL_ENABLED: bool = True
+    QUESTION_POOL_LOW_WATERMARK: int = 10 # Refill is triggered when a pool drops below this
+    QUESTION_POOL_TARGET_SIZE: int = 30 # Refill tops the pool up to this size
+    QUESTION_POOL_REFILL_BATCH_SIZE: int = 10 # Questions requested per LLM call during refill
+    QUESTION_POOL_REFILL_INTERVAL_SECONDS: int = 300 # Background warmer sweep interval
+    QUESTION_POOL_CLAIM_TIMEOUT_SECONDS: int = 300 # Claims older than this (the draw died before deleting them) go back to the pool
+    QUESTION_POOL_TAILORED_QUESTIONS: int = 2 # Resume-tailored questions still generated live
+
     # Service URLs
     CANDIDATE_SERVICE_URL: str = os.getenv("CANDIDATE_SERVICE_URL", "http://candidate_service:8000") # Read from env var, default for docker-compose
 
@@ -0,0 +1,39 @@
+# interview_service/app/core/fast_json.py
+
+import json
+from datetime import datetime
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError: # Optional: stdlib json is used when orjson is not installed
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # Match Pydantic's JSON output for UTC datetimes
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes for plain dicts/lists (as produced by DocumentCodec), datetimes included."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    Response for content that is already JSON-ready. Returning it from a route skips FastAPI's
+    response_model validation and serialization; the response_model still documents the shape.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
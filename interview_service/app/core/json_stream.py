@@ -0,0 +1,154 @@
+# interview_service/app/core/json_stream.py
+
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStreamParser:
+    """
+    Incrementally parses a JSON array arriving in arbitrary text chunks (e.g. a streamed LLM response).
+
+    `feed()` returns every top-level array element (object or nested array) whose closing bracket
+    arrived in that chunk, so callers can act on each element without waiting for the whole array.
+    Text before the opening '[' (markdown fences, introductory prose) and anything after the
+    closing ']' is ignored. Elements that fail to decode are logged and skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start: Optional[int] = None
+        self.started = False
+        self.finished = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        if self.finished or not chunk:
+            return []
+
+        self._buffer += chunk
+        buf = self._buffer
+        completed: List[Any] = []
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self.started:
+                if ch == "[":
+                    self.started = True
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 1:
+                    self._element_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._element_start is not None:
+                    fragment = buf[self._element_start:i + 1]
+                    self._element_start = None
+                    try:
+                        completed.append(json.loads(fragment))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping undecodable streamed JSON element: {e}. Fragment: '{fragment[:200]}'")
+                elif self._depth <= 0:
+                    self.finished = True
+                    i += 1
+                    break
+            i += 1
+
+        # Drop the consumed prefix so the buffer only holds the element currently being received
+        keep_from = self._element_start if self._element_start is not None else i
+        self._buffer = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._element_start is not None:
+            self._element_start = 0
+        return completed
+
+
+_CLOSING_FOR = {"{": "}", "[": "]"}
+
+
+def _find_balanced_end(text: str, start: int) -> Optional[Tuple[int, bool]]:
+    """
+    Scans from the opening bracket at `start` and returns `(index, balanced)`: the index of its
+    matching closing bracket, or of the first closing bracket that does not match (balanced=False).
+    Returns None if the text ends first (truncated output). Brackets inside JSON strings are ignored.
+    """
+    stack = [_CLOSING_FOR[text[start]]]
+    in_string = False
+    escaped = False
+    for i in range(start + 1, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSING_FOR:
+            stack.append(_CLOSING_FOR[ch])
+        elif ch in "}]":
+            if ch != stack.pop():
+                return i, False
+            if not stack:
+                return i, True
+    return None
+
+
+def extract_json(text: Optional[str]) -> Optional[Any]:
+    """
+    Extracts the first decodable top-level JSON object or array from an LLM response.
+
+    Candidates are found with a single bracket-balanced pass rather than a regex, so nested arrays
+    of objects are never cut at the first closing bracket, and markdown fences, introductory prose
+    and trailing text are skipped naturally. Only outermost candidates are considered: a value
+    nested inside an undecodable or truncated one is never returned on its own, while a candidate
+    with mismatched brackets is abandoned at the offending closer and the scan goes on. If the response was
+    truncated inside a top-level array, the elements that did complete are salvaged and returned
+    as a (shorter) list. Returns None when nothing usable is found.
+    """
+    if not text:
+        return None
+
+    pos = 0
+    while True:
+        starts = [idx for idx in (text.find("{", pos), text.find("[", pos)) if idx != -1]
+        if not starts:
+            return None
+        start = min(starts)
+        found = _find_balanced_end(text, start)
+        if found is None:
+            # Truncated: the candidate runs to the end of the text, so there is nothing after it
+            if text[start] == "[":
+                salvaged = JsonArrayStreamParser().feed(text[start:])
+                if salvaged:
+                    logger.warning(f"Salvaged {len(salvaged)} complete elements from truncated JSON array.")
+                    return salvaged
+            return None
+        end, balanced = found
+        if not balanced:
+            # Stray brackets in prose ("see [a}") must not hide a valid value further on
+            logger.debug(f"Mismatched brackets in JSON candidate at offset {start}.")
+        else:
+            try:
+                return json.loads(text[start:end + 1])
+            except json.JSONDecodeError as e:
+                logger.debug(f"Balanced candidate at offset {start} is not valid JSON: {e}")
+        # Resume after the rejected candidate (or its offending closer), so the scan stays linear
+        pos = end + 1
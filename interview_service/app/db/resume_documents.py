@@ -0,0 +1,187 @@
+# interview_service/app/db/resume_documents.py
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional
+
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorClientSession, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_LOADED = True
+except ImportError:
+    zstandard = None
+    ZSTD_LOADED = False
+
+# Fields that used to live on user documents and are removed by the split
+LEGACY_USER_UNSET = {"resume_text": ""}
+# Analysis artifacts stored with the text; the two search keys are also kept on the user document
+ANALYSIS_FIELDS = ("extracted_skills_list", "estimated_yoe")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_warned_missing_zstd = False
+
+
+# --- Text Encoding ---
+def encode_text(text: Optional[str]) -> Dict[str, Any]:
+    """
+    The stored form of `text`: zstd-compressed when RESUME_DOCUMENTS_COMPRESSION is "zstd", the
+    text is at least RESUME_DOCUMENTS_COMPRESS_MIN_BYTES and compression actually shrinks it.
+    """
+    global _warned_missing_zstd
+    if text is None:
+        return {"text": None, "encoding": None, "text_bytes": 0}
+    raw = text.encode("utf-8")
+    if settings.RESUME_DOCUMENTS_COMPRESSION == "zstd" and len(raw) >= settings.RESUME_DOCUMENTS_COMPRESS_MIN_BYTES:
+        if ZSTD_LOADED:
+            compressed = zstandard.ZstdCompressor(level=settings.RESUME_DOCUMENTS_ZSTD_LEVEL).compress(raw)
+            if len(compressed) < len(raw):
+                return {"text": Binary(compressed), "encoding": "zstd", "text_bytes": len(raw)}
+        elif not _warned_missing_zstd:
+            _warned_missing_zstd = True
+            logger.warning("RESUME_DOCUMENTS_COMPRESSION is 'zstd' but the zstandard package is not installed; storing resume text uncompressed.")
+    return {"text": text, "encoding": None, "text_bytes": len(raw)}
+
+
+def decode_text(document: Mapping[str, Any]) -> Optional[str]:
+    text = document.get("text")
+    if text is None or document.get("encoding") != "zstd":
+        return text
+    if not ZSTD_LOADED:
+        raise RuntimeError("Resume text is zstd-compressed but the zstandard package is not installed.")
+    return zstandard.ZstdDecompressor().decompress(bytes(text)).decode("utf-8")
+
+
+def resume_filter() -> Dict[str, Any]:
+    """Users with a parsed resume (what `{"resume_text": {"$ne": None}}` selected before the split)."""
+    if settings.RESUME_DOCUMENTS_LEGACY_READS:
+        return {"$or": [{"has_resume": True}, {"resume_text": {"$ne": None}}]}
+    return {"has_resume": True}
+
+
+# --- Store ---
+class ResumeDocuments:
+    """
+    Parsed resume text and analysis artifacts, one document per user in
+    MONGODB_COLLECTION_RESUME_DOCUMENTS with the user's `_id` as its own, so the users collection
+    (read on every authenticated request) stays small. User documents keep `has_resume` and the
+    search keys (`extracted_skills_list`, `estimated_yoe`) that candidate search filters and
+    text-indexes. While RESUME_DOCUMENTS_LEGACY_READS is on, reads fall back to `resume_text` on
+    user documents that `migrate` has not reached yet.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db[settings.MONGODB_COLLECTION_RESUME_DOCUMENTS]
+        self.users = db[settings.MONGODB_COLLECTION_USERS]
+
+    @staticmethod
+    def _document(text: Optional[str], analysis: Mapping[str, Any], resume_path: Optional[str], updated_at: datetime) -> Dict[str, Any]:
+        document = encode_text(text)
+        document.update({field: analysis.get(field) for field in ANALYSIS_FIELDS})
+        document.update({"resume_path": resume_path, "updated_at": updated_at})
+        return document
+
+    async def save(
+        self,
+        user_id: Any,
+        text: Optional[str],
+        analysis: Mapping[str, Any],
+        resume_path: Optional[str] = None,
+        session: Optional[AsyncIOMotorClientSession] = None,
+    ) -> None:
+        """
+        Stores a freshly parsed resume. Write it before updating the user document, and set
+        `has_resume` and unset LEGACY_USER_UNSET there.
+        """
+        document = self._document(text, analysis, resume_path, datetime.now(timezone.utc))
+        await self.collection.update_one({"_id": user_id}, {"$set": document}, upsert=True, session=session)
+
+    async def get_text(self, user_id: Any, legacy_doc: Optional[Mapping[str, Any]] = None) -> Optional[str]:
+        """
+        The user's resume text. `legacy_doc` is the user document when the caller already has it;
+        a `resume_text` still on it is the newest copy (new writes remove it), so no read is made.
+        """
+        if settings.RESUME_DOCUMENTS_LEGACY_READS and legacy_doc is not None and legacy_doc.get("resume_text") is not None:
+            return legacy_doc["resume_text"]
+        document = await self.collection.find_one({"_id": user_id}, {"text": 1, "encoding": 1})
+        if document is not None:
+            return decode_text(document)
+        if not settings.RESUME_DOCUMENTS_LEGACY_READS or legacy_doc is not None:
+            return None
+        user_doc = await self.users.find_one({"_id": user_id}, {"resume_text": 1})
+        return user_doc.get("resume_text") if user_doc else None
+
+    # --- Online Migration ---
+    async def migrate(
+        self,
+        batch_size: int = 500,
+        pause_seconds: float = 0.0,
+        dry_run: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Moves resume text and analysis off user documents in `_id` order, one batch at a time, while
+        the services keep serving. Idempotent and safe to rerun after an interruption:
+
+        - a resume document is only written when none exists or the existing one is older than the
+          user document, so a resume uploaded through the new path is never overwritten;
+        - `resume_text` is only removed from a user document whose `updated_at` is unchanged since
+          the batch was read; users changed in between are counted in `users_changed` and picked
+          up by the next run. `updated_at` is left as is (claims tokens are checked against it).
+        """
+        stats = {"scanned": 0, "copied": 0, "kept_newer": 0, "users_compacted": 0, "users_changed": 0}
+        projection = {"resume_text": 1, "resume_path": 1, "updated_at": 1, **{field: 1 for field in ANALYSIS_FIELDS}}
+        last_id = None
+        while True:
+            query: Dict[str, Any] = {"resume_text": {"$exists": True}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await self.users.find(query, projection).sort("_id", 1).limit(batch_size).to_list(length=None)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            stats["scanned"] += len(batch)
+            if not dry_run:
+                await self._migrate_batch(batch, stats)
+            logger.info(f"Resume documents migration: {stats}")
+            if pause_seconds:
+                await asyncio.sleep(pause_seconds)
+        return stats
+
+    async def _migrate_batch(self, batch: List[Dict[str, Any]], stats: Dict[str, int]) -> None:
+        copies = []
+        for user_doc in batch:
+            if user_doc.get("resume_text") is None and not any(user_doc.get(field) for field in ANALYSIS_FIELDS):
+                continue
+            updated_at = user_doc.get("updated_at") or _EPOCH
+            document = self._document(user_doc.get("resume_text"), user_doc, user_doc.get("resume_path"), updated_at)
+            copies.append(UpdateOne({"_id": user_doc["_id"], "updated_at": {"$lt": updated_at}}, {"$set": document}, upsert=True))
+        if copies:
+            try:
+                result = await self.collection.bulk_write(copies, ordered=False)
+                stats["copied"] += result.upserted_count + result.modified_count
+            except BulkWriteError as e:
+                # A duplicate _id means a resume document at least as new as the user document exists
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in errors):
+                    raise
+                stats["copied"] += e.details.get("nUpserted", 0) + e.details.get("nModified", 0)
+                stats["kept_newer"] += len(errors)
+
+        compactions = [
+            UpdateOne(
+                {"_id": user_doc["_id"], "updated_at": user_doc.get("updated_at")},
+                {"$set": {"has_resume": user_doc.get("resume_text") is not None}, "$unset": LEGACY_USER_UNSET},
+            )
+            for user_doc in batch
+        ]
+        result = await self.users.bulk_write(compactions, ordered=False)
+        stats["users_compacted"] += result.modified_count
+        stats["users_changed"] += len(compactions) - result.matched_count
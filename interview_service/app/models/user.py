@@ -1,9 +1,10 @@
 # LLM_interviewer/server/app/models/user.py
 
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional, Literal 
+from pydantic import BaseModel, BeforeValidator, Field, EmailStr, ConfigDict
+from typing import Annotated, Any, Dict, Optional, Literal 
 from datetime import datetime, timezone 
 from bson import ObjectId 
+from bson.errors import InvalidId
 
 CandidateMappingStatus = Literal[
     "pending_resume", 
@@ -71,3 +72,47 @@ class User(BaseModel):
     )
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def _object_id(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return ObjectId(value)
+        except InvalidId:
+            raise ValueError(f"Invalid ObjectId: {value}")
+    return value
+
+PrincipalObjectId = Annotated[ObjectId, BeforeValidator(_object_id)]
+
+
+class Principal(BaseModel):
+    """
+    The authenticated caller: identity plus the role and status fields authorization checks read.
+    Built from current access-token claims (or the user document when they are stale), so role and
+    status dependencies need no users lookup. Ids are ObjectIds, as on User.
+    """
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True, extra='ignore')
+
+    id: PrincipalObjectId = Field(..., alias="_id")
+    username: str
+    email: EmailStr
+    role: UserRole
+    # Plain strings: a status value this service does not know yet must not fail authentication
+    mapping_status: Optional[str] = None
+    assigned_hr_id: Optional[PrincipalObjectId] = None
+    hr_status: Optional[str] = None
+    admin_manager_id: Optional[PrincipalObjectId] = None
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "Principal":
+        """Builds the principal from access-token claims or an auth_service introspection result."""
+        return cls.model_validate({
+            "_id": claims["uid"],
+            "username": claims["username"],
+            "email": claims["sub"],
+            "role": claims["role"],
+            "mapping_status": claims.get("mapping_status"),
+            "assigned_hr_id": claims.get("assigned_hr_id"),
+            "hr_status": claims.get("hr_status"),
+            "admin_manager_id": claims.get("admin_manager_id"),
+        })
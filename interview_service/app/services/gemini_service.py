@@ -1,12 +1,16 @@
 # LLM_interviewer/server/app/services/gemini_service.py
 
 import google.generativeai as genai
+import asyncio
+import hashlib
 import logging
-import json
-import re
-from typing import List, Dict, Any, Optional, Tuple
+import time
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 
 from ..core.config import settings # Adjusted import
+from ..core.json_stream import JsonArrayStreamParser, extract_json
+from .llm_metrics import llm_metrics
+from .prompt_budget import PromptSection, estimate_tokens, fit_sections_to_budget
 try:
     from ..schemas.interview import Question # Adjusted import
 except ImportError:
@@ -25,6 +29,8 @@ class GeminiService:
     def __init__(self):
         self.api_key = settings.GEMINI_API_KEY
         self.model = None
+        # Single-flight: identical prompts issued concurrently share one in-flight provider call
+        self._in_flight: Dict[str, asyncio.Task] = {}
 
         if self.api_key:
             log_key_display = f"{self.api_key[:5]}...{self.api_key[-4:]}"
@@ -49,8 +55,51 @@ class GeminiService:
             logger.error("Gemini model is not available (check API key and initialization logs).")
             raise GeminiServiceError("Gemini model is not configured or initialization failed.", status_code=503)
 
-    async def _call_gemini_api(self, prompt: str) -> Optional[str]:
+    def _record_call(self, operation: str, prompt: str, output_text: str, usage: Any, started: float, success: bool) -> None:
+        """Records token counts (provider usage metadata when available, local estimate otherwise) and latency."""
+        input_tokens = getattr(usage, 'prompt_token_count', None)
+        output_tokens = getattr(usage, 'candidates_token_count', None)
+        tokens_estimated = input_tokens is None or output_tokens is None
+        llm_metrics.record(
+            operation=operation,
+            input_tokens=input_tokens if input_tokens is not None else estimate_tokens(prompt),
+            output_tokens=output_tokens if output_tokens is not None else estimate_tokens(output_text),
+            latency_ms=(time.perf_counter() - started) * 1000,
+            success=success,
+            tokens_estimated=tokens_estimated
+        )
+
+    async def _call_gemini_api(self, prompt: str, operation: str = "generate") -> Optional[str]:
+        """
+        Calls Gemini, coalescing concurrent identical prompts (single-flight): later callers await
+        the call already in flight for the same prompt hash, and its result or error is delivered
+        to every waiter. Nothing is kept once the call completes, so there is no staleness.
+        """
         self._check_model()
+        if not settings.GEMINI_SINGLE_FLIGHT_ENABLED:
+            return await self._call_gemini_api_uncoalesced(prompt, operation)
+
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        task = self._in_flight.get(key)
+        if task is not None:
+            logger.info(f"Coalescing identical Gemini request ({operation}) onto in-flight call {key[:12]}.")
+        else:
+            task = asyncio.create_task(self._call_gemini_api_uncoalesced(prompt, operation))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._release_in_flight(key, t))
+        # shield() keeps the shared call alive for the other waiters if one caller is cancelled
+        return await asyncio.shield(task)
+
+    def _release_in_flight(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception() # Mark the exception as retrieved even if every waiter was cancelled
+
+    async def _call_gemini_api_uncoalesced(self, prompt: str, operation: str) -> Optional[str]:
+        started = time.perf_counter()
+        response = None
+        success = False
         try:
             logger.debug(f"Sending prompt to Gemini (first 100 chars): {prompt[:100]}...")
             response = await self.model.generate_content_async(
@@ -67,6 +116,7 @@ class GeminiService:
 
             if hasattr(response, 'text') and response.text is not None:
                  logger.debug("Received response text from Gemini.")
+                 success = True
                  return response.text
             elif hasattr(response, 'prompt_feedback') and response.prompt_feedback and hasattr(response.prompt_feedback, 'block_reason') and response.prompt_feedback.block_reason:
                  block_reason = response.prompt_feedback.block_reason
@@ -82,6 +132,50 @@ class GeminiService:
             logger.error(f"Error calling Gemini API: {e}", exc_info=True)
             error_detail = str(e)
             raise GeminiServiceError(f"Failed to get response from Gemini API: {error_detail}", status_code=502)
+        finally:
+            output_text = response.text if success else ""
+            self._record_call(operation, prompt, output_text, getattr(response, 'usage_metadata', None), started, success)
+
+
+    async def _stream_gemini_api(self, prompt: str, operation: str = "stream") -> AsyncIterator[str]:
+        """Yields response text chunks as Gemini produces them (generate_content_async with stream=True)."""
+        self._check_model()
+        started = time.perf_counter()
+        output_parts: List[str] = []
+        usage = None
+        success = False
+        try:
+            logger.debug(f"Streaming prompt to Gemini (first 100 chars): {prompt[:100]}...")
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=settings.GEMINI_GENERATION_CONFIG,
+                safety_settings=settings.GEMINI_SAFETY_SETTINGS,
+                stream=True
+            )
+            async for chunk in response:
+                # Usage metadata is cumulative; the last chunk carries the final counts
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                prompt_feedback = getattr(chunk, 'prompt_feedback', None)
+                if prompt_feedback and getattr(prompt_feedback, 'block_reason', None):
+                    logger.warning(f"Gemini streaming request blocked. Reason: {prompt_feedback.block_reason}")
+                    raise GeminiServiceError(f"Content generation blocked due to safety settings ({prompt_feedback.block_reason}).", status_code=400)
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. a final chunk carrying only finish metadata)
+                    continue
+                if chunk_text:
+                    output_parts.append(chunk_text)
+                    yield chunk_text
+            success = True
+
+        except GeminiServiceError:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming from Gemini API: {e}", exc_info=True)
+            raise GeminiServiceError(f"Failed to stream response from Gemini API: {e}", status_code=502)
+        finally:
+            self._record_call(operation, prompt, "".join(output_parts), usage, started, success)
 
 
     def _clean_json_response(self, raw_text: Optional[str]) -> Optional[Any]:
@@ -89,40 +183,37 @@ class GeminiService:
             logger.warning("Received empty text for JSON cleaning.")
             return None
 
-        logger.debug("Attempting to clean and parse JSON response...")
-        text_to_parse = raw_text.strip()
-        match = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```|({.*?}|\[.*?\])", text_to_parse, re.DOTALL)
-        json_str_to_parse = None
-        if match:
-            json_str_to_parse = match.group(1) if match.group(1) else match.group(2)
+        logger.debug("Attempting to extract and parse JSON response...")
+        parsed_json = extract_json(raw_text)
+        if parsed_json is None:
+            logger.error(f"Could not extract valid JSON from response. Text was: '{raw_text[:200]}...'")
         else:
-            logger.debug("No clear JSON block/object/array found via regex, attempting to parse entire text.")
-            json_str_to_parse = text_to_parse
-
-        if json_str_to_parse:
-            json_str_to_parse = json_str_to_parse.strip()
-            logger.debug(f"Attempting JSON parsing on: {json_str_to_parse[:200]}...")
-            try:
-                parsed_json = json.loads(json_str_to_parse)
-                logger.debug("Successfully parsed JSON.")
-                return parsed_json
-            except json.JSONDecodeError as e:
-                logger.error(f"JSONDecodeError parsing extracted string: {e}. String was: '{json_str_to_parse[:200]}...'")
-                return None
-        else:
-            logger.warning("Could not extract a potential JSON string to parse.")
-            return None
+            logger.debug("Successfully parsed JSON.")
+        return parsed_json
 
 
-    async def generate_questions(
+    def _build_questions_prompt(
         self,
         job_title: str,
-        job_description: Optional[str], 
-        num_questions: int = 5,
-        category: str = "General",
-        difficulty: str = "Medium",
-        resume_text: Optional[str] = None
-    ) -> Optional[List[Dict[str, Any]]]:
+        job_description: Optional[str],
+        num_questions: int,
+        category: str,
+        difficulty: str,
+        resume_text: Optional[str]
+    ) -> str:
+        # Job description and resume are the only unbounded inputs; fit them into what the
+        # token budget leaves after the fixed instructions (job description is kept first).
+        if job_description or resume_text:
+            fixed_tokens = estimate_tokens(self._build_questions_prompt(job_title, None, num_questions, category, difficulty, None))
+            fitted = fit_sections_to_budget(
+                [
+                    PromptSection("job_description", job_description, priority=2, min_tokens=settings.GEMINI_PROMPT_MIN_SECTION_TOKENS),
+                    PromptSection("resume", resume_text, priority=1, min_tokens=settings.GEMINI_PROMPT_MIN_SECTION_TOKENS),
+                ],
+                settings.GEMINI_PROMPT_TOKEN_BUDGET - fixed_tokens
+            )
+            job_description, resume_text = fitted["job_description"], fitted["resume"]
+
         prompt = f"Generate {num_questions} interview questions suitable for a candidate applying for the role of '{job_title}'."
         if job_description: 
              prompt += f"Job Description: {job_description}\n"
@@ -138,8 +229,21 @@ class GeminiService:
         ]
         Ensure the output is ONLY the JSON list, without any introductory text or markdown formatting outside the JSON itself.
         """
+        return prompt
+
+
+    async def generate_questions(
+        self,
+        job_title: str,
+        job_description: Optional[str], 
+        num_questions: int = 5,
+        category: str = "General",
+        difficulty: str = "Medium",
+        resume_text: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        prompt = self._build_questions_prompt(job_title, job_description, num_questions, category, difficulty, resume_text)
         try:
-            raw_response_text = await self._call_gemini_api(prompt)
+            raw_response_text = await self._call_gemini_api(prompt, operation="generate_questions")
             parsed_json = self._clean_json_response(raw_response_text)
             if isinstance(parsed_json, list):
                  logger.info(f"Successfully generated and parsed {len(parsed_json)} questions.")
@@ -154,6 +258,31 @@ class GeminiService:
             raise GeminiServiceError(f"An unexpected error occurred: {e}")
 
 
+    async def stream_questions(
+        self,
+        job_title: str,
+        job_description: Optional[str],
+        num_questions: int = 5,
+        category: str = "General",
+        difficulty: str = "Medium",
+        resume_text: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of generate_questions: yields each question as soon as its JSON object closes."""
+        prompt = self._build_questions_prompt(job_title, job_description, num_questions, category, difficulty, resume_text)
+        parser = JsonArrayStreamParser()
+        emitted = 0
+        async for text_chunk in self._stream_gemini_api(prompt, operation="stream_questions"):
+            for item in parser.feed(text_chunk):
+                if isinstance(item, dict) and item.get("text"):
+                    emitted += 1
+                    yield item
+                else:
+                    logger.warning(f"Skipping malformed streamed question: {str(item)[:200]}")
+        if emitted == 0:
+            raise GeminiServiceError("Failed to parse any questions from streamed Gemini response.")
+        logger.info(f"Streamed {emitted} questions from Gemini.")
+
+
     async def evaluate_answer(
         self,
         question_text: str,
@@ -170,6 +299,12 @@ class GeminiService:
         Question: "{question_text}"
         Candidate's Answer: "{answer_text}"
         """
+        if job_description:
+            # The answers being evaluated are never trimmed; job description context gets what the budget leaves
+            job_description = fit_sections_to_budget(
+                [PromptSection("job_description", job_description, priority=1)],
+                settings.GEMINI_PROMPT_TOKEN_BUDGET - estimate_tokens(prompt)
+            )["job_description"]
         if job_title:
             prompt += f"\nThe candidate is applying for the role of: '{job_title}'."
         if job_description:
@@ -182,7 +317,7 @@ class GeminiService:
         Ensure the output is ONLY the JSON object, without any introductory text or markdown formatting.
         """
         try:
-            raw_response_text = await self._call_gemini_api(prompt)
+            raw_response_text = await self._call_gemini_api(prompt, operation="evaluate_answer")
             parsed_json = self._clean_json_response(raw_response_text)
             if isinstance(parsed_json, dict) and 'score' in parsed_json and 'feedback' in parsed_json:
                  logger.info("Successfully evaluated answer and parsed response.")
@@ -198,4 +333,59 @@ class GeminiService:
              logger.error(f"Unexpected error during answer evaluation: {e}", exc_info=True)
              raise GeminiServiceError(f"An unexpected error occurred: {e}")
 
+    async def stream_evaluations(
+        self,
+        answers: List[Dict[str, str]],
+        job_title: Optional[str] = None,
+        job_description: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Evaluates several answers in one streamed call. Each item of `answers` needs
+        'question_id', 'question_text' and 'answer_text'. Yields one evaluation dict
+        ('question_id', 'score', 'feedback') as soon as its JSON object closes.
+        """
+        if not answers:
+            raise ValueError("At least one answer is required for evaluation.")
+
+        prompt = """
+        Evaluate each of the following answers provided by a candidate for the corresponding interview question.
+        """
+        for item in answers:
+            prompt += f"""
+        Question ID: "{item['question_id']}"
+        Question: "{item['question_text']}"
+        Candidate's Answer: "{item['answer_text']}"
+        """
+        if job_description:
+            # The answers being evaluated are never trimmed; job description context gets what the budget leaves
+            job_description = fit_sections_to_budget(
+                [PromptSection("job_description", job_description, priority=1)],
+                settings.GEMINI_PROMPT_TOKEN_BUDGET - estimate_tokens(prompt)
+            )["job_description"]
+        if job_title:
+            prompt += f"\nThe candidate is applying for the role of: '{job_title}'."
+        if job_description:
+            prompt += f"\nConsider the following job description context:\n{job_description}"
+        prompt += """
+        For every answer provide an evaluation score between 0.0 and 5.0 (float, where 5.0 is excellent) and concise feedback (string).
+        Return the evaluations strictly as a JSON list, in the same order as the answers, where each object has keys: 'question_id' (string, copied from the input), 'score' (float) and 'feedback' (string).
+        Example format:
+        [
+          {"question_id": "q1", "score": 4.0, "feedback": "The candidate demonstrated strong understanding..."}
+        ]
+        Ensure the output is ONLY the JSON list, without any introductory text or markdown formatting.
+        """
+        parser = JsonArrayStreamParser()
+        emitted = 0
+        async for text_chunk in self._stream_gemini_api(prompt, operation="stream_evaluations"):
+            for item in parser.feed(text_chunk):
+                if isinstance(item, dict) and 'question_id' in item and 'score' in item and 'feedback' in item:
+                    emitted += 1
+                    yield item
+                else:
+                    logger.warning(f"Skipping malformed streamed evaluation: {str(item)[:200]}")
+        if emitted == 0:
+            raise GeminiServiceError("Failed to parse any evaluations from streamed Gemini response.")
+        logger.info(f"Streamed {emitted} evaluations from Gemini.")
+
 gemini_service = GeminiService()
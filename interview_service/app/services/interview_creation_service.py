@@ -5,7 +5,7 @@
 import logging
 import uuid
 from typing import Optional, List, Dict, Any
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import ValidationError
 from bson import ObjectId
 import httpx # Import httpx for service-to-service communication
@@ -13,14 +13,17 @@ import httpx # Import httpx for service-to-service communication
 from app.models.interview import Interview, InterviewStatus, InterviewType
 from app.schemas.interview import InterviewCreate, InterviewInDB, QuestionBase
 from app.core.config import settings # Import settings
+from app.db.mongodb import mongodb
+from app.db.repository import Repository
 from .gemini_service import GeminiService, gemini_service # Import GeminiService
 
 logger = logging.getLogger(__name__)
 
 class InterviewCreationService:
-    def __init__(self, db_client: AsyncIOMotorClient):
-        self.db_client = db_client
-        self.collection = db_client.get_database().get_collection("interviews")
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None):
+        # Share the service's pooled client instead of resolving a database from a client of its own
+        self.db = db if db is not None else mongodb.get_db()
+        self.collection = self.db[settings.MONGODB_COLLECTION_INTERVIEWS]
         self.gemini_service: GeminiService = gemini_service # Use the initialized instance
         self.candidate_service_url = settings.CANDIDATE_SERVICE_URL
 
@@ -126,14 +129,9 @@ class InterviewCreationService:
             # MongoDB will add _id and potentially creation timestamp if configured
 
             # Insert the new interview document into the collection
-            insert_result = await self.collection.insert_one(interview_dict)
-
-            if insert_result.inserted_id:
-                # Retrieve the created document to return the full object with _id and timestamps
-                created_interview = await self.collection.find_one({"_id": insert_result.inserted_id})
-                if created_interview:
-                    # Convert MongoDB document to Pydantic model
-                    return InterviewInDB(**created_interview)
+            # insert_one sets _id on the dict, so it is the created document; no read-back needed
+            created_interview = await Repository(self.collection).insert(interview_dict)
+            return InterviewInDB(**created_interview)
 
         except ValidationError as e:
             logger.error(f"Validation error creating interview: {e}")
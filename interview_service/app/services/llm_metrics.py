@@ -0,0 +1,87 @@
+# interview_service/app/services/llm_metrics.py
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from ..core.config import settings
+from ..core.request_context import current_endpoint
+from ..db.mongodb import mongodb
+
+logger = logging.getLogger(__name__)
+
+
+class LLMMetricsRecorder:
+    """Records per-call LLM token counts and latency in the metrics collection without blocking the caller."""
+
+    def __init__(self):
+        self._pending: Set[asyncio.Task] = set()
+
+    def record(
+        self,
+        operation: str,
+        input_tokens: int,
+        output_tokens: int,
+        latency_ms: float,
+        success: bool,
+        tokens_estimated: bool
+    ) -> None:
+        if not settings.LLM_METRICS_ENABLED:
+            return
+        doc = {
+            "endpoint": current_endpoint(),
+            "operation": operation,
+            "model": settings.GEMINI_MODEL_NAME,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency_ms": round(latency_ms, 2),
+            "success": success,
+            "tokens_estimated": tokens_estimated,
+            "created_at": datetime.now(timezone.utc),
+        }
+        task = asyncio.create_task(self._insert(doc))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def aclose(self) -> None:
+        """Waits for the inserts still in flight; call before the MongoDB client is closed."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _insert(self, doc: Dict[str, Any]) -> None:
+        try:
+            await mongodb.get_db()[settings.MONGODB_COLLECTION_LLM_METRICS].insert_one(doc)
+        except Exception as e:
+            # Metrics must never affect request handling
+            logger.warning(f"Failed to record LLM metrics for {doc['operation']}: {e}")
+
+    async def aggregate_by_endpoint(self, db: AsyncIOMotorDatabase, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        match: Dict[str, Any] = {}
+        if since:
+            match["created_at"] = {"$gte": since}
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"endpoint": "$endpoint", "operation": "$operation"},
+                "calls": {"$sum": 1},
+                "failures": {"$sum": {"$cond": ["$success", 0, 1]}},
+                "input_tokens": {"$sum": "$input_tokens"},
+                "output_tokens": {"$sum": "$output_tokens"},
+                "avg_input_tokens": {"$avg": "$input_tokens"},
+                "avg_output_tokens": {"$avg": "$output_tokens"},
+                "avg_latency_ms": {"$avg": "$latency_ms"},
+                "max_latency_ms": {"$max": "$latency_ms"},
+            }},
+            {"$sort": {"input_tokens": -1}},
+        ]
+        results = []
+        async for row in db[settings.MONGODB_COLLECTION_LLM_METRICS].aggregate(pipeline):
+            key = row.pop("_id")
+            results.append({**key, **row})
+        return results
+
+
+llm_metrics = LLMMetricsRecorder()
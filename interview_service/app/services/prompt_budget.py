@@ -0,0 +1,59 @@
+# interview_service/app/services/prompt_budget.py
+
+import logging
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = "\n...[truncated]"
+
+
+class PromptSection(NamedTuple):
+    name: str
+    text: Optional[str]
+    priority: int # Higher priority sections keep more of their text
+    min_tokens: int = 0 # Reserved for this section while higher-priority sections are fitted
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Cheap local token estimate (characters / GEMINI_CHARS_PER_TOKEN), no tokenizer call."""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / settings.GEMINI_CHARS_PER_TOKEN))
+
+
+def trim_to_tokens(text: Optional[str], max_tokens: int) -> Optional[str]:
+    """Trims text to roughly `max_tokens`, preferring to cut at a line or sentence boundary."""
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = int(max_tokens * settings.GEMINI_CHARS_PER_TOKEN) - len(TRUNCATION_MARKER)
+    if max_chars <= 0:
+        return ""
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary > max_chars * 0.8:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+def fit_sections_to_budget(sections: List[PromptSection], budget_tokens: int) -> Dict[str, Optional[str]]:
+    """
+    Fits variable prompt sections into `budget_tokens`, highest priority first.
+    Each lower-priority section keeps up to its `min_tokens` reserved, so a long
+    high-priority section cannot starve the rest of the prompt.
+    """
+    remaining = max(budget_tokens, 0)
+    ordered = sorted(sections, key=lambda s: s.priority, reverse=True)
+    fitted: Dict[str, Optional[str]] = {}
+    for idx, section in enumerate(ordered):
+        reserved = sum(min(s.min_tokens, estimate_tokens(s.text)) for s in ordered[idx + 1:])
+        allowance = max(remaining - reserved, min(section.min_tokens, remaining))
+        trimmed = trim_to_tokens(section.text, allowance)
+        if trimmed != section.text:
+            logger.info(f"Prompt section '{section.name}' trimmed from ~{estimate_tokens(section.text)} to ~{estimate_tokens(trimmed)} tokens to fit budget.")
+        fitted[section.name] = trimmed
+        remaining -= estimate_tokens(trimmed)
+    return fitted
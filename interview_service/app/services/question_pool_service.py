@@ -0,0 +1,289 @@
+# interview_service/app/services/question_pool_service.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+
+from ..core.config import settings
+from ..db.mongodb import mongodb
+from .gemini_service import GeminiService, GeminiServiceError, gemini_service
+
+logger = logging.getLogger(__name__)
+
+PoolSpec = Tuple[str, str, str] # (job_title, category, difficulty)
+DRAW_ATTEMPTS = 3 # Claim rounds per draw when concurrent draws take the same candidates
+
+
+class QuestionPoolService:
+    """
+    Keeps a pool of pre-generated, validated questions per (job_title, category, difficulty)
+    in the questions collection so scheduling can draw questions without waiting on the LLM.
+    Pooled documents carry a 'pool_key' field, which keeps them apart from the default questions.
+
+    Pools are generated without a job description, so a pooled question is generic for its job
+    title: two interviews with the same title but different descriptions draw from the same
+    pool. Questions that depend on the description or resume are generated live by the caller.
+    """
+
+    def __init__(self, gemini: GeminiService):
+        self.gemini_service = gemini
+        self._known_pools: Dict[str, PoolSpec] = {}
+        self._refilling: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._warmer_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def pool_key(job_title: str, category: str, difficulty: str) -> str:
+        return "|".join(part.strip().lower() for part in (job_title, category, difficulty))
+
+    def _collection(self, db: AsyncIOMotorDatabase):
+        return db[settings.MONGODB_COLLECTION_QUESTIONS]
+
+    @staticmethod
+    def _available(key: str) -> Dict[str, Any]:
+        """Pooled questions of `key` that no draw has claimed yet."""
+        return {"pool_key": key, "claim_id": {"$exists": False}}
+
+    async def draw(
+        self,
+        db: AsyncIOMotorDatabase,
+        job_title: str,
+        count: int,
+        category: str = "General",
+        difficulty: str = "Medium",
+    ) -> List[Dict[str, Any]]:
+        """
+        Claims up to `count` pooled questions (oldest first) and removes them from the pool.
+        Returns fewer questions than requested when the pool runs short; a refill is
+        scheduled in the background whenever the pool ends up below the low watermark.
+
+        A draw takes a constant number of round trips: one read of the oldest candidates (which
+        also tells how full the pool is), one update_many tagging them with a claim id, and one
+        delete_many. Only when a concurrent draw claimed some of the same candidates is the claim
+        read back, and the draw retried for the shortfall (at most DRAW_ATTEMPTS times). Claims
+        carry 'claimed_at'; if the draw is cancelled or dies before its delete, the warmer returns
+        them to the pool after QUESTION_POOL_CLAIM_TIMEOUT_SECONDS.
+        """
+        key = self.pool_key(job_title, category, difficulty)
+        self._known_pools[key] = (job_title, category, difficulty)
+        if count <= 0:
+            return []
+
+        collection = self._collection(db)
+        projection = {"text": 1, "category": 1, "difficulty": 1}
+        drawn: List[Dict[str, Any]] = []
+        remaining = 0
+        for _ in range(DRAW_ATTEMPTS):
+            wanted = count - len(drawn)
+            candidates = await collection.find(self._available(key), projection).sort("created_at", ASCENDING) \
+                .limit(wanted + settings.QUESTION_POOL_LOW_WATERMARK).to_list(length=None)
+            batch = candidates[:wanted]
+            remaining = len(candidates) - len(batch)
+            if not batch:
+                break
+
+            # Tagging is atomic per document, so concurrent schedulers never share a question
+            claim_id = ObjectId()
+            ids = [doc["_id"] for doc in batch]
+            result = await collection.update_many({"_id": {"$in": ids}, "claim_id": {"$exists": False}}, {"$set": {"claim_id": claim_id, "claimed_at": datetime.now(timezone.utc)}})
+            claimed = batch
+            if result.modified_count < len(batch):
+                claimed = await collection.find({"_id": {"$in": ids}, "claim_id": claim_id}, projection).to_list(length=None) if result.modified_count else []
+            if claimed:
+                await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in claimed]}})
+            drawn.extend(
+                {"text": doc["text"], "category": doc.get("category", category), "difficulty": doc.get("difficulty", difficulty)}
+                for doc in claimed
+            )
+            if len(drawn) >= count or len(candidates) < wanted:
+                break
+
+        logger.info(f"Drew {len(drawn)}/{count} pooled questions for pool '{key}' (about {remaining} remaining).")
+        if remaining < settings.QUESTION_POOL_LOW_WATERMARK:
+            self.schedule_refill(job_title, category, difficulty)
+        return drawn
+
+    def release(
+        self,
+        db: AsyncIOMotorDatabase,
+        job_title: str,
+        questions: List[Dict[str, Any]],
+        category: str = "General",
+        difficulty: str = "Medium",
+    ) -> None:
+        """
+        Returns drawn questions that never made it into an interview (the insert failed or the
+        client went away mid-stream) to their pool. The insert runs in the background, so this is
+        safe to call from the cleanup of a cancelled request.
+        """
+        if not questions:
+            return
+        task = asyncio.create_task(self._return_to_pool(db, job_title, questions, category, difficulty))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _return_to_pool(self, db: AsyncIOMotorDatabase, job_title: str, questions: List[Dict[str, Any]], category: str, difficulty: str) -> None:
+        key = self.pool_key(job_title, category, difficulty)
+        now = datetime.now(timezone.utc)
+        docs = [
+            {"text": q["text"], "category": q.get("category", category), "difficulty": q.get("difficulty", difficulty),
+             "job_title": job_title, "pool_key": key, "source": "pool", "created_at": now}
+            for q in questions
+        ]
+        try:
+            await self._collection(db).insert_many(docs, ordered=False)
+            logger.info(f"Returned {len(docs)} unused questions to pool '{key}'.")
+        except Exception as e:
+            logger.error(f"Failed to return {len(docs)} unused questions to pool '{key}': {e}", exc_info=True)
+
+    def schedule_refill(self, job_title: str, category: str, difficulty: str) -> None:
+        """Starts a background refill for the pool unless one is already running."""
+        key = self.pool_key(job_title, category, difficulty)
+        if key in self._refilling:
+            logger.debug(f"Refill already in progress for pool '{key}'.")
+            return
+        self._refilling.add(key)
+        task = asyncio.create_task(self._run_refill(key, job_title, category, difficulty))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _run_refill(self, key: str, job_title: str, category: str, difficulty: str) -> None:
+        try:
+            await self.refill(mongodb.get_db(), job_title, category, difficulty)
+        except Exception as e:
+            logger.error(f"Background refill failed for pool '{key}': {e}", exc_info=True)
+        finally:
+            self._refilling.discard(key)
+
+    def _validate_generated(self, generated: Optional[List[Any]], category: str, difficulty: str, seen: Set[str]) -> List[Dict[str, Any]]:
+        """Keeps only well-formed, non-duplicate questions and pins them to the pool's category/difficulty."""
+        valid: List[Dict[str, Any]] = []
+        for item in generated or []:
+            if not isinstance(item, dict):
+                continue
+            text = item.get("text")
+            if not isinstance(text, str) or len(text.strip()) < 10:
+                continue
+            normalized = text.strip().lower()
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            valid.append({"text": text.strip(), "category": category, "difficulty": difficulty})
+        return valid
+
+    async def refill(self, db: AsyncIOMotorDatabase, job_title: str, category: str, difficulty: str) -> int:
+        """Tops the pool up to QUESTION_POOL_TARGET_SIZE. Returns the number of questions inserted."""
+        key = self.pool_key(job_title, category, difficulty)
+        collection = self._collection(db)
+        current = await collection.count_documents(self._available(key))
+        missing = settings.QUESTION_POOL_TARGET_SIZE - current
+        if missing <= 0:
+            return 0
+
+        existing_texts = await collection.distinct("text", {"pool_key": key})
+        seen: Set[str] = {t.strip().lower() for t in existing_texts if isinstance(t, str)}
+        inserted = 0
+        # Each LLM call is bounded by the batch size; stop early if a batch yields nothing usable
+        while inserted < missing:
+            batch_size = min(settings.QUESTION_POOL_REFILL_BATCH_SIZE, missing - inserted)
+            try:
+                generated = await self.gemini_service.generate_questions(
+                    job_title=job_title,
+                    job_description=None,
+                    num_questions=batch_size,
+                    category=category,
+                    difficulty=difficulty,
+                )
+            except GeminiServiceError as e:
+                logger.warning(f"Question generation failed while refilling pool '{key}': {e.message}")
+                break
+
+            valid = self._validate_generated(generated, category, difficulty, seen)[:batch_size]
+            if not valid:
+                logger.warning(f"Refill batch for pool '{key}' produced no valid questions; stopping.")
+                break
+
+            now = datetime.now(timezone.utc)
+            docs = [
+                {**q, "job_title": job_title, "pool_key": key, "source": "pool", "created_at": now}
+                for q in valid
+            ]
+            await collection.insert_many(docs, ordered=False)
+            inserted += len(docs)
+
+        logger.info(f"Refilled pool '{key}' with {inserted} questions (was {current}, target {settings.QUESTION_POOL_TARGET_SIZE}).")
+        return inserted
+
+    async def release_stale_claims(self, db: AsyncIOMotorDatabase) -> int:
+        """Returns questions claimed by draws that never deleted them (cancelled or crashed) to their pools."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.QUESTION_POOL_CLAIM_TIMEOUT_SECONDS)
+        result = await self._collection(db).update_many(
+            {"claimed_at": {"$lt": cutoff}, "pool_key": {"$exists": True}},
+            {"$unset": {"claim_id": "", "claimed_at": ""}},
+        )
+        if result.modified_count:
+            logger.warning(f"Returned {result.modified_count} questions with stale claims to their pools.")
+        return result.modified_count
+
+    async def warm_all(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Releases stale claims, then refills every known pool (from the database and from recent
+        draws) that is below the low watermark.
+        """
+        await self.release_stale_claims(db)
+        pipeline = [
+            {"$match": {"pool_key": {"$exists": True}, "claim_id": {"$exists": False}}},
+            {"$group": {
+                "_id": "$pool_key",
+                "count": {"$sum": 1},
+                "job_title": {"$first": "$job_title"},
+                "category": {"$first": "$category"},
+                "difficulty": {"$first": "$difficulty"},
+            }},
+        ]
+        counts: Dict[str, int] = {}
+        async for row in self._collection(db).aggregate(pipeline):
+            counts[row["_id"]] = row["count"]
+            self._known_pools.setdefault(row["_id"], (row["job_title"], row["category"], row["difficulty"]))
+
+        for key, (job_title, category, difficulty) in list(self._known_pools.items()):
+            if counts.get(key, 0) < settings.QUESTION_POOL_LOW_WATERMARK:
+                self.schedule_refill(job_title, category, difficulty)
+
+    async def _warmer_loop(self) -> None:
+        while True:
+            try:
+                await self.warm_all(mongodb.get_db())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Question pool warmer sweep failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.QUESTION_POOL_REFILL_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if not settings.QUESTION_POOL_ENABLED:
+            logger.info("Question pool is disabled; background warmer not started.")
+            return
+        if self._warmer_task is None or self._warmer_task.done():
+            self._warmer_task = asyncio.create_task(self._warmer_loop())
+            logger.info("Question pool background warmer started.")
+
+    async def stop(self) -> None:
+        tasks = list(self._background_tasks)
+        if self._warmer_task is not None:
+            tasks.append(self._warmer_task)
+            self._warmer_task = None
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._refilling.clear()
+        logger.info("Question pool background tasks stopped.")
+
+
+question_pool_service = QuestionPoolService(gemini_service)
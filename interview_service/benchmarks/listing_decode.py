@@ -0,0 +1,122 @@
+# interview_service/benchmarks/listing_decode.py
+"""
+Per-document cost of listing responses: Pydantic validation vs. DocumentCodec decoding.
+
+Builds N synthetic documents shaped like the interviews, interview responses and default
+questions collections (as the driver returns them: ObjectIds, naive datetimes, extra fields)
+and times turning them into response bytes:
+
+- "validate": Schema.model_validate per row, then FastAPI's response_model validation and dump (previous path)
+- "codec+json": DocumentCodec.decode_many, encoded with the stdlib json fallback
+- "codec+orjson": DocumentCodec.decode_many, encoded with orjson (FastJSONResponse)
+
+CPU only, no database needed.
+
+    cd interview_service && python -m benchmarks.listing_decode --rows 10000 --repeat 5
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.core import fast_json
+from app.db.repository import DocumentCodec
+from app.schemas.interview import InterviewOut, InterviewResponseOut, QuestionOut
+
+
+def _interview(n: int) -> Dict[str, Any]:
+    created = datetime(2024, 1, 1) + timedelta(minutes=n)
+    return {
+        "_id": ObjectId(), "interview_id": f"interview-{n}", "candidate_id": ObjectId(), "hr_id": ObjectId(),
+        "job_title": "Backend Engineer", "job_description": "Build and run services. " * 8, "role": "Software Engineer",
+        "tech_stack": ["python", "fastapi", "mongodb"], "status": random.choice(["scheduled", "completed"]),
+        "questions": [
+            {"question_id": f"q{i}", "text": f"Question {i} about distributed systems?", "category": "Technical", "difficulty": "Medium"}
+            for i in range(8)
+        ],
+        "created_at": created, "updated_at": created, "completed_at": created + timedelta(hours=1),
+        "overall_score": random.randint(1, 5), "overall_feedback": "Solid answers overall.", "evaluated_by": "hr", "evaluated_at": created,
+    }
+
+
+def _response(n: int) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(), "interview_id": f"interview-{n // 8}", "question_id": f"q{n % 8}", "candidate_id": ObjectId(),
+        "answer": "A reasonably long answer to the question. " * 6, "submitted_at": datetime(2024, 1, 1) + timedelta(seconds=n),
+        "score": random.randint(1, 5), "feedback": "[AI]: Good.", "evaluated_by": "AI (hr)", "evaluated_at": datetime(2024, 1, 2),
+    }
+
+
+def _question(n: int) -> Dict[str, Any]:
+    return {"_id": ObjectId(), "text": f"Default question {n}?", "category": "Behavioral", "difficulty": "Easy", "created_at": datetime(2024, 1, 1)}
+
+
+def _validate(schema) -> Callable[[List[Dict[str, Any]]], bytes]:
+    adapter = TypeAdapter(List[schema])
+
+    def run(documents):
+        models = [schema.model_validate(document) for document in documents]
+        # FastAPI then re-validates the returned list against response_model before dumping it by alias
+        models = adapter.validate_python(models, from_attributes=True)
+        return json.dumps(adapter.dump_python(models, mode="json", by_alias=True)).encode("utf-8")
+    return run
+
+
+def _codec(schema, use_orjson: bool) -> Callable[[List[Dict[str, Any]]], bytes]:
+    codec = DocumentCodec(schema)
+    orjson_module = fast_json.orjson
+
+    def run(documents):
+        fast_json.orjson = orjson_module if use_orjson else None
+        try:
+            return fast_json.dumps(codec.decode_many(documents))
+        finally:
+            fast_json.orjson = orjson_module
+    return run
+
+
+def _best(run: Callable[[List[Dict[str, Any]]], bytes], documents: List[Dict[str, Any]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(documents)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rows: int, repeat: int) -> None:
+    for name, schema, make in (
+        ("interviews", InterviewOut, _interview),
+        ("responses", InterviewResponseOut, _response),
+        ("questions", QuestionOut, _question),
+    ):
+        documents = [make(n) for n in range(rows)]
+        cases = [("validate", _validate(schema)), ("codec+json", _codec(schema, False))]
+        if fast_json.orjson is not None:
+            cases.append(("codec+orjson", _codec(schema, True)))
+        baseline = None
+        for label, case in cases:
+            elapsed = _best(case, documents, repeat)
+            baseline = baseline or elapsed
+            print(
+                f"{name:<10} {rows:>7} rows  {label:<13} {elapsed * 1000:8.1f} ms total  "
+                f"{elapsed / rows * 1e6:7.2f} us/doc  x{baseline / elapsed:5.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+
+from app.api.routes import interview as interview_routes
+from app.core.config import settings
+from app.db.mongodb import mongodb
+from app.main import app
+from app.models.user import User
+from app.schemas.interview import InterviewCreate
+
+def _parse_events(body: str):
+    """Splits a text/event-stream body into (event, data) pairs."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+class _Collection:
+    def __init__(self, docs=(), fail_inserts=False):
+        self.docs = list(docs)
+        self.fail_inserts = fail_inserts
+        self.bulk_writes = []
+
+    async def find_one(self, filter, projection=None, session=None):
+        return next((doc for doc in self.docs if all(doc.get(k) == v for k, v in filter.items())), None)
+
+    def find(self, filter, projection=None):
+        return _Cursor([doc for doc in self.docs if all(doc.get(k) == v for k, v in filter.items())])
+
+    async def insert_one(self, document, session=None):
+        if self.fail_inserts:
+            raise RuntimeError("primary unavailable")
+        document["_id"] = ObjectId()
+        self.docs.append(document)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(ops)
+        return SimpleNamespace(matched_count=len(ops), modified_count=len(ops))
+
+class _DB(dict):
+    def __init__(self, interviews=(), responses=(), fail_inserts=False):
+        super().__init__({
+            settings.MONGODB_COLLECTION_INTERVIEWS: _Collection(interviews, fail_inserts),
+            settings.MONGODB_COLLECTION_RESPONSES: _Collection(responses),
+        })
+
+def _reviewer():
+    return User.model_validate({
+        "_id": ObjectId(), "username": "reviewer", "email": "reviewer@example.com",
+        "hashed_password": "x" * 60, "role": "hr", "hr_status": "mapped",
+    })
+
+@pytest.fixture
+def released(monkeypatch):
+    """Records questions handed back to the pool instead of scheduling a background insert."""
+    returned = []
+    monkeypatch.setattr(interview_routes.question_pool_service, "release", lambda db, job_title, questions, *a: returned.extend(questions))
+    return returned
+
+@pytest.fixture
+def schedule_setup(monkeypatch):
+    pooled = [{"text": "Pooled question one", "category": "General", "difficulty": "Medium"},
+              {"text": "Pooled question two", "category": "General", "difficulty": "Medium"}]
+
+    async def draw(db, job_title, num_questions, has_resume):
+        return list(pooled)
+
+    async def validate(db, candidate_id, user):
+        return ObjectId(candidate_id), None
+
+    async def stream_questions(**kwargs):
+        for item in ({"text": "Live question one"}, "stray", {"text": "Live question two"}):
+            yield item
+
+    monkeypatch.setattr(interview_routes, "_draw_pooled_questions", draw)
+    monkeypatch.setattr(interview_routes, "_validate_candidate_for_scheduling", validate)
+    monkeypatch.setattr(interview_routes.gemini_service, "stream_questions", stream_questions)
+    return pooled
+
+async def _post(db, path, payload=None):
+    app.dependency_overrides[interview_routes.require_hr_or_admin] = _reviewer
+    app.dependency_overrides[mongodb.get_db] = lambda: db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver-interview") as client:
+            response = await client.post(f"/api/v1/interview{path}", json=payload)
+    finally:
+        app.dependency_overrides = {}
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _parse_events(response.text)
+
+def _schedule_payload():
+    return {"candidate_id": str(ObjectId()), "job_title": "Engineer", "role": "Software Engineer"}
+
+# --- /schedule/stream ---
+
+@pytest.mark.asyncio
+async def test_schedule_stream_emits_questions_then_the_interview(schedule_setup, released):
+    db = _DB()
+    events = await _post(db, "/schedule/stream", _schedule_payload())
+
+    assert [name for name, _ in events] == ["question"] * 4 + ["interview"]
+    assert [data["text"] for _, data in events[:4]] == ["Pooled question one", "Pooled question two", "Live question one", "Live question two"]
+    assert [q["text"] for q in events[-1][1]["questions"]] == [data["text"] for _, data in events[:4]]
+    assert len(db[settings.MONGODB_COLLECTION_INTERVIEWS].docs) == 1
+    assert released == [] # The interview holds the pooled questions
+
+@pytest.mark.asyncio
+async def test_schedule_stream_returns_pooled_questions_when_the_insert_fails(schedule_setup, released):
+    events = await _post(_DB(fail_inserts=True), "/schedule/stream", _schedule_payload())
+
+    assert events[-1][0] == "error" and events[-1][1]["status_code"] == 500
+    assert released == schedule_setup
+
+@pytest.mark.asyncio
+async def test_schedule_stream_returns_pooled_questions_on_disconnect(schedule_setup, released):
+    response = await interview_routes.schedule_interview_stream(InterviewCreate(**_schedule_payload()), _reviewer(), db=_DB())
+    first = await response.body_iterator.__anext__()
+    assert first.startswith("event: question")
+    await response.body_iterator.aclose() # What the server does when the client goes away
+
+    assert released == schedule_setup
+
+# --- /{interview_id}/evaluate/stream ---
+
+def _completed_interview(answers):
+    candidate_id = ObjectId()
+    interview = {
+        "interview_id": "int-1", "candidate_id": candidate_id, "status": "completed", "job_title": "Engineer",
+        "questions": [{"question_id": f"q{i}", "text": f"Question {i}"} for i in range(len(answers))],
+    }
+    responses = [
+        {"interview_id": "int-1", "candidate_id": candidate_id, "question_id": f"q{i}", "answer": answer}
+        for i, answer in enumerate(answers)
+    ]
+    return _DB([interview], responses)
+
+def _stub_evaluations(monkeypatch, evaluations, fail_after=None):
+    # Record update filters without reaching into pymongo's UpdateOne internals
+    monkeypatch.setattr(interview_routes, "UpdateOne", lambda filter, update: filter["question_id"])
+    sent = []
+
+    async def stream_evaluations(answers, **kwargs):
+        sent.extend(answer["question_id"] for answer in answers)
+        for i, evaluation in enumerate(evaluations):
+            if i == fail_after:
+                raise interview_routes.GeminiServiceError("stream cut")
+            yield evaluation
+
+    monkeypatch.setattr(interview_routes.gemini_service, "stream_evaluations", stream_evaluations)
+    return sent
+
+@pytest.mark.asyncio
+async def test_evaluate_stream_skips_short_answers_and_writes_once(monkeypatch):
+    db = _completed_interview(["A detailed enough answer", "too short", "Another full answer"])
+    sent = _stub_evaluations(monkeypatch, [
+        {"question_id": "q0", "score": 4, "feedback": "good"},
+        {"question_id": "q1", "score": 1, "feedback": "not asked"}, # Its answer was never sent
+        {"question_id": "q2", "score": 3, "feedback": "fine"},
+    ])
+
+    events = await _post(db, "/int-1/evaluate/stream")
+
+    assert sent == ["q0", "q2"]
+    assert events == [
+        ("evaluation", {"question_id": "q0", "score": 4.0, "feedback": "good"}),
+        ("evaluation", {"question_id": "q2", "score": 3.0, "feedback": "fine"}),
+        ("complete", {"interview_id": "int-1", "evaluated_count": 2}),
+    ]
+    writes = db[settings.MONGODB_COLLECTION_RESPONSES].bulk_writes
+    assert writes == [["q0", "q2"]]
+
+@pytest.mark.asyncio
+async def test_evaluate_stream_keeps_evaluations_when_the_stream_fails(monkeypatch):
+    db = _completed_interview(["A detailed enough answer", "Another full answer"])
+    _stub_evaluations(monkeypatch, [{"question_id": "q0", "score": 4, "feedback": "good"}, {"question_id": "q1", "score": 2, "feedback": "ok"}], fail_after=1)
+
+    events = await _post(db, "/int-1/evaluate/stream")
+    await asyncio.gather(*interview_routes._detached_writes)
+
+    assert [name for name, _ in events] == ["evaluation", "error"]
+    assert db[settings.MONGODB_COLLECTION_RESPONSES].bulk_writes == [["q0"]]
+
+@pytest.mark.asyncio
+async def test_evaluate_stream_keeps_evaluations_on_disconnect(monkeypatch):
+    db = _completed_interview(["A detailed enough answer", "Another full answer"])
+    _stub_evaluations(monkeypatch, [{"question_id": "q0", "score": 4, "feedback": "good"}, {"question_id": "q1", "score": 2, "feedback": "ok"}])
+
+    response = await interview_routes.evaluate_interview_responses_stream("int-1", _reviewer(), db=db)
+    first = await response.body_iterator.__anext__()
+    assert first.startswith("event: evaluation")
+    await response.body_iterator.aclose() # Client went away after the first evaluation
+    await asyncio.gather(*interview_routes._detached_writes)
+
+    assert db[settings.MONGODB_COLLECTION_RESPONSES].bulk_writes == [["q0"]]
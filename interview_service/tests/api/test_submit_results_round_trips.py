@@ -0,0 +1,125 @@
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.api.routes import interview as interview_routes
+from app.api.routes.interview import submit_interview_results
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.interview import InterviewResultSubmit
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return T0
+
+class _Aggregation:
+    def __init__(self, average):
+        self.average = average
+
+    async def to_list(self, length=None):
+        return [{"_id": None, "average": self.average}] if self.average is not None else []
+
+class _Collection:
+    """Records every command the route sends; one entry per server round trip."""
+
+    def __init__(self, name, calls, docs):
+        self.name, self.calls, self.docs = name, calls, docs
+        self.bulk_ops = []
+
+    async def find_one(self, filter, projection=None, session=None):
+        self.calls[(self.name, "find_one")] += 1
+        return self.docs.get("interview")
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        self.calls[(self.name, "bulk_write")] += 1
+        self.bulk_ops = ops
+        return SimpleNamespace(matched_count=len(ops), modified_count=len(ops))
+
+    def aggregate(self, pipeline, session=None):
+        self.calls[(self.name, "aggregate")] += 1
+        return _Aggregation(self.docs.get("average"))
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        self.calls[(self.name, "find_one_and_update")] += 1
+        return {**self.docs["interview"], **update["$set"]}
+
+class _DB:
+    def __init__(self, interview, average=None):
+        self.calls = Counter()
+        docs = {"interview": interview, "average": average} # average: what the $avg aggregation returns
+        self.collections = {
+            settings.MONGODB_COLLECTION_INTERVIEWS: _Collection("interviews", self.calls, docs),
+            settings.MONGODB_COLLECTION_RESPONSES: _Collection("responses", self.calls, docs),
+        }
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+def _interview():
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(), "interview_id": "int-1", "candidate_id": ObjectId(), "hr_id": ObjectId(), "job_title": "Engineer",
+        "status": "completed", "created_at": now, "completed_at": now,
+    }
+
+def _update(interview, question_id, **fields):
+    """The UpdateOne the route is expected to send for one question."""
+    return UpdateOne(
+        {"interview_id": "int-1", "candidate_id": interview["candidate_id"], "question_id": question_id},
+        {"$set": {**fields, "evaluated_by": "reviewer", "evaluated_at": T0}},
+    )
+
+@pytest.fixture(autouse=True)
+def _frozen_clock(monkeypatch):
+    monkeypatch.setattr(interview_routes, "datetime", _FrozenDatetime)
+
+def _reviewer():
+    return User.model_validate({
+        "_id": ObjectId(), "username": "reviewer", "email": "reviewer@example.com",
+        "hashed_password": "x" * 60, "role": "hr", "hr_status": "mapped",
+    })
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("questions", [1, 50])
+async def test_review_takes_constant_round_trips(questions):
+    interview = _interview()
+    feedback = [{"question_id": f"q{n}", "score": float(n % 5), "feedback": "ok"} for n in range(questions)]
+    db = _DB(interview, average=sum(n % 5 for n in range(questions)) / questions)
+    result = await submit_interview_results("int-1", InterviewResultSubmit(responses_feedback=feedback), _reviewer(), db=db, session=None)
+
+    assert db.calls == Counter({
+        ("interviews", "find_one"): 1, ("responses", "bulk_write"): 1,
+        ("responses", "aggregate"): 1, ("interviews", "find_one_and_update"): 1,
+    })
+    assert db.collections[settings.MONGODB_COLLECTION_RESPONSES].bulk_ops == [
+        _update(interview, f"q{n}", score=float(n % 5), feedback="ok") for n in range(questions)
+    ]
+    assert result.overall_score == pytest.approx(sum(n % 5 for n in range(questions)) / questions)
+    assert result.evaluated_by == "reviewer"
+
+@pytest.mark.asyncio
+async def test_manual_score_skips_the_aggregation_and_duplicates_merge():
+    interview = _interview()
+    db = _DB(interview)
+    feedback = [
+        {"question_id": "q1", "score": 1.0}, {"question_id": "q2", "feedback": "fine"},
+        {"question_id": "q1", "feedback": "better on reflection"}, {"question_id": "q1", "score": 4.0},
+    ]
+    result = await submit_interview_results(
+        "int-1", InterviewResultSubmit(responses_feedback=feedback, overall_score=3.5), _reviewer(), db=db, session=None,
+    )
+
+    assert ("responses", "aggregate") not in db.calls and sum(db.calls.values()) == 3
+    # A later entry for the same question overrides only the fields it sets
+    assert db.collections[settings.MONGODB_COLLECTION_RESPONSES].bulk_ops == [
+        _update(interview, "q1", score=4.0, feedback="better on reflection"),
+        _update(interview, "q2", feedback="fine"),
+    ]
+    assert result.overall_score == 3.5
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.core.auth_client import AuthIntrospectionClient, AuthServiceUnavailableError
+
+def _client_with(handler) -> AuthIntrospectionClient:
+    client = AuthIntrospectionClient("http://auth.test")
+    client._client = httpx.AsyncClient(base_url="http://auth.test", transport=httpx.MockTransport(handler))
+    return client
+
+def _principal(token: str) -> dict:
+    return {"active": True, "sub": f"{token}@example.com", "uid": "0" * 24, "username": token, "role": "candidate", "exp": int(time.time()) + 600}
+
+async def test_active_and_inactive_tokens_are_cached():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token = json.loads(request.content)["token"]
+        calls.append(token)
+        return httpx.Response(200, json=_principal(token) if token == "good" else {"active": False})
+
+    client = _client_with(handler)
+    assert (await client.introspect("good"))["username"] == "good"
+    assert await client.introspect("bad") is None
+    assert (await client.introspect("good"))["username"] == "good"
+    assert await client.introspect("bad") is None
+    assert calls == ["good", "bad"]
+    await client.aclose()
+
+async def test_concurrent_lookups_share_one_request():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=_principal("same"))
+
+    client = _client_with(handler)
+    results = await asyncio.gather(*(client.introspect("same") for _ in range(5)))
+    assert len(calls) == 1 and all(r["username"] == "same" for r in results)
+    await client.aclose()
+
+async def test_cancelled_owner_does_not_fail_other_waiters():
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await release.wait()
+        return httpx.Response(200, json=_principal("same"))
+
+    client = _client_with(handler)
+    owner = asyncio.create_task(client.introspect("same"))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(client.introspect("same")) for _ in range(3)]
+    await asyncio.sleep(0)
+    owner.cancel() # The request that started the lookup disconnects
+    release.set()
+
+    results = await asyncio.gather(*waiters)
+    assert owner.cancelled() and len(calls) == 1
+    assert all(r["username"] == "same" for r in results)
+    assert not client._in_flight and (await client.introspect("same"))["username"] == "same" # Cached
+    await client.aclose()
+
+async def test_batch_only_requests_cache_misses():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append((request.url.path, body))
+        if request.url.path.endswith("/batch"):
+            return httpx.Response(200, json={"results": [_principal(t) if t != "bad" else {"active": False} for t in body["tokens"]]})
+        return httpx.Response(200, json=_principal(body["token"]))
+
+    client = _client_with(handler)
+    await client.introspect("a")
+    results = await client.introspect_many(["a", "b", "bad", "b"])
+    assert [r and r["username"] for r in results] == ["a", "b", None, "b"]
+    assert bodies[-1] == ("/api/v1/auth/introspect/batch", {"tokens": ["b", "bad"]})
+    await client.aclose()
+
+async def test_service_errors_are_not_cached():
+    responses = [httpx.Response(503), httpx.Response(200, json=_principal("retry"))]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    client = _client_with(handler)
+    with pytest.raises(AuthServiceUnavailableError):
+        await client.introspect("retry")
+    assert (await client.introspect("retry"))["username"] == "retry"
+    await client.aclose()
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from app.core.config import settings
+from app.db.change_events import (
+    GAP_OVERFLOW, GAP_RESET, GAP_UNAVAILABLE, ChangeEventBus, InterviewChanged, UserChanged,
+)
+
+class _Stream:
+    def __init__(self, script):
+        self.script = list(script)
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def try_next(self):
+        if not self.script:
+            await asyncio.Event().wait() # Idle forever once the script is played
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        if item is not None:
+            self.resume_token = {"_data": f"{item['ns']['coll']}-{item['documentKey']['_id']}"}
+        return item
+
+class _Tokens:
+    def __init__(self, saved=None):
+        self.saved = saved
+
+    async def find_one(self, filter, projection=None):
+        return {"_id": filter["_id"], "token": self.saved} if self.saved else None
+
+    async def update_one(self, filter, update, upsert=False):
+        self.saved = update["$set"]["token"]
+
+class _DB:
+    """Plays one script per `watch` call (the last one is repeated) and records how each was opened."""
+
+    def __init__(self, *scripts, saved_token=None):
+        self.scripts = list(scripts)
+        self.tokens = _Tokens(saved_token)
+        self.watches = []
+
+    def __getitem__(self, name):
+        return self.tokens
+
+    def watch(self, pipeline, resume_after=None, max_await_time_ms=None):
+        self.watches.append({"collections": pipeline[0]["$match"]["ns.coll"]["$in"], "resume_after": resume_after})
+        return _Stream(self.scripts.pop(0) if len(self.scripts) > 1 else self.scripts[0])
+
+def _change(coll, op="update", fields=("updated_at",)):
+    return {
+        "ns": {"db": "test", "coll": coll}, "operationType": op, "documentKey": {"_id": ObjectId()},
+        "updatedFields": list(fields) if op == "update" else None,
+    }
+
+@pytest.fixture(autouse=True)
+def _fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CHANGE_EVENTS_ENABLED", True)
+    monkeypatch.setattr(settings, "CHANGE_EVENTS_CHECKPOINT_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "CHANGE_EVENTS_RECONNECT_MIN_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "CHANGE_EVENTS_DRAIN_SECONDS", 1.0)
+
+async def _until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_typed_fan_out_watches_only_subscribed_collections():
+    db = _DB([_change("users"), _change("interviews", "insert"), _change("users", fields=("hr_status",))])
+    bus = ChangeEventBus("test")
+    users, interviews = [], []
+    bus.subscribe("users", (UserChanged,), users.append, lossy=True)
+
+    async def on_interview(event):
+        interviews.append(event)
+
+    bus.subscribe("interviews", (InterviewChanged,), on_interview)
+    bus.start(db)
+    await _until(lambda: len(users) == 2 and len(interviews) == 1)
+    await bus.stop()
+
+    assert set(db.watches[0]["collections"]) == {"users", "interviews"}
+    assert all(isinstance(event, UserChanged) for event in users)
+    assert isinstance(interviews[0], InterviewChanged) and interviews[0].operation == "insert"
+    assert users[1].touches("hr_status") and not users[0].touches("hr_status")
+    assert bus.received == {"users": {"update": 2}, "interviews": {"insert": 1}}
+    assert db.tokens.saved == users[1].resume_token # Everything handled, so the last token is saved
+
+@pytest.mark.asyncio
+async def test_lossy_overflow_resyncs_and_blocking_subscriber_holds_the_checkpoint():
+    db = _DB([_change("users") for _ in range(5)])
+    bus = ChangeEventBus("test")
+    release = asyncio.Event()
+    gaps, blocked = [], []
+
+    async def slow(event):
+        await release.wait()
+
+    async def blocking(event):
+        blocked.append(event)
+        await release.wait()
+
+    lossy = bus.subscribe("cache", (UserChanged,), slow, on_gap=gaps.append, max_queue=2, lossy=True)
+    bus.subscribe("counter", (UserChanged,), blocking, max_queue=10)
+    bus.start(db)
+    await _until(lambda: bus.received.get("users", {}).get("update") == 5 and blocked)
+    assert db.tokens.saved is None # The blocking subscriber has not handled anything yet
+
+    release.set()
+    await _until(lambda: gaps and len(blocked) == 5)
+    await bus.stop()
+    assert gaps == [GAP_OVERFLOW] and lossy.dropped > 0
+    assert db.tokens.saved == {"_data": f"users-{blocked[-1].document_id}"}
+
+@pytest.mark.asyncio
+async def test_reconnect_resumes_from_last_event():
+    first = _change("users")
+    db = _DB([first, AutoReconnect("primary stepped down")], [_change("users")])
+    bus = ChangeEventBus("test")
+    events, gaps = [], []
+    bus.subscribe("users", (UserChanged,), events.append, on_gap=gaps.append)
+    bus.start(db)
+    await _until(lambda: len(events) == 2)
+    await bus.stop()
+
+    assert db.watches[1]["resume_after"] == {"_data": f"users-{first['documentKey']['_id']}"}
+    assert bus.reconnects == 1 and gaps == []
+
+@pytest.mark.asyncio
+async def test_lost_resume_point_restarts_from_now_with_a_gap():
+    db = _DB([OperationFailure("history lost", code=286)], [_change("users")], saved_token={"_data": "stale"})
+    bus = ChangeEventBus("test")
+    events, gaps = [], []
+    bus.subscribe("users", (UserChanged,), events.append, on_gap=gaps.append)
+    bus.start(db)
+    await _until(lambda: len(events) == 1)
+    await bus.stop()
+
+    assert [w["resume_after"] for w in db.watches] == [{"_data": "stale"}, None]
+    assert gaps == [GAP_RESET] and bus.resets == 1
+
+@pytest.mark.asyncio
+async def test_standalone_reports_unavailable():
+    db = _DB([OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)])
+    bus = ChangeEventBus("test")
+    gaps = []
+    bus.subscribe("users", (UserChanged,), lambda event: None, on_gap=gaps.append, lossy=True)
+    bus.start(db)
+    await _until(lambda: gaps)
+    await bus.stop()
+    assert gaps == [GAP_UNAVAILABLE] and len(db.watches) == 1
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.api.routes.interview import require_candidate, require_hr_or_admin
+from app.core.principal_cache import principal_cache
+from app.core.security import CLAIMS_VERSION, create_access_token, get_current_user
+
+class FakeUsers:
+    def __init__(self, doc):
+        self.doc = doc
+        self.calls = []
+
+    async def find_one(self, query, projection=None, **kwargs):
+        self.calls.append((query, projection))
+        if self.doc is None or ("_id" in query and query["_id"] != self.doc["_id"]) or ("email" in query and query["email"] != self.doc["email"]):
+            return None
+        return dict(self.doc)
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = users
+
+    def __getitem__(self, name):
+        return self.users
+
+def _user_doc(**overrides):
+    doc = {
+        "_id": ObjectId(), "email": "cand@example.com", "username": "candidate1", "role": "candidate",
+        "hashed_password": "x", "token_version": 0,
+        "updated_at": datetime(2024, 5, 1, tzinfo=timezone.utc), "created_at": datetime(2024, 4, 1, tzinfo=timezone.utc),
+    }
+    doc.update(overrides)
+    return doc
+
+def _claims_token(doc, **overrides):
+    claims = {
+        "sub": doc["email"], "role": doc["role"], "uid": str(doc["_id"]), "username": doc["username"],
+        "tv": doc["token_version"], "uat": doc["updated_at"].timestamp(), "cv": CLAIMS_VERSION, "typ": "access",
+    }
+    claims.update(overrides)
+    return create_access_token(claims)
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+async def test_current_claims_need_only_the_cached_token_state():
+    doc = _user_doc()
+    users = FakeUsers(doc)
+    token = _claims_token(doc)
+
+    user = await get_current_user(token, FakeDB(users))
+    assert str(user.id) == str(doc["_id"]) and user.role == "candidate"
+    await get_current_user(token, FakeDB(users))
+    # One projected token-state lookup, no full user document fetches
+    assert len(users.calls) == 1 and users.calls[0][1] == {"token_version": 1, "updated_at": 1}
+
+async def test_role_and_status_dependencies_use_the_claims():
+    hr_doc = _user_doc(email="hr@example.com", username="hr1", role="hr")
+    admin_id, hr_id = ObjectId(), ObjectId()
+    users = FakeUsers(hr_doc)
+    token = _claims_token(hr_doc, hr_status="mapped", admin_manager_id=str(admin_id))
+
+    principal = await require_hr_or_admin(await get_current_user(token, FakeDB(users)))
+    assert (principal.id, principal.hr_status, principal.admin_manager_id) == (hr_doc["_id"], "mapped", admin_id)
+    with pytest.raises(HTTPException) as exc_info:
+        await require_candidate(principal)
+    assert exc_info.value.status_code == 403
+
+    cand_doc = _user_doc()
+    token = _claims_token(cand_doc, mapping_status="assigned", assigned_hr_id=str(hr_id))
+    candidate = await require_candidate(await get_current_user(token, FakeDB(FakeUsers(cand_doc))))
+    assert candidate.mapping_status == "assigned" and candidate.assigned_hr_id == hr_id
+    # Only the projected token-state lookups; no user documents were loaded
+    assert all(projection == {"token_version": 1, "updated_at": 1} for _, projection in users.calls)
+
+async def test_stale_claims_fall_back_to_user_lookup():
+    doc = _user_doc(mapping_status="assigned")
+    token = _claims_token(doc, uat=(doc["updated_at"] - timedelta(minutes=5)).timestamp(), mapping_status="pending_assignment")
+    users = FakeUsers(doc)
+    user = await get_current_user(token, FakeDB(users))
+    assert user.mapping_status == "assigned" # came from the user document, not the stale claims
+    assert {"email": doc["email"]} in [query for query, _ in users.calls]
+
+async def test_bumped_token_version_revokes_token():
+    doc = _user_doc(token_version=1)
+    token = _claims_token(doc, tv=0)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token, FakeDB(FakeUsers(doc)))
+    assert exc_info.value.status_code == 401
+
+async def test_refresh_token_is_not_an_access_token():
+    doc = _user_doc()
+    token = create_access_token({"sub": doc["email"], "uid": str(doc["_id"]), "typ": "refresh", "jti": "x"})
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token, FakeDB(FakeUsers(doc)))
+    assert exc_info.value.status_code == 401
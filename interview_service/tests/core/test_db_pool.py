@@ -0,0 +1,77 @@
+import pytest
+from pymongo import monitoring
+from pymongo.read_concern import ReadConcern
+
+from app.db.pool import CONSISTENT, DEFAULT, LISTING, CausalTokens, PoolMetrics, client_options, read_options
+
+ADDRESS = ("mongodb", 27017)
+
+def test_pool_metrics_track_checkouts_and_waits():
+    metrics = PoolMetrics()
+    metrics.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    metrics.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1, 0.004))
+    metrics.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    metrics.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(ADDRESS, monitoring.ConnectionCheckOutFailedReason.TIMEOUT, 0.5)
+    )
+
+    server = metrics.snapshot()["servers"]["mongodb:27017"]
+    assert server["checkouts"] == 1
+    assert server["in_use"] == 1 and server["max_in_use"] == 1
+    assert server["open_connections"] == 1
+    assert server["checkout_failures"] == {"timeout": 1}
+    assert server["wait_ms_p50"] == 4.0
+    assert server["wait_ms_max"] == 500.0
+
+    metrics.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert metrics.snapshot()["servers"]["mongodb:27017"]["in_use"] == 0
+
+def test_read_profiles():
+    assert read_options(DEFAULT) == {}
+    assert read_options(CONSISTENT)["read_concern"] == ReadConcern("majority")
+    listing = read_options(LISTING)["read_preference"]
+    assert listing.mongos_mode == "secondaryPreferred" and listing.max_staleness == 90
+
+def test_read_profiles_ignore_staleness_on_primary(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "MONGODB_LISTING_READ_PREFERENCE", "primary")
+    assert read_options(LISTING)["read_preference"].max_staleness == -1
+    with pytest.raises(ValueError):
+        read_options("unknown")
+
+def test_client_options_come_from_settings(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "MONGODB_MAX_POOL_SIZE", 25)
+    monkeypatch.setattr(settings, "MONGODB_COMPRESSORS", "zstd,zlib")
+    options = client_options()
+    assert options["maxPoolSize"] == 25
+    assert options["compressors"] == "zstd,zlib"
+    assert "zlibCompressionLevel" in options
+    assert "readPreference" not in options # Deferred to the connection string
+
+class FakeSession:
+    def __init__(self, cluster_time=None, operation_time=None):
+        self.cluster_time = cluster_time
+        self.operation_time = operation_time
+
+    def advance_cluster_time(self, cluster_time):
+        self.cluster_time = cluster_time
+
+    def advance_operation_time(self, operation_time):
+        self.operation_time = operation_time
+
+def test_causal_tokens_carry_a_principals_last_write():
+    tokens = CausalTokens(max_principals=2)
+    tokens.remember("u1", FakeSession({"clusterTime": 5}, 5))
+    tokens.remember("u2", FakeSession({"clusterTime": 6}, 6))
+    tokens.remember("u3", FakeSession(None, None)) # Standalone: nothing to carry
+
+    reader = FakeSession()
+    tokens.resume("u1", reader)
+    assert (reader.cluster_time, reader.operation_time) == ({"clusterTime": 5}, 5)
+
+    tokens.remember("u3", FakeSession({"clusterTime": 7}, 7)) # Evicts the least recent principal
+    untouched = FakeSession()
+    tokens.resume("u1", untouched)
+    assert untouched.operation_time is None
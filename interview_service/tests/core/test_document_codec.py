@@ -0,0 +1,46 @@
+import json
+from datetime import datetime, timezone
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.core.fast_json import dumps
+from app.db.repository import DocumentCodec
+from app.schemas.interview import InterviewOut, InterviewResponseOut, QuestionOut
+
+def _pydantic_json(schema, documents):
+    # What FastAPI sends for a List[schema] response_model: validate, then dump by alias in JSON mode
+    adapter = TypeAdapter(List[schema])
+    return json.loads(json.dumps(adapter.dump_python(adapter.validate_python(documents), mode="json", by_alias=True)))
+
+def _codec_json(schema, documents):
+    return json.loads(dumps(DocumentCodec(schema).decode_many(documents)))
+
+def test_interview_listing_matches_pydantic():
+    documents = [
+        {
+            "_id": ObjectId(), "interview_id": "i-1", "candidate_id": ObjectId(), "hr_id": ObjectId(),
+            "job_title": "Engineer", "status": "completed", "overall_score": 4,
+            "questions": [{"text": "Why?", "category": "Behavioral", "difficulty": "Easy", "question_id": "q1", "extra": ObjectId()}],
+            "created_at": datetime(2024, 1, 2, 3, 4, 5, 678000), "completed_at": datetime(2024, 1, 3, tzinfo=timezone.utc),
+            "resume_text": "not part of the schema",
+        },
+        {"_id": ObjectId(), "candidate_id": ObjectId(), "hr_id": ObjectId(), "job_title": "Analyst", "questions": None},
+    ]
+    assert _codec_json(InterviewOut, documents) == _pydantic_json(InterviewOut, documents)
+
+def test_question_and_response_listings_match_pydantic():
+    questions = [{"_id": ObjectId(), "text": "Q", "category": "Technical", "difficulty": "Hard", "created_at": datetime(2024, 5, 1)}]
+    assert _codec_json(QuestionOut, questions) == _pydantic_json(QuestionOut, questions)
+
+    responses = [{
+        "_id": ObjectId(), "interview_id": "i-1", "question_id": "q1", "candidate_id": ObjectId(),
+        "answer": "A", "submitted_at": datetime(2024, 5, 1, 12), "score": 3, "evaluated_by": "AI (hr)",
+    }]
+    assert _codec_json(InterviewResponseOut, responses) == _pydantic_json(InterviewResponseOut, responses)
+
+def test_projection_covers_aliases_and_names():
+    projection = DocumentCodec(InterviewOut).projection
+    assert projection["_id"] == 1 and projection["id"] == 1
+    assert "resume_text" not in projection
@@ -0,0 +1,59 @@
+from collections import Counter
+
+from pymongo import ASCENDING
+
+from app.db.indexes import INDEX_SPECS, IndexReconciler, _spec
+
+class FakeCollection:
+    def __init__(self, indexes=None):
+        self.indexes = {"_id_": {"key": [("_id", 1)], "v": 2}, **(indexes or {})}
+        self.created = []
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def create_index(self, keys, name, **options):
+        self.created.append((name, keys, options))
+        self.indexes[name] = {"key": keys, **options}
+        return name
+
+class FakeDB:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+def test_registry_names_are_unique_per_collection():
+    counts = Counter((spec.default_collection, spec.name) for spec in INDEX_SPECS)
+    assert [key for key, count in counts.items() if count > 1] == []
+
+async def test_reconcile_creates_owned_indexes_and_reports_the_rest():
+    specs = [
+        _spec("interview", "MONGODB_COLLECTION_RESPONSES", "responses", [("interview_id", ASCENDING)], "mine", "test"),
+        _spec("hr", "MONGODB_COLLECTION_MESSAGES", "messages", [("recipient_id", ASCENDING)], "theirs", "test"),
+    ]
+    db = FakeDB({})
+    report = await IndexReconciler(specs).reconcile(db, owner="interview")
+    assert report["created"] == ["responses.mine"]
+    assert report["missing"] == ["messages.theirs"]
+    assert db.collections["messages"].created == []
+
+    # Second run is a no-op
+    report = await IndexReconciler(specs).reconcile(db, owner="interview")
+    assert report["created"] == [] and report["mismatched"] == []
+
+async def test_reconcile_reports_drift_without_dropping():
+    specs = [
+        _spec("auth", "MONGODB_COLLECTION_USERS", "users", [("email", ASCENDING)], "users_email_ci_unique", "test",
+              unique=True, collation={"locale": "en", "strength": 2}),
+    ]
+    users = FakeCollection({
+        "users_email_ci_unique": {"key": [("email", 1)], "unique": True, "collation": {"locale": "en", "strength": 3, "caseLevel": False}},
+        "legacy_idx": {"key": [("foo", 1)]},
+    })
+    report = await IndexReconciler(specs).reconcile(FakeDB({"users": users}), owner="auth")
+    assert report["mismatched"][0]["index"] == "users.users_email_ci_unique"
+    assert "collation" in report["mismatched"][0]["differences"][0]
+    assert report["undeclared"] == ["users.legacy_idx"]
+    assert users.created == [] and "legacy_idx" in users.indexes
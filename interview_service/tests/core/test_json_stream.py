@@ -0,0 +1,117 @@
+import json
+import random
+
+import pytest
+
+from app.core.json_stream import JsonArrayStreamParser, extract_json
+
+QUESTIONS = [
+    {"text": "Explain the GIL [briefly].", "category": "Technical", "difficulty": "Medium"},
+    {"text": "Describe a \"hard\" bug you fixed {and how}.", "category": "Behavioral", "difficulty": "Easy"},
+    {"text": "Nested?", "tags": [["a", "b"], {"k": "]"}]},
+]
+
+def _feed_in_chunks(parser: JsonArrayStreamParser, text: str, size: int):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return emitted
+
+def test_emits_each_element_as_it_closes():
+    text = json.dumps(QUESTIONS)
+    parser = JsonArrayStreamParser()
+    first_object_end = text.index("}") + 1
+    assert parser.feed(text[:first_object_end - 1]) == []
+    assert parser.feed(text[first_object_end - 1:first_object_end]) == [QUESTIONS[0]]
+    assert parser.feed(text[first_object_end:]) == QUESTIONS[1:]
+    assert parser.finished
+
+def test_chunk_boundaries_do_not_matter():
+    text = json.dumps(QUESTIONS, indent=2)
+    for size in (1, 2, 3, 7, 64):
+        assert _feed_in_chunks(JsonArrayStreamParser(), text, size) == QUESTIONS
+
+def test_ignores_fences_and_surrounding_prose():
+    text = 'Here are your "questions":\n```json\n' + json.dumps(QUESTIONS) + '\n```\nGood luck [!]'
+    parser = JsonArrayStreamParser()
+    assert _feed_in_chunks(parser, text, 5) == QUESTIONS
+    assert parser.feed("[{\"text\": \"ignored\"}]") == []
+
+def test_skips_undecodable_elements():
+    text = '[{"text": "ok"}, {"text": bad}, {"text": "also ok"}]'
+    assert _feed_in_chunks(JsonArrayStreamParser(), text, 4) == [{"text": "ok"}, {"text": "also ok"}]
+
+
+# --- extract_json ---
+
+EVALUATION = {"score": 4.0, "feedback": "Solid answer; mentions {edge cases} and [trade-offs]."}
+
+MALFORMED_CORPUS = [
+    # (raw LLM output, expected result)
+    (json.dumps(QUESTIONS), QUESTIONS),
+    ("```json\n" + json.dumps(QUESTIONS, indent=2) + "\n```", QUESTIONS),
+    ("```\n" + json.dumps(QUESTIONS) + "\n```", QUESTIONS),
+    ("Sure! Here are the questions:\n" + json.dumps(QUESTIONS) + "\nLet me know if you need more.", QUESTIONS),
+    ("Note [see below]: generated. " + json.dumps(QUESTIONS), QUESTIONS),
+    ("{not json} then " + json.dumps(EVALUATION), EVALUATION),
+    ("Evaluation: " + json.dumps(EVALUATION) + " (scores are out of 5) {x}", EVALUATION),
+    (json.dumps(QUESTIONS)[:-1], QUESTIONS),
+    (json.dumps(QUESTIONS)[:-10], QUESTIONS[:2]),
+    ("```json\n" + json.dumps(QUESTIONS)[:30], None),
+    ('[{"text": "a"}, {"text": "b"', [{"text": "a"}]),
+    ('{"score": 4.0, "feedback": "cut off', None),
+    # A truncated outer value never yields one of its nested values
+    ('[{"text": "Q1", "tags": ["a", "b"], "cat', None),
+    ('{"questions": [{"text": "Q1"}], "more": [1, 2], "x', None),
+    # A mismatched bracket abandons the candidate at the offending closer, not the whole scan
+    ('Scores (see [a}) below: {"score": 4}', {"score": 4}),
+    ('Note: use [x} format.\n[{"text": "Q"}]', [{"text": "Q"}]),
+    ('{"a": ] "b": [1, 2]}', [1, 2]),
+    ("[}]", None),
+    ("No JSON here at all.", None),
+    ("", None),
+    (None, None),
+]
+
+@pytest.mark.parametrize("raw, expected", MALFORMED_CORPUS)
+def test_extract_json_corpus(raw, expected):
+    assert extract_json(raw) == expected
+
+def test_regex_regression_nested_arrays_not_truncated():
+    # The old non-greedy regex stopped at the first ']' inside the nested 'tags' list
+    payload = [{"text": "Q1", "tags": ["a", "b"]}, {"text": "Q2", "tags": []}]
+    assert extract_json("Output: " + json.dumps(payload) + " done") == payload
+
+def test_extract_json_fuzz_truncation_salvages_prefix():
+    text = json.dumps(QUESTIONS)
+    for cut in range(len(text) + 1):
+        result = extract_json(text[:cut])
+        # Only ever the complete elements received so far, never a nested value on its own
+        assert result is None or result == QUESTIONS[:len(result)]
+        assert result != []
+
+def test_extract_json_single_pass_on_unbalanced_input():
+    # Rescanning from every bracket was quadratic and blocked the event loop on inputs like these
+    for text in ("{" * 50_000, "[" * 50_000, "[{" * 25_000 + '"x": [1]', "[[}" * 25_000):
+        assert extract_json(text) is None
+
+def test_extract_json_fuzz_noise_never_raises():
+    rng = random.Random(1234)
+    alphabet = 'ab {}[]",:\\`\n0123456789'
+    payload = json.dumps(QUESTIONS)
+    for _ in range(500):
+        prefix = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        suffix = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        noisy = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        extract_json(noisy)
+        extract_json(prefix + payload[:rng.randint(0, len(payload))] + suffix)
+        # Prose without brackets around a complete payload must always round-trip
+        prose = prefix.translate(str.maketrans("", "", "{}[]"))
+        assert extract_json(prose + payload + " trailing text") == QUESTIONS
+
+def test_question_shaping_skips_non_objects():
+    from app.api.routes.interview import _to_interview_question
+
+    salvaged = extract_json('[{"text": "Q1"}, ["a", "b"], "stray", {"text": "Q2"}, {"text": "Q3", "tags": ["a"], "cat')
+    shaped = [q for q in map(_to_interview_question, salvaged) if q is not None]
+    assert [q["text"] for q in shaped] == ["Q1", "Q2"]
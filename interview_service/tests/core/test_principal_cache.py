@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app.core.principal_cache import PrincipalCache
+from app.models.user import User
+from app.schemas.user import UserOut
+
+def _user_doc(email="hr@example.com", **overrides):
+    doc = {
+        "_id": ObjectId(),
+        "username": "hruser",
+        "email": email,
+        "hashed_password": "x" * 60,
+        "role": "hr",
+        "hr_status": "mapped",
+        "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "updated_at": datetime(2024, 1, 2, tzinfo=timezone.utc),
+    }
+    doc.update(overrides)
+    return doc
+
+def test_hit_returns_copy_per_model_class():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    doc = _user_doc()
+    cache.put(doc["email"], doc, UserOut.model_validate(doc))
+
+    first = cache.get(doc["email"], UserOut)
+    assert first is not None and first.email == doc["email"]
+    first.username = "mutated"
+    assert cache.get(doc["email"], UserOut).username == "hruser"
+
+    full = cache.get(doc["email"], User)
+    assert isinstance(full, User) and full.id == doc["_id"] and full.hr_status == "mapped"
+
+def test_miss_after_ttl(monkeypatch):
+    cache = PrincipalCache(ttl_seconds=1, max_entries=10)
+    doc = _user_doc()
+    cache.put(doc["email"], doc)
+    now = time.monotonic()
+    monkeypatch.setattr("app.core.principal_cache.time.monotonic", lambda: now + 2)
+    assert cache.get(doc["email"], UserOut) is None
+
+def test_lru_bound():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=2)
+    docs = [_user_doc(email=f"user{i}@example.com") for i in range(3)]
+    cache.put(docs[0]["email"], docs[0])
+    cache.put(docs[1]["email"], docs[1])
+    assert cache.get(docs[0]["email"], UserOut) is not None # touch 0 so 1 is least recently used
+    cache.put(docs[2]["email"], docs[2])
+    assert cache.get(docs[1]["email"], UserOut) is None
+    assert cache.get(docs[0]["email"], UserOut) is not None
+
+def test_invalidate_by_user_id_and_version():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    doc = _user_doc()
+    cache.put(doc["email"], doc)
+
+    # A change that is not newer than the cached version keeps the entry
+    cache.invalidate(user_id=doc["_id"], version=doc["updated_at"])
+    assert cache.get(doc["email"], UserOut) is not None
+
+    cache.invalidate(user_id=str(doc["_id"]), version=doc["updated_at"] + timedelta(seconds=1))
+    assert cache.get(doc["email"], UserOut) is None
+
+def test_invalid_cached_doc_falls_back_to_db():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    doc = _user_doc(admin_manager_id="not-an-object-id")
+    cache.put(doc["email"], doc)
+    assert cache.get(doc["email"], User) is None
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from app.db.query_stats import QueryStats, describe_command, redact
+
+ADDRESS = ("mongodb", 27017)
+
+# Event constructors differ between pymongo releases; the listener only reads these attributes
+def _started(command_name, command, request_id):
+    return SimpleNamespace(command_name=command_name, command=command, request_id=request_id, connection_id=ADDRESS)
+
+def _succeeded(command_name, request_id, micros):
+    return SimpleNamespace(command_name=command_name, request_id=request_id, connection_id=ADDRESS, duration_micros=micros)
+
+def test_redact_keeps_fields_and_operators_only():
+    shape = redact({"email": "a@b.c", "role": {"$in": ["hr", "admin"]}, "$or": [{"a": 1}, {"b": {"$gt": 2}}]})
+    assert shape == {"email": "?", "role": {"$in": ["?"]}, "$or": [{"a": "?"}, {"b": {"$gt": "?"}}]}
+
+def test_describe_command_shapes():
+    collection, shape = describe_command("find", {"find": "users", "filter": {"email": "x"}, "sort": {"updated_at": -1}})
+    assert (collection, shape) == ("users", {"filter": {"email": "?"}, "sort": {"updated_at": -1}})
+    collection, shape = describe_command("update", {"update": "interviews", "updates": [{"q": {"interview_id": "i1"}, "u": {}}]})
+    assert (collection, shape) == ("interviews", {"filter": {"interview_id": "?"}})
+    collection, shape = describe_command("aggregate", {"aggregate": "responses", "pipeline": [{"$match": {"interview_id": "i1"}}]})
+    assert shape == {"pipeline": [{"$match": {"interview_id": "?"}}]}
+
+def test_histograms_and_slow_log():
+    stats = QueryStats(slow_ms=50, max_series=10, slow_log_size=5)
+    stats.started(_started("find", {"find": "users", "filter": {"email": "secret@example.com"}}, 1))
+    stats.succeeded(_succeeded("find", 1, 3000))
+    stats.started(_started("find", {"find": "users", "filter": {"email": "other@example.com"}}, 2))
+    stats.succeeded(_succeeded("find", 2, 120000))
+    stats.started(_started("ping", {"ping": 1}, 3))
+    stats.succeeded(_succeeded("ping", 3, 10))
+
+    snapshot = stats.snapshot()
+    assert len(snapshot["series"]) == 1
+    series = snapshot["series"][0]
+    assert (series["collection"], series["operation"], series["route"]) == ("users", "find", "background")
+    assert series["count"] == 2 and series["buckets"]["le_5"] == 1 and series["buckets"]["le_250"] == 1
+    assert len(snapshot["slow_queries"]) == 1
+    slow = snapshot["slow_queries"][0]
+    assert slow["duration_ms"] == 120.0 and slow["shape"] == {"filter": {"email": "?"}}
+    assert "example.com" not in str(snapshot)
+
+async def test_debug_endpoint_is_off_by_default_and_bounds_limit(monkeypatch):
+    from httpx import ASGITransport, AsyncClient
+
+    from app.core.config import settings
+    from app.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver-interview") as client:
+        assert settings.DEBUG_ENDPOINTS_ENABLED is False
+        assert (await client.get("/debug/db-stats")).status_code == 404
+        monkeypatch.setattr(settings, "DEBUG_ENDPOINTS_ENABLED", True)
+        assert (await client.get("/debug/db-stats", params={"limit": 100000})).status_code == 422
+        response = await client.get("/debug/db-stats", params={"limit": 5})
+        assert response.status_code == 200 and {"queries", "pool", "indexes", "change_events"} <= response.json().keys()
@@ -0,0 +1,225 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services import question_pool_service as pool_module
+from app.services.gemini_service import GeminiServiceError
+from app.services.question_pool_service import QuestionPoolService
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def _matches(doc, filter):
+    for field, condition in filter.items():
+        if isinstance(condition, dict) and "$exists" in condition:
+            if (field in doc) != condition["$exists"]:
+                return False
+        elif isinstance(condition, dict) and "$in" in condition:
+            if doc.get(field) not in condition["$in"]:
+                return False
+        elif isinstance(condition, dict) and "$lt" in condition:
+            if field not in doc or not doc[field] < condition["$lt"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+class _Questions:
+    """In-memory questions collection; counts every command as one round trip."""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.calls = Counter()
+        self.before_claim = None # Hook to simulate a concurrent draw between read and claim
+
+    def find(self, filter, projection=None):
+        self.calls["find"] += 1
+        return _Cursor([dict(doc) for doc in self.docs if _matches(doc, filter)])
+
+    async def update_many(self, filter, update):
+        self.calls["update_many"] += 1
+        if self.before_claim:
+            self.before_claim()
+        modified = 0
+        for doc in self.docs:
+            if _matches(doc, filter):
+                doc.update(update.get("$set", {}))
+                for field in update.get("$unset", {}):
+                    doc.pop(field, None)
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+    async def delete_many(self, filter):
+        self.calls["delete_many"] += 1
+        self.docs = [doc for doc in self.docs if not _matches(doc, filter)]
+
+    async def count_documents(self, filter):
+        self.calls["count_documents"] += 1
+        return sum(1 for doc in self.docs if _matches(doc, filter))
+
+    async def distinct(self, field, filter):
+        return list({doc[field] for doc in self.docs if _matches(doc, filter)})
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend({"_id": ObjectId(), **doc} for doc in docs)
+
+    async def aggregate(self, pipeline):
+        groups = {}
+        for doc in self.docs:
+            if _matches(doc, pipeline[0]["$match"]):
+                group = groups.setdefault(doc["pool_key"], {"_id": doc["pool_key"], "count": 0, **{f: doc[f] for f in ("job_title", "category", "difficulty")}})
+                group["count"] += 1
+        for group in groups.values():
+            yield group
+
+class _Gemini:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.calls = 0
+
+    async def generate_questions(self, **kwargs):
+        self.calls += 1
+        if not self.batches:
+            raise GeminiServiceError("no more batches")
+        return self.batches.pop(0)
+
+def _pooled(n, job_title="Engineer"):
+    key = QuestionPoolService.pool_key(job_title, "General", "Medium")
+    return [
+        {"_id": ObjectId(), "text": f"Pooled question {i}", "category": "General", "difficulty": "Medium",
+         "job_title": job_title, "pool_key": key, "created_at": T0 + timedelta(seconds=i)}
+        for i in range(n)
+    ]
+
+def _generated(prefix, n):
+    return [{"text": f"{prefix} generated question {i}"} for i in range(n)]
+
+@pytest.fixture(autouse=True)
+def _pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTION_POOL_LOW_WATERMARK", 3)
+    monkeypatch.setattr(settings, "QUESTION_POOL_TARGET_SIZE", 6)
+    monkeypatch.setattr(settings, "QUESTION_POOL_REFILL_BATCH_SIZE", 4)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", [1, 5])
+async def test_draw_takes_oldest_in_constant_round_trips(count):
+    questions = _Questions(_pooled(20))
+    service = QuestionPoolService(_Gemini([]))
+
+    drawn = await service.draw({settings.MONGODB_COLLECTION_QUESTIONS: questions}, "Engineer", count)
+
+    assert [q["text"] for q in drawn] == [f"Pooled question {i}" for i in range(count)]
+    assert questions.calls == Counter({"find": 1, "update_many": 1, "delete_many": 1})
+    assert len(questions.docs) == 20 - count
+    assert not service._background_tasks # Still above the low watermark
+
+@pytest.mark.asyncio
+async def test_draw_retries_questions_taken_by_a_concurrent_draw():
+    questions = _Questions(_pooled(10))
+    stolen = questions.docs[1]["_id"]
+
+    def concurrent_draw():
+        questions.before_claim = None
+        next(doc for doc in questions.docs if doc["_id"] == stolen)["claim_id"] = ObjectId()
+
+    questions.before_claim = concurrent_draw
+    drawn = await QuestionPoolService(_Gemini([])).draw({settings.MONGODB_COLLECTION_QUESTIONS: questions}, "Engineer", 3)
+
+    assert [q["text"] for q in drawn] == ["Pooled question 0", "Pooled question 2", "Pooled question 3"]
+    # The stolen question is left to the draw that claimed it
+    assert len(questions.docs) == 7 and any(doc["_id"] == stolen for doc in questions.docs)
+    assert questions.calls["update_many"] == 2
+
+@pytest.mark.asyncio
+async def test_short_draw_skips_the_count_and_refills_below_the_low_watermark(monkeypatch):
+    questions = _Questions(_pooled(2))
+    db = {settings.MONGODB_COLLECTION_QUESTIONS: questions}
+    monkeypatch.setattr(pool_module.mongodb, "get_db", lambda: db)
+    service = QuestionPoolService(_Gemini([_generated("A", 4), _generated("B", 4)]))
+
+    drawn = await service.draw(db, "Engineer", 5)
+    assert len(drawn) == 2 and questions.calls["count_documents"] == 0
+    await asyncio.gather(*service._background_tasks)
+
+    key = service.pool_key("Engineer", "General", "Medium")
+    assert len(questions.docs) == settings.QUESTION_POOL_TARGET_SIZE
+    assert all(doc["pool_key"] == key and "claim_id" not in doc for doc in questions.docs)
+    assert not service._refilling
+
+@pytest.mark.asyncio
+async def test_refill_dedups_and_stops_on_an_unusable_batch():
+    questions = _Questions(_pooled(1))
+    gemini = _Gemini([
+        [{"text": "Pooled question 0"}, {"text": "short"}, "not a dict", {"text": "A new question here"}, {"text": "a new question here "}],
+        [{"text": "tiny"}],
+        _generated("never", 4),
+    ])
+    service = QuestionPoolService(gemini)
+
+    inserted = await service.refill({settings.MONGODB_COLLECTION_QUESTIONS: questions}, "Engineer", "General", "Medium")
+
+    assert inserted == 1 and gemini.calls == 2
+    assert sorted(doc["text"] for doc in questions.docs) == ["A new question here", "Pooled question 0"]
+
+@pytest.mark.asyncio
+async def test_warmer_loop_refills_low_pools_until_stopped(monkeypatch):
+    questions = _Questions(_pooled(1, "Engineer") + _pooled(5, "Designer"))
+    db = {settings.MONGODB_COLLECTION_QUESTIONS: questions}
+    monkeypatch.setattr(pool_module.mongodb, "get_db", lambda: db)
+    monkeypatch.setattr(settings, "QUESTION_POOL_ENABLED", True)
+    monkeypatch.setattr(settings, "QUESTION_POOL_REFILL_INTERVAL_SECONDS", 0.01)
+    service = QuestionPoolService(_Gemini([_generated("A", 4), _generated("B", 4)]))
+
+    service.start()
+    deadline = asyncio.get_running_loop().time() + 2.0
+    while sum(doc["job_title"] == "Engineer" for doc in questions.docs) < settings.QUESTION_POOL_TARGET_SIZE:
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+    await service.stop()
+
+    assert sum(doc["job_title"] == "Designer" for doc in questions.docs) == 5 # Above the watermark: untouched
+    assert service._warmer_task is None and not service._background_tasks
+
+@pytest.mark.asyncio
+async def test_warmer_returns_claims_of_interrupted_draws(monkeypatch):
+    questions = _Questions(_pooled(5))
+    db = {settings.MONGODB_COLLECTION_QUESTIONS: questions}
+    monkeypatch.setattr(pool_module.mongodb, "get_db", lambda: db)
+
+    async def cancelled(filter):
+        raise asyncio.CancelledError() # The request went away between the claim and the delete
+
+    questions.delete_many = cancelled
+    service = QuestionPoolService(_Gemini([]))
+    with pytest.raises(asyncio.CancelledError):
+        await service.draw(db, "Engineer", 2)
+    stuck = [doc for doc in questions.docs if "claim_id" in doc]
+    assert len(stuck) == 2 and all("claimed_at" in doc for doc in stuck)
+
+    assert await service.release_stale_claims(db) == 0 # Still within QUESTION_POOL_CLAIM_TIMEOUT_SECONDS
+    monkeypatch.setattr(settings, "QUESTION_POOL_CLAIM_TIMEOUT_SECONDS", -1)
+    monkeypatch.setattr(settings, "QUESTION_POOL_LOW_WATERMARK", 0) # Keep the sweep from scheduling refills
+    await service.warm_all(db)
+
+    assert not any("claim_id" in doc or "claimed_at" in doc for doc in questions.docs)
+    del questions.delete_many
+    assert [q["text"] for q in await QuestionPoolService(_Gemini([])).draw(db, "Engineer", 2)] == ["Pooled question 0", "Pooled question 1"]
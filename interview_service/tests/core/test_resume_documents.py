@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.db import resume_documents
+from app.db.resume_documents import ResumeDocuments, decode_text, encode_text, resume_filter
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+class _Users:
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.reads = 0
+
+    async def find_one(self, filter, projection=None):
+        self.reads += 1
+        return self.docs.get(filter["_id"])
+
+    def find(self, query, projection=None):
+        after = query.get("_id", {}).get("$gt")
+        return _Cursor([
+            dict(doc) for doc in self.docs.values()
+            if "resume_text" in doc and (after is None or doc["_id"] > after)
+        ])
+
+    async def bulk_write(self, ops, ordered=True):
+        matched = 0
+        for op in ops:
+            doc = self.docs.get(op._filter["_id"])
+            if doc is None or doc.get("updated_at") != op._filter["updated_at"]:
+                continue
+            matched += 1
+            doc.update(op._doc["$set"])
+            for field in op._doc["$unset"]:
+                doc.pop(field, None)
+        return SimpleNamespace(matched_count=matched, modified_count=matched)
+
+class _Resumes:
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.reads = 0
+
+    async def find_one(self, filter, projection=None):
+        self.reads += 1
+        return self.docs.get(filter["_id"])
+
+    async def bulk_write(self, ops, ordered=True):
+        upserted, modified, errors = 0, 0, []
+        for op in ops:
+            _id, older_than = op._filter["_id"], op._filter["updated_at"]["$lt"]
+            existing = self.docs.get(_id)
+            if existing is None:
+                self.docs[_id] = {"_id": _id, **op._doc["$set"]}
+                upserted += 1
+            elif existing["updated_at"] < older_than:
+                existing.update(op._doc["$set"])
+                modified += 1
+            else:
+                errors.append({"code": 11000})
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nUpserted": upserted, "nModified": modified})
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+def _store(users, resumes):
+    return ResumeDocuments({settings.MONGODB_COLLECTION_USERS: users, settings.MONGODB_COLLECTION_RESUME_DOCUMENTS: resumes})
+
+def test_text_is_stored_plain_without_compression_or_zstandard(monkeypatch):
+    text = "python " * 500
+    assert encode_text(text) == {"text": text, "encoding": None, "text_bytes": len(text)}
+    monkeypatch.setattr(settings, "RESUME_DOCUMENTS_COMPRESSION", "zstd")
+    monkeypatch.setattr(resume_documents, "ZSTD_LOADED", False)
+    assert encode_text(text)["encoding"] is None
+    assert decode_text(encode_text(text)) == text
+
+def test_zstd_round_trip(monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(settings, "RESUME_DOCUMENTS_COMPRESSION", "zstd")
+    text = "Senior engineer, Python and MongoDB. " * 200
+    stored = encode_text(text)
+    assert stored["encoding"] == "zstd" and len(stored["text"]) < len(text)
+    assert decode_text(stored) == text
+    assert encode_text("short")["encoding"] is None # Below RESUME_DOCUMENTS_COMPRESS_MIN_BYTES
+
+@pytest.mark.asyncio
+async def test_get_text_compatibility_path(monkeypatch):
+    migrated, legacy, bare = ObjectId(), ObjectId(), ObjectId()
+    users = _Users([{"_id": legacy, "resume_text": "legacy text"}, {"_id": bare}])
+    resumes = _Resumes([{"_id": migrated, **encode_text("split text")}])
+    store = _store(users, resumes)
+
+    assert await store.get_text(migrated) == "split text"
+    assert await store.get_text(legacy) == "legacy text" # Not migrated yet: read from the user document
+    assert await store.get_text(bare) is None
+    # A caller-supplied user document still holding the text needs no read at all
+    resumes.reads = users.reads = 0
+    assert await store.get_text(legacy, {"resume_text": "legacy text"}) == "legacy text"
+    assert resumes.reads == users.reads == 0
+
+    monkeypatch.setattr(settings, "RESUME_DOCUMENTS_LEGACY_READS", False)
+    assert await store.get_text(legacy) is None
+    assert resume_filter() == {"has_resume": True}
+
+@pytest.mark.asyncio
+async def test_migrate_moves_text_in_batches_and_never_overwrites_newer_resumes():
+    uploaded, concurrent = ObjectId(), ObjectId()
+    docs = [
+        {"_id": ObjectId(), "resume_text": f"resume {n}", "extracted_skills_list": ["python"], "estimated_yoe": 2.0, "updated_at": T0}
+        for n in range(5)
+    ]
+    # Re-uploaded through the new path after the migration read its old text
+    docs.append({"_id": uploaded, "resume_text": "stale", "updated_at": T0})
+    docs.append({"_id": concurrent, "resume_text": None, "updated_at": T0})
+    docs.append({"_id": ObjectId(), "username": "no resume", "updated_at": T0})
+    users = _Users(docs)
+    resumes = _Resumes([{"_id": uploaded, **encode_text("fresh"), "updated_at": T0 + timedelta(days=1)}])
+    store = _store(users, resumes)
+
+    original_find = users.find
+    def find_and_race(query, projection=None):
+        cursor = original_find(query, projection)
+        users.docs[concurrent]["updated_at"] = T0 + timedelta(seconds=1) # Changed after being read
+        return cursor
+    users.find = find_and_race
+
+    stats = await store.migrate(batch_size=3)
+    assert stats == {"scanned": 7, "copied": 5, "kept_newer": 1, "users_compacted": 6, "users_changed": 1}
+    assert decode_text(resumes.docs[uploaded]) == "fresh"
+    assert decode_text(resumes.docs[docs[0]["_id"]]) == "resume 0" and resumes.docs[docs[0]["_id"]]["extracted_skills_list"] == ["python"]
+    assert [doc["_id"] for doc in users.docs.values() if "resume_text" in doc] == [concurrent]
+    assert users.docs[uploaded]["has_resume"] is True and users.docs[docs[0]["_id"]]["has_resume"] is True
+
+    users.find = original_find
+    stats = await store.migrate(batch_size=3) # Rerun picks up what changed underneath the first one
+    assert stats["users_compacted"] == 1 and users.docs[concurrent]["has_resume"] is False
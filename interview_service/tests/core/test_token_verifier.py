@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jose import JWTError
+from jose.exceptions import ExpiredSignatureError
+
+from app.core.token_verifier import TokenVerifier
+
+def _pem_pair(private_key):
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+def _claims(seconds=60):
+    return {"sub": "user@example.com", "role": "candidate", "exp": int(time.time()) + seconds}
+
+def test_verified_tokens_are_served_from_cache_until_exp():
+    verifier = TokenVerifier("HS256", "secret")
+    token = verifier.encode(_claims())
+    first = verifier.decode(token)
+    first["role"] = "admin" # callers get their own copy
+    assert verifier.decode(token)["role"] == "candidate"
+    assert (verifier.hits, verifier.misses) == (1, 1)
+    stats = verifier.stats()
+    assert stats["cached_tokens"] == 1 and stats["verify_us_p50"] is not None
+
+def test_cached_token_is_verified_again_once_exp_passes(monkeypatch):
+    verifier = TokenVerifier("HS256", "secret")
+    token = verifier.encode(_claims(seconds=5))
+    verifier.decode(token)
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 10)
+    verifier.decode(token) # the cache no longer answers; full verification runs again
+    assert (verifier.hits, verifier.misses) == (0, 2)
+
+def test_expired_token_is_rejected():
+    verifier = TokenVerifier("HS256", "secret")
+    with pytest.raises(ExpiredSignatureError):
+        verifier.decode(verifier.encode(_claims(seconds=-5)))
+
+def test_cache_is_bounded_and_bad_tokens_are_not_cached():
+    verifier = TokenVerifier("HS256", "secret", max_entries=2)
+    for n in range(3):
+        verifier.decode(verifier.encode({**_claims(), "n": n}))
+    assert verifier.stats()["cached_tokens"] == 2
+    forged = TokenVerifier("HS256", "other-secret").encode(_claims())
+    with pytest.raises(JWTError):
+        verifier.decode(forged)
+    assert verifier.failures == 1 and verifier.stats()["cached_tokens"] == 2
+
+@pytest.mark.parametrize("algorithm, private_key", [
+    ("RS256", rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+    ("EdDSA", ed25519.Ed25519PrivateKey.generate()),
+])
+def test_asymmetric_tokens_verify_with_public_key_only(algorithm, private_key):
+    private_pem, public_pem = _pem_pair(private_key)
+    signer = TokenVerifier(algorithm, None, private_key=private_pem)
+    verifier = TokenVerifier(algorithm, None, public_key=public_pem)
+    token = signer.encode(_claims())
+    assert verifier.decode(token)["sub"] == "user@example.com"
+    with pytest.raises(JWTError):
+        verifier.encode(_claims()) # no signing key outside auth_service
+    tampered = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+    with pytest.raises(JWTError):
+        TokenVerifier(algorithm, None, public_key=public_pem).decode(tampered)
+    with pytest.raises(JWTError):
+        verifier.decode(TokenVerifier("HS256", "secret").encode(_claims())) # algorithm confusion
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.gemini_service import GeminiService, GeminiServiceError
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.prompt_feedback = None
+        self.usage_metadata = None
+
+
+class _FakeModel:
+    """Counts provider calls and holds each one open until released."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("provider unavailable")
+        return _FakeResponse(f'[{{"text": "Answer for: {prompt}"}}]')
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_METRICS_ENABLED", False)
+    return GeminiService()
+
+
+async def _run_concurrently(svc, model, prompts):
+    svc.model = model
+    tasks = [asyncio.create_task(svc._call_gemini_api(p)) for p in prompts]
+    await asyncio.sleep(0)
+    model.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_identical_prompts_share_one_call(service):
+    model = _FakeModel()
+    results = await _run_concurrently(service, model, ["same prompt"] * 5)
+    assert model.calls == 1
+    assert len(set(results)) == 1
+    assert service._in_flight == {}
+
+
+async def test_distinct_prompts_are_not_coalesced(service):
+    model = _FakeModel()
+    await _run_concurrently(service, model, ["prompt a", "prompt b", "prompt a"])
+    assert model.calls == 2
+
+
+async def test_errors_propagate_to_all_waiters(service):
+    model = _FakeModel(fail=True)
+    results = await _run_concurrently(service, model, ["same prompt"] * 3)
+    assert model.calls == 1
+    assert all(isinstance(r, GeminiServiceError) for r in results)
+    assert service._in_flight == {}
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_call(service):
+    model = _FakeModel()
+    service.model = model
+    first = asyncio.create_task(service._call_gemini_api("same prompt"))
+    second = asyncio.create_task(service._call_gemini_api("same prompt"))
+    await asyncio.sleep(0)
+    first.cancel()
+    model.release.set()
+    assert "Answer for: same prompt" in await second
+    assert model.calls == 1
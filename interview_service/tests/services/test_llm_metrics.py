@@ -0,0 +1,51 @@
+import asyncio
+
+from bson import ObjectId
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.db.mongodb import mongodb
+from app.main import app
+from app.schemas.user import UserOut
+from app.services import llm_metrics as metrics_module
+from app.services.llm_metrics import LLMMetricsRecorder
+
+class _SlowMetrics:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(0.01)
+        self.docs.append(doc)
+
+async def test_aclose_waits_for_inserts_in_flight(monkeypatch):
+    collection = _SlowMetrics()
+    monkeypatch.setattr(settings, "LLM_METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics_module.mongodb, "get_db", lambda: {settings.MONGODB_COLLECTION_LLM_METRICS: collection})
+    recorder = LLMMetricsRecorder()
+
+    for n in range(3):
+        recorder.record("generate_questions", 100 + n, 20, 12.5, True, False)
+    assert collection.docs == []
+    await recorder.aclose()
+
+    assert [doc["input_tokens"] for doc in collection.docs] == [100, 101, 102] and not recorder._pending
+
+async def _get_metrics(monkeypatch, role):
+    async def aggregate_by_endpoint(db, since=None):
+        return [{"endpoint": "/schedule", "operation": "generate_questions", "calls": 1}]
+
+    monkeypatch.setattr(metrics_module.llm_metrics, "aggregate_by_endpoint", aggregate_by_endpoint)
+    app.dependency_overrides[get_current_user] = lambda: UserOut(id=str(ObjectId()), username=f"{role}user", email=f"{role}@example.com", role=role)
+    app.dependency_overrides[mongodb.get_db] = lambda: None
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver-interview") as client:
+            return await client.get("/api/v1/interview/metrics/llm")
+    finally:
+        app.dependency_overrides = {}
+
+async def test_llm_metrics_are_admin_only(monkeypatch):
+    assert (await _get_metrics(monkeypatch, "hr")).status_code == 403
+    response = await _get_metrics(monkeypatch, "admin")
+    assert response.status_code == 200 and response.json()[0]["calls"] == 1
@@ -0,0 +1,34 @@
+from app.core.config import settings
+from app.services.prompt_budget import (
+    PromptSection, TRUNCATION_MARKER, estimate_tokens, fit_sections_to_budget, trim_to_tokens
+)
+
+def test_estimate_tokens():
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a") == 1
+    assert estimate_tokens("x" * int(settings.GEMINI_CHARS_PER_TOKEN * 10)) == 10
+
+def test_trim_to_tokens_keeps_short_text_and_marks_trimmed_text():
+    assert trim_to_tokens("short text", 100) == "short text"
+    long_text = "\n".join(f"Line {i}: did some work on project {i}." for i in range(500))
+    trimmed = trim_to_tokens(long_text, 100)
+    assert trimmed.endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(trimmed) <= 100
+
+def test_fit_sections_respects_budget_and_priority():
+    job_description = "Build APIs. " * 400
+    resume = "Worked on things. " * 2000
+    fitted = fit_sections_to_budget(
+        [PromptSection("resume", resume, priority=1, min_tokens=200),
+         PromptSection("job_description", job_description, priority=2, min_tokens=200)],
+        1000
+    )
+    assert sum(estimate_tokens(t) for t in fitted.values()) <= 1000
+    # The higher priority section is fitted first but leaves the resume its reserved share
+    assert estimate_tokens(fitted["job_description"]) <= 800
+    assert estimate_tokens(fitted["resume"]) >= 150
+
+def test_fit_sections_untouched_when_within_budget():
+    fitted = fit_sections_to_budget([PromptSection("resume", "Python, FastAPI", priority=1)], 1000)
+    assert fitted == {"resume": "Python, FastAPI"}